@@ -0,0 +1,42 @@
+"""Add payroll run checkpoints
+
+Revision ID: payr0llck01
+Revises: o3p4q5r6s7t8
+Create Date: 2026-10-16 09:00:00.000000
+
+Per-chunk progress for chunked payroll runs so an interrupted run resumes
+from the last committed employee instead of restarting.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = 'payr0llck01'
+down_revision = 'o3p4q5r6s7t8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('payroll_run_checkpoints',
+        sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('payroll_run_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('chunk_index', sa.Integer, nullable=False),
+        sa.Column('last_employee_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('employee_count', sa.Integer, default=0),
+        sa.Column('total_gross', sa.Numeric(14, 2), default=0),
+        sa.Column('total_deductions', sa.Numeric(14, 2), default=0),
+        sa.Column('total_net', sa.Numeric(14, 2), default=0),
+        sa.Column('total_employer_contributions', sa.Numeric(14, 2), default=0),
+        sa.Column('errors', postgresql.JSONB, server_default='[]'),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()')),
+        sa.ForeignKeyConstraint(['payroll_run_id'], ['payroll_runs.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('payroll_run_id', 'chunk_index', name='uq_payroll_checkpoint_chunk')
+    )
+    op.create_index('ix_payroll_run_checkpoints_payroll_run_id', 'payroll_run_checkpoints', ['payroll_run_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_payroll_run_checkpoints_payroll_run_id', table_name='payroll_run_checkpoints')
+    op.drop_table('payroll_run_checkpoints')
@@ -0,0 +1,102 @@
+"""Add document number sequences
+
+Revision ID: docseq01
+Revises: payr0llck01
+Create Date: 2026-10-16 10:00:00.000000
+
+Counter rows for generated lead, customer, opportunity and anomaly
+detection numbers, seeded from the highest number already issued. Document
+numbers are allocated per company, so their unique constraints become
+per-company as well. The document tables are only touched if they exist,
+since some of them are created outside the migration chain.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+from sqlalchemy.dialects import postgresql
+
+revision = 'docseq01'
+down_revision = 'payr0llck01'
+branch_labels = None
+depends_on = None
+
+
+# (table, number column, prefix, regex, period expression, value expression)
+SEQUENCE_SOURCES = [
+    ('leads', 'lead_number', 'LD', '^LD-[0-9]{6}-[0-9]+$',
+     "split_part(lead_number, '-', 2)", "split_part(lead_number, '-', 3)"),
+    ('opportunities', 'opportunity_number', 'OP', '^OP-[0-9]{6}-[0-9]+$',
+     "split_part(opportunity_number, '-', 2)", "split_part(opportunity_number, '-', 3)"),
+    ('customers', 'customer_code', 'CUST', '^CUST-[0-9]+$',
+     "''", "split_part(customer_code, '-', 2)"),
+    ('anomaly_detections', 'detection_number', 'ANM', '^ANM-[0-9]{4}-[0-9]+$',
+     "split_part(detection_number, '-', 2)", "split_part(detection_number, '-', 3)"),
+]
+
+# (table, column, old global constraint, new per-company constraint)
+PER_COMPANY_NUMBERS = [
+    ('leads', 'lead_number', 'leads_lead_number_key', 'uq_lead_number'),
+    ('opportunities', 'opportunity_number', 'opportunities_opportunity_number_key', 'uq_opportunity_number'),
+    ('anomaly_detections', 'detection_number', 'anomaly_detections_detection_number_key', 'uq_detection_number'),
+]
+
+
+def table_exists(table_name):
+    """Check if a table exists in the database."""
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    return table_name in inspector.get_table_names()
+
+
+def constraint_exists(table_name, constraint_name):
+    """Check if a unique constraint exists on a table."""
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    return constraint_name in [c['name'] for c in inspector.get_unique_constraints(table_name)]
+
+
+def upgrade() -> None:
+    if not table_exists('document_sequences'):
+        op.create_table('document_sequences',
+            sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+            sa.Column('company_id', postgresql.UUID(as_uuid=True), nullable=False),
+            sa.Column('prefix', sa.String(20), nullable=False),
+            sa.Column('period', sa.String(10), nullable=False, server_default=''),
+            sa.Column('last_value', sa.BigInteger, nullable=False, server_default='0'),
+            sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()')),
+            sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()')),
+            sa.ForeignKeyConstraint(['company_id'], ['companies.id']),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('company_id', 'prefix', 'period', name='uq_document_sequence')
+        )
+
+    for table, column, prefix, pattern, period_expr, value_expr in SEQUENCE_SOURCES:
+        if not table_exists(table):
+            continue
+        op.execute(f"""
+            INSERT INTO document_sequences (id, company_id, prefix, period, last_value)
+            SELECT gen_random_uuid(), company_id, '{prefix}', {period_expr},
+                   MAX(({value_expr})::bigint)
+            FROM {table}
+            WHERE {column} ~ '{pattern}'
+            GROUP BY company_id, {period_expr}
+            ON CONFLICT ON CONSTRAINT uq_document_sequence
+            DO UPDATE SET last_value = GREATEST(document_sequences.last_value, EXCLUDED.last_value)
+        """)
+
+    for table, column, old_name, new_name in PER_COMPANY_NUMBERS:
+        if not table_exists(table) or constraint_exists(table, new_name):
+            continue
+        op.execute(f'ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {old_name}')
+        op.create_unique_constraint(new_name, table, ['company_id', column])
+
+
+def downgrade() -> None:
+    for table, column, old_name, new_name in PER_COMPANY_NUMBERS:
+        if not table_exists(table) or not constraint_exists(table, new_name):
+            continue
+        op.execute(f'ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {new_name}')
+        op.create_unique_constraint(old_name, table, [column])
+
+    if table_exists('document_sequences'):
+        op.drop_table('document_sequences')
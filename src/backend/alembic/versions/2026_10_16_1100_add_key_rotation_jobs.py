@@ -0,0 +1,43 @@
+"""Add key rotation jobs
+
+Revision ID: keyrot01
+Revises: docseq01
+Create Date: 2026-10-16 11:00:00.000000
+
+Keyset cursor and counters per encrypted column, so re-encrypting a table
+to a new key version resumes after an interruption.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = 'keyrot01'
+down_revision = 'docseq01'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('key_rotation_jobs',
+        sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('table_name', sa.String(100), nullable=False),
+        sa.Column('column_name', sa.String(100), nullable=False),
+        sa.Column('target_version', sa.Integer, nullable=False),
+        sa.Column('status', sa.String(20), server_default='running'),
+        sa.Column('last_id', postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column('rows_total', sa.Integer, server_default='0'),
+        sa.Column('rows_processed', sa.Integer, server_default='0'),
+        sa.Column('rows_rotated', sa.Integer, server_default='0'),
+        sa.Column('rows_skipped', sa.Integer, server_default='0'),
+        sa.Column('rows_failed', sa.Integer, server_default='0'),
+        sa.Column('last_error', sa.Text, nullable=True),
+        sa.Column('started_at', sa.DateTime, server_default=sa.text('now()')),
+        sa.Column('updated_at', sa.DateTime, server_default=sa.text('now()')),
+        sa.Column('completed_at', sa.DateTime, nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('table_name', 'column_name', 'target_version', name='uq_key_rotation_job')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('key_rotation_jobs')
@@ -0,0 +1,87 @@
+"""Add account period balances
+
+Revision ID: ledger01
+Revises: keyrot01
+Create Date: 2026-10-16 12:00:00.000000
+
+Posted debit/credit totals per account and accounting period, so financial
+statements read one row per account and period instead of every journal
+line. Accounting tables are created outside migrations on some installs,
+so this only runs (and backfills) where they exist.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+from sqlalchemy import inspect
+
+revision = 'ledger01'
+down_revision = 'keyrot01'
+branch_labels = None
+depends_on = None
+
+
+def table_exists(table_name):
+    """Check if a table exists in the database."""
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    return table_name in inspector.get_table_names()
+
+
+def index_exists(index_name, table_name):
+    """Check if an index exists on a table."""
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    try:
+        indexes = inspector.get_indexes(table_name)
+        return any(idx['name'] == index_name for idx in indexes)
+    except Exception:
+        return False
+
+
+def upgrade() -> None:
+    if not table_exists('journal_entries') or table_exists('account_period_balances'):
+        return
+
+    op.create_table('account_period_balances',
+        sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('company_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('companies.id'), nullable=False),
+        sa.Column('account_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('accounts.id'), nullable=False),
+        sa.Column('accounting_period_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('accounting_periods.id'), nullable=False),
+        sa.Column('period_end', sa.Date, nullable=False),
+        sa.Column('debit_total', sa.Numeric(18, 2), nullable=False, server_default='0'),
+        sa.Column('credit_total', sa.Numeric(18, 2), nullable=False, server_default='0'),
+        sa.Column('is_frozen', sa.Boolean, nullable=False, server_default='false'),
+        sa.Column('updated_at', sa.DateTime, server_default=sa.text('now()')),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('account_id', 'accounting_period_id', name='uq_account_period_balance')
+    )
+    op.create_index('ix_account_period_balances_company_end', 'account_period_balances', ['company_id', 'period_end'])
+
+    if not index_exists('ix_journal_entries_period_date', 'journal_entries'):
+        op.create_index('ix_journal_entries_period_date', 'journal_entries', ['accounting_period_id', 'journal_date'])
+    if not index_exists('ix_journal_lines_entry', 'journal_lines'):
+        op.create_index('ix_journal_lines_entry', 'journal_lines', ['journal_entry_id'])
+
+    # Backfill from entries already posted; closed periods start frozen
+    op.execute("""
+        INSERT INTO account_period_balances
+            (id, company_id, account_id, accounting_period_id, period_end, debit_total, credit_total, is_frozen)
+        SELECT gen_random_uuid(), je.company_id, jl.account_id, je.accounting_period_id, ap.end_date,
+               COALESCE(SUM(jl.debit_amount), 0), COALESCE(SUM(jl.credit_amount), 0),
+               NOT COALESCE(ap.is_open, true)
+        FROM journal_lines jl
+        JOIN journal_entries je ON je.id = jl.journal_entry_id
+        JOIN accounting_periods ap ON ap.id = je.accounting_period_id
+        WHERE je.status::text IN ('POSTED', 'REVERSED')
+        GROUP BY je.company_id, jl.account_id, je.accounting_period_id, ap.end_date, ap.is_open
+    """)
+
+
+def downgrade() -> None:
+    if table_exists('account_period_balances'):
+        op.drop_index('ix_account_period_balances_company_end', table_name='account_period_balances')
+        op.drop_table('account_period_balances')
+    if index_exists('ix_journal_lines_entry', 'journal_lines'):
+        op.drop_index('ix_journal_lines_entry', table_name='journal_lines')
+    if index_exists('ix_journal_entries_period_date', 'journal_entries'):
+        op.drop_index('ix_journal_entries_period_date', table_name='journal_entries')
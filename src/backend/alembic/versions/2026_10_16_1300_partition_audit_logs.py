@@ -0,0 +1,173 @@
+"""Partition audit logs by month and chain their checksums
+
+Revision ID: audit01
+Revises: ledger01
+Create Date: 2026-10-16 13:00:00.000000
+
+audit_logs becomes a table range-partitioned by month on created_at, so
+searches bounded by date and the 7-year retention cleanup only touch the
+partitions they need. Entries gain company_id, description, request_id,
+extra, and a per-company hash chain (seq, prev_checksum, checksum) whose
+head is kept in audit_chain_heads. Existing rows are copied into the
+partitions; they predate the chain and keep a NULL seq.
+"""
+from datetime import date
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+from sqlalchemy import inspect
+
+revision = 'audit01'
+down_revision = 'ledger01'
+branch_labels = None
+depends_on = None
+
+# Partitions created ahead of the current month
+MONTHS_AHEAD = 3
+
+
+def table_exists(table_name):
+    """Check if a table exists in the database."""
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    return table_name in inspector.get_table_names()
+
+
+def column_type(table_name, column_name):
+    """Data type of a column, or None if it does not exist."""
+    return op.get_bind().execute(sa.text(
+        "SELECT data_type FROM information_schema.columns "
+        "WHERE table_name = :table AND column_name = :column"
+    ), {"table": table_name, "column": column_name}).scalar()
+
+
+def is_partitioned(table_name):
+    return bool(op.get_bind().execute(sa.text(
+        "SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid "
+        "WHERE c.relname = :table"
+    ), {"table": table_name}).scalar())
+
+
+def next_month(day):
+    return date(day.year + day.month // 12, day.month % 12 + 1, 1)
+
+
+def create_partitions(first_month, last_month):
+    month = first_month
+    while month <= last_month:
+        op.execute(
+            f"CREATE TABLE IF NOT EXISTS audit_logs_{month.year:04d}_{month.month:02d} "
+            f"PARTITION OF audit_logs FOR VALUES FROM ('{month.isoformat()}') TO ('{next_month(month).isoformat()}')"
+        )
+        month = next_month(month)
+
+
+def upgrade() -> None:
+    if not table_exists('audit_chain_heads'):
+        op.create_table('audit_chain_heads',
+            sa.Column('chain_id', postgresql.UUID(as_uuid=True), nullable=False),
+            sa.Column('seq', sa.BigInteger, nullable=False, server_default='0'),
+            sa.Column('checksum', sa.String(64), nullable=True),
+            sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()')),
+            sa.PrimaryKeyConstraint('chain_id')
+        )
+
+    if table_exists('audit_logs') and is_partitioned('audit_logs'):
+        return
+
+    legacy = table_exists('audit_logs')
+    if legacy:
+        op.rename_table('audit_logs', 'audit_logs_legacy')
+        # Index names are global; free them for the new table
+        op.execute("ALTER INDEX IF EXISTS audit_logs_pkey RENAME TO audit_logs_legacy_pkey")
+
+    op.execute("""
+        CREATE TABLE audit_logs (
+            id UUID NOT NULL DEFAULT uuid_generate_v4(),
+            user_id UUID REFERENCES users(id),
+            company_id UUID,
+            action VARCHAR(100) NOT NULL,
+            entity_type VARCHAR(50),
+            entity_id UUID,
+            old_values JSONB,
+            new_values JSONB,
+            ip_address INET,
+            user_agent VARCHAR(500),
+            description TEXT,
+            request_id VARCHAR(100),
+            extra JSONB,
+            seq BIGINT,
+            prev_checksum VARCHAR(64),
+            checksum VARCHAR(64),
+            created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+    """)
+    op.create_index('ix_audit_logs_company_created', 'audit_logs', ['company_id', 'created_at'])
+    op.create_index('ix_audit_logs_chain', 'audit_logs', ['company_id', 'seq'])
+    op.create_index('ix_audit_logs_user_created', 'audit_logs', ['user_id', 'created_at'])
+
+    first_month = date.today().replace(day=1)
+    if legacy:
+        oldest = op.get_bind().execute(sa.text("SELECT min(created_at) FROM audit_logs_legacy")).scalar()
+        if oldest is not None:
+            first_month = min(first_month, oldest.date().replace(day=1))
+    last_month = date.today().replace(day=1)
+    for _ in range(MONTHS_AHEAD):
+        last_month = next_month(last_month)
+    create_partitions(first_month, last_month)
+
+    if legacy:
+        # old_values/new_values were created as text; later installs have JSONB
+        def as_jsonb(column):
+            if column_type('audit_logs_legacy', column) in ('json', 'jsonb'):
+                return f"{column}::jsonb"
+            return f"CASE WHEN {column} IS NULL THEN NULL ELSE to_jsonb({column}) END"
+
+        op.execute(f"""
+            INSERT INTO audit_logs (
+                id, user_id, action, entity_type, entity_id, old_values, new_values,
+                ip_address, user_agent, created_at
+            )
+            SELECT
+                id, user_id, action, entity_type, entity_id,
+                {as_jsonb('old_values')}, {as_jsonb('new_values')},
+                ip_address, user_agent, coalesce(created_at, now())
+            FROM audit_logs_legacy
+        """)
+        op.drop_table('audit_logs_legacy')
+
+
+def downgrade() -> None:
+    if table_exists('audit_logs') and is_partitioned('audit_logs'):
+        op.create_table('audit_logs_flat',
+            sa.Column('id', postgresql.UUID(as_uuid=True), primary_key=True, server_default=sa.text('uuid_generate_v4()')),
+            sa.Column('user_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('users.id'), nullable=True),
+            sa.Column('action', sa.String(100), nullable=False),
+            sa.Column('entity_type', sa.String(50), nullable=True),
+            sa.Column('entity_id', postgresql.UUID(as_uuid=True), nullable=True),
+            sa.Column('old_values', postgresql.JSONB, nullable=True),
+            sa.Column('new_values', postgresql.JSONB, nullable=True),
+            sa.Column('ip_address', postgresql.INET, nullable=True),
+            sa.Column('user_agent', sa.String(500), nullable=True),
+            sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()')),
+        )
+        op.execute("""
+            INSERT INTO audit_logs_flat (
+                id, user_id, action, entity_type, entity_id, old_values, new_values,
+                ip_address, user_agent, created_at
+            )
+            SELECT DISTINCT ON (id)
+                id, user_id, action, entity_type, entity_id, old_values, new_values,
+                ip_address, user_agent, created_at
+            FROM audit_logs
+            ORDER BY id, created_at
+        """)
+        # Dropping the parent drops every partition
+        op.drop_table('audit_logs')
+        op.rename_table('audit_logs_flat', 'audit_logs')
+        op.execute("ALTER INDEX IF EXISTS audit_logs_flat_pkey RENAME TO audit_logs_pkey")
+
+    if table_exists('audit_chain_heads'):
+        op.drop_table('audit_chain_heads')
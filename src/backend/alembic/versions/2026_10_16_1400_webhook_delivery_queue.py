@@ -0,0 +1,55 @@
+"""Schedule webhook deliveries for the dispatcher
+
+Revision ID: webhk01
+Revises: audit01
+Create Date: 2026-10-16 14:00:00.000000
+
+webhook_deliveries gains next_attempt_at: when a pending or retry
+delivery is due, or when a claimed (sending) delivery's lease expires.
+A partial index over the claimable statuses keeps the dispatcher's
+claim query cheap however large the delivery history grows.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+revision = 'webhk01'
+down_revision = 'audit01'
+branch_labels = None
+depends_on = None
+
+
+def column_exists(table_name, column_name):
+    """Check if a column exists in a table."""
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    return column_name in [c['name'] for c in inspector.get_columns(table_name)]
+
+
+def index_exists(table_name, index_name):
+    """Check if an index exists on a table."""
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    return index_name in [i['name'] for i in inspector.get_indexes(table_name)]
+
+
+def upgrade() -> None:
+    if not column_exists('webhook_deliveries', 'next_attempt_at'):
+        op.add_column('webhook_deliveries', sa.Column('next_attempt_at', sa.DateTime(), nullable=True))
+        op.execute(
+            "UPDATE webhook_deliveries SET next_attempt_at = now() AT TIME ZONE 'utc' "
+            "WHERE status IN ('pending', 'retry')"
+        )
+
+    if not index_exists('webhook_deliveries', 'ix_webhook_deliveries_due'):
+        op.create_index(
+            'ix_webhook_deliveries_due', 'webhook_deliveries', ['next_attempt_at'],
+            postgresql_where=sa.text("status IN ('pending', 'retry', 'sending')")
+        )
+
+
+def downgrade() -> None:
+    if index_exists('webhook_deliveries', 'ix_webhook_deliveries_due'):
+        op.drop_index('ix_webhook_deliveries_due', table_name='webhook_deliveries')
+    if column_exists('webhook_deliveries', 'next_attempt_at'):
+        op.drop_column('webhook_deliveries', 'next_attempt_at')
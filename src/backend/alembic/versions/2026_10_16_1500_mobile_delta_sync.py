@@ -0,0 +1,105 @@
+"""Tombstones and keyset indexes for mobile delta sync
+
+Revision ID: msync01
+Revises: webhk01
+Create Date: 2026-10-16 15:00:00.000000
+
+Delta sync pages each entity by (changed_at, id) from a cursor, so every
+synced table gets an index on (owner, changed_at, id). Hard deletes of
+synced rows are recorded in sync_tombstones by a trigger, with the owner
+(company, employee or user) the row was synced to.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+from sqlalchemy import inspect
+
+revision = 'msync01'
+down_revision = 'webhk01'
+branch_labels = None
+depends_on = None
+
+# table: (entity type, owner column, changed-at column)
+SYNCED_TABLES = {
+    'employees': ('employee', 'company_id', 'updated_at'),
+    'attendance_logs': ('attendance', 'employee_id', 'created_at'),
+    'leave_requests': ('leave', 'employee_id', 'updated_at'),
+    'expense_claims': ('expense', 'employee_id', 'updated_at'),
+    'tasks': ('task', 'assignee_id', 'updated_at'),
+    'timesheets': ('timesheet', 'employee_id', 'updated_at'),
+    'push_notification_recipients': ('notification', 'user_id', 'updated_at'),
+}
+
+
+def table_exists(table_name):
+    """Check if a table exists in the database."""
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    return table_name in inspector.get_table_names()
+
+
+def index_exists(table_name, index_name):
+    """Check if an index exists on a table."""
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    return index_name in [i['name'] for i in inspector.get_indexes(table_name)]
+
+
+def upgrade() -> None:
+    if not table_exists('sync_tombstones'):
+        op.create_table('sync_tombstones',
+            sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False, server_default=sa.text('uuid_generate_v4()')),
+            sa.Column('entity_type', sa.String(50), nullable=False),
+            sa.Column('entity_id', postgresql.UUID(as_uuid=True), nullable=False),
+            sa.Column('company_id', postgresql.UUID(as_uuid=True), nullable=True),
+            sa.Column('owner_id', postgresql.UUID(as_uuid=True), nullable=True),
+            sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=False, server_default=sa.text('now()')),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(
+            'ix_sync_tombstones_owner', 'sync_tombstones', ['entity_type', 'owner_id', 'deleted_at', 'id']
+        )
+
+    # TG_ARGV: entity type, owner column
+    op.execute("""
+        CREATE OR REPLACE FUNCTION record_sync_tombstone()
+        RETURNS TRIGGER AS $$
+        DECLARE
+            old_row JSONB := to_jsonb(OLD);
+        BEGIN
+            INSERT INTO sync_tombstones (entity_type, entity_id, company_id, owner_id)
+            VALUES (
+                TG_ARGV[0],
+                OLD.id,
+                (old_row ->> 'company_id')::uuid,
+                (old_row ->> TG_ARGV[1])::uuid
+            );
+            RETURN OLD;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+
+    for table, (entity_type, owner, changed_at) in SYNCED_TABLES.items():
+        if not table_exists(table):
+            continue
+        if not index_exists(table, f'ix_{table}_sync'):
+            op.create_index(f'ix_{table}_sync', table, [owner, changed_at, 'id'])
+        op.execute(f"DROP TRIGGER IF EXISTS trg_{table}_sync_tombstone ON {table}")
+        op.execute(f"""
+            CREATE TRIGGER trg_{table}_sync_tombstone
+            AFTER DELETE ON {table}
+            FOR EACH ROW EXECUTE FUNCTION record_sync_tombstone('{entity_type}', '{owner}')
+        """)
+
+
+def downgrade() -> None:
+    for table in SYNCED_TABLES:
+        if not table_exists(table):
+            continue
+        op.execute(f"DROP TRIGGER IF EXISTS trg_{table}_sync_tombstone ON {table}")
+        if index_exists(table, f'ix_{table}_sync'):
+            op.drop_index(f'ix_{table}_sync', table_name=table)
+    op.execute("DROP FUNCTION IF EXISTS record_sync_tombstone()")
+
+    if table_exists('sync_tombstones'):
+        op.drop_table('sync_tombstones')
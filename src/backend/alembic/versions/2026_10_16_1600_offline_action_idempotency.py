@@ -0,0 +1,55 @@
+"""Make offline actions idempotent on client_action_id
+
+Revision ID: offln01
+Revises: msync01
+Create Date: 2026-10-16 16:00:00.000000
+
+offline_actions doubles as the idempotency record of mobile uploads: an
+action is claimed with INSERT ... ON CONFLICT DO NOTHING on (company_id,
+user_id, client_action_id), so a resent action is recognised instead of
+being applied twice. Existing duplicates keep their first row.
+"""
+from alembic import op
+from sqlalchemy import inspect
+
+revision = 'offln01'
+down_revision = 'msync01'
+branch_labels = None
+depends_on = None
+
+
+def table_exists(table_name):
+    """Check if a table exists in the database."""
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    return table_name in inspector.get_table_names()
+
+
+def index_exists(table_name, index_name):
+    """Check if an index exists on a table."""
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    return index_name in [i['name'] for i in inspector.get_indexes(table_name)]
+
+
+def upgrade() -> None:
+    if not table_exists('offline_actions') or index_exists('offline_actions', 'uq_offline_actions_client_action'):
+        return
+
+    op.execute("""
+        DELETE FROM offline_actions a
+        USING offline_actions b
+        WHERE a.company_id = b.company_id
+          AND a.user_id = b.user_id
+          AND a.client_action_id = b.client_action_id
+          AND (a.created_at, a.ctid) > (b.created_at, b.ctid)
+    """)
+    op.create_index(
+        'uq_offline_actions_client_action', 'offline_actions',
+        ['company_id', 'user_id', 'client_action_id'], unique=True
+    )
+
+
+def downgrade() -> None:
+    if table_exists('offline_actions') and index_exists('offline_actions', 'uq_offline_actions_client_action'):
+        op.drop_index('uq_offline_actions_client_action', table_name='offline_actions')
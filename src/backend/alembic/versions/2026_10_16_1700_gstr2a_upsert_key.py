@@ -0,0 +1,63 @@
+"""Make GSTR-2A rows unique per supplier invoice and period
+
+Revision ID: gstr2a01
+Revises: offln01
+Create Date: 2026-10-16 17:00:00.000000
+
+GSTR-2A imports upsert on (company_id, period, supplier_gstin,
+invoice_number) so that re-importing a portal download keeps the user's
+accept/reject actions and manual matches. Existing duplicates keep the row
+that was acted on, otherwise the latest one.
+"""
+from alembic import op
+from sqlalchemy import inspect
+
+revision = 'gstr2a01'
+down_revision = 'offln01'
+branch_labels = None
+depends_on = None
+
+
+def table_exists(table_name):
+    """Check if a table exists in the database."""
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    return table_name in inspector.get_table_names()
+
+
+def constraint_exists(table_name, constraint_name):
+    """Check if a unique constraint exists on a table."""
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    return constraint_name in [c['name'] for c in inspector.get_unique_constraints(table_name)]
+
+
+def upgrade() -> None:
+    if not table_exists('gstr2a') or constraint_exists('gstr2a', 'uq_gstr2a_period_invoice'):
+        return
+
+    op.execute("""
+        DELETE FROM gstr2a a
+        USING gstr2a b
+        WHERE a.company_id = b.company_id
+          AND a.period = b.period
+          AND a.supplier_gstin = b.supplier_gstin
+          AND a.invoice_number = b.invoice_number
+          -- The greatest (acted on, created_at, ctid) of each group survives
+          AND (
+                NOT ((a.action IS NULL OR a.action = 'PENDING') AND a.matched_bill_id IS NULL),
+                a.created_at, a.ctid
+              ) < (
+                NOT ((b.action IS NULL OR b.action = 'PENDING') AND b.matched_bill_id IS NULL),
+                b.created_at, b.ctid
+              )
+    """)
+    op.create_unique_constraint(
+        'uq_gstr2a_period_invoice', 'gstr2a',
+        ['company_id', 'period', 'supplier_gstin', 'invoice_number']
+    )
+
+
+def downgrade() -> None:
+    if table_exists('gstr2a') and constraint_exists('gstr2a', 'uq_gstr2a_period_invoice'):
+        op.drop_constraint('uq_gstr2a_period_invoice', 'gstr2a', type_='unique')
@@ -20,6 +20,7 @@ from app.schemas.analytics import (
     # Dashboard schemas
     DashboardCreate, DashboardUpdate, DashboardResponse, DashboardListResponse,
     DashboardWidgetCreate, DashboardWidgetUpdate, DashboardWidgetResponse,
+    DashboardDataResponse,
     # KPI schemas
     KPIDefinitionCreate, KPIDefinitionUpdate, KPIDefinitionResponse,
     KPIValueCreate, KPIValueResponse, KPITrendResponse,
@@ -140,6 +141,22 @@ async def delete_dashboard(
     await DashboardService.delete_dashboard(db, dashboard)
 
 
+@router.get("/dashboards/{dashboard_id}/data", response_model=DashboardDataResponse)
+async def get_dashboard_data(
+    dashboard_id: UUID,
+    current_user: Annotated[TokenData, Depends(get_current_user)],
+    db: AsyncSession = Depends(get_db)
+):
+    """Get data for every widget of a dashboard in one request."""
+    company_id = UUID(current_user.company_id)
+
+    dashboard = await DashboardService.get_dashboard(db, dashboard_id, company_id)
+    if not dashboard:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Dashboard not found")
+
+    return await DashboardService.hydrate_dashboard(db, dashboard)
+
+
 @router.post("/dashboards/{dashboard_id}/clone", response_model=DashboardResponse)
 async def clone_dashboard(
     dashboard_id: UUID,
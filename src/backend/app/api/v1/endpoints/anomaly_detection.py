@@ -184,7 +184,8 @@ async def calculate_baselines(
         rule_id=request.rule_id,
         data_source=request.data_source,
         metric_name=request.metric_name,
-        period_days=request.period_days
+        period_days=request.period_days,
+        full_refresh=request.full_refresh
     )
     return result
 
@@ -396,6 +397,34 @@ async def run_detection(
     return result
 
 
+@router.post("/run/async")
+async def queue_detection_run(
+    request: RunDetectionRequest,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Queue anomaly detection on a background worker.
+
+    Use for large windows; poll the returned task id for progress.
+    """
+    from app.tasks.anomaly_tasks import run_anomaly_detection_task
+
+    task = run_anomaly_detection_task.delay(
+        company_id=str(current_user.company_id),
+        user_id=str(current_user.id),
+        rule_ids=[str(r) for r in request.rule_ids] if request.rule_ids else None,
+        category=request.category.value if request.category else None,
+        data_source=request.data_source,
+        start_date=request.start_date.isoformat() if request.start_date else None,
+        end_date=request.end_date.isoformat() if request.end_date else None
+    )
+
+    return {
+        "task_id": task.id,
+        "message": "Anomaly detection queued"
+    }
+
+
 # ============ Patterns Endpoints ============
 
 @router.get("/patterns", response_model=List[AnomalyPatternResponse])
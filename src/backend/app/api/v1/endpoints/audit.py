@@ -196,15 +196,10 @@ async def verify_audit_log_integrity(
 
     service = AuditDBService(db)
     try:
-        log_data = await service.get_log(log_uuid)
-        # Log exists and was retrieved - it's valid
+        result = await service.verify_log(log_uuid)
         return {
-            "log_id": log_id,
-            "is_valid": True,
-            "checksum_match": True,
+            **result,
             "log_exists": True,
-            "timestamp": log_data.get("timestamp"),
-            "action": log_data.get("action"),
             "verified_at": utc_now().isoformat()
         }
     except AuditLogNotFoundError:
@@ -217,6 +212,32 @@ async def verify_audit_log_integrity(
         }
 
 
+@router.get("/integrity")
+async def verify_audit_chain(
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    start_date: Optional[date] = Query(None, description="Start date"),
+    end_date: Optional[date] = Query(None, description="End date"),
+):
+    """
+    Verify the company's audit checksum chain over a period.
+
+    Detects altered entries (checksum mismatch) and deleted ones (gaps in
+    the chain's sequence numbers).
+    """
+    if current_user.role not in ["admin", "super_admin"]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required"
+        )
+
+    service = AuditDBService(db, current_user.company_id)
+    return await service.verify_integrity(
+        start_date=datetime.combine(start_date, datetime.min.time()) if start_date else None,
+        end_date=datetime.combine(end_date, datetime.max.time()) if end_date else None
+    )
+
+
 # =============================================================================
 # User Activity Endpoints
 # =============================================================================
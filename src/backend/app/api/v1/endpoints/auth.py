@@ -24,11 +24,13 @@ from email.mime.multipart import MIMEMultipart
 
 from app.core.config import settings
 from app.core.security import PasswordPolicy
+from app.core.token_blacklist import get_token_blacklist
 
 # Setup logger
 logger = logging.getLogger(__name__)
 from app.db.session import get_db
-from app.models.user import User, UserSession, AuditLog
+from app.models.user import User, UserSession
+from app.services.audit_writer import audit_entry, write_audit_entry
 from app.models.employee import Employee
 
 router = APIRouter()
@@ -36,7 +38,7 @@ router = APIRouter()
 # OAuth2 scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_PREFIX}/auth/login")
 
-# Redis connection for token blacklist and password reset tokens
+# Redis connection for password reset tokens
 # Use asyncio lock to prevent race condition in async initialization
 import asyncio
 _redis_client = None
@@ -160,32 +162,24 @@ def create_refresh_token(data: dict) -> str:
     """Create JWT refresh token."""
     to_encode = data.copy()
     expire = datetime.now(timezone.utc) + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
-    to_encode.update({"exp": expire, "type": "refresh"})
+    # jti keeps every rotated refresh token distinct, even within one second
+    to_encode.update({"exp": expire, "type": "refresh", "jti": secrets.token_hex(16)})
     return jwt.encode(to_encode, settings.JWT_SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
 
 
 async def is_token_blacklisted(token: str) -> bool:
-    """Check if a token is blacklisted."""
-    try:
-        r = await get_redis()
-        return await r.exists(f"blacklist:{token}") > 0
-    except Exception as e:
-        # Log the error but don't fail - allow access if Redis is down
-        # This is a security trade-off: availability over strict blacklisting
-        logger.warning(f"Token blacklist check failed (allowing access): {e}")
-        return False
+    """Check if a token is blacklisted (usually answered without Redis)."""
+    return await get_token_blacklist().is_revoked(token)
 
 
 async def blacklist_token(token: str, expires_in: int) -> bool:
     """Add token to blacklist. Returns True if successful."""
-    try:
-        r = await get_redis()
-        await r.setex(f"blacklist:{token}", expires_in, "1")
-        return True
-    except Exception as e:
-        # Log the failure - this is a security concern
-        logger.error(f"Failed to blacklist token (token may remain valid): {e}")
-        return False
+    return await get_token_blacklist().revoke(token, expires_in)
+
+
+async def consume_refresh_token(token: str, expires_in: int) -> bool:
+    """Revoke a refresh token on rotation; False if it was already used or revoked."""
+    return await get_token_blacklist().consume(token, expires_in)
 
 
 async def get_token_from_request(
@@ -262,30 +256,27 @@ async def log_audit(
     ip_address: str | None = None,
     user_agent: str | None = None
 ) -> bool:
-    """Log an audit event. Returns True if successful."""
+    """
+    Queue an audit event for the batched audit writer. Returns True if queued.
+
+    The entry is written outside the request transaction, so db is left
+    untouched.
+    """
     try:
-        from uuid import UUID
-        audit = AuditLog(
-            user_id=UUID(user_id) if user_id else None,
+        await write_audit_entry(audit_entry(
             action=action,
             entity_type=entity_type,
-            entity_id=UUID(entity_id) if entity_id else None,
+            user_id=user_id,
+            entity_id=entity_id,
             old_values=old_values,
             new_values=new_values,
             ip_address=ip_address,
             user_agent=user_agent
-        )
-        db.add(audit)
-        await db.commit()
+        ))
         return True
     except Exception as e:
         # Log the failure - audit trail is critical for compliance
         logger.error(f"Failed to log audit event '{action}': {e}")
-        # Try to rollback to avoid leaving transaction in bad state
-        try:
-            await db.rollback()
-        except Exception as rollback_error:
-            logger.error(f"Failed to rollback after audit log failure: {rollback_error}")
         return False
 
 
@@ -503,10 +494,15 @@ async def refresh_token(
             "employee_id": payload.get("employee_id")
         }
 
-        # Blacklist old refresh token
+        # Refresh tokens are single use: claim the old one in Redis, so a
+        # token already rotated by another worker is refused immediately
         exp = payload.get("exp", 0)
         remaining = max(0, exp - int(datetime.now(timezone.utc).timestamp()))
-        await blacklist_token(token_value, remaining)
+        if not await consume_refresh_token(token_value, remaining):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Token has been revoked"
+            )
 
         access_token = create_access_token(token_data)
         new_refresh_token = create_refresh_token(token_data)
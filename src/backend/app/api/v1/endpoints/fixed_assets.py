@@ -304,15 +304,11 @@ async def run_depreciation(
     user_id = UUID(current_user.user_id)
 
     try:
-        result = await DepreciationService.run_depreciation(
+        result = await DepreciationService.run_depreciation_bulk(
             db=db,
             company_id=company_id,
             user_id=user_id,
-            fiscal_year=run_data.fiscal_year,
-            period=run_data.period,
-            depreciation_date=run_data.depreciation_date,
-            category_id=run_data.category_id,
-            asset_ids=run_data.asset_ids
+            request=run_data
         )
         return result
     except ValueError as e:
@@ -325,19 +321,18 @@ async def preview_depreciation(
     current_user: Annotated[TokenData, Depends(get_current_user)],
     db: AsyncSession = Depends(get_db)
 ):
-    """Preview depreciation calculation before posting."""
+    """Preview depreciation for a period (e.g. a full fiscal year) without posting anything."""
     company_id = UUID(current_user.company_id)
 
-    preview = await DepreciationService.preview_depreciation(
-        db=db,
-        company_id=company_id,
-        fiscal_year=run_data.fiscal_year,
-        period=run_data.period,
-        depreciation_date=run_data.depreciation_date,
-        category_id=run_data.category_id,
-        asset_ids=run_data.asset_ids
-    )
-    return preview
+    try:
+        preview = await DepreciationService.preview_depreciation(
+            db=db,
+            company_id=company_id,
+            request=run_data
+        )
+        return preview
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
 
 @router.get("/depreciation/summary")
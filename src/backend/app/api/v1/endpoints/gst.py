@@ -5,7 +5,7 @@ Routes for GSTR-1, GSTR-3B, reconciliation, and ITC management
 from decimal import Decimal
 from typing import Optional
 from uuid import UUID
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status, UploadFile, File, Form
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db.session import get_db
@@ -41,7 +41,10 @@ def verify_company_access(requested_company_id: UUID, user_company_id: UUID):
         )
 
 
-from app.services.gst_service import GSTService, GSTCalculator, GSTINValidator
+from app.services.gst_service import (
+    GSTService, GSTCalculator, GSTINValidator, GSTR2A_REPORT_PAGE_SIZE
+)
+from app.services.gstr2a_parser import GSTR2AParseError
 from app.schemas.gst import (
     # Request schemas
     GSTReturnCreate,
@@ -180,7 +183,7 @@ async def generate_gstr1(
         status=result["status"],
         summary=result["summary"],
         b2b_count=result["summary"]["b2b"]["count"],
-        b2c_count=result["summary"]["b2cl"]["count"] + len(result["summary"].get("b2cs", {})),
+        b2c_count=result["summary"]["b2cl"]["count"] + result["summary"]["b2cs"]["count"],
         credit_notes_count=result["summary"]["cdnr"]["count"],
         debit_notes_count=result["summary"].get("dnr", {}).get("count", 0),
         total_taxable_value=Decimal(str(result["total_taxable_value"])),
@@ -344,6 +347,8 @@ async def get_reconciliation(
     period: str,
     company_id: UUID = Query(..., description="Company UUID"),
     gstin: str = Query(..., min_length=15, max_length=15, description="Company GSTIN"),
+    offset: int = Query(0, ge=0, description="Items to skip in each category"),
+    limit: int = Query(GSTR2A_REPORT_PAGE_SIZE, ge=1, le=5000, description="Items per category"),
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -361,6 +366,9 @@ async def get_reconciliation(
 
     This is critical for ITC eligibility as per GST rules.
 
+    The summary covers every invoice; each item list holds one page of its
+    category (offset/limit).
+
     Period format: MMYYYY (e.g., 012025 for January 2025)
     """
     service = GSTService(db)
@@ -368,7 +376,9 @@ async def get_reconciliation(
     report = await service.reconcile_gstr2a(
         company_id=company_id,
         gstin=gstin,
-        period=period
+        period=period,
+        items_offset=offset,
+        items_limit=limit
     )
 
     return report
@@ -384,6 +394,8 @@ async def match_invoices(
     period: str,
     request: ReconciliationMatchRequest,
     company_id: UUID = Query(..., description="Company UUID"),
+    offset: int = Query(0, ge=0, description="Items to skip in each category"),
+    limit: int = Query(GSTR2A_REPORT_PAGE_SIZE, ge=1, le=5000, description="Items per category"),
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -406,12 +418,61 @@ async def match_invoices(
         company_id=company_id,
         gstin=request.gstin,
         period=period,
-        tolerance_amount=request.tolerance_amount
+        tolerance_amount=request.tolerance_amount,
+        items_offset=offset,
+        items_limit=limit
     )
 
     return report
 
 
+@router.post(
+    "/reconciliation/{period}/upload",
+    response_model=ReconciliationReport,
+    summary="Upload GSTR-2A/2B and reconcile",
+    description="Import a GSTR-2A or GSTR-2B JSON download and reconcile it against purchase bills."
+)
+async def upload_gstr2a(
+    period: str,
+    company_id: UUID = Query(..., description="Company UUID"),
+    gstin: str = Form(..., min_length=15, max_length=15),
+    tolerance_amount: Decimal = Form(default=Decimal("1.00"), ge=0),
+    file: UploadFile = File(..., description="GSTR-2A/2B JSON from the GST portal"),
+    auth: tuple = Depends(require_auth_and_company),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Import a GSTR-2A/2B JSON file and run reconciliation.
+
+    The file is streamed into the GSTR-2A table (refreshing earlier imports
+    for the period without losing accept/reject actions or manual matches)
+    and matched against purchase bills in a single pass. The response holds
+    the first page of each item category.
+
+    Period format: MMYYYY (e.g., 012025 for January 2025)
+    """
+    _, user_company_id = auth
+    verify_company_access(company_id, user_company_id)
+
+    service = GSTService(db)
+
+    try:
+        report = await service.reconcile_gstr2a(
+            company_id=company_id,
+            gstin=gstin,
+            period=period,
+            tolerance_amount=tolerance_amount,
+            gstr2a_file=file.file
+        )
+    except GSTR2AParseError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+    return report
+
+
 # ----- ITC Endpoints -----
 
 @router.get(
@@ -301,16 +301,24 @@ async def sync_data(
     current_user: Annotated[TokenData, Depends(get_current_user)],
     db: AsyncSession = Depends(get_db)
 ):
-    """Sync mobile data with server."""
+    """
+    Sync mobile data with server.
+
+    Returns changes in pages of `limit` items. Pass `next_cursor` back as
+    `cursor` until `has_more` is false, and keep it for the next sync.
+    """
     company_id = UUID(current_user.company_id)
     user_id = UUID(current_user.user_id)
 
-    sync_result = await SyncService.sync_data(
-        db=db,
-        company_id=company_id,
-        user_id=user_id,
-        request=sync_request
-    )
+    try:
+        sync_result = await SyncService.sync_data(
+            db=db,
+            company_id=company_id,
+            user_id=user_id,
+            request=sync_request
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     return sync_result
 
 
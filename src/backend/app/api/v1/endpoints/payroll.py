@@ -293,6 +293,37 @@ async def run_payroll(
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@router.post("/run/async", summary="Queue chunked payroll run")
+async def queue_payroll_run(
+    request: PayrollRunRequest,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Queue a chunked payroll run for large companies.
+
+    Employees are processed in checkpointed chunks on a background worker.
+    Re-queueing an interrupted run resumes from the last completed chunk.
+    Poll the returned task id for progress.
+    """
+    from app.tasks.payroll_tasks import run_payroll_task
+
+    task = run_payroll_task.delay(
+        company_id=str(current_user.company_id),
+        user_id=str(current_user.id),
+        year=request.year,
+        month=request.month,
+        working_days=request.working_days,
+        tax_regime_default=request.tax_regime_default,
+        employee_ids=[str(e) for e in request.employee_ids] if request.employee_ids else None
+    )
+
+    return {
+        "task_id": task.id,
+        "period": f"{request.month:02d}/{request.year}",
+        "message": "Payroll run queued"
+    }
+
+
 @router.get("/runs", summary="List payroll runs")
 async def list_payroll_runs(
     current_user: User = Depends(get_current_user),
@@ -340,6 +371,78 @@ async def get_payroll_run(
         raise HTTPException(status_code=404, detail="Payroll run not found")
 
 
+@router.post("/runs/{run_id}/payslips/render", summary="Queue PDF rendering of a run's payslips")
+async def queue_payslip_rendering(
+    run_id: UUID,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    output: str = Query(default="zip", pattern="^(zip|files)$", description="One ZIP archive or one file per employee")
+):
+    """
+    Queue rendering of every payslip of a payroll run to PDF.
+
+    Payslips are rendered in a process pool on a background worker, into a
+    ZIP archive or one stored file per employee. Poll the returned task id
+    for progress.
+    """
+    from app.tasks.payroll_tasks import render_payslips_task
+
+    company_id = UUID(current_user.company_id)
+    service = PayrollDBService(db, company_id)
+    try:
+        await service.get_payroll_run(run_id)
+    except PayrollRunNotFoundError:
+        raise HTTPException(status_code=404, detail="Payroll run not found")
+
+    task = render_payslips_task.delay(
+        company_id=str(current_user.company_id),
+        user_id=str(current_user.id),
+        payroll_run_id=str(run_id),
+        output=output
+    )
+
+    return {
+        "task_id": task.id,
+        "payroll_run_id": str(run_id),
+        "message": "Payslip rendering queued"
+    }
+
+
+@router.post("/runs/{run_id}/payslips/email", summary="Queue emailing of a run's payslips")
+async def queue_payslip_emails(
+    run_id: UUID,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Queue emailing every payslip of a payroll run to its employee.
+
+    Payslips are rendered and sent over pooled SMTP connections on a
+    background worker. Poll the returned task id for progress and the
+    delivery summary.
+    """
+    from app.tasks.email_tasks import send_payslip_emails_task
+
+    company_id = UUID(current_user.company_id)
+    service = PayrollDBService(db, company_id)
+    try:
+        await service.get_payroll_run(run_id)
+    except PayrollRunNotFoundError:
+        raise HTTPException(status_code=404, detail="Payroll run not found")
+
+    task = send_payslip_emails_task.delay(
+        company_id=str(current_user.company_id),
+        user_id=str(current_user.id),
+        payroll_run_id=str(run_id)
+    )
+
+    return {
+        "task_id": task.id,
+        "payroll_run_id": str(run_id),
+        "message": "Payslip emails queued"
+    }
+
+
 @router.get("/runs/{run_id}/payslips", summary="Get payslips for a payroll run")
 async def get_payslips(
     run_id: UUID,
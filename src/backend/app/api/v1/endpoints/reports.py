@@ -50,6 +50,7 @@ from app.schemas.reports import (
     DateRange, ReportFilter
 )
 from app.services.report_service import ReportService
+from app.services.excel.streaming_export import MEDIA_TYPES, export_format, stream_query
 
 
 router = APIRouter(prefix="/reports", tags=["Reports"], dependencies=[Depends(require_auth)])
@@ -369,12 +370,21 @@ async def get_payroll_register(
         output_format=output_format
     )
 
+    filename_base = f"payroll_register_{year}_{month:02d}"
+    if output_format in (OutputFormatEnum.excel, OutputFormatEnum.csv):
+        # Stream payslips from the database instead of building the report in memory
+        query = ReportService.payroll_register_query(company_id, request.model_dump())
+        return _stream_export(
+            stream_query(query), ReportService._get_payroll_register_columns(),
+            output_format, filename_base, "Payroll Register"
+        )
+
     report_data = await ReportService.generate_payroll_register(db, company_id, request)
 
     if output_format == OutputFormatEnum.json:
         return report_data
 
-    return await _export_report(report_data, output_format, f"payroll_register_{year}_{month:02d}")
+    return await _export_report(report_data, output_format, filename_base)
 
 
 @router.get("/payroll/bank-statement", summary="Get bank payment statement")
@@ -1739,6 +1749,24 @@ async def run_saved_report(
 # Helper Functions
 # =====================
 
+def _stream_export(
+    rows,
+    columns,
+    output_format: OutputFormatEnum,
+    filename_base: str,
+    sheet_title: str = "Report"
+) -> StreamingResponse:
+    """Stream rows as a CSV or Excel download, written as they are sent."""
+    ext = export_format(output_format)
+    return StreamingResponse(
+        ReportService.stream_export(rows, columns, output_format, sheet_title),
+        media_type=MEDIA_TYPES[ext],
+        headers={
+            "Content-Disposition": f"attachment; filename={filename_base}.{ext}"
+        }
+    )
+
+
 async def _export_report(
     report_data: dict,
     output_format: OutputFormatEnum,
@@ -1751,10 +1779,11 @@ async def _export_report(
     company_data = report_data.get("company", {"name": "Company"})
 
     if output_format == OutputFormatEnum.excel or output_format == OutputFormatEnum.csv:
-        content = await ReportService.export_to_excel(report_data, columns)
-        media_type = "text/csv" if output_format == OutputFormatEnum.csv else "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-        ext = "csv" if output_format == OutputFormatEnum.csv else "xlsx"
-    elif output_format == OutputFormatEnum.pdf:
+        return _stream_export(
+            report_data.get("data", []), columns, output_format, filename_base,
+            report_data.get("report_name", "Report")
+        )
+    if output_format == OutputFormatEnum.pdf:
         content = await ReportService.export_to_pdf(report_data, columns, company_data)
         media_type = "application/pdf"
         ext = "pdf"
@@ -280,6 +280,20 @@ async def get_daily_metrics(
     return result.scalars().all()
 
 
+@router.get("/metrics/runtime")
+async def get_runtime_metrics(
+    admin: SuperAdmin = Depends(get_current_super_admin)
+):
+    """Get in-process metrics of this API worker. Requires super admin auth."""
+    from app.core.security import inspection_metrics
+    from app.core.token_blacklist import get_token_blacklist
+
+    return {
+        "token_blacklist": get_token_blacklist().metrics_snapshot(),
+        "request_inspection": inspection_metrics.snapshot(),
+    }
+
+
 # ============================================================================
 # Tenant Management Endpoints
 # ============================================================================
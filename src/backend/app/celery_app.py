@@ -18,8 +18,11 @@ celery_app = Celery(
     include=[
         "app.tasks.email_tasks",
         "app.tasks.report_tasks",
+        "app.tasks.payroll_tasks",
+        "app.tasks.anomaly_tasks",
         "app.tasks.notification_tasks",
         "app.tasks.maintenance_tasks",
+        "app.tasks.webhook_tasks",
     ]
 )
 
@@ -57,13 +60,17 @@ celery_app.conf.update(
         Queue("low_priority", Exchange("low_priority"), routing_key="low_priority"),
         Queue("emails", Exchange("emails"), routing_key="emails"),
         Queue("reports", Exchange("reports"), routing_key="reports"),
+        Queue("webhooks", Exchange("webhooks"), routing_key="webhooks"),
     ),
 
     # Task routing
     task_routes={
         "app.tasks.email_tasks.*": {"queue": "emails"},
         "app.tasks.report_tasks.*": {"queue": "reports"},
+        "app.tasks.payroll_tasks.*": {"queue": "reports"},
+        "app.tasks.anomaly_tasks.*": {"queue": "reports"},
         "app.tasks.notification_tasks.*": {"queue": "high_priority"},
+        "app.tasks.webhook_tasks.*": {"queue": "webhooks"},
     },
 
     # Beat schedule for periodic tasks
@@ -77,6 +84,11 @@ celery_app.conf.update(
             "schedule": 86400.0,  # Every 24 hours
             "options": {"queue": "reports"},
         },
+        "dispatch-webhooks": {
+            "task": "app.tasks.webhook_tasks.dispatch_webhooks_task",
+            "schedule": 30.0,  # Every 30 seconds
+            "options": {"queue": "webhooks"},
+        },
     },
 )
 
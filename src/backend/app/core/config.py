@@ -89,6 +89,11 @@ class Settings(BaseSettings):
     REDIS_SESSION_DB: int = 1
     REDIS_CACHE_DB: int = 2
 
+    # Token blacklist (local bloom filter in front of Redis)
+    TOKEN_BLACKLIST_REFRESH_SECONDS: float = 5.0
+    TOKEN_BLACKLIST_CAPACITY: int = 100000
+    TOKEN_BLACKLIST_MAX_CONNECTIONS: int = 20
+
     # JWT Authentication
     # SECURITY: JWT_SECRET_KEY must be set via environment variable
     # Generate with: openssl rand -base64 64
@@ -112,6 +117,15 @@ class Settings(BaseSettings):
             )
         return v
 
+    # Request inspection (SQL injection / XSS middleware). URLs are always
+    # inspected; bodies only get a narrow XSS check when this is enabled.
+    REQUEST_BODY_INSPECTION: bool = False
+
+    # Rate limiting (per client IP and per tenant, per window)
+    RATE_LIMIT_REQUESTS: int = 100
+    RATE_LIMIT_TENANT_REQUESTS: int = 1000
+    RATE_LIMIT_WINDOW_SECONDS: int = 60
+
     # AI Providers (Fallback Chain)
     CLAUDE_API_KEY: Optional[str] = None
     GEMINI_API_KEY: Optional[str] = None
@@ -133,6 +147,16 @@ class Settings(BaseSettings):
     MAX_UPLOAD_SIZE_MB: int = 50
     ALLOWED_FILE_TYPES: List[str] = ["pdf", "jpg", "jpeg", "png", "xlsx", "csv", "doc", "docx"]
 
+    # Bulk PDF rendering processes per Celery task (1 renders in the task process)
+    PDF_RENDER_WORKERS: int = 1
+
+    # Payroll calculation processes per Celery task (each task runs its own pool)
+    PAYROLL_WORKERS: int = 2
+
+    # Mobile delta sync: margin behind the oldest open writing transaction
+    # (covers app/database clock skew and stamps taken just before BEGIN)
+    MOBILE_SYNC_SAFETY_LAG_SECONDS: float = 5.0
+
     # Email (SMTP - Hostinger)
     SMTP_HOST: str = "smtp.hostinger.com"
     SMTP_PORT: int = 465
@@ -3,18 +3,23 @@ QA-003: Data Encryption Service
 Encryption utilities for sensitive data at rest and in transit
 Using AES-256-GCM for authenticated encryption
 """
-from typing import Optional, Union
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+import asyncio
 import base64
 import hashlib
 import hmac
 import secrets
 import os
+import time
 from datetime import datetime, timedelta, timezone
 from jose import jwt  # python-jose for JWT operations
 
 # Import cryptography library for proper AES-256-GCM
 try:
     from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+    from cryptography.hazmat.primitives.kdf.hkdf import HKDF
     from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
     from cryptography.hazmat.primitives import hashes
     from cryptography.hazmat.backends import default_backend
@@ -29,10 +34,21 @@ class EncryptionService:
 
     Features:
     - AES-256-GCM authenticated encryption for data at rest
-    - Secure key derivation using PBKDF2
+    - One data key per key version, derived once with HKDF and cached
+    - Transparent decryption of legacy per-value PBKDF2 ciphertexts
     - Secure hashing
     - Token generation
     - Key versioning and rotation support
+
+    Ciphertext formats:
+    - v2 (written): "v2:" + base64(version (1) + nonce (12) + ciphertext + tag (16)).
+      The version byte is authenticated as associated data.
+    - v1 (legacy): base64(version (1) + salt (32) + nonce (12) + ciphertext + tag (16)),
+      key derived per value with PBKDF2
+    - v0 (legacy): base64(salt (32) + nonce (12) + ciphertext + tag (16))
+
+    v2 uses random 96-bit nonces under one data key per version, which is
+    safe for well over a billion encryptions per key version.
     """
 
     # Key derivation parameters
@@ -45,6 +61,14 @@ class EncryptionService:
     # Current key version (increment when rotating keys)
     CURRENT_KEY_VERSION = 1
 
+    # v2 envelope ("v2:" cannot occur in base64, so legacy values never match)
+    ENVELOPE_PREFIX = "v2:"
+    ENVELOPE_AAD = b"ganaportal:v2:"
+    HKDF_SALT = b"ganaportal:field-encryption"
+
+    # Derived keys of legacy values kept per process, keyed by salt
+    LEGACY_KEY_CACHE_SIZE = 4096
+
     def __init__(self, master_key: Optional[str] = None):
         """
         Initialize with master key and optional old keys for rotation support.
@@ -99,6 +123,11 @@ class EncryptionService:
             if key:
                 self._key_registry[version] = key
 
+        # AES-GCM ciphers of v2 data keys, by (key version, key)
+        self._ciphers: dict[tuple[int, str], AESGCM] = {}
+        # Derived keys of legacy values, by (key, salt)
+        self._legacy_keys: "OrderedDict[tuple[str, bytes], bytes]" = OrderedDict()
+
     def get_key_for_version(self, version: int) -> Optional[str]:
         """Get encryption key for a specific version."""
         return self._key_registry.get(version)
@@ -119,39 +148,27 @@ class EncryptionService:
             key: Optional encryption key (uses master key if not provided)
 
         Returns:
-            Base64-encoded encrypted data: version (1) + salt (32) + nonce (12) + ciphertext + tag (16)
+            v2 envelope: "v2:" + base64(version (1) + nonce (12) + ciphertext + tag (16))
         """
-        # Generate salt and derive key
-        salt = secrets.token_bytes(self.SALT_LENGTH)
-        derived_key = self._derive_key(key or self.master_key, salt)
-
-        # Generate nonce (must be unique per encryption with same key)
+        # Nonce must be unique per encryption with the same data key
         nonce = secrets.token_bytes(self.NONCE_LENGTH)
+        header = bytes([self.current_version])
 
-        # Create AES-GCM cipher and encrypt
-        aesgcm = AESGCM(derived_key)
-        plaintext_bytes = plaintext.encode('utf-8')
-
-        # Encrypt with authentication - tag is automatically appended
-        ciphertext = aesgcm.encrypt(nonce, plaintext_bytes, None)
-
-        # Combine version + salt + nonce + ciphertext (includes auth tag)
-        # Version byte allows future key rotation
-        version_byte = bytes([self.current_version])
-        combined = version_byte + salt + nonce + ciphertext
+        cipher = self._cipher(self.current_version, key)
+        ciphertext = cipher.encrypt(nonce, plaintext.encode('utf-8'), self.ENVELOPE_AAD + header)
 
-        return base64.b64encode(combined).decode('utf-8')
+        return self.ENVELOPE_PREFIX + base64.b64encode(header + nonce + ciphertext).decode('ascii')
 
     def decrypt(self, ciphertext: str, key: Optional[str] = None) -> str:
         """
         Decrypt ciphertext using AES-256-GCM with key version support.
 
         Verifies authenticity before returning plaintext.
-        Supports both versioned (new) and legacy (old) encrypted data.
-        Raises exception if data has been tampered with.
+        Supports the v2 envelope and legacy versioned (v1) and unversioned
+        (v0) data. Raises exception if data has been tampered with.
 
         Args:
-            ciphertext: Base64-encoded encrypted data
+            ciphertext: Encrypted data
             key: Optional decryption key (overrides key registry lookup)
 
         Returns:
@@ -161,60 +178,130 @@ class EncryptionService:
             ValueError: If decryption fails or data is tampered
         """
         try:
-            # Decode from base64
-            combined = base64.b64decode(ciphertext.encode('utf-8'))
+            if ciphertext.startswith(self.ENVELOPE_PREFIX):
+                combined = base64.b64decode(ciphertext[len(self.ENVELOPE_PREFIX):])
+                header = combined[:self.VERSION_LENGTH]
+                nonce = combined[self.VERSION_LENGTH:self.VERSION_LENGTH + self.NONCE_LENGTH]
+                encrypted_data = combined[self.VERSION_LENGTH + self.NONCE_LENGTH:]
 
-            # Determine if this is versioned or legacy data
-            # Legacy format: salt (32) + nonce (12) + ciphertext + tag (16) = min 60 bytes
-            # Versioned format: version (1) + salt (32) + nonce (12) + ciphertext + tag (16) = min 61 bytes
-            # We detect version by checking if first byte is a valid version number
-            # and the data is at least 61 bytes (version + minimum encrypted data)
-            version = 0  # Default to legacy
-            offset = 0
+                cipher = self._cipher(header[0], key)
+                plaintext_bytes = cipher.decrypt(nonce, encrypted_data, self.ENVELOPE_AAD + header)
+                return plaintext_bytes.decode('utf-8')
 
-            if len(combined) >= self.VERSION_LENGTH + self.SALT_LENGTH + self.NONCE_LENGTH + 16:
-                potential_version = combined[0]
-                # Version 0 is reserved for legacy, versions 1-99 are valid
-                if 1 <= potential_version <= 99:
-                    version = potential_version
-                    offset = self.VERSION_LENGTH
+            return self._decrypt_legacy(ciphertext, key)
+        except Exception as e:
+            raise ValueError(f"Decryption failed - data may be corrupted or tampered: {e}")
 
-            # Extract components based on format
-            salt = combined[offset:offset + self.SALT_LENGTH]
-            nonce = combined[offset + self.SALT_LENGTH:offset + self.SALT_LENGTH + self.NONCE_LENGTH]
-            encrypted_data = combined[offset + self.SALT_LENGTH + self.NONCE_LENGTH:]
+    def decrypt_many(
+        self,
+        ciphertexts: Iterable[Optional[str]],
+        ignore_errors: bool = False
+    ) -> List[Optional[str]]:
+        """
+        Decrypt a column of values, e.g. from a result set.
 
-            # Get the appropriate key
-            if key:
-                decryption_key = key
-            else:
-                decryption_key = self._key_registry.get(version)
-                if not decryption_key:
-                    # Fallback to current key for legacy data
-                    decryption_key = self.master_key
+        Data keys are resolved once per key version, so v2 values cost one
+        AES-GCM operation each. None stays None.
+
+        Args:
+            ciphertexts: Encrypted values
+            ignore_errors: Return values that fail to decrypt unchanged
+                instead of raising (e.g. plaintext not yet encrypted)
+
+        Returns:
+            Plaintexts in input order
+        """
+        plaintexts: List[Optional[str]] = []
+        for ciphertext in ciphertexts:
+            if ciphertext is None:
+                plaintexts.append(None)
+                continue
+            try:
+                plaintexts.append(self.decrypt(ciphertext))
+            except ValueError:
+                if not ignore_errors:
+                    raise
+                plaintexts.append(ciphertext)
+        return plaintexts
+
+    def _decrypt_legacy(self, ciphertext: str, key: Optional[str] = None) -> str:
+        """Decrypt v0/v1 data (per-value PBKDF2 key)."""
+        # Decode from base64
+        combined = base64.b64decode(ciphertext.encode('utf-8'))
+
+        # Determine if this is versioned or legacy data
+        # Legacy format: salt (32) + nonce (12) + ciphertext + tag (16) = min 60 bytes
+        # Versioned format: version (1) + salt (32) + nonce (12) + ciphertext + tag (16) = min 61 bytes
+        # We detect version by checking if first byte is a valid version number
+        # and the data is at least 61 bytes (version + minimum encrypted data)
+        version = 0  # Default to legacy
+        offset = 0
 
-            # Derive key
-            derived_key = self._derive_key(decryption_key, salt)
+        if len(combined) >= self.VERSION_LENGTH + self.SALT_LENGTH + self.NONCE_LENGTH + 16:
+            potential_version = combined[0]
+            # Version 0 is reserved for legacy, versions 1-99 are valid
+            if 1 <= potential_version <= 99:
+                version = potential_version
+                offset = self.VERSION_LENGTH
 
-            # Create AES-GCM cipher and decrypt (also verifies auth tag)
-            aesgcm = AESGCM(derived_key)
-            plaintext_bytes = aesgcm.decrypt(nonce, encrypted_data, None)
+        # Extract components based on format
+        salt = combined[offset:offset + self.SALT_LENGTH]
+        nonce = combined[offset + self.SALT_LENGTH:offset + self.SALT_LENGTH + self.NONCE_LENGTH]
+        encrypted_data = combined[offset + self.SALT_LENGTH + self.NONCE_LENGTH:]
 
-            return plaintext_bytes.decode('utf-8')
-        except Exception as e:
-            raise ValueError(f"Decryption failed - data may be corrupted or tampered: {e}")
+        derived_key = self._legacy_key(key or self._key_for(version), salt)
+
+        # Create AES-GCM cipher and decrypt (also verifies auth tag)
+        aesgcm = AESGCM(derived_key)
+        plaintext_bytes = aesgcm.decrypt(nonce, encrypted_data, None)
+
+        return plaintext_bytes.decode('utf-8')
+
+    def _key_for(self, version: int) -> str:
+        """Key of a version; falls back to the current key for unknown versions."""
+        return self._key_registry.get(version) or self.master_key
+
+    def _cipher(self, version: int, key: Optional[str] = None) -> "AESGCM":
+        """AES-GCM cipher of the v2 data key for a key version (cached)."""
+        secret = key or self._key_for(version)
+        cipher = self._ciphers.get((version, secret))
+        if cipher is None:
+            hkdf = HKDF(
+                algorithm=hashes.SHA256(),
+                length=self.KEY_LENGTH,
+                salt=self.HKDF_SALT,
+                info=f"data-key:v{version}".encode(),
+                backend=default_backend()
+            )
+            cipher = self._ciphers[(version, secret)] = AESGCM(hkdf.derive(secret.encode()))
+        return cipher
+
+    def _legacy_key(self, secret: str, salt: bytes) -> bytes:
+        """PBKDF2 key of a legacy value, cached by salt so re-reads are free."""
+        cache_key = (secret, salt)
+        derived_key = self._legacy_keys.get(cache_key)
+        if derived_key is None:
+            derived_key = self._legacy_keys[cache_key] = self._derive_key(secret, salt)
+            if len(self._legacy_keys) > self.LEGACY_KEY_CACHE_SIZE:
+                self._legacy_keys.popitem(last=False)
+        else:
+            self._legacy_keys.move_to_end(cache_key)
+        return derived_key
 
     def get_data_key_version(self, ciphertext: str) -> int:
         """
         Get the key version used to encrypt data.
 
         Args:
-            ciphertext: Base64-encoded encrypted data
+            ciphertext: Encrypted data
 
         Returns:
             Key version (0 for legacy data, 1+ for versioned data)
         """
         try:
+            if ciphertext.startswith(self.ENVELOPE_PREFIX):
+                combined = base64.b64decode(ciphertext[len(self.ENVELOPE_PREFIX):])
+                return combined[0]
             combined = base64.b64decode(ciphertext.encode('utf-8'))
             if len(combined) >= self.VERSION_LENGTH + self.SALT_LENGTH + self.NONCE_LENGTH + 16:
                 potential_version = combined[0]
@@ -228,12 +315,16 @@ class EncryptionService:
         """
         Check if data needs to be re-encrypted with current key.
 
+        Legacy (v0/v1) values always do, so they move to the v2 format.
+
         Args:
-            ciphertext: Base64-encoded encrypted data
+            ciphertext: Encrypted data
 
         Returns:
             True if data should be re-encrypted with current key
         """
+        if not ciphertext.startswith(self.ENVELOPE_PREFIX):
+            return True
         data_version = self.get_data_key_version(ciphertext)
         return data_version != self.current_version
 
@@ -244,7 +335,7 @@ class EncryptionService:
         Used for key rotation - decrypt with old key, encrypt with new.
 
         Args:
-            ciphertext: Base64-encoded encrypted data
+            ciphertext: Encrypted data
 
         Returns:
             Re-encrypted data with current key version
@@ -332,7 +423,7 @@ class TokenManager:
     Features:
     - JWT token generation
     - Refresh token management
-    - Token blacklisting (Redis-backed for persistence)
+    - Token blacklisting (shared async blacklist, see app.core.token_blacklist)
     - Session management
     """
 
@@ -340,7 +431,6 @@ class TokenManager:
     ACCESS_TOKEN_EXPIRE_MINUTES = 15  # Reduced from 30 for security
     REFRESH_TOKEN_EXPIRE_DAYS = 7
     ALGORITHM = "HS256"
-    BLACKLIST_PREFIX = "token_blacklist:"
 
     def __init__(self, secret_key: str):
         """Initialize with secret key."""
@@ -354,9 +444,6 @@ class TokenManager:
                 "JWT secret key must be at least 32 characters for security."
             )
         self.secret_key = secret_key
-        self._redis_client = None
-        # Fallback in-memory blacklist only used if Redis unavailable
-        self._memory_blacklist: set = set()
 
     def create_access_token(
         self,
@@ -399,12 +486,12 @@ class TokenManager:
 
         return jwt.encode(payload, self.secret_key, algorithm=self.ALGORITHM)
 
-    def verify_token(self, token: str, token_type: str = "access") -> Optional[dict]:
+    async def verify_token(self, token: str, token_type: str = "access") -> Optional[dict]:
         """Verify and decode token."""
 
         try:
-            # Check blacklist (Redis-backed with in-memory fallback)
-            if self.is_blacklisted(token):
+            # Check blacklist (local bloom filter, Redis only on filter hits)
+            if await self.is_blacklisted(token):
                 return None
 
             payload = jwt.decode(
@@ -423,58 +510,25 @@ class TokenManager:
         except jwt.InvalidTokenError:
             return None
 
-    def _get_redis(self):
-        """Get Redis client for blacklist storage."""
-        if self._redis_client is None:
-            try:
-                import redis
-                redis_url = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
-                self._redis_client = redis.from_url(redis_url, decode_responses=True)
-                # Test connection
-                self._redis_client.ping()
-            except Exception:
-                self._redis_client = None
-        return self._redis_client
-
-    def blacklist_token(self, token: str, expires_in: int = None) -> None:
+    async def blacklist_token(self, token: str, expires_in: int = None) -> bool:
         """
         Add token to blacklist.
 
-        Uses Redis for persistence across restarts.
-        Falls back to in-memory if Redis unavailable.
+        Returns False if Redis was unavailable (the token is then revoked
+        in this process only).
         """
+        from app.core.token_blacklist import get_token_blacklist
+
         # Default expiry: 7 days (max token lifetime)
         if expires_in is None:
             expires_in = self.REFRESH_TOKEN_EXPIRE_DAYS * 24 * 60 * 60
+        return await get_token_blacklist().revoke(token, expires_in)
 
-        redis_client = self._get_redis()
-        if redis_client:
-            try:
-                key = f"{self.BLACKLIST_PREFIX}{hashlib.sha256(token.encode()).hexdigest()}"
-                redis_client.setex(key, expires_in, "1")
-                return
-            except Exception:
-                pass
-
-        # Fallback to in-memory
-        self._memory_blacklist.add(token)
+    async def is_blacklisted(self, token: str) -> bool:
+        """Check if token is blacklisted."""
+        from app.core.token_blacklist import get_token_blacklist
 
-    def is_blacklisted(self, token: str) -> bool:
-        """
-        Check if token is blacklisted.
-
-        Checks Redis first, then in-memory fallback.
-        """
-        redis_client = self._get_redis()
-        if redis_client:
-            try:
-                key = f"{self.BLACKLIST_PREFIX}{hashlib.sha256(token.encode()).hexdigest()}"
-                return redis_client.exists(key) > 0
-            except Exception:
-                pass
-
-        # Fallback to in-memory
-        return token in self._memory_blacklist
+        return await get_token_blacklist().is_revoked(token)
 
     def create_password_reset_token(self, user_id: str, email: str) -> str:
         """Create password reset token."""
@@ -596,17 +650,74 @@ class FieldLevelEncryption:
         fields_to_decrypt = fields or self.SENSITIVE_FIELDS
         decrypted = data.copy()
 
+        present = [field for field in fields_to_decrypt if decrypted.get(field)]
+        # Field might not be encrypted - keep such values as-is
+        values = self.encryption.decrypt_many(
+            [decrypted[field] for field in present], ignore_errors=True
+        )
+        decrypted.update(zip(present, values))
+
+        return decrypted
+
+    def decrypt_rows(self, rows: List[dict], fields: list = None) -> List[dict]:
+        """Decrypt sensitive fields of many rows, one column at a time."""
+        fields_to_decrypt = fields or self.SENSITIVE_FIELDS
+        decrypted = [row.copy() for row in rows]
+
         for field in fields_to_decrypt:
-            if field in decrypted and decrypted[field]:
-                try:
-                    decrypted[field] = self.encryption.decrypt(decrypted[field])
-                except Exception:
-                    # Field might not be encrypted
-                    pass
+            indexes = [i for i, row in enumerate(decrypted) if row.get(field)]
+            values = self.encryption.decrypt_many(
+                [decrypted[i][field] for i in indexes], ignore_errors=True
+            )
+            for i, value in zip(indexes, values):
+                decrypted[i][field] = value
 
         return decrypted
 
 
+# Rows read per keyset page and written per bulk UPDATE during key rotation
+ROTATION_BATCH_SIZE = 1000
+
+# Encryption service of a key rotation worker process
+_rotation_service: Optional[EncryptionService] = None
+
+
+def _init_rotation_worker(master_key: str, current_version: int, key_registry: dict) -> None:
+    """Process pool initializer: rebuild the parent's encryption service."""
+    global _rotation_service
+    service = EncryptionService(master_key)
+    service.current_version = current_version
+    service._key_registry = dict(key_registry)
+    _rotation_service = service
+
+
+def rotate_values(
+    service: EncryptionService,
+    rows: List[Tuple[Any, str]]
+) -> Tuple[List[Tuple[Any, str, str]], int, int]:
+    """
+    Re-encrypt the (id, ciphertext) rows not yet on the current key and format.
+
+    Returns:
+        ((id, old ciphertext, new ciphertext) updates, skipped, failed)
+    """
+    updates: List[Tuple[Any, str, str]] = []
+    skipped = failed = 0
+    for row_id, ciphertext in rows:
+        if not ciphertext or not service.needs_re_encryption(ciphertext):
+            skipped += 1
+            continue
+        try:
+            updates.append((row_id, ciphertext, service.re_encrypt(ciphertext)))
+        except ValueError:
+            failed += 1
+    return updates, skipped, failed
+
+
+def _rotate_values_in_worker(rows: List[Tuple[Any, str]]) -> Tuple[List[Tuple[Any, str, str]], int, int]:
+    return rotate_values(_rotation_service, rows)
+
+
 class KeyRotationManager:
     """
     Manages encryption key rotation for gradual data migration.
@@ -615,7 +726,8 @@ class KeyRotationManager:
         1. Generate new key: openssl rand -base64 32
         2. Set new key as ENCRYPTION_KEY, increment ENCRYPTION_KEY_VERSION
         3. Set old key as ENCRYPTION_KEY_V{old_version}
-        4. Run rotate_table() for each table with encrypted data
+        4. Run rotate_column() (or the rotate_encryption_keys task) for
+           each encrypted column
         5. After all data migrated, remove old key from environment
 
     Example environment for rotation from v1 to v2:
@@ -627,82 +739,302 @@ class KeyRotationManager:
     def __init__(self, encryption_service: EncryptionService):
         """Initialize with encryption service."""
         self.encryption = encryption_service
+        # Progress of jobs run by this process, by "table.column"
+        self._progress: Dict[str, dict] = {}
 
-    def get_rotation_status(self) -> dict:
+    def get_rotation_status(self, jobs: Optional[Iterable[Any]] = None) -> dict:
         """
         Get current key rotation status.
 
+        Args:
+            jobs: KeyRotationJob rows to report on (defaults to the jobs
+                run by this process)
+
         Returns:
-            Dictionary with current version, available versions, and status
+            Dictionary with current version, available versions, status and
+            per-column progress including rows/sec and ETA
         """
+        if jobs is None:
+            progress = list(self._progress.values())
+        else:
+            progress = [self._job_progress(job) for job in jobs]
+
         return {
             "current_version": self.encryption.current_version,
             "available_versions": self.encryption.list_key_versions(),
             "has_legacy_key": 0 in self.encryption._key_registry,
-            "ready_for_rotation": len(self.encryption._key_registry) > 1
+            "ready_for_rotation": len(self.encryption._key_registry) > 1,
+            "jobs": progress
         }
 
-    async def rotate_encrypted_field(
+    async def rotate_column(
         self,
         db_session,
         model_class,
         field_name: str,
-        batch_size: int = 100
+        batch_size: int = ROTATION_BATCH_SIZE,
+        max_workers: Optional[int] = None,
+        progress_callback: Optional[Callable[[dict], None]] = None
     ) -> dict:
         """
-        Rotate encryption for a specific field in a model.
+        Re-encrypt one encrypted column to the current key version.
+
+        Rows are paged by primary key (keyset, not OFFSET) and the raw
+        ciphertext is read without going through EncryptedStringType.
+        Decryption and re-encryption run in a process pool while the next
+        page is read, and each page is written back with one
+        UPDATE ... FROM (VALUES ...). The cursor is committed with every
+        page in a key_rotation_jobs row, so an interrupted job resumes
+        where it stopped.
+
+        A row is only overwritten if it still holds the ciphertext that was
+        read, so concurrent application writes are never clobbered.
 
         Args:
             db_session: SQLAlchemy async session
-            model_class: SQLAlchemy model class
+            model_class: SQLAlchemy model class with a UUID primary key
             field_name: Name of the encrypted field
-            batch_size: Number of records to process per batch
+            batch_size: Rows per page / bulk UPDATE
+            max_workers: Process pool size (None = CPU count, 0 = in-process)
+            progress_callback: Called with the job progress after every page
 
         Returns:
-            Dictionary with rotation statistics
+            Job progress (see get_rotation_status)
         """
-        from sqlalchemy import select, update
+        from sqlalchemy import String, func, inspect, select, type_coerce, update
+        from app.models.security import KeyRotationJob
+
+        table = model_class.__table__
+        primary_key = list(table.primary_key.columns)
+        if len(primary_key) != 1:
+            raise ValueError(f"{table.name} needs a single-column primary key for key rotation")
+        pk = primary_key[0]
+        target = inspect(model_class).columns[field_name]
+        # Stored ciphertext, bypassing the column type's decryption
+        raw = type_coerce(target, String)
+
+        job = await self._start_job(db_session, table.name, target.name)
+        job_id = job.id
+        cursor = job.last_id
+
+        def pending_rows(after):
+            criteria = [raw.isnot(None)]
+            if after is not None:
+                criteria.append(pk > after)
+            return criteria
+
+        remaining = await db_session.scalar(
+            select(func.count()).select_from(table).where(*pending_rows(cursor))
+        )
+        job.rows_total = (job.rows_processed or 0) + (remaining or 0)
+        await db_session.commit()
+
+        loop = asyncio.get_running_loop()
+        started = time.monotonic()
+        processed_before = job.rows_processed or 0
+        workers = 1 if max_workers == 0 else (max_workers or os.cpu_count() or 1)
+        pool = None
+        if max_workers != 0:
+            pool = ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_rotation_worker,
+                initargs=(
+                    self.encryption.master_key,
+                    self.encryption.current_version,
+                    dict(self.encryption._key_registry)
+                )
+            )
+
+        pending: deque = deque()
+        exhausted = False
+        try:
+            while pending or not exhausted:
+                # Keep the pool busy while earlier pages are being written
+                while not exhausted and len(pending) < workers:
+                    result = await db_session.execute(
+                        select(pk, raw.label("value"))
+                        .where(*pending_rows(cursor))
+                        .order_by(pk)
+                        .limit(batch_size)
+                    )
+                    rows = [tuple(row) for row in result]
+                    if not rows:
+                        exhausted = True
+                        break
+                    cursor = rows[-1][0]
+
+                    if pool is None:
+                        future = loop.create_future()
+                        future.set_result(rotate_values(self.encryption, rows))
+                    else:
+                        future = loop.run_in_executor(pool, _rotate_values_in_worker, rows)
+                    pending.append((future, cursor, len(rows)))
+
+                if not pending:
+                    break
+
+                future, last_id, row_count = pending.popleft()
+                updates, skipped, failed = await future
+                written = await self._write_rotated(db_session, table, pk, target, raw, updates)
+
+                job.last_id = last_id
+                job.rows_processed = (job.rows_processed or 0) + row_count
+                job.rows_rotated = (job.rows_rotated or 0) + written
+                # Rows changed since they were read already carry a fresh value
+                job.rows_skipped = (job.rows_skipped or 0) + skipped + len(updates) - written
+                job.rows_failed = (job.rows_failed or 0) + failed
+                await db_session.commit()
+
+                elapsed = time.monotonic() - started
+                rate = (job.rows_processed - processed_before) / elapsed if elapsed > 0 else 0.0
+                progress = self._record_progress(job, rate)
+                if progress_callback:
+                    progress_callback(progress)
+        except Exception as e:
+            # Committed pages are kept; a new run resumes from the cursor
+            await db_session.rollback()
+            await db_session.execute(
+                update(KeyRotationJob)
+                .where(KeyRotationJob.id == job_id)
+                .values(status="failed", last_error=str(e)[:1000])
+            )
+            await db_session.commit()
+            key = f"{table.name}.{target.name}"
+            if key in self._progress:
+                self._progress[key]["status"] = "failed"
+            raise
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+
+        job.status = "completed"
+        job.completed_at = datetime.now(timezone.utc).replace(tzinfo=None)
+        await db_session.commit()
+        return self._record_progress(job, 0.0)
+
+    async def _start_job(self, db_session, table_name: str, column_name: str):
+        """Resume the job for a column and key version, or start a new pass."""
+        from sqlalchemy import select
+        from app.models.security import KeyRotationJob
+
+        result = await db_session.execute(
+            select(KeyRotationJob).where(
+                KeyRotationJob.table_name == table_name,
+                KeyRotationJob.column_name == column_name,
+                KeyRotationJob.target_version == self.encryption.current_version
+            )
+        )
+        job = result.scalar_one_or_none()
+
+        if job is None:
+            job = KeyRotationJob(
+                table_name=table_name,
+                column_name=column_name,
+                target_version=self.encryption.current_version
+            )
+            db_session.add(job)
+        if job.status in (None, "completed"):
+            # New pass over the whole column
+            job.last_id = None
+            job.rows_processed = job.rows_rotated = job.rows_skipped = job.rows_failed = 0
+            job.started_at = datetime.now(timezone.utc).replace(tzinfo=None)
+
+        job.status = "running"
+        job.last_error = None
+        job.completed_at = None
+        await db_session.flush()
+        return job
 
-        stats = {
-            "total": 0,
-            "rotated": 0,
-            "skipped": 0,
-            "errors": 0
+    @staticmethod
+    async def _write_rotated(db_session, table, pk, target, raw, updates: List[Tuple[Any, str, str]]) -> int:
+        """Write a page with one UPDATE ... FROM (VALUES ...); returns rows written."""
+        if not updates:
+            return 0
+
+        from sqlalchemy import String, column, update, values
+
+        rotated = values(
+            column("id", pk.type),
+            column("old_value", String),
+            column("new_value", String),
+            name="rotated"
+        ).data(updates)
+
+        assignments = {target: rotated.c.new_value}
+        if "updated_at" in table.c:
+            # Re-encryption does not change the data; keep change tracking quiet
+            assignments[table.c.updated_at] = table.c.updated_at
+
+        result = await db_session.execute(
+            update(table)
+            .where(pk == rotated.c.id, raw == rotated.c.old_value)
+            .values(assignments)
+        )
+        return result.rowcount
+
+    def _record_progress(self, job, rows_per_second: Optional[float] = None) -> dict:
+        progress = self._job_progress(job, rows_per_second)
+        self._progress[f"{job.table_name}.{job.column_name}"] = progress
+        return progress
+
+    @staticmethod
+    def _job_progress(job, rows_per_second: Optional[float] = None) -> dict:
+        """
+        Progress of a KeyRotationJob.
+
+        Without a measured rate, the average since the job started is used.
+        """
+        processed = job.rows_processed or 0
+        if rows_per_second is None:
+            elapsed = 0.0
+            if job.started_at and job.updated_at:
+                elapsed = (job.updated_at - job.started_at).total_seconds()
+            rows_per_second = processed / elapsed if elapsed > 0 else 0.0
+
+        remaining = max((job.rows_total or 0) - processed, 0)
+        if job.status == "completed" or not remaining:
+            eta_seconds = 0
+        elif rows_per_second > 0:
+            eta_seconds = round(remaining / rows_per_second)
+        else:
+            eta_seconds = None
+
+        return {
+            "table": job.table_name,
+            "column": job.column_name,
+            "target_version": job.target_version,
+            "status": job.status,
+            "rows_total": job.rows_total or 0,
+            "rows_processed": processed,
+            "rows_rotated": job.rows_rotated or 0,
+            "rows_skipped": job.rows_skipped or 0,
+            "rows_failed": job.rows_failed or 0,
+            "rows_per_second": round(rows_per_second, 1),
+            "eta_seconds": eta_seconds
         }
 
-        # Get all records with encrypted field
-        offset = 0
-        while True:
-            stmt = select(model_class).offset(offset).limit(batch_size)
-            result = await db_session.execute(stmt)
-            records = result.scalars().all()
-
-            if not records:
-                break
-
-            for record in records:
-                stats["total"] += 1
-                encrypted_value = getattr(record, field_name, None)
-
-                if not encrypted_value:
-                    stats["skipped"] += 1
-                    continue
-
-                try:
-                    if self.encryption.needs_re_encryption(encrypted_value):
-                        # Re-encrypt with current key
-                        new_value = self.encryption.re_encrypt(encrypted_value)
-                        setattr(record, field_name, new_value)
-                        stats["rotated"] += 1
-                    else:
-                        stats["skipped"] += 1
-                except Exception as e:
-                    stats["errors"] += 1
+    async def rotate_encrypted_field(
+        self,
+        db_session,
+        model_class,
+        field_name: str,
+        batch_size: int = ROTATION_BATCH_SIZE
+    ) -> dict:
+        """
+        Rotate encryption for a specific field in a model.
 
-            await db_session.commit()
-            offset += batch_size
+        Kept for existing callers; see rotate_column.
 
-        return stats
+        Returns:
+            Dictionary with rotation statistics
+        """
+        progress = await self.rotate_column(db_session, model_class, field_name, batch_size=batch_size)
+        return {
+            "total": progress["rows_processed"],
+            "rotated": progress["rows_rotated"],
+            "skipped": progress["rows_skipped"],
+            "errors": progress["rows_failed"]
+        }
 
     def check_field_needs_rotation(self, encrypted_value: str) -> bool:
         """Check if a single encrypted value needs rotation."""
@@ -2,19 +2,30 @@
 QA-001 to QA-003: Security Hardening
 Comprehensive security middleware and utilities
 """
-from typing import Optional, List, Dict, Any, Callable
-from datetime import datetime, timedelta, timezone
-from functools import wraps
+from typing import Optional, List, Dict, Any, Deque, FrozenSet, Iterator, Tuple
+from bisect import bisect_right
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from urllib.parse import parse_qsl, unquote_plus
 import hashlib
 import hmac
+import json
+import logging
 import secrets
 import re
 import ipaddress
+import math
+import time
 from enum import Enum
 
-from fastapi import Request, HTTPException, status
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from starlette.middleware.base import BaseHTTPMiddleware
+from fastapi import status
+from jose import jwt
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.requests import cookie_parser
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
 
 
 # =============================================================================
@@ -55,77 +66,300 @@ SECURITY_HEADERS = {
 # Rate limiting defaults
 RATE_LIMIT_WINDOW = 60  # seconds
 RATE_LIMIT_MAX_REQUESTS = 100
+RATE_LIMIT_LOCAL_MAX_KEYS = 10000  # Keys kept by the in-memory fallback
+RATE_LIMIT_TOKEN_CACHE_SIZE = 10000  # Verified access token -> tenant
+RATE_LIMIT_REDIS_RETRY_SECONDS = 5.0  # Back-off after a Redis failure
 
 
 # =============================================================================
 # Security Middleware
 # =============================================================================
 
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
-    """Add security headers to all responses."""
+class SecurityHeadersMiddleware:
+    """
+    Add security headers to all responses.
+
+    Pure ASGI: headers are added to the response start message, without the
+    extra task and body streaming of BaseHTTPMiddleware.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                for header, value in SECURITY_HEADERS.items():
+                    headers[header] = value
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+
+@dataclass(frozen=True)
+class RateLimitRule:
+    """
+    ``limit`` requests per ``window`` seconds, per client IP or per tenant.
 
-    async def dispatch(self, request: Request, call_next):
-        response = await call_next(request)
+    path_prefix and methods narrow the requests a rule applies to. Tenant
+    rules key on the company_id of a valid access token and do not apply
+    to anonymous requests.
+    """
+    name: str
+    limit: int
+    window: int
+    by: str = "ip"  # ip or tenant
+    path_prefix: Optional[str] = None
+    methods: Optional[FrozenSet[str]] = None
+
+    def matches(self, path: str, method: str) -> bool:
+        if self.path_prefix and not path.startswith(self.path_prefix):
+            return False
+        return not self.methods or method in self.methods
+
+
+# GCRA check-and-increment over every key of a request, atomically.
+# KEYS: one per rule; ARGV: limit, period (ms) per key.
+# Returns {allowed, remaining, retry after (ms)}; nothing is written unless
+# every key allows the request. Time comes from the Redis server.
+RATE_LIMIT_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) * 1000 + math.floor(tonumber(now_parts[2]) / 1000)
+local new_tats = {}
+local remaining = -1
+for i, key in ipairs(KEYS) do
+    local limit = tonumber(ARGV[2 * i - 1])
+    local period = tonumber(ARGV[2 * i])
+    local emission = period / limit
+    local tat = tonumber(redis.call('GET', key)) or now
+    if tat < now then tat = now end
+    local new_tat = tat + emission
+    local allow_at = new_tat - period
+    if allow_at > now then
+        return {0, 0, math.ceil(allow_at - now)}
+    end
+    new_tats[i] = new_tat
+    local left = math.floor((period - (new_tat - now)) / emission)
+    if remaining < 0 or left < remaining then remaining = left end
+end
+for i, key in ipairs(KEYS) do
+    redis.call('SET', key, string.format('%.3f', new_tats[i]), 'PX', math.ceil(new_tats[i] - now))
+end
+return {1, remaining, 0}
+"""
 
-        for header, value in SECURITY_HEADERS.items():
-            response.headers[header] = value
+# (key, limit, window seconds) checks of one request
+RateLimitChecks = List[Tuple[str, int, int]]
 
-        return response
 
+class LocalRateLimiter:
+    """
+    In-process sliding-window limiter, used while Redis is unavailable.
 
-class RateLimitMiddleware(BaseHTTPMiddleware):
+    Each key keeps a ring buffer of its last ``limit`` request times and
+    keys are evicted least-recently-used beyond ``max_keys``, so memory is
+    bounded by max_keys * limit timestamps.
+    """
+
+    def __init__(self, max_keys: int = RATE_LIMIT_LOCAL_MAX_KEYS):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Deque[float]]" = OrderedDict()
+
+    def check(self, checks: RateLimitChecks, now: Optional[float] = None) -> Tuple[bool, int, float]:
+        """
+        Check and record a request against every (key, limit, window).
+
+        Returns:
+            (allowed, remaining requests, retry after in seconds)
+        """
+        now = time.monotonic() if now is None else now
+        buckets: List[Deque[float]] = []
+        remaining: Optional[int] = None
+
+        for key, limit, window in checks:
+            bucket = self._buckets.get(key)
+            if bucket is None or bucket.maxlen != limit:
+                bucket = self._buckets[key] = deque(bucket or (), maxlen=limit)
+            self._buckets.move_to_end(key)
+
+            cutoff = now - window
+            if len(bucket) == limit and bucket[0] > cutoff:
+                return False, 0, bucket[0] - cutoff
+            in_window = len(bucket) - bisect_right(bucket, cutoff)
+            left = limit - in_window - 1
+            remaining = left if remaining is None else min(remaining, left)
+            buckets.append(bucket)
+
+        for bucket in buckets:
+            bucket.append(now)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return True, remaining if remaining is not None else -1, 0.0
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class RateLimitMiddleware:
     """
     Rate limiting middleware with Redis support for distributed deployments.
 
-    Falls back to in-memory storage if Redis is unavailable.
+    - Pure ASGI, one Lua script round trip per request (GCRA, atomic
+      check-and-increment for every matching rule)
+    - Per-IP, per-route and per-tenant rules (see RateLimitRule)
+    - Falls back to a bounded in-memory sliding window if Redis is
+      unavailable, retrying Redis after RATE_LIMIT_REDIS_RETRY_SECONDS
     """
 
-    def __init__(self, app, max_requests: int = 100, window: int = 60, redis_url: str = None):
-        super().__init__(app)
-        self.max_requests = max_requests
-        self.window = window
+    def __init__(
+        self,
+        app: ASGIApp,
+        max_requests: int = RATE_LIMIT_MAX_REQUESTS,
+        window: int = RATE_LIMIT_WINDOW,
+        redis_url: str = None,
+        rules: Optional[List[RateLimitRule]] = None,
+        jwt_secret: Optional[str] = None,
+        jwt_algorithm: str = "HS256",
+        exempt_paths: Tuple[str, ...] = ("/health",),
+        local_max_keys: int = RATE_LIMIT_LOCAL_MAX_KEYS
+    ):
+        self.app = app
+        self.rules = rules or [RateLimitRule("ip", max_requests, window)]
         self.redis_url = redis_url
+        self.jwt_secret = jwt_secret
+        self.jwt_algorithm = jwt_algorithm
+        self.exempt_paths = exempt_paths
+        self.local = LocalRateLimiter(local_max_keys)
         self._redis = None
-        self._fallback_requests: Dict[str, List[datetime]] = {}  # Fallback for non-Redis
-
-    async def _get_redis(self):
-        """Get Redis client for distributed rate limiting."""
-        if self._redis is None and self.redis_url:
+        self._script = None
+        self._redis_retry_at = 0.0
+        self._tenants: "OrderedDict[str, Tuple[Optional[str], float]]" = OrderedDict()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] in self.exempt_paths:
+            await self.app(scope, receive, send)
+            return
+
+        checks = self._checks(scope)
+        if not checks:
+            await self.app(scope, receive, send)
+            return
+
+        allowed, remaining, retry_after = await self._check(checks)
+        if not allowed:
+            response = JSONResponse(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                content={"detail": "Rate limit exceeded. Please try again later."},
+                headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+            )
+            await response(scope, receive, send)
+            return
+
+        async def send_with_remaining(message: Message) -> None:
+            if message["type"] == "http.response.start" and remaining >= 0:
+                MutableHeaders(scope=message)["X-RateLimit-Remaining"] = str(remaining)
+            await send(message)
+
+        await self.app(scope, receive, send_with_remaining)
+
+    def _checks(self, scope: Scope) -> RateLimitChecks:
+        """(key, limit, window) of every rule the request falls under."""
+        path, method = scope["path"], scope["method"]
+        headers = Headers(scope=scope)
+        client_ip: Optional[str] = None
+        tenant: Optional[str] = None
+        tenant_resolved = False
+        checks: RateLimitChecks = []
+
+        for rule in self.rules:
+            if not rule.matches(path, method):
+                continue
+            if rule.by == "tenant":
+                if not tenant_resolved:
+                    tenant, tenant_resolved = self._get_tenant(headers), True
+                if tenant is None:
+                    continue
+                identity = tenant
+            else:
+                if client_ip is None:
+                    client_ip = self._get_client_ip(scope, headers)
+                identity = client_ip
+            checks.append((f"rate_limit:{rule.name}:{identity}", rule.limit, rule.window))
+        return checks
+
+    async def _check(self, checks: RateLimitChecks) -> Tuple[bool, int, float]:
+        """Check with Redis, or the local limiter while Redis is unavailable."""
+        script = self._get_script()
+        if script is not None:
             try:
+                args: List[int] = []
+                for _, limit, window in checks:
+                    args.extend((limit, window * 1000))
+                allowed, remaining, retry_ms = await script(keys=[key for key, _, _ in checks], args=args)
+                return bool(allowed), int(remaining), int(retry_ms) / 1000
+            except Exception as e:
+                logger.warning(f"Redis rate limiting unavailable, using in-memory limits: {e}")
+                self._script = None
+                self._redis_retry_at = time.monotonic() + RATE_LIMIT_REDIS_RETRY_SECONDS
+
+        return self.local.check(checks)
+
+    def _get_script(self):
+        """Registered rate limit script, unless Redis recently failed."""
+        if self._script is None and self.redis_url and time.monotonic() >= self._redis_retry_at:
+            if self._redis is None:
                 import redis.asyncio as aioredis
                 self._redis = aioredis.from_url(self.redis_url, decode_responses=True)
-                await self._redis.ping()
-            except Exception:
-                self._redis = None
-        return self._redis
-
-    async def dispatch(self, request: Request, call_next):
-        client_ip = self._get_client_ip(request)
+            self._script = self._redis.register_script(RATE_LIMIT_SCRIPT)
+        return self._script
+
+    def _get_tenant(self, headers: Headers) -> Optional[str]:
+        """company_id of a valid access token (header or cookie), cached per token."""
+        if not self.jwt_secret:
+            return None
+        authorization = headers.get("authorization", "")
+        if authorization.startswith("Bearer "):
+            token = authorization[7:]
+        else:
+            token = cookie_parser(headers.get("cookie", "")).get("access_token")
+        if not token:
+            return None
 
-        if not await self._is_allowed(client_ip):
-            raise HTTPException(
-                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                detail="Rate limit exceeded. Please try again later.",
-                headers={"Retry-After": str(self.window)}
-            )
+        now = time.time()
+        cached = self._tenants.get(token)
+        if cached is not None and cached[1] > now:
+            self._tenants.move_to_end(token)
+            return cached[0]
 
-        await self._record_request(client_ip)
-        return await call_next(request)
+        try:
+            payload = jwt.decode(token, self.jwt_secret, algorithms=[self.jwt_algorithm])
+        except Exception:
+            return None
+        tenant = payload.get("company_id")
+        self._tenants[token] = (str(tenant) if tenant else None, float(payload.get("exp", now)))
+        while len(self._tenants) > RATE_LIMIT_TOKEN_CACHE_SIZE:
+            self._tenants.popitem(last=False)
+        return self._tenants[token][0]
 
-    def _get_client_ip(self, request: Request) -> str:
+    @staticmethod
+    def _get_client_ip(scope: Scope, headers: Headers) -> str:
         """
         Get client IP, handling proxies securely.
 
         Only trust X-Forwarded-For if behind a known proxy.
         """
         # Check for trusted proxy header (should be set by your load balancer)
-        if request.headers.get("X-Real-IP"):
-            return request.headers.get("X-Real-IP")
+        if headers.get("x-real-ip"):
+            return headers["x-real-ip"]
 
         # X-Forwarded-For can be spoofed - only trust first IP if behind trusted proxy
-        forwarded = request.headers.get("X-Forwarded-For")
+        forwarded = headers.get("x-forwarded-for")
         if forwarded:
-            # Take the rightmost IP (closest proxy) for security
             # In production, configure your proxy to strip untrusted headers
             ips = [ip.strip() for ip in forwarded.split(",")]
             # Return first non-private IP, or first IP if all are private
@@ -138,290 +372,401 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
                     continue
             return ips[0] if ips else "unknown"
 
-        return request.client.host if request.client else "unknown"
+        client = scope.get("client")
+        return client[0] if client else "unknown"
 
-    async def _is_allowed(self, client_ip: str) -> bool:
-        """Check if client is within rate limit using Redis or fallback."""
-        redis_client = await self._get_redis()
-
-        if redis_client:
-            try:
-                key = f"rate_limit:{client_ip}"
-                current = await redis_client.get(key)
-                return int(current or 0) < self.max_requests
-            except Exception:
-                pass  # Fall through to in-memory
 
-        # Fallback to in-memory (single instance only)
-        now = datetime.now(timezone.utc)
-        cutoff = now - timedelta(seconds=self.window)
-
-        if client_ip in self._fallback_requests:
-            self._fallback_requests[client_ip] = [
-                t for t in self._fallback_requests[client_ip] if t > cutoff
-            ]
-            return len(self._fallback_requests[client_ip]) < self.max_requests
-
-        return True
+# =============================================================================
+# Request Inspection (SQL injection / XSS)
+# =============================================================================
 
-    async def _record_request(self, client_ip: str) -> None:
-        """Record a request using Redis or fallback."""
-        redis_client = await self._get_redis()
+# Comprehensive SQL injection patterns
+# Patterns work on URL-decoded strings
+SQL_INJECTION_PATTERNS = [
+    # Basic SQL syntax elements that shouldn't appear in normal input
+    r"(\-\-)|(/\*)|(\*/)",  # SQL comments
+    r";\s*(SELECT|INSERT|UPDATE|DELETE|DROP|CREATE|ALTER|TRUNCATE)",  # Chained statements
+
+    # UNION-based injection
+    r"UNION\s+(ALL\s+)?SELECT",
+    r"UNION\s+(ALL\s+)?/\*.*\*/\s*SELECT",
+
+    # Classic SQL injection patterns
+    r"'\s*(OR|AND)\s+['\d]",  # ' OR '1 / ' AND 1
+    r"'\s*(OR|AND)\s+\w+\s*=\s*\w+",  # ' OR 1=1 / ' AND a=a
+    r"1\s*=\s*1",  # Tautologies like 1=1
+    r"'\s*=\s*'",  # '='
+
+    # Dangerous SQL keywords with suspicious context
+    r"(^|\s|;)(DROP|TRUNCATE|DELETE\s+FROM)\s+",
+    r"(^|\s|;)INSERT\s+INTO\s+",
+    r"(^|\s|;)UPDATE\s+\w+\s+SET\s+",
+    r"(^|\s|;)ALTER\s+TABLE\s+",
+
+    # Stored procedure execution
+    r"EXEC(UTE)?\s+",
+    r"xp_\w+",  # SQL Server extended procedures
+
+    # Information schema access
+    r"INFORMATION_SCHEMA\.",
+    r"sys\.(tables|columns|databases)",
+
+    # Sleep/benchmark (time-based blind injection)
+    r"SLEEP\s*\(",
+    r"BENCHMARK\s*\(",
+    r"WAITFOR\s+DELAY",
+    r"pg_sleep\s*\(",
+
+    # Hex/char encoding attempts
+    r"CHAR\s*\(\s*\d+\s*\)",
+    r"0x[0-9a-fA-F]+",  # Hex literals in suspicious context
+
+    # Stacked queries
+    r";\s*\-\-",
+]
+
+XSS_PATTERNS = [
+    # Script tags (various forms)
+    r"<\s*script[^>]*>",
+    r"<\s*/\s*script\s*>",
+
+    # JavaScript URI scheme
+    r"javascript\s*:",
+    r"vbscript\s*:",
+    r"data\s*:\s*text/html",
+
+    # Event handlers (comprehensive list)
+    r"on(abort|activate|afterprint|afterupdate|beforeactivate|beforecopy|beforecut|beforedeactivate|beforeeditfocus|beforepaste|beforeprint|beforeunload|beforeupdate|blur|bounce|cellchange|change|click|contextmenu|controlselect|copy|cut|dataavailable|datasetchanged|datasetcomplete|dblclick|deactivate|drag|dragend|dragenter|dragleave|dragover|dragstart|drop|error|errorupdate|filterchange|finish|focus|focusin|focusout|hashchange|help|input|keydown|keypress|keyup|layoutcomplete|load|losecapture|message|mousedown|mouseenter|mouseleave|mousemove|mouseout|mouseover|mouseup|mousewheel|move|moveend|movestart|offline|online|pagehide|pageshow|paste|popstate|progress|propertychange|readystatechange|reset|resize|resizeend|resizestart|rowenter|rowexit|rowsdelete|rowsinserted|scroll|search|select|selectionchange|selectstart|start|stop|storage|submit|timeout|touchcancel|touchend|touchmove|touchstart|unload|wheel)\s*=",
+
+    # Dangerous HTML elements
+    r"<\s*iframe[^>]*>",
+    r"<\s*object[^>]*>",
+    r"<\s*embed[^>]*>",
+    r"<\s*frame[^>]*>",
+    r"<\s*frameset[^>]*>",
+    r"<\s*applet[^>]*>",
+    r"<\s*base[^>]*>",
+    r"<\s*link[^>]*>",
+    r"<\s*meta[^>]*>",
+    r"<\s*style[^>]*>",
+
+    # SVG-based XSS
+    r"<\s*svg[^>]*>",
+    r"<\s*math[^>]*>",
+
+    # Expression/eval patterns
+    r"expression\s*\(",
+    r"eval\s*\(",
+    r"Function\s*\(",
+    r"setTimeout\s*\(",
+    r"setInterval\s*\(",
+
+    # HTML entity encoded variants of < and >
+    r"&lt;\s*script",
+    r"&#60;\s*script",
+    r"&#x3c;\s*script",
+]
+
+# Narrow XSS subset applied to request bodies. Free text, passwords and
+# tokens legitimately contain "--", "0x..", "execute" or "<style>", so the
+# SQL injection rules and the broad XSS rules only run on the URL.
+BODY_XSS_PATTERNS = [
+    r"<\s*script[^>]*>",
+    r"<\s*/\s*script\s*>",
+    r"<\s*(iframe|object|embed|frame|frameset|applet|base|meta)\b[^>]*>",
+    r"<[^>]*[\s/\"']on[a-z]+\s*=",  # Event handler attribute inside a tag
+    r"(href|src|action|formaction)\s*=\s*[\"']?\s*(javascript|vbscript)\s*:",
+    r"^\s*(javascript|vbscript)\s*:",  # URL field holding a script URI
+    r"&(lt|#60|#x3c);\s*script",
+]
+
+# Body fields never inspected: credentials and tokens are opaque strings
+BODY_INSPECTION_EXEMPT_FIELDS = frozenset({
+    "password", "current_password", "old_password", "new_password", "confirm_password",
+    "token", "access_token", "refresh_token", "id_token", "reset_token", "otp",
+    "secret", "client_secret", "api_key", "mfa_code", "totp_code",
+})
+
+# Body content types that are inspected; anything else (multipart uploads,
+# binary files, ...) passes through unread
+INSPECTED_CONTENT_TYPES = (
+    "application/json",
+    "application/x-www-form-urlencoded",
+    "application/xml",
+    "text/",
+)
+
+# Larger bodies are streamed through uninspected
+MAX_INSPECTED_BODY_SIZE = 1024 * 1024  # 1 MB
+
+# Inspections slower than this are logged
+SLOW_INSPECTION_SECONDS = 0.005
+
+
+def _compile_inspection_pattern() -> "re.Pattern[str]":
+    """
+    All SQL injection and XSS patterns as one alternation.
 
-        if redis_client:
-            try:
-                key = f"rate_limit:{client_ip}"
-                pipe = redis_client.pipeline()
-                pipe.incr(key)
-                pipe.expire(key, self.window)
-                await pipe.execute()
-                return
-            except Exception:
-                pass  # Fall through to in-memory
-
-        # Fallback to in-memory
-        now = datetime.now(timezone.utc)
-        if client_ip not in self._fallback_requests:
-            self._fallback_requests[client_ip] = []
-        self._fallback_requests[client_ip].append(now)
-
-
-class SQLInjectionMiddleware(BaseHTTPMiddleware):
+    Each rule set is a named group, so one search per value tells whether
+    and which rule set matched. XSS patterns keep their DOTALL flag scoped
+    to their own group.
     """
-    Defense-in-depth SQL injection detection middleware.
+    sqli = "|".join(f"(?:{p})" for p in SQL_INJECTION_PATTERNS)
+    xss = "|".join(f"(?:{p})" for p in XSS_PATTERNS)
+    return re.compile(f"(?P<sqli>{sqli})|(?P<xss>(?s:{xss}))", re.IGNORECASE)
 
-    IMPORTANT: This is NOT a replacement for parameterized queries!
-    All database queries MUST use parameterized queries (SQLAlchemy ORM) as the
-    primary defense against SQL injection. This middleware provides an additional
-    layer of protection by detecting and blocking obvious attack patterns.
 
-    This middleware:
-    - Checks query strings and URL paths only (body inspection disabled to avoid stream issues)
-    - URL-decodes values before pattern matching to catch encoding bypasses
-    - Logs detected attempts for security monitoring
+INSPECTION_PATTERN = _compile_inspection_pattern()
+BODY_INSPECTION_PATTERN = re.compile(
+    "|".join(f"(?:{p})" for p in BODY_XSS_PATTERNS), re.IGNORECASE | re.DOTALL | re.MULTILINE
+)
 
-    NOTE: Body inspection is intentionally disabled because Starlette's BaseHTTPMiddleware
-    has issues with body stream consumption that can cause "No response returned" errors.
-    SQL injection protection for body content relies on parameterized queries (SQLAlchemy ORM).
-    """
 
-    # Comprehensive SQL injection patterns
-    # Patterns work on URL-decoded strings
-    SQL_PATTERNS = [
-        # Basic SQL syntax elements that shouldn't appear in normal input
-        r"(\-\-)|(/\*)|(\*/)",  # SQL comments
-        r";\s*(SELECT|INSERT|UPDATE|DELETE|DROP|CREATE|ALTER|TRUNCATE)",  # Chained statements
-
-        # UNION-based injection
-        r"UNION\s+(ALL\s+)?SELECT",
-        r"UNION\s+(ALL\s+)?/\*.*\*/\s*SELECT",
-
-        # Classic SQL injection patterns
-        r"'\s*(OR|AND)\s+['\d]",  # ' OR '1 / ' AND 1
-        r"'\s*(OR|AND)\s+\w+\s*=\s*\w+",  # ' OR 1=1 / ' AND a=a
-        r"1\s*=\s*1",  # Tautologies like 1=1
-        r"'\s*=\s*'",  # '='
-
-        # Dangerous SQL keywords with suspicious context
-        r"(^|\s|;)(DROP|TRUNCATE|DELETE\s+FROM)\s+",
-        r"(^|\s|;)INSERT\s+INTO\s+",
-        r"(^|\s|;)UPDATE\s+\w+\s+SET\s+",
-        r"(^|\s|;)ALTER\s+TABLE\s+",
-
-        # Stored procedure execution
-        r"EXEC(UTE)?\s+",
-        r"xp_\w+",  # SQL Server extended procedures
-
-        # Information schema access
-        r"INFORMATION_SCHEMA\.",
-        r"sys\.(tables|columns|databases)",
-
-        # Sleep/benchmark (time-based blind injection)
-        r"SLEEP\s*\(",
-        r"BENCHMARK\s*\(",
-        r"WAITFOR\s+DELAY",
-        r"pg_sleep\s*\(",
-
-        # Hex/char encoding attempts
-        r"CHAR\s*\(\s*\d+\s*\)",
-        r"0x[0-9a-fA-F]+",  # Hex literals in suspicious context
-
-        # Stacked queries
-        r";\s*\-\-",
-    ]
-
-    def __init__(self, app):
-        super().__init__(app)
-        self._patterns = [re.compile(p, re.IGNORECASE) for p in self.SQL_PATTERNS]
-
-    async def dispatch(self, request: Request, call_next):
-        from urllib.parse import unquote_plus
-        import logging
-
-        logger = logging.getLogger("security.sqli")
-
-        # Check query parameters (URL-decoded)
-        query_string = unquote_plus(str(request.query_params))
-
-        if self._contains_sql_injection(query_string):
-            logger.warning(
-                f"SQL injection attempt detected in query string from {request.client.host}: {query_string[:200]}"
-            )
-            from starlette.responses import JSONResponse
-            return JSONResponse(
-                status_code=400,
-                content={"detail": "Invalid request parameters"}
-            )
+def detect_injection(value: str) -> Optional[str]:
+    """
+    Rule set ("sqli" or "xss") matched by a value, if any.
 
-        # Check path parameters (URL-decoded)
-        path = unquote_plus(request.url.path)
-        if self._contains_sql_injection(path):
-            logger.warning(
-                f"SQL injection attempt detected in path from {request.client.host}: {path[:200]}"
-            )
-            from starlette.responses import JSONResponse
-            return JSONResponse(
-                status_code=400,
-                content={"detail": "Invalid request path"}
-            )
+    Note: This is a heuristic check and may have false positives/negatives.
+    Always use parameterized queries and output encoding as the primary defense.
+    """
+    if not value:
+        return None
+    match = INSPECTION_PATTERN.search(value)
+    return match.lastgroup if match else None
 
-        # NOTE: Body inspection disabled - causes "No response returned" errors
-        # due to Starlette BaseHTTPMiddleware body stream consumption issues.
-        # SQL injection protection for body content relies on parameterized queries.
 
-        return await call_next(request)
+def detect_body_injection(value: str) -> Optional[str]:
+    """
+    "xss" if a request body value matches the narrow body rule set.
 
-    def _contains_sql_injection(self, value: str) -> bool:
-        """
-        Check if value contains SQL injection patterns.
+    Bodies carry free text and credentials, so only unambiguous script
+    injection is flagged here; see BODY_XSS_PATTERNS.
+    """
+    if not value:
+        return None
+    return "xss" if BODY_INSPECTION_PATTERN.search(value) else None
+
+
+class InspectionMetrics:
+    """Inspection latency of the most recent requests, for p50/p99 reporting."""
+
+    def __init__(self, window: int = 10000):
+        self._samples: Deque[float] = deque(maxlen=window)
+        self.requests = 0
+        self.blocked = 0
+
+    def record(self, seconds: float, blocked: bool) -> None:
+        self._samples.append(seconds)
+        self.requests += 1
+        if blocked:
+            self.blocked += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Counters and latency percentiles in milliseconds."""
+        samples = sorted(self._samples)
+
+        def percentile(pct: float) -> float:
+            if not samples:
+                return 0.0
+            return round(samples[min(len(samples) - 1, int(len(samples) * pct))] * 1000, 3)
+
+        return {
+            "requests": self.requests,
+            "blocked": self.blocked,
+            "p50_ms": percentile(0.50),
+            "p99_ms": percentile(0.99),
+            "max_ms": round(samples[-1] * 1000, 3) if samples else 0.0,
+        }
 
-        Note: This is a heuristic check and may have false positives/negatives.
-        Always use parameterized queries as the primary defense.
-        """
-        if not value:
-            return False
 
-        for pattern in self._patterns:
-            if pattern.search(value):
-                return True
-        return False
+inspection_metrics = InspectionMetrics()
 
 
-class XSSProtectionMiddleware(BaseHTTPMiddleware):
+class RequestInspectionMiddleware:
     """
-    Defense-in-depth XSS detection middleware.
+    Defense-in-depth SQL injection and XSS detection middleware.
 
-    IMPORTANT: This is NOT a replacement for proper output encoding!
-    All user input displayed in HTML MUST be properly escaped/encoded.
-    This middleware provides an additional layer of protection by detecting
-    and blocking obvious XSS attack patterns in inputs.
+    IMPORTANT: This is NOT a replacement for parameterized queries or output
+    encoding! All database queries MUST use parameterized queries (SQLAlchemy
+    ORM) and all user input displayed in HTML MUST be escaped. This middleware
+    blocks obvious attack patterns as an additional layer.
 
     This middleware:
-    - Checks query strings and URL paths only (body inspection disabled to avoid stream issues)
+    - Checks the URL path and query string with the SQL injection and XSS rules
+    - Optionally (``inspect_body``, off by default) checks text-like request
+      bodies with a narrow XSS subset, skipping credential and token fields
+      and the authentication routes
     - URL-decodes values before pattern matching to catch encoding bypasses
+    - Matches both rule sets with one combined regex per value
+    - Is pure ASGI: the body is read once, inspected and replayed to the app
+    - Records inspection latency (inspection_metrics and a Server-Timing header)
     - Logs detected attempts for security monitoring
-
-    NOTE: Body inspection is intentionally disabled because Starlette's BaseHTTPMiddleware
-    has issues with body stream consumption that can cause "No response returned" errors.
-    XSS protection for body content relies on proper output encoding in the frontend.
     """
 
-    XSS_PATTERNS = [
-        # Script tags (various forms)
-        r"<\s*script[^>]*>",
-        r"<\s*/\s*script\s*>",
-
-        # JavaScript URI scheme
-        r"javascript\s*:",
-        r"vbscript\s*:",
-        r"data\s*:\s*text/html",
-
-        # Event handlers (comprehensive list)
-        r"on(abort|activate|afterprint|afterupdate|beforeactivate|beforecopy|beforecut|beforedeactivate|beforeeditfocus|beforepaste|beforeprint|beforeunload|beforeupdate|blur|bounce|cellchange|change|click|contextmenu|controlselect|copy|cut|dataavailable|datasetchanged|datasetcomplete|dblclick|deactivate|drag|dragend|dragenter|dragleave|dragover|dragstart|drop|error|errorupdate|filterchange|finish|focus|focusin|focusout|hashchange|help|input|keydown|keypress|keyup|layoutcomplete|load|losecapture|message|mousedown|mouseenter|mouseleave|mousemove|mouseout|mouseover|mouseup|mousewheel|move|moveend|movestart|offline|online|pagehide|pageshow|paste|popstate|progress|propertychange|readystatechange|reset|resize|resizeend|resizestart|rowenter|rowexit|rowsdelete|rowsinserted|scroll|search|select|selectionchange|selectstart|start|stop|storage|submit|timeout|touchcancel|touchend|touchmove|touchstart|unload|wheel)\s*=",
-
-        # Dangerous HTML elements
-        r"<\s*iframe[^>]*>",
-        r"<\s*object[^>]*>",
-        r"<\s*embed[^>]*>",
-        r"<\s*frame[^>]*>",
-        r"<\s*frameset[^>]*>",
-        r"<\s*applet[^>]*>",
-        r"<\s*base[^>]*>",
-        r"<\s*link[^>]*>",
-        r"<\s*meta[^>]*>",
-        r"<\s*style[^>]*>",
-
-        # SVG-based XSS
-        r"<\s*svg[^>]*>",
-        r"<\s*math[^>]*>",
-
-        # Expression/eval patterns
-        r"expression\s*\(",
-        r"eval\s*\(",
-        r"Function\s*\(",
-        r"setTimeout\s*\(",
-        r"setInterval\s*\(",
-
-        # HTML entity encoded variants of < and >
-        r"&lt;\s*script",
-        r"&#60;\s*script",
-        r"&#x3c;\s*script",
-    ]
-
-    def __init__(self, app):
-        super().__init__(app)
-        self._patterns = [re.compile(p, re.IGNORECASE | re.DOTALL) for p in self.XSS_PATTERNS]
-
-    async def dispatch(self, request: Request, call_next):
-        from urllib.parse import unquote_plus
-        import logging
-
-        logger = logging.getLogger("security.xss")
-
-        # Check query parameters (URL-decoded)
-        query_string = unquote_plus(str(request.query_params))
-        if self._contains_xss(query_string):
-            logger.warning(
-                f"XSS attempt detected in query string from {request.client.host}: {query_string[:200]}"
+    def __init__(
+        self,
+        app: ASGIApp,
+        inspect_body: bool = False,
+        max_body_size: int = MAX_INSPECTED_BODY_SIZE,
+        metrics: Optional[InspectionMetrics] = None,
+        exempt_paths: Tuple[str, ...] = ()
+    ):
+        self.app = app
+        self.inspect_body = inspect_body
+        self.exempt_paths = tuple(exempt_paths)
+        self.max_body_size = max_body_size
+        self.metrics = metrics or inspection_metrics
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        finding = self._inspect_url(scope)
+        buffered: List[Message] = []
+
+        if finding is None and self.inspect_body and not scope["path"].startswith(self.exempt_paths):
+            content_type = self._inspected_content_type(scope)
+            if content_type:
+                buffered, body, complete = await self._read_body(receive)
+                if complete:
+                    finding = self._inspect_body(body, content_type)
+
+        elapsed = time.perf_counter() - started
+        self.metrics.record(elapsed, finding is not None)
+        if elapsed > SLOW_INSPECTION_SECONDS:
+            logger.info(f"Slow request inspection: {elapsed * 1000:.1f} ms for {scope['path'][:200]}")
+
+        if finding is not None:
+            rule_set, location, value = finding
+            client = scope.get("client")
+            logging.getLogger(f"security.{rule_set}").warning(
+                f"{'SQL injection' if rule_set == 'sqli' else 'XSS'} attempt detected in {location} "
+                f"from {client[0] if client else 'unknown'}: {value[:200]}"
             )
-            from starlette.responses import JSONResponse
-            return JSONResponse(
-                status_code=400,
-                content={"detail": "Invalid request parameters"}
+            detail = "Invalid request path" if location == "path" else (
+                "Invalid request body" if location == "body" else "Invalid request parameters"
             )
+            response = JSONResponse(status_code=400, content={"detail": detail})
+            await response(scope, receive, send)
+            return
 
-        # Check path (URL-decoded)
-        path = unquote_plus(request.url.path)
-        if self._contains_xss(path):
-            logger.warning(
-                f"XSS attempt detected in path from {request.client.host}: {path[:200]}"
-            )
-            from starlette.responses import JSONResponse
-            return JSONResponse(
-                status_code=400,
-                content={"detail": "Invalid request path"}
-            )
+        if buffered:
+            receive = self._replay(buffered, receive)
+
+        timing = f"inspect;dur={elapsed * 1000:.3f}"
 
-        # NOTE: Body inspection disabled - causes "No response returned" errors
-        # due to Starlette BaseHTTPMiddleware body stream consumption issues.
-        # XSS protection for body content relies on proper output encoding.
+        async def send_with_timing(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append("Server-Timing", timing)
+            await send(message)
 
-        return await call_next(request)
+        await self.app(scope, receive, send_with_timing)
 
-    def _contains_xss(self, value: str) -> bool:
+    @staticmethod
+    def _inspect_url(scope: Scope) -> Optional[Tuple[str, str, str]]:
+        """(rule set, location, value) of a match in the query string or path."""
+        query_string = unquote_plus(scope.get("query_string", b"").decode("latin-1"))
+        rule_set = detect_injection(query_string)
+        if rule_set:
+            return rule_set, "query string", query_string
+
+        path = unquote_plus(scope.get("path", ""))
+        rule_set = detect_injection(path)
+        if rule_set:
+            return rule_set, "path", path
+        return None
+
+    def _inspected_content_type(self, scope: Scope) -> Optional[str]:
+        """Content type of a body worth inspecting, or None to skip the body."""
+        headers = Headers(scope=scope)
+        if headers.get("content-encoding"):
+            return None
+        content_type = headers.get("content-type", "").split(";", 1)[0].strip().lower()
+        if not content_type.startswith(INSPECTED_CONTENT_TYPES):
+            return None
+        try:
+            if int(headers.get("content-length", 0)) > self.max_body_size:
+                return None
+        except ValueError:
+            return None
+        return content_type
+
+    async def _read_body(self, receive: Receive) -> Tuple[List[Message], bytes, bool]:
         """
-        Check if value contains XSS patterns.
+        Read the body up to max_body_size.
 
-        Note: This is a heuristic check and may have false positives/negatives.
-        Always use proper output encoding as the primary defense.
+        Returns:
+            (messages read, body, whether the whole body was read)
         """
-        if not value:
-            return False
+        messages: List[Message] = []
+        chunks: List[bytes] = []
+        size = 0
+        while True:
+            message = await receive()
+            messages.append(message)
+            if message["type"] != "http.request":
+                return messages, b"", False
+            chunk = message.get("body", b"")
+            chunks.append(chunk)
+            size += len(chunk)
+            if not message.get("more_body", False):
+                return messages, b"".join(chunks), True
+            if size > self.max_body_size:
+                return messages, b"", False
 
-        for pattern in self._patterns:
-            if pattern.search(value):
-                return True
-        return False
+    @staticmethod
+    def _inspect_body(body: bytes, content_type: str) -> Optional[Tuple[str, str, str]]:
+        """(rule set, location, value) of a match in the body."""
+        if not body:
+            return None
+        text = body.decode("utf-8", errors="replace")
+
+        if content_type == "application/x-www-form-urlencoded":
+            values = (
+                value for key, value in parse_qsl(text, keep_blank_values=True)
+                if key.lower() not in BODY_INSPECTION_EXEMPT_FIELDS
+            )
+        elif content_type == "application/json":
+            try:
+                values = _json_strings(json.loads(text))
+            except ValueError:
+                values = iter((text,))
+        else:
+            values = iter((text,))
+
+        for value in values:
+            rule_set = detect_body_injection(value)
+            if rule_set:
+                return rule_set, "body", value
+        return None
+
+    @staticmethod
+    def _replay(messages: List[Message], receive: Receive) -> Receive:
+        """Receive callable that returns the buffered messages first."""
+        pending = deque(messages)
+
+        async def replay() -> Message:
+            if pending:
+                return pending.popleft()
+            return await receive()
+
+        return replay
+
+
+def _json_strings(value: Any) -> Iterator[str]:
+    """String values of a decoded JSON document, skipping exempt fields."""
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for key, item in value.items():
+            if isinstance(key, str) and key.lower() in BODY_INSPECTION_EXEMPT_FIELDS:
+                continue
+            yield from _json_strings(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from _json_strings(item)
 
 
 # =============================================================================
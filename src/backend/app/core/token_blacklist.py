@@ -0,0 +1,340 @@
+"""
+Token Blacklist - Revoked tokens with a local bloom-filter front
+Revocations live in Redis; every process keeps a bloom filter of revoked
+token digests, so checks for valid tokens need no network round-trip
+"""
+import asyncio
+import hashlib
+import logging
+import math
+import time
+from typing import Any, Dict, Iterable, Optional, Set
+
+import redis.asyncio as redis
+
+logger = logging.getLogger(__name__)
+
+# token_blacklist:<sha256 of token> -> "1", expiring with the token
+BLACKLIST_PREFIX = "token_blacklist:"
+# Sorted set of digest -> token expiry (unix seconds); rebuilds the filters
+BLACKLIST_INDEX_KEY = "token_blacklist:index"
+# Sorted set of digest -> revocation time (unix seconds); incremental refreshes
+BLACKLIST_LOG_KEY = "token_blacklist:log"
+# Keys written before the filter existed (raw token in the key name)
+LEGACY_BLACKLIST_PREFIX = "blacklist:"
+
+# New revocations from other processes are picked up after this many seconds
+DEFAULT_REFRESH_SECONDS = 5.0
+# Full rebuilds drop expired tokens from the filter
+DEFAULT_REBUILD_SECONDS = 300.0
+DEFAULT_CAPACITY = 100_000
+DEFAULT_ERROR_RATE = 0.001
+DEFAULT_MAX_CONNECTIONS = 20
+# Incremental refreshes re-read this far behind their cursor (clock skew between hosts)
+CLOCK_SKEW_SECONDS = 5.0
+
+
+def token_digest(token: str) -> str:
+    """SHA-256 hex digest a token is blacklisted under."""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+class BloomFilter:
+    """
+    Fixed-size bloom filter over hex SHA-256 digests.
+
+    Bit positions come from double hashing the first 128 bits of the
+    digest, so no further hashing is needed.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = DEFAULT_ERROR_RATE):
+        capacity = max(capacity, 1)
+        self.size = max(64, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, digest: str) -> Iterable[int]:
+        h1 = int(digest[:16], 16)
+        h2 = int(digest[16:32], 16) | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+    def add(self, digest: str) -> None:
+        for position in self._positions(digest):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, digest: str) -> bool:
+        return all(self.bits[p >> 3] & (1 << (p & 7)) for p in self._positions(digest))
+
+
+class TokenBlacklist:
+    """
+    Async token blacklist backed by a pooled Redis client.
+
+    Lookups:
+    - Digest not in the local bloom filter: not revoked, answered locally
+    - Digest confirmed revoked earlier: revoked, answered locally until the
+      token expires
+    - Otherwise: confirmed with one Redis TTL call; filter false positives
+      are remembered until the next rebuild
+
+    The filter is refreshed in the background every ``refresh_seconds``
+    from the revocation log and rebuilt every ``rebuild_seconds`` from the
+    live index, which evicts expired tokens. If Redis is unreachable,
+    tokens the filter flags are treated as revoked and all others pass.
+    """
+
+    def __init__(
+        self,
+        redis_url: str,
+        refresh_seconds: float = DEFAULT_REFRESH_SECONDS,
+        rebuild_seconds: float = DEFAULT_REBUILD_SECONDS,
+        capacity: int = DEFAULT_CAPACITY,
+        error_rate: float = DEFAULT_ERROR_RATE,
+        max_connections: int = DEFAULT_MAX_CONNECTIONS,
+        client: Optional[Any] = None
+    ):
+        self.redis_url = redis_url
+        self.refresh_seconds = refresh_seconds
+        self.rebuild_seconds = rebuild_seconds
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.max_connections = max_connections
+        self._client = client
+
+        self._filter = BloomFilter(capacity, error_rate)
+        self._revoked: Dict[str, float] = {}  # Confirmed digest -> token expiry
+        self._cleared: Set[str] = set()  # Filter false positives since the last rebuild
+        self._loaded = False
+        self._legacy_imported = False
+        self._refreshed_at = 0.0  # monotonic
+        self._rebuilt_at = 0.0  # monotonic
+        self._log_cursor = 0.0  # unix seconds
+        self._refresh_lock: Optional[asyncio.Lock] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+
+        self.metrics: Dict[str, int] = {
+            "checks": 0,
+            "local_hits": 0,
+            "remote_checks": 0,
+            "revoked": 0,
+            "false_positives": 0,
+            "refreshes": 0,
+            "errors": 0,
+        }
+
+    def _redis(self):
+        if self._client is None:
+            pool = redis.ConnectionPool.from_url(
+                self.redis_url,
+                max_connections=self.max_connections,
+                decode_responses=True
+            )
+            self._client = redis.Redis(connection_pool=pool)
+        return self._client
+
+    def _remember(self, digest: str, expires_at: float) -> None:
+        self._filter.add(digest)
+        self._revoked[digest] = expires_at
+        self._cleared.discard(digest)
+
+    async def revoke(self, token: str, expires_in: int) -> bool:
+        """
+        Blacklist a token for its remaining lifetime.
+
+        The token is revoked in this process immediately. Returns False if
+        it could not be written to Redis (other processes will not see it).
+        """
+        digest = token_digest(token)
+        ttl = max(int(expires_in), 1)
+        now = time.time()
+        self._remember(digest, now + ttl)
+
+        try:
+            async with self._redis().pipeline(transaction=True) as pipe:
+                pipe.setex(f"{BLACKLIST_PREFIX}{digest}", ttl, "1")
+                pipe.zadd(BLACKLIST_INDEX_KEY, {digest: now + ttl})
+                pipe.zadd(BLACKLIST_LOG_KEY, {digest: now})
+                await pipe.execute()
+            return True
+        except Exception as e:
+            self.metrics["errors"] += 1
+            logger.error(f"Failed to blacklist token in Redis (revoked in this process only): {e}")
+            return False
+
+    async def consume(self, token: str, expires_in: int) -> bool:
+        """
+        Revoke a one-time token (a refresh token being rotated) and return
+        whether this call was the one that revoked it.
+
+        Unlike is_revoked, this never trusts the local filter alone: the
+        revocation is claimed in Redis with SET NX, so a token already
+        used by any process, or by a concurrent request, is refused at
+        once rather than after the next refresh. If Redis is unreachable
+        only this process's own revocations are known.
+        """
+        digest = token_digest(token)
+        ttl = max(int(expires_in), 1)
+        now = time.time()
+        if self._revoked.get(digest, 0) > now:
+            return False
+
+        try:
+            async with self._redis().pipeline(transaction=True) as pipe:
+                pipe.set(f"{BLACKLIST_PREFIX}{digest}", "1", ex=ttl, nx=True)
+                pipe.zadd(BLACKLIST_INDEX_KEY, {digest: now + ttl})
+                pipe.zadd(BLACKLIST_LOG_KEY, {digest: now})
+                claimed = (await pipe.execute())[0]
+        except Exception as e:
+            self.metrics["errors"] += 1
+            logger.error(f"Failed to consume token in Redis (checked in this process only): {e}")
+            claimed = True
+
+        self._remember(digest, now + ttl)
+        return bool(claimed)
+
+    async def is_revoked(self, token: str) -> bool:
+        """Check if a token is blacklisted."""
+        self.metrics["checks"] += 1
+        await self._ensure_fresh()
+
+        digest = token_digest(token)
+        now = time.time()
+        expires_at = self._revoked.get(digest)
+        if expires_at is not None:
+            self.metrics["local_hits"] += 1
+            if expires_at > now:
+                self.metrics["revoked"] += 1
+                return True
+            # The token has expired; it no longer needs to be tracked
+            del self._revoked[digest]
+            return False
+
+        if digest not in self._filter or digest in self._cleared:
+            self.metrics["local_hits"] += 1
+            return False
+
+        self.metrics["remote_checks"] += 1
+        try:
+            ttl = await self._redis().ttl(f"{BLACKLIST_PREFIX}{digest}")
+        except Exception as e:
+            self.metrics["errors"] += 1
+            logger.warning(f"Token blacklist check failed (treating filtered token as revoked): {e}")
+            self.metrics["revoked"] += 1
+            return True
+
+        if ttl == -2:  # No such key
+            self.metrics["false_positives"] += 1
+            self._cleared.add(digest)
+            return False
+
+        # ttl -1 = no expiry; keep it until the next rebuild re-checks it
+        self._revoked[digest] = now + (ttl if ttl > 0 else self.rebuild_seconds)
+        self.metrics["revoked"] += 1
+        return True
+
+    async def _ensure_fresh(self) -> None:
+        """Load the filter on first use, then refresh it in the background."""
+        if time.monotonic() - self._refreshed_at < self.refresh_seconds:
+            return
+        if not self._loaded:
+            await self.refresh()
+        elif self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self.refresh())
+
+    async def refresh(self, full: bool = False) -> None:
+        """Pull new revocations (or rebuild the filter when due or ``full``)."""
+        if self._refresh_lock is None:
+            self._refresh_lock = asyncio.Lock()
+
+        async with self._refresh_lock:
+            started = time.monotonic()
+            try:
+                client = self._redis()
+                now = time.time()
+                if full or not self._loaded or started - self._rebuilt_at >= self.rebuild_seconds:
+                    await self._rebuild(client, now)
+                else:
+                    digests = await client.zrangebyscore(
+                        BLACKLIST_LOG_KEY, self._log_cursor - CLOCK_SKEW_SECONDS, "+inf"
+                    )
+                    for digest in digests:
+                        self._filter.add(digest)
+                        self._cleared.discard(digest)
+                    self._log_cursor = now
+                self.metrics["refreshes"] += 1
+            except Exception as e:
+                self.metrics["errors"] += 1
+                logger.warning(f"Token blacklist refresh failed: {e}")
+            finally:
+                self._refreshed_at = time.monotonic()
+
+    async def _rebuild(self, client, now: float) -> None:
+        """New filter from the live index; expired tokens drop out."""
+        if not self._legacy_imported:
+            await self._import_legacy_keys(client, now)
+            self._legacy_imported = True
+
+        async with client.pipeline(transaction=False) as pipe:
+            pipe.zremrangebyscore(BLACKLIST_INDEX_KEY, "-inf", now)
+            pipe.zremrangebyscore(BLACKLIST_LOG_KEY, "-inf", now - 2 * self.rebuild_seconds)
+            pipe.zrangebyscore(BLACKLIST_INDEX_KEY, now, "+inf")
+            live = (await pipe.execute())[-1]
+
+        # Revocations Redis missed (e.g. while it was down) survive rebuilds
+        self._revoked = {digest: expiry for digest, expiry in self._revoked.items() if expiry > now}
+
+        bloom = BloomFilter(max(self.capacity, 2 * (len(live) + len(self._revoked))), self.error_rate)
+        for digest in live:
+            bloom.add(digest)
+        for digest in self._revoked:
+            bloom.add(digest)
+
+        self._filter = bloom
+        self._cleared = set()
+        self._log_cursor = now
+        self._rebuilt_at = time.monotonic()
+        self._loaded = True
+
+    async def _import_legacy_keys(self, client, now: float) -> None:
+        """Move "blacklist:<token>" keys to the digest layout, keeping their TTL."""
+        async for key in client.scan_iter(match=f"{LEGACY_BLACKLIST_PREFIX}*", count=1000):
+            ttl = await client.ttl(key)
+            if ttl > 0:
+                digest = token_digest(key[len(LEGACY_BLACKLIST_PREFIX):])
+                async with client.pipeline(transaction=True) as pipe:
+                    pipe.setex(f"{BLACKLIST_PREFIX}{digest}", ttl, "1")
+                    pipe.zadd(BLACKLIST_INDEX_KEY, {digest: now + ttl})
+                    pipe.delete(key)
+                    await pipe.execute()
+
+    def metrics_snapshot(self) -> Dict[str, Any]:
+        """Counters plus the local hit ratio and filter state."""
+        snapshot: Dict[str, Any] = dict(self.metrics)
+        checks = snapshot["checks"]
+        snapshot["local_hit_ratio"] = round(snapshot["local_hits"] / checks, 4) if checks else None
+        snapshot["filter_entries"] = self._filter.count
+        snapshot["filter_bits"] = self._filter.size
+        snapshot["confirmed_revoked"] = len(self._revoked)
+        snapshot["seconds_since_refresh"] = (
+            round(time.monotonic() - self._refreshed_at, 1) if self._refreshed_at else None
+        )
+        return snapshot
+
+
+_token_blacklist: Optional[TokenBlacklist] = None
+
+
+def get_token_blacklist() -> TokenBlacklist:
+    """Get token blacklist singleton (lazy initialization)."""
+    global _token_blacklist
+    if _token_blacklist is None:
+        from app.core.config import settings
+        _token_blacklist = TokenBlacklist(
+            settings.REDIS_URL,
+            refresh_seconds=settings.TOKEN_BLACKLIST_REFRESH_SECONDS,
+            capacity=settings.TOKEN_BLACKLIST_CAPACITY,
+            max_connections=settings.TOKEN_BLACKLIST_MAX_CONNECTIONS
+        )
+    return _token_blacklist
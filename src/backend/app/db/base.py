@@ -6,10 +6,10 @@ from app.db.session import Base
 
 # Import all models to register them with Base.metadata
 # User and Auth
-from app.models.user import User, UserSession, AuditLog
+from app.models.user import User, UserSession, AuditLog, AuditChainHead
 
 # Company and Organization
-from app.models.company import CompanyProfile, CompanyStatutory, Department, Designation
+from app.models.company import CompanyProfile, CompanyStatutory, Department, Designation, DocumentSequence
 
 # Employee
 from app.models.employee import Employee, EmployeeContact, EmployeeIdentity, EmployeeBank
@@ -30,7 +30,7 @@ from app.models.leave import (
 # Payroll
 from app.models.payroll import (
     SalaryComponent, EmployeeSalary, EmployeeSalaryComponent,
-    PayrollRun, Payslip, PFMonthlyData, ESIMonthlyData, TDSMonthlyData, TaxDeclaration
+    PayrollRun, PayrollRunCheckpoint, Payslip, PFMonthlyData, ESIMonthlyData, TDSMonthlyData, TaxDeclaration
 )
 
 # Document
@@ -41,7 +41,7 @@ from app.models.document import (
 # Accounting
 from app.models.accounting import (
     Account, FinancialYear, AccountingPeriod, JournalEntry, JournalLine,
-    GeneralLedger, CostCenter, BudgetEntry
+    GeneralLedger, AccountPeriodBalance, CostCenter, BudgetEntry
 )
 
 # Invoice and Bill
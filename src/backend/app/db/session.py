@@ -2,7 +2,8 @@
 Database Session Management
 Async SQLAlchemy with connection pooling
 """
-from typing import AsyncGenerator
+from contextlib import asynccontextmanager
+from typing import AsyncGenerator, AsyncIterator
 from sqlalchemy import create_engine
 from sqlalchemy.ext.asyncio import (
     AsyncSession,
@@ -10,6 +11,7 @@ from sqlalchemy.ext.asyncio import (
     create_async_engine,
 )
 from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.pool import NullPool
 
 from app.core.config import settings
 
@@ -50,6 +52,38 @@ SessionLocal = sessionmaker(
 Base = declarative_base()
 
 
+@asynccontextmanager
+async def task_session_maker() -> AsyncIterator[async_sessionmaker]:
+    """
+    Async session factory for Celery tasks that run coroutines with asyncio.run().
+
+    asyncpg connections are bound to the event loop that opened them, and
+    every asyncio.run() starts a new loop, so pooled connections of the
+    module-level engine cannot be reused by the next task run. This engine
+    does not pool (NullPool) and is disposed when the block exits.
+
+    Usage:
+        async with task_session_maker() as session_maker:
+            async with session_maker() as session:
+                ...
+    """
+    task_engine = create_async_engine(
+        settings.DATABASE_URL,
+        poolclass=NullPool,
+        echo=settings.DEBUG,
+    )
+    try:
+        yield async_sessionmaker(
+            task_engine,
+            class_=AsyncSession,
+            expire_on_commit=False,
+            autocommit=False,
+            autoflush=False,
+        )
+    finally:
+        await task_engine.dispose()
+
+
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
     """
     Dependency for getting async database session.
@@ -11,11 +11,12 @@ import structlog
 from app.core.config import settings
 from app.api.v1.router import api_router
 from app.db.session import engine
+from app.services.audit_writer import audit_writer
 from app.core.security import (
     SecurityHeadersMiddleware,
-    SQLInjectionMiddleware,
-    XSSProtectionMiddleware,
+    RequestInspectionMiddleware,
     RateLimitMiddleware,
+    RateLimitRule,
 )
 
 
@@ -54,10 +55,13 @@ async def lifespan(app: FastAPI):
     # Initialize database connection pool
     # await init_db()
 
+    await audit_writer.start()
+
     yield
 
     # Shutdown
     logger.info("Shutting down GanaPortal")
+    await audit_writer.stop()
     await engine.dispose()
 
 
@@ -98,16 +102,30 @@ app.add_middleware(GZipMiddleware, minimum_size=1000)
 # - Parameterized queries (for SQL injection)
 # - Output encoding (for XSS)
 app.add_middleware(SecurityHeadersMiddleware)
-app.add_middleware(SQLInjectionMiddleware)
-app.add_middleware(XSSProtectionMiddleware)
+app.add_middleware(
+    RequestInspectionMiddleware,
+    inspect_body=settings.REQUEST_BODY_INSPECTION,
+    exempt_paths=(
+        f"{settings.API_V1_PREFIX}/auth/",
+        f"{settings.API_V1_PREFIX}/candidates/auth/",
+        f"{settings.API_V1_PREFIX}/superadmin/auth/",
+    )
+)
 
 # Rate Limiting - Protect against DoS and abuse
 # Uses Redis for distributed deployments, falls back to in-memory for single instance
 app.add_middleware(
     RateLimitMiddleware,
-    max_requests=100,  # requests per window
-    window=60,  # seconds
-    redis_url=getattr(settings, 'REDIS_URL', None)
+    rules=[
+        RateLimitRule("ip", settings.RATE_LIMIT_REQUESTS, settings.RATE_LIMIT_WINDOW_SECONDS),
+        RateLimitRule(
+            "tenant", settings.RATE_LIMIT_TENANT_REQUESTS, settings.RATE_LIMIT_WINDOW_SECONDS,
+            by="tenant"
+        ),
+    ],
+    redis_url=getattr(settings, 'REDIS_URL', None),
+    jwt_secret=settings.JWT_SECRET_KEY,
+    jwt_algorithm=settings.JWT_ALGORITHM
 )
 
 
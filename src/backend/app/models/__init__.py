@@ -3,10 +3,12 @@
 from app.models.base import BaseModel, TenantBaseModel
 
 # User
-from app.models.user import User, UserRole, UserSession, AuditLog
+from app.models.user import User, UserRole, UserSession, AuditLog, AuditChainHead
 
 # Company
-from app.models.company import CompanyProfile, CompanyStatutory, Department, Designation
+from app.models.company import (
+    CompanyProfile, CompanyStatutory, Department, Designation, DocumentSequence
+)
 
 # Employee
 from app.models.employee import (
@@ -16,7 +18,7 @@ from app.models.employee import (
 
 # Payroll
 from app.models.payroll import (
-    PayrollRun, PayrollStatus, SalaryComponent, ComponentType,
+    PayrollRun, PayrollRunCheckpoint, PayrollStatus, SalaryComponent, ComponentType,
     EmployeeSalary, EmployeeSalaryComponent, Payslip,
     PFMonthlyData, ESIMonthlyData, TDSMonthlyData, TaxDeclaration
 )
@@ -46,7 +48,7 @@ from app.models.document import (
 from app.models.accounting import (
     Account, AccountType, AccountSubType, FinancialYear, AccountingPeriod,
     JournalEntry, JournalLine, JournalType, JournalStatus, GeneralLedger,
-    CostCenter, BudgetEntry
+    AccountPeriodBalance, CostCenter, BudgetEntry
 )
 
 # Customer/Vendor
@@ -213,14 +215,14 @@ __all__ = [
     # Base
     "BaseModel", "TenantBaseModel",
     # User
-    "User", "UserRole", "UserSession", "AuditLog",
+    "User", "UserRole", "UserSession", "AuditLog", "AuditChainHead",
     # Company
-    "CompanyProfile", "CompanyStatutory", "Department", "Designation",
+    "CompanyProfile", "CompanyStatutory", "Department", "Designation", "DocumentSequence",
     # Employee
     "Employee", "EmploymentStatus", "EmploymentType",
     "EmployeeContact", "EmployeeIdentity", "EmployeeBank",
     # Payroll
-    "PayrollRun", "PayrollStatus", "SalaryComponent", "ComponentType",
+    "PayrollRun", "PayrollRunCheckpoint", "PayrollStatus", "SalaryComponent", "ComponentType",
     "EmployeeSalary", "EmployeeSalaryComponent", "Payslip",
     "PFMonthlyData", "ESIMonthlyData", "TDSMonthlyData", "TaxDeclaration",
     # Leave
@@ -237,7 +239,7 @@ __all__ = [
     # Accounting
     "Account", "AccountType", "AccountSubType", "FinancialYear", "AccountingPeriod",
     "JournalEntry", "JournalLine", "JournalType", "JournalStatus", "GeneralLedger",
-    "CostCenter", "BudgetEntry",
+    "AccountPeriodBalance", "CostCenter", "BudgetEntry",
     # Customer/Vendor
     "Party", "PartyType", "PartyAddress", "PartyContact",
     "GSTRegistrationType", "PaymentTerms",
@@ -8,7 +8,7 @@ from decimal import Decimal
 from enum import Enum as PyEnum
 from sqlalchemy import (
     Column, String, Integer, Boolean, Date, DateTime,
-    ForeignKey, Enum, Text, Numeric, UniqueConstraint, CheckConstraint
+    ForeignKey, Enum, Text, Numeric, UniqueConstraint, CheckConstraint, Index
 )
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
@@ -261,6 +261,10 @@ class JournalEntry(Base):
     financial_year = relationship("FinancialYear")
     accounting_period = relationship("AccountingPeriod")
 
+    __table_args__ = (
+        Index('ix_journal_entries_period_date', 'accounting_period_id', 'journal_date'),
+    )
+
 
 class JournalLine(Base):
     """Journal entry line item."""
@@ -309,6 +313,7 @@ class JournalLine(Base):
             '(debit_amount > 0 AND credit_amount = 0) OR (credit_amount > 0 AND debit_amount = 0) OR (debit_amount = 0 AND credit_amount = 0)',
             name='check_debit_credit_exclusive'
         ),
+        Index('ix_journal_lines_entry', 'journal_entry_id'),
     )
 
 
@@ -351,6 +356,38 @@ class GeneralLedger(Base):
     journal_entry = relationship("JournalEntry")
 
 
+class AccountPeriodBalance(Base):
+    """
+    Posted debits and credits of one account in one accounting period.
+
+    Updated as journal entries post and frozen when the period closes;
+    balances as of a date add the posted lines of the period still open
+    on that date to the rows of the periods ended before it.
+    """
+    __tablename__ = "account_period_balances"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    company_id = Column(UUID(as_uuid=True), ForeignKey("companies.id"), nullable=False)
+    account_id = Column(UUID(as_uuid=True), ForeignKey("accounts.id"), nullable=False)
+    accounting_period_id = Column(UUID(as_uuid=True), ForeignKey("accounting_periods.id"), nullable=False)
+    period_end = Column(Date, nullable=False)  # Copy of the period end date for as-of lookups
+
+    # Movements
+    debit_total = Column(Numeric(18, 2), nullable=False, default=0)
+    credit_total = Column(Numeric(18, 2), nullable=False, default=0)
+
+    # Status
+    is_frozen = Column(Boolean, nullable=False, default=False)  # Period closed
+
+    # Timestamps
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        UniqueConstraint('account_id', 'accounting_period_id', name='uq_account_period_balance'),
+        Index('ix_account_period_balances_company_end', 'company_id', 'period_end'),
+    )
+
+
 class CostCenter(Base):
     """Cost centers for expense tracking."""
     __tablename__ = "cost_centers"
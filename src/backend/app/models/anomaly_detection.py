@@ -208,7 +208,7 @@ class AnomalyDetection(Base):
     baseline_id = Column(UUID(as_uuid=True), ForeignKey("anomaly_baselines.id"), nullable=True)
 
     # Detection identifiers
-    detection_number = Column(String(50), unique=True, nullable=False)
+    detection_number = Column(String(50), nullable=False)
 
     # Category and type
     category = Column(Enum(AnomalyCategory), nullable=False)
@@ -272,6 +272,7 @@ class AnomalyDetection(Base):
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     __table_args__ = (
+        UniqueConstraint("company_id", "detection_number", name="uq_detection_number"),
         Index("ix_anomaly_detections_company_status", "company_id", "status"),
         Index("ix_anomaly_detections_company_category", "company_id", "category"),
         Index("ix_anomaly_detections_company_date", "company_id", "anomaly_date"),
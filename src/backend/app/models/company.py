@@ -5,7 +5,10 @@ AI Org Builder models for intelligent org structure recommendations
 """
 import uuid
 from datetime import datetime, date
-from sqlalchemy import Column, String, Boolean, DateTime, Date, Integer, ForeignKey, Numeric, Text
+from sqlalchemy import (
+    Column, String, Boolean, DateTime, Date, Integer, BigInteger, ForeignKey, Numeric, Text,
+    UniqueConstraint
+)
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import relationship
 
@@ -158,6 +161,27 @@ class Designation(Base):
     source_recommendation = relationship("AIRecommendation", foreign_keys=[source_recommendation_id])
 
 
+class DocumentSequence(Base):
+    """
+    Per-company counter for generated document numbers.
+
+    One row per (company, prefix, period), e.g. ("LD", "202501") for lead
+    numbers issued in January 2025. Allocated via SequenceService.
+    """
+    __tablename__ = "document_sequences"
+    __table_args__ = (
+        UniqueConstraint('company_id', 'prefix', 'period', name='uq_document_sequence'),
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    company_id = Column(UUID(as_uuid=True), ForeignKey("companies.id"), nullable=False)
+    prefix = Column(String(20), nullable=False)
+    period = Column(String(10), nullable=False, default="")  # "" for sequences that never reset
+    last_value = Column(BigInteger, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), default=datetime.utcnow)
+    updated_at = Column(DateTime(timezone=True), default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
 # =============================================================================
 # AI Org Builder Models
 # =============================================================================
@@ -257,7 +257,7 @@ class Lead(Base):
     company_id = Column(UUID(as_uuid=True), ForeignKey("companies.id"), nullable=False, index=True)
 
     # Lead identification
-    lead_number = Column(String(20), unique=True, nullable=False)  # LD-YYYYMM-XXXX
+    lead_number = Column(String(20), nullable=False)  # LD-YYYYMM-XXXX
 
     # Company/Organization info
     company_name = Column(String(255))
@@ -325,6 +325,7 @@ class Lead(Base):
     notes = relationship("Note", back_populates="lead", foreign_keys="Note.lead_id")
 
     __table_args__ = (
+        UniqueConstraint('company_id', 'lead_number', name='uq_lead_number'),
         Index('idx_leads_company_status', 'company_id', 'status'),
         Index('idx_leads_company_assigned', 'company_id', 'assigned_to'),
         Index('idx_leads_company_source', 'company_id', 'source'),
@@ -525,7 +526,7 @@ class Opportunity(Base):
     company_id = Column(UUID(as_uuid=True), ForeignKey("companies.id"), nullable=False, index=True)
 
     # Opportunity identification
-    opportunity_number = Column(String(20), unique=True, nullable=False)  # OP-YYYYMM-XXXX
+    opportunity_number = Column(String(20), nullable=False)  # OP-YYYYMM-XXXX
     title = Column(String(255), nullable=False)
 
     # References
@@ -591,6 +592,7 @@ class Opportunity(Base):
     notes = relationship("Note", back_populates="opportunity", foreign_keys="Note.opportunity_id")
 
     __table_args__ = (
+        UniqueConstraint('company_id', 'opportunity_number', name='uq_opportunity_number'),
         Index('idx_opportunities_company_stage', 'company_id', 'stage'),
         Index('idx_opportunities_company_owner', 'company_id', 'owner_id'),
         Index('idx_opportunities_company_customer', 'company_id', 'customer_id'),
@@ -298,6 +298,8 @@ class GSTR2A(Base):
         Index('ix_gstr2a_period', 'period'),
         Index('ix_gstr2a_supplier', 'supplier_gstin'),
         Index('ix_gstr2a_company_period', 'company_id', 'period'),
+        UniqueConstraint('company_id', 'period', 'supplier_gstin', 'invoice_number',
+                         name='uq_gstr2a_period_invoice'),
     )
 
 
@@ -5,7 +5,7 @@ API integrations, webhooks, connectors, data mappings
 from datetime import datetime
 from typing import Optional, List
 from uuid import UUID, uuid4
-from sqlalchemy import String, Text, Boolean, Integer, DateTime, ForeignKey, Enum as SQLEnum, ARRAY, JSON
+from sqlalchemy import String, Text, Boolean, Integer, DateTime, ForeignKey, Enum as SQLEnum, ARRAY, JSON, Index, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.dialects.postgresql import UUID as PGUUID
 from app.models.base import Base, TimestampMixin, SoftDeleteMixin
@@ -171,6 +171,13 @@ class WebhookSubscription(Base, TimestampMixin, SoftDeleteMixin):
 class WebhookDelivery(Base, TimestampMixin):
     """Webhook delivery attempts"""
     __tablename__ = "webhook_deliveries"
+    __table_args__ = (
+        # Queue of deliveries the dispatcher can claim
+        Index(
+            'ix_webhook_deliveries_due', 'next_attempt_at',
+            postgresql_where=text("status IN ('pending', 'retry', 'sending')")
+        ),
+    )
 
     id: Mapped[UUID] = mapped_column(PGUUID(as_uuid=True), primary_key=True, default=uuid4)
     subscription_id: Mapped[UUID] = mapped_column(PGUUID(as_uuid=True), ForeignKey("webhook_subscriptions.id"))
@@ -192,9 +199,11 @@ class WebhookDelivery(Base, TimestampMixin):
     duration_ms: Mapped[Optional[int]] = mapped_column(Integer)
 
     # Status
-    status: Mapped[str] = mapped_column(String(50))  # pending/success/failed
+    status: Mapped[str] = mapped_column(String(50))  # pending/sending/retry/success/failed
     error_message: Mapped[Optional[str]] = mapped_column(Text)
-    attempt_number: Mapped[int] = mapped_column(Integer, default=1)
+    attempt_number: Mapped[int] = mapped_column(Integer, default=1)  # Attempt being (or last) made
+    # When a pending/retry delivery is due, or a claimed (sending) one's lease expires
+    next_attempt_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
 
     delivered_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
 
@@ -6,7 +6,7 @@ from datetime import datetime
 from typing import Optional, List
 from uuid import UUID, uuid4
 from decimal import Decimal
-from sqlalchemy import String, Text, Boolean, Integer, DateTime, ForeignKey, Enum as SQLEnum, JSON, Numeric
+from sqlalchemy import String, Text, Boolean, Integer, DateTime, ForeignKey, Enum as SQLEnum, JSON, Numeric, Index, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.dialects.postgresql import UUID as PGUUID
 from app.models.base import Base, TimestampMixin, SoftDeleteMixin
@@ -150,11 +150,33 @@ class MobileSyncLog(Base, TimestampMixin):
     error_message: Mapped[Optional[str]] = mapped_column(Text)
 
 
+class SyncTombstone(Base):
+    """
+    Hard deletes of synced rows, written by the record_sync_tombstone
+    trigger, so delta sync can tell devices what to remove
+    """
+    __tablename__ = "sync_tombstones"
+    __table_args__ = (
+        Index('ix_sync_tombstones_owner', 'entity_type', 'owner_id', 'deleted_at', 'id'),
+    )
+
+    id: Mapped[UUID] = mapped_column(PGUUID(as_uuid=True), primary_key=True, default=uuid4)
+    entity_type: Mapped[str] = mapped_column(String(50))
+    entity_id: Mapped[UUID] = mapped_column(PGUUID(as_uuid=True))
+    company_id: Mapped[Optional[UUID]] = mapped_column(PGUUID(as_uuid=True))
+    owner_id: Mapped[Optional[UUID]] = mapped_column(PGUUID(as_uuid=True))  # Company, employee or user the row was synced to
+    deleted_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=text("NOW()"))
+
+
 # ============ Offline Actions ============
 
 class OfflineAction(Base, TimestampMixin):
     """Offline actions queued for sync"""
     __tablename__ = "offline_actions"
+    __table_args__ = (
+        # Idempotency: an action resent by the client is recognised, not applied again
+        Index('uq_offline_actions_client_action', 'company_id', 'user_id', 'client_action_id', unique=True),
+    )
 
     id: Mapped[UUID] = mapped_column(PGUUID(as_uuid=True), primary_key=True, default=uuid4)
     company_id: Mapped[UUID] = mapped_column(PGUUID(as_uuid=True), ForeignKey("companies.id"))
@@ -169,7 +191,7 @@ class OfflineAction(Base, TimestampMixin):
     client_timestamp: Mapped[datetime] = mapped_column(DateTime)
 
     # Processing
-    status: Mapped[str] = mapped_column(String(50), default="pending")
+    status: Mapped[str] = mapped_column(String(50), default="pending")  # processing/success/failed
     server_entity_id: Mapped[Optional[UUID]] = mapped_column(PGUUID(as_uuid=True))
     error_message: Mapped[Optional[str]] = mapped_column(Text)
     processed_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
@@ -132,6 +132,30 @@ class PayrollRun(Base):
 
     # Relationships
     payslips = relationship("Payslip", back_populates="payroll_run")
+    checkpoints = relationship("PayrollRunCheckpoint", back_populates="payroll_run")
+
+
+class PayrollRunCheckpoint(Base):
+    """Progress checkpoint for one committed chunk of a chunked payroll run."""
+    __tablename__ = "payroll_run_checkpoints"
+    __table_args__ = (
+        UniqueConstraint('payroll_run_id', 'chunk_index', name='uq_payroll_checkpoint_chunk'),
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    payroll_run_id = Column(UUID(as_uuid=True), ForeignKey("payroll_runs.id"), nullable=False, index=True)
+    chunk_index = Column(Integer, nullable=False)
+    last_employee_id = Column(UUID(as_uuid=True), nullable=False)  # Keyset cursor for resume
+    employee_count = Column(Integer, default=0)
+    total_gross = Column(Numeric(14, 2), default=0)
+    total_deductions = Column(Numeric(14, 2), default=0)
+    total_net = Column(Numeric(14, 2), default=0)
+    total_employer_contributions = Column(Numeric(14, 2), default=0)
+    errors = Column(JSONB, default=list)
+    created_at = Column(DateTime(timezone=True), default=utc_now)
+
+    # Relationships
+    payroll_run = relationship("PayrollRun", back_populates="checkpoints")
 
 
 class Payslip(Base):
@@ -688,3 +688,33 @@ class DataAccessLog(Base):
         Index("ix_data_access_user_date", "user_id", "created_at"),
         Index("ix_data_access_resource", "resource_type", "resource_id"),
     )
+
+
+class KeyRotationJob(Base):
+    """Resumable re-encryption of one encrypted column to a key version"""
+    __tablename__ = "key_rotation_jobs"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid4)
+
+    # What is rotated
+    table_name = Column(String(100), nullable=False)
+    column_name = Column(String(100), nullable=False)
+    target_version = Column(Integer, nullable=False)
+
+    # Progress
+    status = Column(String(20), default="running")  # running, completed, failed
+    last_id = Column(UUID(as_uuid=True), nullable=True)  # Keyset cursor for resume
+    rows_total = Column(Integer, default=0)  # Estimated when the job (re)starts
+    rows_processed = Column(Integer, default=0)
+    rows_rotated = Column(Integer, default=0)
+    rows_skipped = Column(Integer, default=0)
+    rows_failed = Column(Integer, default=0)
+    last_error = Column(Text, nullable=True)
+
+    started_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    completed_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        UniqueConstraint("table_name", "column_name", "target_version", name="uq_key_rotation_job"),
+    )
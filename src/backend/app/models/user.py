@@ -5,7 +5,7 @@ Authentication and user management with categories, types, and permissions
 import uuid
 import enum
 from datetime import datetime, timezone
-from sqlalchemy import Column, String, Boolean, DateTime, Enum, Integer, ForeignKey, Text
+from sqlalchemy import BigInteger, Column, String, Boolean, DateTime, Enum, Index, Integer, ForeignKey, Text
 from sqlalchemy.dialects.postgresql import UUID, INET, JSONB
 from sqlalchemy.orm import relationship
 
@@ -135,11 +135,24 @@ class UserSession(Base):
 
 
 class AuditLog(Base):
-    """Audit log for tracking user actions."""
+    """
+    Audit log for tracking user actions.
+
+    Range-partitioned by month on created_at. Each company's entries form
+    a hash chain: seq numbers the chain and checksum covers the entry and
+    the previous entry's checksum (prev_checksum).
+    """
     __tablename__ = "audit_logs"
+    __table_args__ = (
+        Index('ix_audit_logs_company_created', 'company_id', 'created_at'),
+        Index('ix_audit_logs_chain', 'company_id', 'seq'),
+        Index('ix_audit_logs_user_created', 'user_id', 'created_at'),
+        {'postgresql_partition_by': 'RANGE (created_at)'},
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=True)
+    company_id = Column(UUID(as_uuid=True), nullable=True)
     action = Column(String(100), nullable=False)
     entity_type = Column(String(50), nullable=True)
     entity_id = Column(UUID(as_uuid=True), nullable=True)
@@ -147,7 +160,23 @@ class AuditLog(Base):
     new_values = Column(JSONB, nullable=True)  # Proper JSONB for efficient queries
     ip_address = Column(INET, nullable=True)
     user_agent = Column(String(500), nullable=True)
-    created_at = Column(DateTime(timezone=True), default=utc_now)
+    description = Column(Text, nullable=True)
+    request_id = Column(String(100), nullable=True)
+    extra = Column(JSONB, nullable=True)  # Additional metadata
+    seq = Column(BigInteger, nullable=True)  # Position in the company's hash chain
+    prev_checksum = Column(String(64), nullable=True)
+    checksum = Column(String(64), nullable=True)
+    created_at = Column(DateTime(timezone=True), primary_key=True, default=utc_now)
+
+
+class AuditChainHead(Base):
+    """Last entry of each company's audit hash chain (nil UUID for system events)."""
+    __tablename__ = "audit_chain_heads"
+
+    chain_id = Column(UUID(as_uuid=True), primary_key=True)
+    seq = Column(BigInteger, nullable=False, default=0)
+    checksum = Column(String(64), nullable=True)
+    updated_at = Column(DateTime(timezone=True), default=utc_now, onupdate=utc_now)
 
 
 class Module(Base):
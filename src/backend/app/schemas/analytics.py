@@ -419,6 +419,22 @@ class KPITrendResponse(BaseModel):
     max_value: float
 
 
+# Dashboard Data Response
+class DashboardWidgetData(BaseModel):
+    widget_id: UUID
+    title: str
+    widget_type: str
+    kpi_id: Optional[UUID] = None
+    latest: Optional[Dict[str, Any]] = None  # Latest KPI value
+    trend: Optional[List[Dict[str, Any]]] = None  # KPI values, oldest first
+
+
+class DashboardDataResponse(BaseModel):
+    dashboard_id: UUID
+    generated_at: datetime
+    widgets: List[DashboardWidgetData]
+
+
 # Report Generation Request
 class ReportGenerationRequest(BaseModel):
     template_id: UUID
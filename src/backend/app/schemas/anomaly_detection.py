@@ -427,6 +427,7 @@ class CalculateBaselineRequest(BaseModel):
     data_source: Optional[str] = None
     metric_name: Optional[str] = None
     period_days: int = 90
+    full_refresh: bool = False  # Rebuild from the full window instead of merging new data
 
 
 class TrainModelRequest(AnomalyBaseModel):
@@ -385,6 +385,9 @@ class ReconciliationReport(BaseModel):
     mismatched_items: List[ReconciliationItem] = Field(default_factory=list)
     only_in_books: List[ReconciliationItem] = Field(default_factory=list)
     only_in_gstr2a: List[ReconciliationItem] = Field(default_factory=list)
+    # Page of each item list; the summary always covers every invoice
+    items_offset: int = 0
+    items_limit: Optional[int] = None
 
     last_reconciled_at: Optional[datetime] = None
     created_at: datetime
@@ -5,7 +5,7 @@ from datetime import datetime
 from decimal import Decimal
 from typing import Optional, List, Dict, Any
 from uuid import UUID
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from enum import Enum
 
 
@@ -121,13 +121,14 @@ class MobileSyncRequestBase(BaseModel):
 
 
 class MobileSyncRequest(MobileSyncRequestBase):
-    pass
+    cursor: Optional[str] = None  # next_cursor of the previous sync; takes precedence over last_sync_at
+    limit: int = Field(default=500, ge=1, le=2000)
 
 
 class SyncDataItem(BaseModel):
     entity_type: SyncEntityType
     entity_id: UUID
-    action: str
+    action: str  # upsert/delete
     data: Dict[str, Any]
     updated_at: datetime
 
@@ -138,7 +139,7 @@ class MobileSyncResponse(BaseModel):
     sync_timestamp: datetime
     items: List[SyncDataItem]
     has_more: bool
-    next_cursor: Optional[str] = None
+    next_cursor: Optional[str] = None  # Resume point; keep it for the next sync even when has_more is false
 
     model_config = {"from_attributes": True}
 
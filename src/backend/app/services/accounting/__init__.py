@@ -1,5 +1,8 @@
 """Accounting services package - BE-019, BE-020."""
 from app.services.accounting.journal_service import JournalService
 from app.services.accounting.account_service import AccountService
+from app.services.accounting.ledger_service import (
+    LedgerService, AccountBalance, PeriodClosedError
+)
 
-__all__ = ["JournalService", "AccountService"]
+__all__ = ["JournalService", "AccountService", "LedgerService", "AccountBalance", "PeriodClosedError"]
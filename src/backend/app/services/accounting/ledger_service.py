@@ -0,0 +1,446 @@
+"""
+Ledger Service - BE-020
+Posted balances per account and accounting period
+
+Posting a journal entry adds its lines to account_period_balances and
+closing a period freezes that period's rows, so a balance as of any date
+is the rows of the periods ended by then plus the posted lines of the one
+period still running on that date.
+"""
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from uuid import UUID, uuid4
+
+from sqlalchemy import and_, delete, event, func, insert, inspect, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, object_session
+
+from app.models.accounting import (
+    Account, AccountPeriodBalance, AccountType, AccountSubType, AccountingPeriod,
+    FinancialYear, JournalEntry, JournalLine, JournalStatus
+)
+
+
+ZERO = Decimal("0")
+
+# Entries whose lines count towards balances. A reversal posts an opposite
+# entry of its own, so the reversed original keeps counting.
+LEDGER_STATUSES = (JournalStatus.POSTED, JournalStatus.REVERSED)
+
+# Balances of these account types are credit-natured
+CREDIT_ACCOUNT_TYPES = frozenset({AccountType.LIABILITY, AccountType.EQUITY, AccountType.INCOME})
+
+# session.info key of entries posted (+1) or un-posted (-1) in the current flush
+_PENDING_POSTINGS = "ledger_pending_postings"
+
+# (debit, credit) per account
+Movements = Dict[UUID, Tuple[Decimal, Decimal]]
+
+
+class PeriodClosedError(ValueError):
+    """Raised when posting into an accounting period that has been closed."""
+
+
+@dataclass
+class AccountBalance:
+    """Balances of one account over a date range; amounts are debit-positive."""
+    account_id: UUID
+    code: str
+    name: str
+    account_type: AccountType
+    account_sub_type: Optional[AccountSubType] = None
+    balance_type: str = "debit"
+    is_bank_account: bool = False
+    opening: Decimal = ZERO
+    period_debit: Decimal = ZERO
+    period_credit: Decimal = ZERO
+
+    @property
+    def movement(self) -> Decimal:
+        return self.period_debit - self.period_credit
+
+    @property
+    def closing(self) -> Decimal:
+        return self.opening + self.movement
+
+    def natural(self, amount: Decimal) -> Decimal:
+        """Amount in the account's natural sign (credits positive for income, liabilities, equity)."""
+        return -amount if self.account_type in CREDIT_ACCOUNT_TYPES else amount
+
+    @property
+    def is_zero(self) -> bool:
+        return not (self.opening or self.period_debit or self.period_credit)
+
+
+def split_balance(amount: Decimal) -> Tuple[Decimal, Decimal]:
+    """Debit-positive amount as a (debit, credit) column pair."""
+    return (amount, ZERO) if amount >= 0 else (ZERO, -amount)
+
+
+def merge_movements(*results: Iterable[Tuple[UUID, Optional[Decimal], Optional[Decimal]]]) -> Movements:
+    """Add up (account_id, debit, credit) rows from several queries."""
+    totals: Dict[UUID, List[Decimal]] = defaultdict(lambda: [ZERO, ZERO])
+    for rows in results:
+        for account_id, debit, credit in rows:
+            totals[account_id][0] += debit or ZERO
+            totals[account_id][1] += credit or ZERO
+    return {account_id: (debit, credit) for account_id, (debit, credit) in totals.items()}
+
+
+def financial_year_start(on: date) -> date:
+    """1 April of the Indian financial year containing a date."""
+    return date(on.year if on.month >= 4 else on.year - 1, 4, 1)
+
+
+def _balance_rows(rows: Iterable, signs: Dict[UUID, int]) -> List[Dict]:
+    """
+    Snapshot deltas from (entry, company, account, period, period end,
+    debit, credit) rows, one per account and period.
+    """
+    deltas: Dict[Tuple[UUID, UUID], Dict] = {}
+    for entry_id, company_id, account_id, period_id, period_end, debit, credit in rows:
+        sign = signs[entry_id]
+        delta = deltas.setdefault((account_id, period_id), {
+            "company_id": company_id,
+            "account_id": account_id,
+            "accounting_period_id": period_id,
+            "period_end": period_end,
+            "debit_total": ZERO,
+            "credit_total": ZERO,
+        })
+        delta["debit_total"] += sign * (debit or ZERO)
+        delta["credit_total"] += sign * (credit or ZERO)
+    return list(deltas.values())
+
+
+def _apply_postings(connection, signs: Dict[UUID, int]) -> None:
+    """Add (or take back) the lines of entries to their period snapshots."""
+    entry_ids = list(signs)
+
+    # FOR SHARE: closing a period locks its row, so it waits for this transaction
+    periods = connection.execute(
+        select(AccountingPeriod.name, AccountingPeriod.is_open)
+        .where(AccountingPeriod.id.in_(
+            select(JournalEntry.accounting_period_id).where(JournalEntry.id.in_(entry_ids))
+        ))
+        .with_for_update(read=True)
+    ).all()
+    closed = [period.name for period in periods if period.is_open is False]
+    if closed:
+        raise PeriodClosedError(f"Accounting period {', '.join(closed)} is closed")
+
+    rows = connection.execute(
+        select(
+            JournalEntry.id, JournalEntry.company_id, JournalLine.account_id,
+            JournalEntry.accounting_period_id, AccountingPeriod.end_date,
+            func.sum(JournalLine.debit_amount), func.sum(JournalLine.credit_amount)
+        )
+        .join(JournalLine, JournalLine.journal_entry_id == JournalEntry.id)
+        .join(AccountingPeriod, AccountingPeriod.id == JournalEntry.accounting_period_id)
+        .where(JournalEntry.id.in_(entry_ids))
+        .group_by(
+            JournalEntry.id, JournalEntry.company_id, JournalLine.account_id,
+            JournalEntry.accounting_period_id, AccountingPeriod.end_date
+        )
+    ).all()
+    deltas = _balance_rows(rows, signs)
+    if not deltas:
+        return
+
+    now = datetime.utcnow()
+    stmt = pg_insert(AccountPeriodBalance).values([
+        {**delta, "id": uuid4(), "is_frozen": False, "updated_at": now} for delta in deltas
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["account_id", "accounting_period_id"],
+        set_={
+            "debit_total": AccountPeriodBalance.debit_total + stmt.excluded.debit_total,
+            "credit_total": AccountPeriodBalance.credit_total + stmt.excluded.credit_total,
+            "updated_at": stmt.excluded.updated_at,
+        }
+    )
+    connection.execute(stmt)
+
+
+def _queue_posting(target: JournalEntry, sign: int) -> None:
+    session = object_session(target)
+    if session is not None:
+        pending = session.info.setdefault(_PENDING_POSTINGS, {})
+        pending[target.id] = pending.get(target.id, 0) + sign
+        if not pending[target.id]:
+            del pending[target.id]
+
+
+@event.listens_for(JournalEntry, "after_insert")
+def _post_inserted_entry(mapper, connection, target) -> None:
+    if target.status in LEDGER_STATUSES:
+        _queue_posting(target, 1)
+
+
+@event.listens_for(JournalEntry, "after_update")
+def _post_updated_entry(mapper, connection, target) -> None:
+    """Queue entries whose status moved into or out of the ledger statuses."""
+    history = inspect(target).attrs.status.history
+    if not history.deleted:
+        return
+    was_posted = any(status in LEDGER_STATUSES for status in history.deleted)
+    is_posted = target.status in LEDGER_STATUSES
+    if is_posted != was_posted:
+        _queue_posting(target, 1 if is_posted else -1)
+
+
+@event.listens_for(Session, "after_flush")
+def _apply_queued_postings(session, flush_context) -> None:
+    """Runs once the entries and their lines are written, inside the flush."""
+    signs = session.info.pop(_PENDING_POSTINGS, None)
+    if signs:
+        _apply_postings(session.connection(), signs)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_queued_postings(session) -> None:
+    session.info.pop(_PENDING_POSTINGS, None)
+
+
+class LedgerService:
+    """
+    Service for posted balances.
+
+    Provides:
+    - Posting journal entries (snapshots follow automatically)
+    - Closing accounting periods (snapshots are rebuilt and frozen)
+    - Account balances as of a date or over a date range
+    """
+
+    @classmethod
+    async def post_journal_entry(
+        cls,
+        db: AsyncSession,
+        entry: JournalEntry,
+        posted_by: Optional[UUID] = None
+    ) -> JournalEntry:
+        """
+        Post a draft or approved journal entry.
+
+        Raises:
+            ValueError if the entry is already posted, has no lines or is
+            not balanced; PeriodClosedError if its period is closed
+        """
+        if entry.status in LEDGER_STATUSES:
+            raise ValueError(f"Journal entry {entry.journal_number} is already posted")
+
+        totals = (await db.execute(
+            select(
+                func.count(JournalLine.id),
+                func.coalesce(func.sum(JournalLine.debit_amount), 0),
+                func.coalesce(func.sum(JournalLine.credit_amount), 0)
+            ).where(JournalLine.journal_entry_id == entry.id)
+        )).one()
+        line_count, total_debit, total_credit = totals
+        if not line_count:
+            raise ValueError(f"Journal entry {entry.journal_number} has no lines")
+        if total_debit != total_credit:
+            raise ValueError(
+                f"Journal entry not balanced. Debit: {total_debit}, Credit: {total_credit}"
+            )
+
+        entry.total_debit = total_debit
+        entry.total_credit = total_credit
+        entry.status = JournalStatus.POSTED
+        entry.posted_at = datetime.utcnow()
+        entry.posted_by = posted_by
+        await db.flush()
+        return entry
+
+    @classmethod
+    async def close_period(
+        cls,
+        db: AsyncSession,
+        period_id: UUID,
+        closed_by: Optional[UUID] = None
+    ) -> AccountingPeriod:
+        """
+        Close an accounting period.
+
+        Its snapshot rows are rebuilt from the posted lines and frozen;
+        later postings into the period raise PeriodClosedError.
+        """
+        period = (await db.execute(
+            select(AccountingPeriod).where(AccountingPeriod.id == period_id).with_for_update()
+        )).scalar_one_or_none()
+        if period is None:
+            raise ValueError("Accounting period not found")
+        if period.is_open is False:
+            return period
+
+        await cls.rebuild_period_balances(db, period)
+        await db.execute(
+            update(AccountPeriodBalance)
+            .where(AccountPeriodBalance.accounting_period_id == period.id)
+            .values(is_frozen=True, updated_at=datetime.utcnow())
+        )
+
+        period.is_open = False
+        period.closed_at = datetime.utcnow()
+        period.closed_by = closed_by
+        await db.flush()
+        return period
+
+    @classmethod
+    async def rebuild_period_balances(cls, db: AsyncSession, period: AccountingPeriod) -> int:
+        """Recompute the snapshot rows of one period from its posted lines."""
+        result = await db.execute(
+            select(
+                JournalEntry.company_id, JournalLine.account_id,
+                func.sum(JournalLine.debit_amount), func.sum(JournalLine.credit_amount)
+            )
+            .join(JournalLine, JournalLine.journal_entry_id == JournalEntry.id)
+            .where(
+                JournalEntry.accounting_period_id == period.id,
+                JournalEntry.status.in_(LEDGER_STATUSES)
+            )
+            .group_by(JournalEntry.company_id, JournalLine.account_id)
+        )
+        rows = [
+            {
+                "company_id": company_id,
+                "account_id": account_id,
+                "accounting_period_id": period.id,
+                "period_end": period.end_date,
+                "debit_total": debit or ZERO,
+                "credit_total": credit or ZERO,
+                "is_frozen": False,
+            }
+            for company_id, account_id, debit, credit in result
+        ]
+
+        await db.execute(
+            delete(AccountPeriodBalance).where(AccountPeriodBalance.accounting_period_id == period.id)
+        )
+        if rows:
+            await db.execute(insert(AccountPeriodBalance), rows)
+        return len(rows)
+
+    @classmethod
+    async def get_movements(
+        cls,
+        db: AsyncSession,
+        company_id: UUID,
+        as_of: date,
+        cost_center_ids: Optional[Sequence[UUID]] = None
+    ) -> Movements:
+        """
+        Posted (debit, credit) per account up to and including a date.
+
+        Snapshots cover the periods ended by then; only the lines of the
+        period running on that date are read. Snapshots are not kept per
+        cost center, so a cost center filter sums the lines instead.
+        """
+        posted_lines = (
+            select(
+                JournalLine.account_id,
+                func.sum(JournalLine.debit_amount), func.sum(JournalLine.credit_amount)
+            )
+            .join(JournalEntry, JournalEntry.id == JournalLine.journal_entry_id)
+            .where(
+                JournalEntry.company_id == company_id,
+                JournalEntry.status.in_(LEDGER_STATUSES),
+                JournalEntry.journal_date <= as_of
+            )
+            .group_by(JournalLine.account_id)
+        )
+
+        if cost_center_ids:
+            result = await db.execute(posted_lines.where(JournalLine.cost_center_id.in_(cost_center_ids)))
+            return merge_movements(result)
+
+        snapshots = await db.execute(
+            select(
+                AccountPeriodBalance.account_id,
+                func.sum(AccountPeriodBalance.debit_total), func.sum(AccountPeriodBalance.credit_total)
+            )
+            .where(
+                AccountPeriodBalance.company_id == company_id,
+                AccountPeriodBalance.period_end <= as_of
+            )
+            .group_by(AccountPeriodBalance.account_id)
+        )
+        running = await db.execute(
+            posted_lines
+            .join(AccountingPeriod, AccountingPeriod.id == JournalEntry.accounting_period_id)
+            .where(and_(AccountingPeriod.start_date <= as_of, AccountingPeriod.end_date > as_of))
+        )
+        return merge_movements(snapshots, running)
+
+    @classmethod
+    async def get_account_balances(
+        cls,
+        db: AsyncSession,
+        company_id: UUID,
+        to_date: date,
+        from_date: Optional[date] = None,
+        cost_center_ids: Optional[Sequence[UUID]] = None
+    ) -> List[AccountBalance]:
+        """
+        Opening balance before from_date and movements from from_date to
+        to_date of every account, by account code.
+
+        Account opening balances are included unless filtering by cost
+        center.
+        """
+        accounts = (await db.execute(
+            select(
+                Account.id, Account.code, Account.name, Account.account_type,
+                Account.account_sub_type, Account.balance_type, Account.is_bank_account,
+                Account.opening_balance
+            )
+            .where(Account.company_id == company_id)
+            .order_by(Account.code)
+        )).all()
+
+        closing = await cls.get_movements(db, company_id, to_date, cost_center_ids)
+        before: Movements = {}
+        if from_date:
+            before = await cls.get_movements(db, company_id, from_date - timedelta(days=1), cost_center_ids)
+
+        balances = []
+        for account in accounts:
+            opening = ZERO
+            if not cost_center_ids and account.opening_balance:
+                opening = account.opening_balance if account.balance_type != "credit" else -account.opening_balance
+            opening_debit, opening_credit = before.get(account.id, (ZERO, ZERO))
+            closing_debit, closing_credit = closing.get(account.id, (ZERO, ZERO))
+            balances.append(AccountBalance(
+                account_id=account.id,
+                code=account.code,
+                name=account.name,
+                account_type=account.account_type,
+                account_sub_type=account.account_sub_type,
+                balance_type=account.balance_type or "debit",
+                is_bank_account=bool(account.is_bank_account),
+                opening=opening + opening_debit - opening_credit,
+                period_debit=closing_debit - opening_debit,
+                period_credit=closing_credit - opening_credit,
+            ))
+        return balances
+
+    @classmethod
+    async def get_financial_year(
+        cls,
+        db: AsyncSession,
+        company_id: UUID,
+        on: date
+    ) -> Optional[FinancialYear]:
+        """Financial year of a company containing a date."""
+        result = await db.execute(
+            select(FinancialYear).where(
+                FinancialYear.company_id == company_id,
+                FinancialYear.start_date <= on,
+                FinancialYear.end_date >= on
+            )
+        )
+        return result.scalars().first()
@@ -14,6 +14,16 @@ from app.schemas.analytics import (
     DashboardCreate, DashboardUpdate,
     DashboardWidgetCreate, DashboardWidgetUpdate
 )
+from app.services.analytics.kpi_service import KPIService
+
+
+# Widgets showing a series of KPI values rather than only the latest one
+TREND_WIDGET_TYPES = frozenset({
+    WidgetType.LINE_CHART, WidgetType.BAR_CHART, WidgetType.AREA_CHART,
+    WidgetType.SPARKLINE, WidgetType.TABLE, WidgetType.HEATMAP
+})
+
+DEFAULT_TREND_PERIODS = 12
 
 
 class DashboardService:
@@ -261,3 +271,66 @@ class DashboardService:
         await db.commit()
         await db.refresh(new_dashboard)
         return new_dashboard
+
+    @staticmethod
+    async def hydrate_dashboard(
+        db: AsyncSession,
+        dashboard: Dashboard
+    ) -> Dict[str, Any]:
+        """
+        Data of every visible widget of a dashboard at once.
+
+        Widgets, latest KPI values and KPI trends are three queries in
+        total (fewer when cached), instead of one round trip per widget.
+        Trend widgets read `periods` from their chart_config; the trend
+        query fetches the longest and each widget takes its own tail.
+        """
+        result = await db.execute(
+            select(DashboardWidget).where(
+                and_(
+                    DashboardWidget.dashboard_id == dashboard.id,
+                    DashboardWidget.is_visible == True
+                )
+            ).order_by(
+                DashboardWidget.display_order,
+                DashboardWidget.position_y,
+                DashboardWidget.position_x
+            )
+        )
+        widgets = result.scalars().all()
+
+        def periods_of(widget: DashboardWidget) -> int:
+            return int((widget.chart_config or {}).get('periods') or DEFAULT_TREND_PERIODS)
+
+        kpi_ids = {w.kpi_id for w in widgets if w.kpi_id}
+        trend_widgets = [w for w in widgets if w.kpi_id and w.widget_type in TREND_WIDGET_TYPES]
+        trend_ids = {w.id for w in trend_widgets}
+
+        latest = await KPIService.get_latest_kpi_values(db, dashboard.company_id, kpi_ids)
+        trends = {}
+        if trend_widgets:
+            trends = await KPIService.get_kpi_trends(
+                db, dashboard.company_id,
+                {w.kpi_id for w in trend_widgets},
+                max(periods_of(w) for w in trend_widgets)
+            )
+
+        items = []
+        for widget in widgets:
+            item = {
+                'widget_id': widget.id,
+                'title': widget.title,
+                'widget_type': widget.widget_type,
+                'kpi_id': widget.kpi_id,
+                'latest': latest.get(widget.kpi_id) if widget.kpi_id else None,
+                'trend': None,
+            }
+            if widget.id in trend_ids:
+                item['trend'] = trends.get(widget.kpi_id, [])[-periods_of(widget):]
+            items.append(item)
+
+        return {
+            'dashboard_id': dashboard.id,
+            'generated_at': utc_now(),
+            'widgets': items,
+        }
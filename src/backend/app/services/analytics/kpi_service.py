@@ -1,12 +1,18 @@
 """
 KPI Service - Analytics Module (MOD-15)
+
+Latest values and trends are read for many KPIs at once (one DISTINCT ON
+query, one row_number() query) and kept briefly per company, so a
+dashboard costs a fixed number of queries however many widgets it has.
 """
+import time
+from collections import OrderedDict
 from datetime import datetime, date
 from decimal import Decimal
-from typing import List, Optional, Tuple, Dict, Any
+from typing import List, Optional, Sequence, Tuple, Dict, Any
 from uuid import UUID, uuid4
 
-from sqlalchemy import select, and_, func
+from sqlalchemy import select, and_, event, func
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.analytics import KPIDefinition, KPIValue
@@ -14,6 +20,93 @@ from app.schemas.analytics import KPIDefinitionCreate, KPIDefinitionUpdate, KPIV
 from app.core.datetime_utils import utc_now
 
 
+# Results kept per process, keyed by (company, query, arguments)
+KPI_CACHE_SIZE = 1024
+
+# Values recorded through other processes are picked up after this many seconds
+KPI_CACHE_TTL_SECONDS = 60
+
+_kpi_cache: "OrderedDict[Tuple[str, str, Any], Tuple[float, Any]]" = OrderedDict()
+
+# Company of every KPI seen by a cached query, to invalidate on new values
+_kpi_companies: Dict[UUID, str] = {}
+
+
+def invalidate_kpi_cache(company_id: Any = None) -> None:
+    """Drop cached results of a company, or all results."""
+    if company_id is None:
+        _kpi_cache.clear()
+        return
+    company_key = str(company_id)
+    for key in [k for k in _kpi_cache if k[0] == company_key]:
+        del _kpi_cache[key]
+
+
+@event.listens_for(KPIDefinition, "after_insert")
+@event.listens_for(KPIDefinition, "after_update")
+@event.listens_for(KPIDefinition, "after_delete")
+def _invalidate_on_kpi_change(mapper, connection, target) -> None:
+    invalidate_kpi_cache(target.company_id)
+
+
+@event.listens_for(KPIValue, "after_insert")
+@event.listens_for(KPIValue, "after_update")
+@event.listens_for(KPIValue, "after_delete")
+def _invalidate_on_value_change(mapper, connection, target) -> None:
+    # A KPI no cached result has seen (e.g. its first value) clears everything
+    invalidate_kpi_cache(_kpi_companies.get(target.kpi_id))
+
+
+def _cache_get(key: Tuple[str, str, Any]) -> Any:
+    entry = _kpi_cache.get(key)
+    if entry is None or time.monotonic() - entry[0] >= KPI_CACHE_TTL_SECONDS:
+        return None
+    _kpi_cache.move_to_end(key)
+    return entry[1]
+
+
+def _cache_put(key: Tuple[str, str, Any], kpi_ids: Sequence[UUID], result: Any) -> Any:
+    for kpi_id in kpi_ids:
+        _kpi_companies[kpi_id] = key[0]
+    _kpi_cache[key] = (time.monotonic(), result)
+    _kpi_cache.move_to_end(key)
+    while len(_kpi_cache) > KPI_CACHE_SIZE:
+        _kpi_cache.popitem(last=False)
+    return result
+
+
+def _float(value: Any) -> Optional[float]:
+    return float(value) if value is not None else None
+
+
+def kpi_value_dict(row: Any) -> Dict[str, Any]:
+    """Plain dict of a KPI value row, safe to cache across sessions."""
+    actual = _float(row.value)
+    target = _float(row.target_value)
+    return {
+        'kpi_id': row.kpi_id,
+        'period': row.period,
+        'period_start': row.period_start,
+        'period_end': row.period_end,
+        'actual': actual,
+        'target': target,
+        'variance': actual - target if actual is not None and target is not None else None,
+        'previous': _float(row.previous_value),
+        'change_percent': _float(row.change_percent),
+        'achievement_percent': _float(row.achievement_percent),
+        'status': row.status,
+        'calculated_at': row.calculated_at,
+    }
+
+
+KPI_VALUE_COLUMNS = (
+    KPIValue.kpi_id, KPIValue.period, KPIValue.period_start, KPIValue.period_end,
+    KPIValue.value, KPIValue.target_value, KPIValue.previous_value,
+    KPIValue.change_percent, KPIValue.achievement_percent, KPIValue.status,
+    KPIValue.calculated_at
+)
+
+
 class KPIService:
     """Service for KPI management."""
 
@@ -77,7 +170,7 @@ class KPIService:
         category: Optional[str] = None,
         is_active: Optional[bool] = None,
         skip: int = 0,
-        limit: int = 100
+        limit: Optional[int] = 100
     ) -> Tuple[List[KPIDefinition], int]:
         """List KPI definitions."""
         query = select(KPIDefinition).where(
@@ -214,22 +307,97 @@ class KPIService:
 
         return result.scalars().all(), total_count
 
+    @staticmethod
+    def _company_values(company_id: UUID, kpi_ids: Optional[Sequence[UUID]] = None) -> list:
+        """Filters for values of a company's (optionally selected) KPIs."""
+        filters = [
+            KPIDefinition.company_id == company_id,
+            KPIDefinition.deleted_at.is_(None)
+        ]
+        if kpi_ids is not None:
+            filters.append(KPIValue.kpi_id.in_(kpi_ids))
+        return filters
+
+    @staticmethod
+    async def get_latest_kpi_values(
+        db: AsyncSession,
+        company_id: UUID,
+        kpi_ids: Optional[Sequence[UUID]] = None
+    ) -> Dict[UUID, Dict[str, Any]]:
+        """
+        Latest value of each KPI (all KPIs of the company by default) with
+        one DISTINCT ON query, keyed by KPI id. KPIs without values are
+        absent.
+        """
+        ids = tuple(sorted(set(kpi_ids), key=str)) if kpi_ids is not None else None
+        key = (str(company_id), 'latest', ids)
+        cached = _cache_get(key)
+        if cached is not None:
+            return cached
+        if ids == ():
+            return {}
+
+        result = await db.execute(
+            select(*KPI_VALUE_COLUMNS)
+            .join(KPIDefinition, KPIDefinition.id == KPIValue.kpi_id)
+            .where(and_(*KPIService._company_values(company_id, ids)))
+            .distinct(KPIValue.kpi_id)
+            .order_by(KPIValue.kpi_id, KPIValue.period_end.desc(), KPIValue.calculated_at.desc())
+        )
+        latest = {row.kpi_id: kpi_value_dict(row) for row in result}
+        return _cache_put(key, ids or list(latest), latest)
+
     @staticmethod
     async def get_latest_kpi_value(
         db: AsyncSession,
         company_id: UUID,
         kpi_id: UUID
-    ) -> Optional[KPIValue]:
+    ) -> Optional[Dict[str, Any]]:
         """Get latest KPI value."""
+        latest = await KPIService.get_latest_kpi_values(db, company_id, [kpi_id])
+        return latest.get(kpi_id)
+
+    @staticmethod
+    async def get_kpi_trends(
+        db: AsyncSession,
+        company_id: UUID,
+        kpi_ids: Sequence[UUID],
+        periods: int = 12
+    ) -> Dict[UUID, List[Dict[str, Any]]]:
+        """
+        Last `periods` values of each KPI, oldest first, with one
+        row_number() query, keyed by KPI id.
+        """
+        ids = tuple(sorted(set(kpi_ids), key=str))
+        key = (str(company_id), 'trend', (ids, periods))
+        cached = _cache_get(key)
+        if cached is not None:
+            return cached
+        if not ids:
+            return {}
+
+        ranked = (
+            select(
+                *KPI_VALUE_COLUMNS,
+                func.row_number().over(
+                    partition_by=KPIValue.kpi_id,
+                    order_by=(KPIValue.period_end.desc(), KPIValue.calculated_at.desc())
+                ).label('rank')
+            )
+            .join(KPIDefinition, KPIDefinition.id == KPIValue.kpi_id)
+            .where(and_(*KPIService._company_values(company_id, ids)))
+            .subquery()
+        )
         result = await db.execute(
-            select(KPIValue).where(
-                and_(
-                    KPIValue.company_id == company_id,
-                    KPIValue.kpi_id == kpi_id
-                )
-            ).order_by(KPIValue.calculated_at.desc()).limit(1)
+            select(ranked)
+            .where(ranked.c.rank <= periods)
+            .order_by(ranked.c.kpi_id, ranked.c.rank.desc())
         )
-        return result.scalar_one_or_none()
+
+        trends: Dict[UUID, List[Dict[str, Any]]] = {kpi_id: [] for kpi_id in ids}
+        for row in result:
+            trends[row.kpi_id].append(kpi_value_dict(row))
+        return _cache_put(key, ids, trends)
 
     @staticmethod
     async def get_kpi_trend(
@@ -239,29 +407,8 @@ class KPIService:
         periods: int = 12
     ) -> List[Dict[str, Any]]:
         """Get KPI trend data."""
-        result = await db.execute(
-            select(KPIValue).where(
-                and_(
-                    KPIValue.company_id == company_id,
-                    KPIValue.kpi_id == kpi_id
-                )
-            ).order_by(
-                KPIValue.period_year.desc(),
-                KPIValue.period_month.desc()
-            ).limit(periods)
-        )
-        values = result.scalars().all()
-
-        return [
-            {
-                'period': f"{v.period_year}-{v.period_month:02d}" if v.period_month else str(v.period_year),
-                'actual': float(v.actual_value),
-                'target': float(v.target_value) if v.target_value else None,
-                'variance': float(v.variance) if v.variance else None,
-                'status': v.status
-            }
-            for v in reversed(values)
-        ]
+        trends = await KPIService.get_kpi_trends(db, company_id, [kpi_id], periods)
+        return trends.get(kpi_id, [])
 
     @staticmethod
     async def get_kpi_summary(
@@ -271,8 +418,9 @@ class KPIService:
     ) -> Dict[str, Any]:
         """Get KPI summary statistics."""
         kpis, _ = await KPIService.list_kpis(
-            db, company_id, category=category, is_active=True
+            db, company_id, category=category, is_active=True, limit=None
         )
+        latest = await KPIService.get_latest_kpi_values(db, company_id)
 
         summary = {
             'total_kpis': len(kpis),
@@ -283,15 +431,11 @@ class KPIService:
         }
 
         for kpi in kpis:
-            latest = await KPIService.get_latest_kpi_value(db, company_id, kpi.id)
-            if latest:
-                if latest.status == 'on_track':
-                    summary['on_track'] += 1
-                elif latest.status == 'warning':
-                    summary['warning'] += 1
-                elif latest.status == 'critical':
-                    summary['critical'] += 1
-                elif latest.status == 'achieved':
-                    summary['achieved'] += 1
+            value = latest.get(kpi.id)
+            if value is None:
+                continue
+            status = 'on_track' if value['status'] == 'normal' else value['status']
+            if status in summary:
+                summary[status] += 1
 
         return summary
@@ -2,15 +2,67 @@
 Anomaly Baseline Service
 Handles baseline calculation for anomaly detection
 """
+from collections import defaultdict
+from dataclasses import dataclass, field
 from datetime import datetime, date, timedelta
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 from uuid import UUID
-import statistics
 
-from sqlalchemy import select, and_, update
+import numpy as np
+from sqlalchemy import select, and_, update, insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.datetime_utils import utc_now
 from app.models.anomaly_detection import AnomalyBaseline, AnomalyRule
+from app.services.anomaly_detection.baseline_stats import (
+    BASELINE_PERCENTILES, aggregate_series, bucket_end, bucket_start, build_digest,
+    digest_from_json, digest_quantiles, digest_to_json, grouped_statistics,
+    merge_digest, merge_moments, period_buckets, split_groups, std_from_moments
+)
+from app.services.anomaly_detection.data_sources import (
+    Observations, get_data_source, load_observations, resolve_metric
+)
+
+
+AGGREGATION_PERIODS = ("daily", "weekly", "monthly")
+
+# Incrementally updated baselines are rebuilt once they span this many windows
+MAX_INCREMENTAL_SPAN_FACTOR = 2
+
+
+@dataclass
+class _BaselinePlan:
+    """How one rule's baselines are refreshed."""
+    rule: AnomalyRule
+    metric: str
+    period: Optional[str]
+    incremental: bool
+    fetch_start: date
+    fetch_end: date
+    baselines: Dict[Optional[UUID], AnomalyBaseline] = field(default_factory=dict)
+
+
+def _float(value: Any) -> Optional[float]:
+    """NumPy scalar to float, NaN to None."""
+    value = float(value)
+    return None if np.isnan(value) else value
+
+
+def _fmin(current: Optional[float], new: Any) -> Optional[float]:
+    return _float(np.fmin(np.nan if current is None else current, new))
+
+
+def _fmax(current: Optional[float], new: Any) -> Optional[float]:
+    return _float(np.fmax(np.nan if current is None else current, new))
+
+
+def _sketch(m2: Any, means: np.ndarray, weights: np.ndarray) -> Dict[str, Any]:
+    """Incremental state stored in AnomalyBaseline.value_distribution."""
+    return {
+        "sketch": "tdigest",
+        "m2": _float(m2) or 0.0,
+        "centroids": digest_to_json(means, weights)
+    }
 
 
 class BaselineService:
@@ -96,26 +148,18 @@ class BaselineService:
         if not values or len(values) < 2:
             return {}
 
-        sorted_values = sorted(values)
-        n = len(sorted_values)
-
-        def percentile(pct: float) -> float:
-            k = (n - 1) * pct / 100
-            f = int(k)
-            c = f + 1 if f + 1 < n else f
-            return sorted_values[f] + (k - f) * (sorted_values[c] - sorted_values[f])
-
+        stats = grouped_statistics(np.zeros(len(values), dtype=np.int64), values, 1)
         return {
-            "mean_value": statistics.mean(values),
-            "median_value": statistics.median(values),
-            "std_deviation": statistics.stdev(values) if len(values) > 1 else 0,
-            "min_value": min(values),
-            "max_value": max(values),
-            "percentile_25": percentile(25),
-            "percentile_75": percentile(75),
-            "percentile_95": percentile(95),
-            "percentile_99": percentile(99),
-            "data_points": n
+            "mean_value": float(stats["mean"][0]),
+            "median_value": float(stats["p50"][0]),
+            "std_deviation": float(stats["std"][0]),
+            "min_value": float(stats["min"][0]),
+            "max_value": float(stats["max"][0]),
+            "percentile_25": float(stats["p25"][0]),
+            "percentile_75": float(stats["p75"][0]),
+            "percentile_95": float(stats["p95"][0]),
+            "percentile_99": float(stats["p99"][0]),
+            "data_points": int(stats["count"][0])
         }
 
     async def calculate_baselines(
@@ -125,86 +169,301 @@ class BaselineService:
         rule_id: Optional[UUID] = None,
         data_source: Optional[str] = None,
         metric_name: Optional[str] = None,
-        period_days: int = 90
+        period_days: int = 90,
+        full_refresh: bool = False
     ) -> Dict[str, Any]:
-        """Calculate baselines for specified criteria"""
-        # This would normally fetch historical data from the relevant data sources
-        # For now, we return a placeholder result
-        # In production, this would:
-        # 1. Query the relevant data source (invoices, expenses, employees, etc.)
-        # 2. Calculate statistics for each metric
-        # 3. Store new baselines and mark old ones as not current
-
-        baselines_created = 0
-        baselines_updated = 0
-
-        # Get rules to calculate baselines for
+        """
+        Calculate baselines for active rules.
+
+        Observations are loaded once per data source for all of its rules,
+        and statistics for every entity are computed together with NumPy.
+        Each rule gets an overall baseline (entity_id NULL) plus one per
+        entity when the rule has an entity_type.
+
+        Baselines keep a Welford state and a t-digest in value_distribution,
+        so a refresh only merges observations after their period_end. A rule
+        is rebuilt from the full window when full_refresh is set, it has no
+        mergeable baselines, or its baselines span more than
+        MAX_INCREMENTAL_SPAN_FACTOR windows.
+        """
         rule_conditions = [AnomalyRule.company_id == company_id, AnomalyRule.is_active == True]
         if rule_id:
             rule_conditions.append(AnomalyRule.id == rule_id)
         if data_source:
             rule_conditions.append(AnomalyRule.data_source == data_source)
 
-        query = select(AnomalyRule).where(and_(*rule_conditions))
-        result = await db.execute(query)
+        result = await db.execute(select(AnomalyRule).where(and_(*rule_conditions)))
         rules = result.scalars().all()
 
-        period_end = date.today()
-        period_start = period_end - timedelta(days=period_days)
+        # Only complete days are baselined, so an incremental run never
+        # merges part of a day twice
+        period_end = date.today() - timedelta(days=1)
+        period_start = period_end - timedelta(days=period_days - 1)
+
+        current = await self._current_baselines(db, company_id, [rule.id for rule in rules])
 
+        plans_by_source: Dict[str, List[_BaselinePlan]] = defaultdict(list)
+        errors: List[str] = []
         for rule in rules:
-            # In production, fetch actual data and calculate
-            # For now, create placeholder baselines
-
-            # Mark existing baselines as not current
-            await db.execute(
-                update(AnomalyBaseline)
-                .where(
-                    and_(
-                        AnomalyBaseline.company_id == company_id,
-                        AnomalyBaseline.rule_id == rule.id,
-                        AnomalyBaseline.is_current == True
-                    )
-                )
-                .values(is_current=False)
+            source = get_data_source(rule.data_source)
+            metric = resolve_metric(rule.conditions, source) if source else None
+            if metric is None:
+                errors.append(f"Rule {rule.code}: unsupported data source '{rule.data_source}'")
+                continue
+            if metric_name and metric != metric_name:
+                continue
+            plan = self._plan_rule(
+                rule, metric, current.get(rule.id, []),
+                period_start, period_end, period_days, full_refresh
             )
-            baselines_updated += 1
-
-            # Create new baseline (in production, with actual calculated values)
-            baseline = AnomalyBaseline(
-                company_id=company_id,
-                rule_id=rule.id,
-                data_source=rule.data_source,
-                metric_name=f"{rule.code}_metric",
-                entity_type=rule.entity_type,
-                period_type="rolling",
-                period_start=period_start,
-                period_end=period_end,
-                data_points=0,  # Would be actual count
-                mean_value=0,
-                median_value=0,
-                std_deviation=0,
-                min_value=0,
-                max_value=0,
-                percentile_25=0,
-                percentile_75=0,
-                percentile_95=0,
-                percentile_99=0,
-                is_current=True
+            if plan.fetch_start <= plan.fetch_end:
+                plans_by_source[rule.data_source].append(plan)
+
+        baselines_created = 0
+        baselines_updated = 0
+
+        for source_name, plans in plans_by_source.items():
+            source = get_data_source(source_name)
+            observations = await load_observations(
+                db, source, company_id,
+                min(plan.fetch_start for plan in plans),
+                max(plan.fetch_end for plan in plans),
+                {plan.metric for plan in plans}
             )
-            db.add(baseline)
-            baselines_created += 1
+
+            inserts: List[Dict[str, Any]] = []
+            updates: List[Dict[str, Any]] = []
+            for plan in plans:
+                rule_inserts, rule_updates = self._compute_rule_baselines(
+                    plan, observations, company_id
+                )
+                inserts.extend(rule_inserts)
+                updates.extend(rule_updates)
+
+            rebuilt = [plan.rule.id for plan in plans if not plan.incremental]
+            if rebuilt:
+                await db.execute(
+                    update(AnomalyBaseline)
+                    .where(
+                        and_(
+                            AnomalyBaseline.company_id == company_id,
+                            AnomalyBaseline.rule_id.in_(rebuilt),
+                            AnomalyBaseline.is_current == True
+                        )
+                    )
+                    .values(is_current=False)
+                )
+            if inserts:
+                await db.execute(insert(AnomalyBaseline), inserts)
+            if updates:
+                await db.execute(update(AnomalyBaseline), updates)
+
+            baselines_created += len(inserts)
+            baselines_updated += len(updates)
 
         await db.commit()
 
         return {
-            "status": "completed",
+            "status": "completed" if not errors else "completed_with_errors",
             "baselines_created": baselines_created,
             "baselines_updated": baselines_updated,
             "period_start": period_start.isoformat(),
-            "period_end": period_end.isoformat()
+            "period_end": period_end.isoformat(),
+            "errors": errors
         }
 
+    async def _current_baselines(
+        self,
+        db: AsyncSession,
+        company_id: UUID,
+        rule_ids: List[UUID]
+    ) -> Dict[UUID, List[AnomalyBaseline]]:
+        """Current baselines of many rules in one query, grouped by rule."""
+        if not rule_ids:
+            return {}
+        result = await db.execute(
+            select(AnomalyBaseline).where(
+                and_(
+                    AnomalyBaseline.company_id == company_id,
+                    AnomalyBaseline.rule_id.in_(rule_ids),
+                    AnomalyBaseline.is_current == True
+                )
+            )
+        )
+        by_rule: Dict[UUID, List[AnomalyBaseline]] = defaultdict(list)
+        for baseline in result.scalars().all():
+            by_rule[baseline.rule_id].append(baseline)
+        return by_rule
+
+    @staticmethod
+    def _plan_rule(
+        rule: AnomalyRule,
+        metric: str,
+        baselines: List[AnomalyBaseline],
+        period_start: date,
+        period_end: date,
+        period_days: int,
+        full_refresh: bool
+    ) -> "_BaselinePlan":
+        """Decide between an incremental merge and a full rebuild for a rule."""
+        period = rule.aggregation_period if rule.aggregation_period in AGGREGATION_PERIODS else None
+
+        # Aggregated series only use complete buckets
+        fetch_end = period_end
+        if period:
+            last_bucket = period_buckets(np.array([period_end], dtype="datetime64[D]"), period)[0]
+            if bucket_end(np.array([last_bucket]), period)[0] > np.datetime64(period_end):
+                last_bucket -= 1
+            fetch_end = bucket_end(np.array([last_bucket]), period)[0].astype(date)
+
+        incremental = bool(baselines) and not full_refresh and all(
+            baseline.metric_name == metric
+            and isinstance(baseline.value_distribution, dict)
+            and "centroids" in baseline.value_distribution
+            and (baseline.period_end - baseline.period_start).days
+            < period_days * MAX_INCREMENTAL_SPAN_FACTOR
+            for baseline in baselines
+        )
+
+        if incremental:
+            fetch_start = max(baseline.period_end for baseline in baselines) + timedelta(days=1)
+        else:
+            fetch_start = period_start
+            if period:
+                # Start on a bucket boundary so the first bucket is complete
+                first_bucket = period_buckets(np.array([period_start], dtype="datetime64[D]"), period)[0]
+                if bucket_start(np.array([first_bucket]), period)[0] < np.datetime64(period_start):
+                    first_bucket += 1
+                fetch_start = bucket_start(np.array([first_bucket]), period)[0].astype(date)
+
+        return _BaselinePlan(
+            rule=rule,
+            metric=metric,
+            period=period,
+            incremental=incremental,
+            baselines={baseline.entity_id: baseline for baseline in baselines} if incremental else {},
+            fetch_start=fetch_start,
+            fetch_end=fetch_end
+        )
+
+    @staticmethod
+    def _compute_rule_baselines(
+        plan: "_BaselinePlan",
+        observations: Observations,
+        company_id: UUID
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Baseline rows for one rule.
+
+        Returns:
+            (rows to insert, rows to update by id)
+        """
+        rule = plan.rule
+        values = observations.metrics[plan.metric]
+        mask = (
+            (observations.days >= np.datetime64(plan.fetch_start))
+            & (observations.days <= np.datetime64(plan.fetch_end))
+            & ~np.isnan(values)
+        )
+        codes = observations.codes[mask]
+        values = values[mask]
+        if plan.period:
+            codes, _, values = aggregate_series(
+                codes, period_buckets(observations.days[mask], plan.period),
+                values, rule.aggregation_function
+            )
+
+        # Group keys: one per entity (when the rule is per entity) + overall
+        if rule.entity_type:
+            keys: List[Optional[UUID]] = list(observations.entity_ids) + [None]
+            overall = len(observations.entity_ids)
+            group_codes = np.concatenate((codes, np.full(values.size, overall)))
+            group_values = np.concatenate((values, values))
+        else:
+            keys = [None]
+            group_codes = np.zeros(values.size, dtype=np.int64)
+            group_values = values
+
+        n_groups = len(keys)
+        stats = grouped_statistics(group_codes, group_values, n_groups)
+        group_series = split_groups(group_codes, group_values, n_groups)
+
+        # Merge Welford states of existing baselines for all groups at once
+        existing = [plan.baselines.get(key) for key in keys]
+        has_state = np.array([baseline is not None for baseline in existing])
+        merged_n, merged_mean, merged_m2 = merge_moments(
+            [(b.data_points or 0) if b else 0 for b in existing],
+            [b.mean_value if b else np.nan for b in existing],
+            [b.value_distribution.get("m2") if b else np.nan for b in existing],
+            stats["count"], stats["mean"], stats["m2"]
+        )
+        merged_std = std_from_moments(merged_n, merged_m2)
+
+        calculated_at = utc_now().replace(tzinfo=None)
+        inserts: List[Dict[str, Any]] = []
+        updates: List[Dict[str, Any]] = []
+
+        for index, key in enumerate(keys):
+            baseline = existing[index]
+            series = group_series[index]
+
+            if has_state[index]:
+                means, weights = digest_from_json(baseline.value_distribution.get("centroids"))
+                means, weights = merge_digest(means, weights, series)
+                min_value = _fmin(baseline.min_value, stats["min"][index])
+                max_value = _fmax(baseline.max_value, stats["max"][index])
+                p25, p50, p75, p95, p99 = digest_quantiles(
+                    means, weights, BASELINE_PERCENTILES, min_value, max_value
+                )
+                updates.append({
+                    "id": baseline.id,
+                    "period_end": plan.fetch_end,
+                    "data_points": int(merged_n[index]),
+                    "mean_value": _float(merged_mean[index]),
+                    "median_value": p50,
+                    "std_deviation": _float(merged_std[index]),
+                    "min_value": min_value,
+                    "max_value": max_value,
+                    "percentile_25": p25,
+                    "percentile_75": p75,
+                    "percentile_95": p95,
+                    "percentile_99": p99,
+                    "value_distribution": _sketch(merged_m2[index], means, weights),
+                    "calculated_at": calculated_at
+                })
+                continue
+
+            if stats["count"][index] == 0 and key is not None:
+                continue
+
+            means, weights = build_digest(series)
+            inserts.append({
+                "company_id": company_id,
+                "rule_id": rule.id,
+                "data_source": rule.data_source,
+                "metric_name": plan.metric,
+                "entity_type": rule.entity_type,
+                "entity_id": key,
+                "period_type": plan.period or "rolling",
+                "period_start": plan.fetch_start,
+                "period_end": plan.fetch_end,
+                "data_points": int(stats["count"][index]),
+                "mean_value": _float(stats["mean"][index]),
+                "median_value": _float(stats["p50"][index]),
+                "std_deviation": _float(stats["std"][index]),
+                "min_value": _float(stats["min"][index]),
+                "max_value": _float(stats["max"][index]),
+                "percentile_25": _float(stats["p25"][index]),
+                "percentile_75": _float(stats["p75"][index]),
+                "percentile_95": _float(stats["p95"][index]),
+                "percentile_99": _float(stats["p99"][index]),
+                "value_distribution": _sketch(stats["m2"][index], means, weights),
+                "calculated_at": calculated_at,
+                "is_current": True
+            })
+
+        return inserts, updates
+
     async def create_baseline(
         self,
         db: AsyncSession,
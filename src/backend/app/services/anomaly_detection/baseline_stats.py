@@ -0,0 +1,293 @@
+"""
+Anomaly Baseline Statistics
+Vectorised per-group statistics and mergeable sketches for baselines
+"""
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+# Percentiles stored on every baseline
+BASELINE_PERCENTILES = (25, 50, 75, 95, 99)
+
+# t-digest compression (max centroids ~ compression)
+DIGEST_COMPRESSION = 100
+
+
+def grouped_statistics(
+    codes: np.ndarray,
+    values: np.ndarray,
+    n_groups: int
+) -> Dict[str, np.ndarray]:
+    """
+    Statistics for every group in one vectorised pass.
+
+    Args:
+        codes: Group index (0..n_groups-1) of each value
+        values: Observed values
+        n_groups: Number of groups
+
+    Returns:
+        Arrays indexed by group: count, mean, m2 (sum of squared deviations),
+        std (sample), min, max and p25/p50/p75/p95/p99. Empty groups get
+        count 0 and NaN statistics.
+    """
+    codes = np.asarray(codes, dtype=np.int64)
+    values = np.asarray(values, dtype=np.float64)
+
+    count = np.bincount(codes, minlength=n_groups)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.bincount(codes, weights=values, minlength=n_groups) / count
+        m2 = np.bincount(codes, weights=(values - mean[codes]) ** 2, minlength=n_groups)
+        std = np.where(count > 1, np.sqrt(m2 / np.maximum(count - 1, 1)), 0.0)
+    m2 = np.where(count > 0, m2, np.nan)
+    std = np.where(count > 0, std, np.nan)
+
+    # Sort by (group, value) once; every group is then a contiguous run
+    order = np.lexsort((values, codes))
+    sorted_values = values[order]
+    starts = np.concatenate(([0], np.cumsum(count)[:-1]))
+    nonempty = count > 0
+    last = starts + np.maximum(count - 1, 0)
+
+    stats = {
+        "count": count,
+        "mean": mean,
+        "m2": m2,
+        "std": std,
+        "min": np.full(n_groups, np.nan),
+        "max": np.full(n_groups, np.nan),
+    }
+    stats["min"][nonempty] = sorted_values[starts[nonempty]]
+    stats["max"][nonempty] = sorted_values[last[nonempty]]
+
+    # Linear interpolation between closest ranks (numpy "linear" method)
+    for pct in BASELINE_PERCENTILES:
+        result = np.full(n_groups, np.nan)
+        rank = (count[nonempty] - 1) * (pct / 100.0)
+        lower = np.floor(rank).astype(np.int64)
+        upper = np.minimum(lower + 1, count[nonempty] - 1)
+        base = starts[nonempty]
+        lo_values = sorted_values[base + lower]
+        hi_values = sorted_values[base + upper]
+        result[nonempty] = lo_values + (rank - lower) * (hi_values - lo_values)
+        stats[f"p{pct}"] = result
+
+    return stats
+
+
+def merge_moments(
+    n_a: np.ndarray,
+    mean_a: np.ndarray,
+    m2_a: np.ndarray,
+    n_b: np.ndarray,
+    mean_b: np.ndarray,
+    m2_b: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Combine running (count, mean, M2) states - Chan et al. parallel Welford.
+
+    Works element-wise, so the states of many baselines merge at once.
+    Either side may have a count of 0.
+    """
+    n_a = np.asarray(n_a, dtype=np.float64)
+    n_b = np.asarray(n_b, dtype=np.float64)
+    mean_a = np.nan_to_num(np.asarray(mean_a, dtype=np.float64))
+    mean_b = np.nan_to_num(np.asarray(mean_b, dtype=np.float64))
+    m2_a = np.nan_to_num(np.asarray(m2_a, dtype=np.float64))
+    m2_b = np.nan_to_num(np.asarray(m2_b, dtype=np.float64))
+
+    n = n_a + n_b
+    delta = mean_b - mean_a
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.where(n > 0, mean_a + delta * n_b / n, np.nan)
+        m2 = np.where(n > 0, m2_a + m2_b + delta ** 2 * n_a * n_b / n, np.nan)
+    return n.astype(np.int64), mean, m2
+
+
+def std_from_moments(n: np.ndarray, m2: np.ndarray) -> np.ndarray:
+    """Sample standard deviation from a (count, M2) state."""
+    n = np.asarray(n, dtype=np.float64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(n > 1, np.sqrt(np.asarray(m2, dtype=np.float64) / np.maximum(n - 1, 1)), 0.0)
+
+
+# ----- t-digest -----
+
+def compress_digest(
+    means: np.ndarray,
+    weights: np.ndarray,
+    compression: int = DIGEST_COMPRESSION
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Merge weighted points into at most ~compression centroids.
+
+    Uses the t-digest k1 scale function, so centroids stay small near the
+    tails (where p95/p99 are read) and larger around the median.
+    """
+    means = np.asarray(means, dtype=np.float64)
+    weights = np.asarray(weights, dtype=np.float64)
+    if means.size == 0:
+        return means, weights
+
+    order = np.argsort(means, kind="stable")
+    means = means[order]
+    weights = weights[order]
+    cumulative = np.cumsum(weights)
+    total = cumulative[-1]
+    q = (cumulative - weights / 2) / total
+    k = (np.arcsin(2 * q - 1) / np.pi + 0.5) * compression
+    bucket = np.minimum(np.floor(k).astype(np.int64), compression - 1)
+
+    # Buckets are monotonic in sorted order; reduce each run
+    boundaries = np.flatnonzero(np.diff(bucket)) + 1
+    starts = np.concatenate(([0], boundaries))
+    merged_weights = np.add.reduceat(weights, starts)
+    merged_means = np.add.reduceat(means * weights, starts) / merged_weights
+    return merged_means, merged_weights
+
+
+def build_digest(
+    values: np.ndarray,
+    compression: int = DIGEST_COMPRESSION
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Digest of raw values."""
+    values = np.asarray(values, dtype=np.float64)
+    return compress_digest(values, np.ones_like(values), compression)
+
+
+def merge_digest(
+    means: np.ndarray,
+    weights: np.ndarray,
+    values: np.ndarray,
+    compression: int = DIGEST_COMPRESSION
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Add raw values to an existing digest."""
+    values = np.asarray(values, dtype=np.float64)
+    return compress_digest(
+        np.concatenate((np.asarray(means, dtype=np.float64), values)),
+        np.concatenate((np.asarray(weights, dtype=np.float64), np.ones_like(values))),
+        compression
+    )
+
+
+def digest_quantiles(
+    means: np.ndarray,
+    weights: np.ndarray,
+    percentiles: Sequence[float],
+    min_value: Optional[float] = None,
+    max_value: Optional[float] = None
+) -> List[Optional[float]]:
+    """Estimate percentiles (0-100) by interpolating between centroid centres."""
+    means = np.asarray(means, dtype=np.float64)
+    weights = np.asarray(weights, dtype=np.float64)
+    if means.size == 0:
+        return [None for _ in percentiles]
+
+    total = weights.sum()
+    centres = np.cumsum(weights) - weights / 2
+    lo = means[0] if min_value is None else min_value
+    hi = means[-1] if max_value is None else max_value
+    xp = np.concatenate(([0.0], centres, [total]))
+    fp = np.concatenate(([lo], means, [hi]))
+    targets = np.asarray(percentiles, dtype=np.float64) / 100.0 * total
+    return [float(v) for v in np.interp(targets, xp, fp)]
+
+
+def digest_to_json(means: np.ndarray, weights: np.ndarray) -> List[List[float]]:
+    """Centroids as [[mean, weight], ...] for JSONB storage."""
+    return [[float(m), float(w)] for m, w in zip(means, weights)]
+
+
+def digest_from_json(centroids: Optional[List[List[float]]]) -> Tuple[np.ndarray, np.ndarray]:
+    """Inverse of digest_to_json."""
+    if not centroids:
+        return np.empty(0), np.empty(0)
+    data = np.asarray(centroids, dtype=np.float64)
+    return data[:, 0], data[:, 1]
+
+
+# ----- Period aggregation -----
+
+def period_buckets(days: np.ndarray, period: Optional[str]) -> np.ndarray:
+    """
+    Bucket index of each date for an aggregation period.
+
+    Args:
+        days: datetime64[D] array
+        period: daily, weekly (Monday start), monthly or None (no bucketing)
+    """
+    days = np.asarray(days, dtype="datetime64[D]")
+    if period == "monthly":
+        return days.astype("datetime64[M]").astype(np.int64)
+    if period == "weekly":
+        # 1970-01-01 was a Thursday; shift so weeks start on Monday
+        return (days.astype(np.int64) + 3) // 7
+    return days.astype(np.int64)
+
+
+def bucket_start(buckets: np.ndarray, period: Optional[str]) -> np.ndarray:
+    """First day (datetime64[D]) of each bucket from period_buckets."""
+    buckets = np.asarray(buckets, dtype=np.int64)
+    if period == "monthly":
+        return buckets.astype("datetime64[M]").astype("datetime64[D]")
+    if period == "weekly":
+        return (buckets * 7 - 3).astype("datetime64[D]")
+    return buckets.astype("datetime64[D]")
+
+
+def bucket_end(buckets: np.ndarray, period: Optional[str]) -> np.ndarray:
+    """Last day (datetime64[D]) of each bucket from period_buckets."""
+    return bucket_start(np.asarray(buckets, dtype=np.int64) + 1, period) - np.timedelta64(1, "D")
+
+
+def aggregate_series(
+    codes: np.ndarray,
+    buckets: np.ndarray,
+    values: np.ndarray,
+    function: Optional[str] = "sum"
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Aggregate values per (group, bucket).
+
+    Args:
+        codes: Group index of each value
+        buckets: Bucket index of each value
+        values: Observed values
+        function: sum, avg, count, max or min
+
+    Returns:
+        (codes, buckets, aggregated values), one entry per non-empty pair
+    """
+    codes = np.asarray(codes, dtype=np.int64)
+    buckets = np.asarray(buckets, dtype=np.int64)
+    values = np.asarray(values, dtype=np.float64)
+    if values.size == 0:
+        return codes, buckets, values
+
+    order = np.lexsort((buckets, codes))
+    codes, buckets, values = codes[order], buckets[order], values[order]
+    change = (np.diff(codes) != 0) | (np.diff(buckets) != 0)
+    starts = np.concatenate(([0], np.flatnonzero(change) + 1))
+    counts = np.diff(np.concatenate((starts, [values.size])))
+
+    if function == "count":
+        aggregated = counts.astype(np.float64)
+    elif function == "avg":
+        aggregated = np.add.reduceat(values, starts) / counts
+    elif function == "max":
+        aggregated = np.maximum.reduceat(values, starts)
+    elif function == "min":
+        aggregated = np.minimum.reduceat(values, starts)
+    else:
+        aggregated = np.add.reduceat(values, starts)
+
+    return codes[starts], buckets[starts], aggregated
+
+
+def split_groups(codes: np.ndarray, values: np.ndarray, n_groups: int) -> List[np.ndarray]:
+    """Values of each group as a list of arrays (index = group)."""
+    codes = np.asarray(codes, dtype=np.int64)
+    order = np.argsort(codes, kind="stable")
+    counts = np.bincount(codes, minlength=n_groups)
+    return np.split(np.asarray(values, dtype=np.float64)[order], np.cumsum(counts)[:-1])
@@ -0,0 +1,231 @@
+"""
+Anomaly Data Sources
+Where the observations for each AnomalyRule.data_source come from
+"""
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from uuid import UUID
+
+import numpy as np
+from sqlalchemy import and_, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select
+
+from app.models.bill import Bill, BillStatus
+from app.models.expense import ExpenseClaim, ExpenseItem, ExpenseStatus
+from app.models.invoice import Invoice, InvoiceStatus
+from app.models.payroll import PayrollRun, PayrollStatus, Payslip
+
+
+@dataclass(frozen=True)
+class MetricSource:
+    """
+    Observation series for one data source.
+
+    Every row is one observation: the entity it belongs to, the date it was
+    observed on and one column per metric.
+    """
+    name: str
+    entity_type: str
+    company_column: Any
+    entity_column: Any
+    date_column: Any
+    metrics: Dict[str, Any]
+    default_metric: str
+    joins: Tuple[Tuple[Any, Any], ...] = ()
+    filters: Tuple[Any, ...] = ()
+
+    def query(
+        self,
+        company_id: UUID,
+        start_date: date,
+        end_date: date,
+        metric_names: Iterable[str],
+        entity_ids: Optional[Iterable[UUID]] = None
+    ) -> Select:
+        """
+        Column-only select of entity_id, observed_on and the requested
+        metrics between start_date and end_date (inclusive).
+        """
+        columns = [
+            self.entity_column.label("entity_id"),
+            self.date_column.label("observed_on"),
+        ] + [self.metrics[name].label(name) for name in metric_names]
+
+        query = select(*columns)
+        for target, onclause in self.joins:
+            query = query.join(target, onclause)
+
+        conditions = [
+            self.company_column == company_id,
+            self.date_column >= start_date,
+            self.date_column <= end_date,
+            *self.filters
+        ]
+        if entity_ids is not None:
+            conditions.append(self.entity_column.in_(list(entity_ids)))
+        return query.where(and_(*conditions))
+
+
+# Rows fetched per round-trip when loading observations
+OBSERVATION_FETCH_SIZE = 10000
+
+
+@dataclass
+class Observations:
+    """Observations loaded column-wise into NumPy arrays."""
+    entity_ids: List[Any]  # entity id of each code
+    codes: np.ndarray  # entity code of each observation
+    days: np.ndarray  # datetime64[D]
+    metrics: Dict[str, np.ndarray]  # metric name -> float64 values (NaN if null)
+
+    @property
+    def size(self) -> int:
+        return int(self.codes.size)
+
+
+async def load_observations(
+    db: AsyncSession,
+    source: MetricSource,
+    company_id: UUID,
+    start_date: date,
+    end_date: date,
+    metric_names: Iterable[str],
+    entity_ids: Optional[Iterable[UUID]] = None
+) -> Observations:
+    """
+    Stream a source's observations into NumPy arrays.
+
+    Rows are fetched in partitions and appended column-wise, so no ORM
+    objects or Row tuples are kept for the whole window.
+    """
+    metric_names = list(metric_names)
+    entity_codes: Dict[Any, int] = {}
+    codes: List[int] = []
+    days: List[date] = []
+    columns: Dict[str, List[Any]] = {name: [] for name in metric_names}
+
+    stream = await db.stream(
+        source.query(company_id, start_date, end_date, metric_names, entity_ids)
+        .execution_options(yield_per=OBSERVATION_FETCH_SIZE)
+    )
+    async for partition in stream.partitions():
+        for row in partition:
+            code = entity_codes.get(row.entity_id)
+            if code is None:
+                code = entity_codes[row.entity_id] = len(entity_codes)
+            codes.append(code)
+            days.append(row.observed_on)
+        for name in metric_names:
+            columns[name].extend(getattr(row, name) for row in partition)
+
+    return Observations(
+        entity_ids=list(entity_codes),
+        codes=np.asarray(codes, dtype=np.int64),
+        days=np.asarray(days, dtype="datetime64[D]"),
+        metrics={
+            name: np.asarray(
+                [np.nan if v is None else float(v) for v in values], dtype=np.float64
+            )
+            for name, values in columns.items()
+        }
+    )
+
+
+DATA_SOURCES: Dict[str, MetricSource] = {
+    source.name: source for source in (
+        MetricSource(
+            name="expenses",
+            entity_type="employee",
+            company_column=ExpenseClaim.company_id,
+            entity_column=ExpenseClaim.employee_id,
+            date_column=ExpenseItem.expense_date,
+            metrics={
+                "amount": ExpenseItem.base_amount,
+                "tax_amount": ExpenseItem.tax_amount,
+                "distance_km": ExpenseItem.distance_km,
+            },
+            default_metric="amount",
+            joins=((ExpenseClaim, ExpenseItem.claim_id == ExpenseClaim.id),),
+            filters=(
+                ExpenseClaim.deleted_at.is_(None),
+                ExpenseClaim.status.notin_([ExpenseStatus.DRAFT, ExpenseStatus.CANCELLED]),
+            ),
+        ),
+        MetricSource(
+            name="invoices",
+            entity_type="customer",
+            company_column=Invoice.company_id,
+            entity_column=Invoice.customer_id,
+            date_column=Invoice.invoice_date,
+            metrics={
+                "amount": Invoice.base_grand_total,
+                "taxable_amount": Invoice.taxable_amount,
+                "discount_amount": Invoice.discount_amount,
+            },
+            default_metric="amount",
+            filters=(
+                Invoice.deleted_at.is_(None),
+                Invoice.status.notin_([InvoiceStatus.DRAFT, InvoiceStatus.CANCELLED]),
+            ),
+        ),
+        MetricSource(
+            name="bills",
+            entity_type="vendor",
+            company_column=Bill.company_id,
+            entity_column=Bill.vendor_id,
+            date_column=Bill.bill_date,
+            metrics={
+                "amount": Bill.base_grand_total,
+                "taxable_amount": Bill.taxable_amount,
+                "total_tax": Bill.total_tax,
+            },
+            default_metric="amount",
+            filters=(
+                Bill.deleted_at.is_(None),
+                Bill.status.notin_([BillStatus.DRAFT, BillStatus.CANCELLED]),
+            ),
+        ),
+        MetricSource(
+            name="payroll",
+            entity_type="employee",
+            company_column=PayrollRun.company_id,
+            entity_column=Payslip.employee_id,
+            date_column=func.make_date(Payslip.year, Payslip.month, 1),
+            metrics={
+                "gross_salary": Payslip.gross_salary,
+                "net_salary": Payslip.net_salary,
+                "total_deductions": Payslip.total_deductions,
+                "lop_days": Payslip.lop_days,
+            },
+            default_metric="gross_salary",
+            joins=((PayrollRun, Payslip.payroll_run_id == PayrollRun.id),),
+            filters=(PayrollRun.status != PayrollStatus.cancelled,),
+        ),
+    )
+}
+
+
+def get_data_source(name: str) -> Optional[MetricSource]:
+    """Look up a data source by AnomalyRule.data_source."""
+    return DATA_SOURCES.get(name)
+
+
+def resolve_metric(conditions: Any, source: MetricSource) -> Optional[str]:
+    """
+    Metric a rule is baselined on.
+
+    The field of the first deviation condition wins, then any condition
+    field the source knows, then the source's default metric.
+    """
+    conditions = [c for c in (conditions or []) if isinstance(c, dict)]
+    deviation_fields = [
+        c.get("field") for c in conditions
+        if c.get("operator") in ("deviation_above", "deviation_below")
+    ]
+    other_fields = [c.get("field") for c in conditions]
+    for name in deviation_fields + other_fields + [source.default_metric]:
+        if name in source.metrics:
+            return name
+    return None
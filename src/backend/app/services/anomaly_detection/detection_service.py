@@ -2,12 +2,14 @@
 Anomaly Detection Service
 Core service for detecting anomalies
 """
+from collections import defaultdict
 from datetime import datetime, date, timedelta
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Callable, Set, Tuple
 from uuid import UUID, uuid4
 import math
 
-from sqlalchemy import select, func, and_, or_
+import numpy as np
+from sqlalchemy import select, func, and_, or_, insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.datetime_utils import utc_now
@@ -18,6 +20,92 @@ from app.models.anomaly_detection import (
 from app.schemas.anomaly_detection import (
     AnomalyDetectionUpdate, AnomalyDetectionListResponse, RunDetectionResponse
 )
+from app.services.anomaly_detection.baseline_service import AGGREGATION_PERIODS
+from app.services.anomaly_detection.baseline_stats import (
+    aggregate_series, bucket_end, bucket_start, period_buckets
+)
+from app.services.anomaly_detection.data_sources import (
+    MetricSource, Observations, get_data_source, load_observations, resolve_metric
+)
+from app.services.sequence_service import SequenceService
+
+
+# Days scanned when run_detection is called without a start date
+DEFAULT_DETECTION_LOOKBACK_DAYS = 1
+
+# Standard deviations used when a rule has no deviation condition
+DEFAULT_THRESHOLD_STD_DEVS = 3.0
+
+# Progress callback: (rules_done, rules_total, detections_created)
+ProgressCallback = Callable[[int, int, int], None]
+
+
+def rule_threshold(conditions: Any) -> Tuple[float, str]:
+    """
+    Z-score threshold and direction of a rule.
+
+    deviation_above / deviation_below conditions give the threshold (in
+    standard deviations) and restrict the direction; with both, or with
+    none, deviations either way are flagged.
+
+    Returns:
+        (threshold, direction) where direction is above, below or outside
+    """
+    thresholds = {}
+    for condition in conditions or []:
+        if not isinstance(condition, dict):
+            continue
+        operator = condition.get("operator")
+        if operator in ("deviation_above", "deviation_below"):
+            try:
+                thresholds[operator] = float(condition.get("value"))
+            except (TypeError, ValueError):
+                thresholds[operator] = DEFAULT_THRESHOLD_STD_DEVS
+
+    if len(thresholds) == 1:
+        operator, threshold = next(iter(thresholds.items()))
+        return threshold, "above" if operator == "deviation_above" else "below"
+    if thresholds:
+        return min(thresholds.values()), "outside"
+    return DEFAULT_THRESHOLD_STD_DEVS, "outside"
+
+
+def score_deviations(
+    values: np.ndarray,
+    expected: np.ndarray,
+    std: np.ndarray,
+    threshold: float,
+    direction: str = "outside"
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Vectorised z-score test, the array form of detect_statistical_anomaly.
+
+    Args:
+        values: Observed values
+        expected: Baseline mean of each observation
+        std: Baseline standard deviation of each observation
+        threshold: Standard deviations that count as anomalous
+        direction: above, below or outside
+
+    Returns:
+        (anomaly mask, signed z-scores). Observations without a usable
+        baseline (NaN or zero deviation) are never anomalous.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    expected = np.asarray(expected, dtype=np.float64)
+    std = np.asarray(std, dtype=np.float64)
+
+    usable = ~np.isnan(values) & ~np.isnan(expected) & (std > 0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        z = np.where(usable, (values - expected) / np.where(usable, std, 1.0), np.nan)
+
+    if direction == "above":
+        mask = z > threshold
+    elif direction == "below":
+        mask = z < -threshold
+    else:
+        mask = np.abs(z) > threshold
+    return mask & usable, z
 
 
 class DetectionService:
@@ -212,21 +300,18 @@ class DetectionService:
         await db.refresh(detection)
         return detection
 
-    async def _generate_detection_number(self, db: AsyncSession, company_id: UUID) -> str:
-        """Generate unique detection number"""
-        year = utc_now().year
-        prefix = f"ANM-{year}"
-
-        # Count existing detections this year
-        count_query = select(func.count()).select_from(AnomalyDetection).where(
-            and_(
-                AnomalyDetection.company_id == company_id,
-                AnomalyDetection.detection_number.like(f"{prefix}%")
-            )
+    async def _generate_detection_numbers(
+        self, db: AsyncSession, company_id: UUID, count: int = 1
+    ) -> List[str]:
+        """Reserve ``count`` unique detection numbers: ANM-YYYY-XXXXXX."""
+        return await SequenceService.next_numbers(
+            db, company_id, "ANM", "{prefix}-{period}-{value:06d}",
+            period=str(utc_now().year), count=count
         )
-        count = await db.scalar(count_query) or 0
 
-        return f"{prefix}-{count + 1:06d}"
+    async def _generate_detection_number(self, db: AsyncSession, company_id: UUID) -> str:
+        """Generate unique detection number"""
+        return (await self._generate_detection_numbers(db, company_id))[0]
 
     async def create_detection(
         self,
@@ -319,15 +404,34 @@ class DetectionService:
         category: Optional[AnomalyCategory] = None,
         data_source: Optional[str] = None,
         start_date: Optional[date] = None,
-        end_date: Optional[date] = None
+        end_date: Optional[date] = None,
+        progress_callback: Optional[ProgressCallback] = None
     ) -> RunDetectionResponse:
-        """Run anomaly detection"""
+        """
+        Run anomaly detection.
+
+        Rules are grouped by data source. Each source's observation window is
+        loaded once, joined in memory against the current baselines of all
+        its rules and scored with NumPy; detections and alerts are then
+        bulk-inserted and committed per source. Observations a rule has
+        already flagged are skipped, so overlapping windows can be re-run.
+
+        Args:
+            start_date: First day scanned (default: DEFAULT_DETECTION_LOOKBACK_DAYS ago).
+                Aggregated rules scan from the start of the containing period.
+            end_date: Last day scanned (default: today)
+            progress_callback: Called with (rules_done, rules_total,
+                detections_created) after each data source
+        """
         job_id = str(uuid4())
         started_at = utc_now()
         rules_executed = 0
         detections_created = 0
         errors = []
 
+        end_date = end_date or date.today()
+        start_date = start_date or end_date - timedelta(days=DEFAULT_DETECTION_LOOKBACK_DAYS)
+
         # Get rules to execute
         conditions = [AnomalyRule.company_id == company_id, AnomalyRule.is_active == True]
         if rule_ids:
@@ -341,22 +445,59 @@ class DetectionService:
         result = await db.execute(query)
         rules = result.scalars().all()
 
+        rules_by_source: Dict[str, List[Tuple[AnomalyRule, str]]] = defaultdict(list)
         for rule in rules:
-            try:
-                # In production, this would:
-                # 1. Fetch data from the rule's data source
-                # 2. Apply rule conditions
-                # 3. Compare against baselines
-                # 4. Create detections for anomalies found
-                rules_executed += 1
-
-                # Placeholder: In production, detect anomalies here
-                # detections_created += await self._detect_anomalies_for_rule(
-                #     db, company_id, rule, start_date, end_date
-                # )
+            source = get_data_source(rule.data_source)
+            metric = resolve_metric(rule.conditions, source) if source else None
+            if metric is None:
+                errors.append(f"Rule {rule.code}: unsupported data source '{rule.data_source}'")
+                continue
+            rules_by_source[rule.data_source].append((rule, metric))
+
+        baselines = await self._current_baselines(
+            db, company_id,
+            [rule.id for source_rules in rules_by_source.values() for rule, _ in source_rules]
+        )
+        rules_done = len(rules) - sum(len(items) for items in rules_by_source.values())
 
+        for source_name, source_rules in rules_by_source.items():
+            source = get_data_source(source_name)
+            window_starts = {
+                rule.id: self._window_start(rule, start_date) for rule, _ in source_rules
+            }
+            try:
+                # A savepoint per source: rolling it back leaves the preloaded
+                # rules and baselines loaded, so the other sources still run
+                async with db.begin_nested():
+                    observations = await load_observations(
+                        db, source, company_id,
+                        min(window_starts.values()), end_date,
+                        {metric for _, metric in source_rules}
+                    )
+                    seen = await self._existing_detection_keys(
+                        db, company_id, list(window_starts), min(window_starts.values()), end_date
+                    )
+
+                    rows: List[Dict[str, Any]] = []
+                    for rule, metric in source_rules:
+                        rows.extend(self._score_rule(
+                            rule, metric, source, observations,
+                            baselines.get(rule.id, {}), window_starts[rule.id], end_date,
+                            company_id, job_id, seen
+                        ))
+
+                    created = await self._bulk_create_detections(
+                        db, company_id, rows, {rule.id: rule for rule, _ in source_rules}
+                    )
+                await db.commit()
+                detections_created += created
+                rules_executed += len(source_rules)
             except Exception as e:
-                errors.append(f"Rule {rule.code}: {str(e)}")
+                errors.append(f"Data source {source_name}: {str(e)}")
+
+            rules_done += len(source_rules)
+            if progress_callback:
+                progress_callback(rules_done, len(rules), detections_created)
 
         return RunDetectionResponse(
             job_id=job_id,
@@ -368,6 +509,283 @@ class DetectionService:
             errors=errors
         )
 
+    async def _current_baselines(
+        self,
+        db: AsyncSession,
+        company_id: UUID,
+        rule_ids: List[UUID]
+    ) -> Dict[UUID, Dict[Optional[UUID], AnomalyBaseline]]:
+        """Current baselines of many rules in one query: rule -> entity -> baseline."""
+        if not rule_ids:
+            return {}
+        result = await db.execute(
+            select(AnomalyBaseline).where(
+                and_(
+                    AnomalyBaseline.company_id == company_id,
+                    AnomalyBaseline.rule_id.in_(rule_ids),
+                    AnomalyBaseline.is_current == True
+                )
+            )
+        )
+        by_rule: Dict[UUID, Dict[Optional[UUID], AnomalyBaseline]] = defaultdict(dict)
+        for baseline in result.scalars().all():
+            by_rule[baseline.rule_id][baseline.entity_id] = baseline
+        return by_rule
+
+    async def _existing_detection_keys(
+        self,
+        db: AsyncSession,
+        company_id: UUID,
+        rule_ids: List[UUID],
+        start_date: date,
+        end_date: date
+    ) -> Set[Tuple[Any, ...]]:
+        """Keys (see _detection_key) of detections already recorded in the window."""
+        result = await db.execute(
+            select(
+                AnomalyDetection.rule_id,
+                AnomalyDetection.entity_id,
+                AnomalyDetection.anomaly_date,
+                AnomalyDetection.observed_value,
+                AnomalyDetection.anomaly_period_start
+            ).where(
+                and_(
+                    AnomalyDetection.company_id == company_id,
+                    AnomalyDetection.rule_id.in_(rule_ids),
+                    AnomalyDetection.anomaly_date >= start_date,
+                    AnomalyDetection.anomaly_date <= end_date
+                )
+            )
+        )
+        return {
+            self._detection_key(
+                row.rule_id, row.entity_id, row.anomaly_date,
+                None if row.anomaly_period_start else row.observed_value
+            )
+            for row in result
+        }
+
+    @staticmethod
+    def _detection_key(
+        rule_id: UUID,
+        entity_id: Optional[UUID],
+        anomaly_date: date,
+        observed_value: Optional[float]
+    ) -> Tuple[Any, ...]:
+        """
+        Identity of a detection for de-duplication. Aggregated detections
+        are one per period (observed_value None); raw ones per value.
+        """
+        value = None if observed_value is None else round(float(observed_value), 4)
+        return (rule_id, entity_id, anomaly_date, value)
+
+    @staticmethod
+    def _window_start(rule: AnomalyRule, start_date: date) -> date:
+        """Aggregated rules scan whole periods, so start at the period boundary."""
+        period = rule.aggregation_period if rule.aggregation_period in AGGREGATION_PERIODS else None
+        if not period:
+            return start_date
+        bucket = period_buckets(np.array([start_date], dtype="datetime64[D]"), period)
+        return bucket_start(bucket, period)[0].astype(date)
+
+    @staticmethod
+    def _baseline_arrays(
+        rule: AnomalyRule,
+        metric: str,
+        baselines: Dict[Optional[UUID], AnomalyBaseline],
+        entity_ids: List[Any]
+    ) -> Tuple[np.ndarray, np.ndarray, List[Optional[AnomalyBaseline]]]:
+        """
+        Baseline of each entity code: the entity's own baseline when it has
+        min_data_points, otherwise the rule's overall baseline.
+
+        Returns:
+            (mean by code, std by code, baseline by code)
+        """
+        min_points = rule.min_data_points or 0
+
+        def usable(baseline: Optional[AnomalyBaseline]) -> bool:
+            return (
+                baseline is not None
+                and baseline.metric_name == metric
+                and (baseline.data_points or 0) >= min_points
+                and bool(baseline.std_deviation)
+            )
+
+        overall = baselines.get(None)
+        overall = overall if usable(overall) else None
+        chosen: List[Optional[AnomalyBaseline]] = []
+        for entity_id in entity_ids:
+            baseline = baselines.get(entity_id) if rule.entity_type else None
+            chosen.append(baseline if usable(baseline) else overall)
+
+        mean = np.array(
+            [np.nan if b is None else b.mean_value for b in chosen], dtype=np.float64
+        )
+        std = np.array(
+            [np.nan if b is None else b.std_deviation for b in chosen], dtype=np.float64
+        )
+        return mean, std, chosen
+
+    @classmethod
+    def _score_rule(
+        cls,
+        rule: AnomalyRule,
+        metric: str,
+        source: MetricSource,
+        observations: Observations,
+        baselines: Dict[Optional[UUID], AnomalyBaseline],
+        start_date: date,
+        end_date: date,
+        company_id: UUID,
+        job_id: str,
+        seen: Set[Tuple[Any, ...]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Detection rows (without detection_number) for one rule.
+
+        Observations of the rule's window are scored against their entity's
+        baseline in one vectorised pass; rows are only built for anomalies.
+        """
+        if not observations.size:
+            return []
+
+        mean_by_code, std_by_code, baseline_by_code = cls._baseline_arrays(
+            rule, metric, baselines, observations.entity_ids
+        )
+        if np.isnan(mean_by_code).all():
+            return []
+
+        values = observations.metrics[metric]
+        mask = (
+            (observations.days >= np.datetime64(start_date))
+            & (observations.days <= np.datetime64(end_date))
+            & ~np.isnan(values)
+        )
+        codes = observations.codes[mask]
+        days = observations.days[mask]
+        values = values[mask]
+
+        period = rule.aggregation_period if rule.aggregation_period in AGGREGATION_PERIODS else None
+        period_start = period_end = None
+        if period:
+            codes, buckets, values = aggregate_series(
+                codes, period_buckets(days, period), values, rule.aggregation_function
+            )
+            days = period_start = bucket_start(buckets, period)
+            period_end = bucket_end(buckets, period)
+
+        threshold, direction = rule_threshold(rule.conditions)
+        expected = mean_by_code[codes]
+        std = std_by_code[codes]
+        anomalies, z_scores = score_deviations(values, expected, std, threshold, direction)
+
+        rows: List[Dict[str, Any]] = []
+        for index in np.flatnonzero(anomalies):
+            code = int(codes[index])
+            entity_id = observations.entity_ids[code]
+            anomaly_date = days[index].astype(date)
+            observed = float(values[index])
+            key = cls._detection_key(rule.id, entity_id, anomaly_date, None if period else observed)
+            if key in seen:
+                continue
+            seen.add(key)
+
+            baseline = baseline_by_code[code]
+            z_score = float(z_scores[index])
+            mean = float(expected[index])
+            deviation = observed - mean
+            deviation_type = "above" if deviation > 0 else "below"
+            rows.append({
+                "id": uuid4(),
+                "company_id": company_id,
+                "rule_id": rule.id,
+                "baseline_id": baseline.id,
+                "category": rule.category,
+                "severity": rule.severity or AnomalySeverity.medium,
+                "status": AnomalyStatus.detected,
+                "detection_method": DetectionMethod.statistical,
+                "title": f"{rule.name}: {metric} {deviation_type} baseline",
+                "description": (
+                    f"Observed {metric} of {observed:,.2f} against an expected "
+                    f"{mean:,.2f} ({z_score:+.1f} standard deviations)"
+                ),
+                "data_source": rule.data_source,
+                "entity_type": rule.entity_type or source.entity_type,
+                "entity_id": entity_id,
+                "metric_name": metric,
+                "observed_value": observed,
+                "expected_value": mean,
+                "deviation": deviation,
+                "deviation_type": deviation_type,
+                "confidence_score": min(0.99, 0.5 + (abs(z_score) - threshold) * 0.1),
+                "anomaly_score": abs(z_score),
+                "context_data": {
+                    "job_id": job_id,
+                    "aggregation_period": period,
+                    "aggregation_function": rule.aggregation_function if period else None,
+                },
+                "comparison_data": {
+                    "z_score": z_score,
+                    "threshold_std_devs": threshold,
+                    "std_deviation": float(std[index]),
+                    "deviation_pct": deviation / mean * 100 if mean else None,
+                    "baseline_data_points": baseline.data_points,
+                    "baseline_entity_id": str(baseline.entity_id) if baseline.entity_id else None,
+                },
+                "anomaly_date": anomaly_date,
+                "anomaly_period_start": (
+                    datetime.combine(period_start[index].astype(date), datetime.min.time())
+                    if period else None
+                ),
+                "anomaly_period_end": (
+                    datetime.combine(period_end[index].astype(date), datetime.max.time())
+                    if period else None
+                ),
+            })
+        return rows
+
+    async def _bulk_create_detections(
+        self,
+        db: AsyncSession,
+        company_id: UUID,
+        rows: List[Dict[str, Any]],
+        rules: Dict[UUID, AnomalyRule]
+    ) -> int:
+        """
+        Insert detections (and alerts for rules with alerting enabled) in
+        two executemany statements, numbering them from one reserved block.
+        """
+        if not rows:
+            return 0
+
+        numbers = await self._generate_detection_numbers(db, company_id, count=len(rows))
+        detected_at = utc_now().replace(tzinfo=None)
+        for row, number in zip(rows, numbers):
+            row["detection_number"] = number
+            row["detected_at"] = detected_at
+            row["updated_at"] = detected_at
+        await db.execute(insert(AnomalyDetection), rows)
+
+        alerts = [
+            {
+                "company_id": company_id,
+                "detection_id": row["id"],
+                "rule_id": row["rule_id"],
+                "title": f"Anomaly Detected: {row['title']}",
+                "message": row["description"],
+                "severity": row["severity"],
+                "recipients": rules[row["rule_id"]].alert_recipients or [],
+                "created_at": detected_at,
+            }
+            for row in rows
+            if rules[row["rule_id"]].alert_enabled
+        ]
+        if alerts:
+            await db.execute(insert(AnomalyAlert), alerts)
+
+        return len(rows)
+
     async def detect_statistical_anomaly(
         self,
         observed_value: float,
@@ -1,8 +1,12 @@
 """
 Audit Database Service - Async database operations for audit logging
+
+Entries are written by the batched audit writer (app.services.audit_writer)
+outside the request transaction; this service reads, verifies and prunes
+the partitioned, hash-chained audit_logs table.
 """
 import logging
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
 from typing import List, Dict, Any, Optional, Tuple
 from uuid import UUID
 
@@ -13,6 +17,10 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.user import AuditLog, User
 from app.core.datetime_utils import utc_now
+from app.services.audit_writer import (
+    CHECKSUM_FIELDS, audit_checksum, audit_entry, drop_expired_partitions,
+    iter_chain_pages, verify_chain, write_audit_entry
+)
 
 
 class AuditDBServiceError(Exception):
@@ -28,8 +36,17 @@ class AuditLogNotFoundError(AuditDBServiceError):
 class AuditDBService:
     """
     Async database service for audit logging operations.
+
+    With a company_id, reads and verification are limited to that
+    company's entries (its hash chain).
     """
 
+    # Retention period in days
+    RETENTION_DAYS = 365 * 7  # 7 years for compliance
+
+    # Entries read per query when verifying a chain
+    VERIFY_PAGE_SIZE = 5000
+
     def __init__(self, db: AsyncSession, company_id: Optional[UUID] = None):
         self.db = db
         self.company_id = company_id
@@ -56,7 +73,11 @@ class AuditDBService:
         query = select(AuditLog)
         count_query = select(func.count(AuditLog.id))
 
-        # Apply filters
+        # Apply filters (created_at bounds limit the scan to the matching monthly partitions)
+        if self.company_id:
+            query = query.where(AuditLog.company_id == self.company_id)
+            count_query = count_query.where(AuditLog.company_id == self.company_id)
+
         if action:
             query = query.where(AuditLog.action == action)
             count_query = count_query.where(AuditLog.action == action)
@@ -132,6 +153,8 @@ class AuditDBService:
     async def get_log(self, log_id: UUID) -> Dict[str, Any]:
         """Get a specific audit log with full details."""
         query = select(AuditLog).where(AuditLog.id == log_id)
+        if self.company_id:
+            query = query.where(AuditLog.company_id == self.company_id)
         result = await self.db.execute(query)
         log = result.scalar_one_or_none()
 
@@ -159,7 +182,9 @@ class AuditDBService:
             "new_values": log.new_values,
             "ip_address": str(log.ip_address) if log.ip_address else None,
             "user_agent": log.user_agent,
-            "verified": True  # All logs are verified by default
+            "seq": log.seq,
+            "checksum": log.checksum,
+            "verified": self._checksum_matches(log)
         }
 
     async def get_user_activity(
@@ -279,22 +304,151 @@ class AuditDBService:
         old_values: Optional[Dict[str, Any]] = None,
         new_values: Optional[Dict[str, Any]] = None,
         ip_address: Optional[str] = None,
-        user_agent: Optional[str] = None
+        user_agent: Optional[str] = None,
+        description: Optional[str] = None,
+        request_id: Optional[str] = None
     ) -> UUID:
-        """Create a new audit log entry."""
-        log = AuditLog(
+        """
+        Queue a new audit log entry for the batched writer.
+
+        The entry is written shortly afterwards outside this session's
+        transaction; its id is returned straight away.
+        """
+        return await write_audit_entry(audit_entry(
             action=action,
             entity_type=entity_type,
             user_id=user_id,
+            company_id=self.company_id,
             entity_id=entity_id,
             old_values=old_values,
             new_values=new_values,
             ip_address=ip_address,
-            user_agent=user_agent
+            user_agent=user_agent,
+            description=description,
+            request_id=request_id
+        ))
+
+    async def verify_log(self, log_id: UUID) -> Dict[str, Any]:
+        """Verify one entry's checksum and its link to the previous entry of its chain."""
+        log = (await self.db.execute(self._chain_columns().where(AuditLog.id == log_id))).mappings().first()
+        if log is None or (self.company_id and log["company_id"] != self.company_id):
+            raise AuditLogNotFoundError(f"Audit log {log_id} not found")
+
+        previous = None
+        if log["seq"] and log["seq"] > 1:
+            previous = await self._chain_entry(log["company_id"], log["seq"] - 1)
+        result = verify_chain(
+            [dict(log)],
+            prev_checksum=previous["checksum"] if previous else None,
+            prev_seq=previous["seq"] if previous else None
+        )
+        return {
+            "log_id": str(log_id),
+            "is_valid": result["is_valid"],
+            "checksum_match": audit_checksum(log["prev_checksum"], log) == log["checksum"],
+            "previous_found": previous is not None,
+            "reason": result["reason"],
+            "timestamp": log["created_at"].isoformat() if log["created_at"] else None,
+            "action": log["action"],
+        }
+
+    async def verify_integrity(
+        self,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None
+    ) -> Dict[str, Any]:
+        """
+        Verify the company's hash chain over a period in one pass.
+
+        The seq range is found from the period's partitions; the entries in
+        it are then streamed in seq order and checked against each other
+        and the entry just before the range. A gap in seq means a deleted
+        entry, a mismatched checksum an altered one. Only one page of
+        entries is held at a time.
+        """
+        company_filter = (
+            AuditLog.company_id == self.company_id if self.company_id else AuditLog.company_id.is_(None)
         )
-        self.db.add(log)
+        bounds = select(func.min(AuditLog.seq), func.max(AuditLog.seq)).where(
+            and_(company_filter, AuditLog.seq.isnot(None))
+        )
+        if start_date:
+            bounds = bounds.where(AuditLog.created_at >= start_date)
+        if end_date:
+            bounds = bounds.where(AuditLog.created_at <= end_date)
+        first_seq, last_seq = (await self.db.execute(bounds)).one()
+
+        result = {
+            "company_id": str(self.company_id) if self.company_id else None,
+            "period": {
+                "start": start_date.isoformat() if start_date else None,
+                "end": end_date.isoformat() if end_date else None
+            },
+            "first_seq": first_seq,
+            "last_seq": last_seq,
+            "verified_at": utc_now().isoformat(),
+        }
+        if first_seq is None:
+            return {**result, "is_valid": True, "checked": 0, "first_invalid_seq": None,
+                    "first_invalid_id": None, "reason": None}
+
+        previous = await self._chain_entry(self.company_id, first_seq - 1) if first_seq > 1 else None
+        prev_checksum = previous["checksum"] if previous else None
+        prev_seq = previous["seq"] if previous else first_seq - 1
+        check = verify_chain([], prev_checksum, prev_seq)
+        checked = 0
+        async for page in iter_chain_pages(
+            self.db, self.company_id, first_seq, last_seq, self.VERIFY_PAGE_SIZE
+        ):
+            # Each page continues from the last entry of the one before
+            check = verify_chain(page, prev_checksum, prev_seq)
+            checked += check["checked"]
+            if not check["is_valid"]:
+                break
+            prev_seq, prev_checksum = page[-1]["seq"], page[-1]["checksum"]
+        check = {**check, "checked": checked}
+        if check["is_valid"] and check["checked"] != last_seq - first_seq + 1:
+            check = {**check, "is_valid": False, "first_invalid_seq": first_seq + check["checked"],
+                     "reason": "entries missing from the end of the range"}
+        return {**result, **check}
+
+    async def cleanup_old_logs(self, retention_days: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Remove entries past the retention period (7 years by default).
+
+        Whole monthly partitions are dropped; only the partition containing
+        the cutoff has rows deleted. This applies to every company.
+        """
+        cutoff = utc_now() - timedelta(days=retention_days or self.RETENTION_DAYS)
+        connection = await self.db.connection()
+        result = await connection.run_sync(drop_expired_partitions, cutoff)
         await self.db.commit()
-        return log.id
+        logger.info(
+            f"Audit log cleanup before {cutoff.isoformat()}: dropped {len(result['partitions_dropped'])} "
+            f"partitions, deleted {result['rows_deleted']} rows"
+        )
+        return {"cutoff": cutoff.isoformat(), **result}
+
+    @staticmethod
+    def _chain_columns():
+        return select(
+            *[AuditLog.__table__.c[name] for name in CHECKSUM_FIELDS],
+            AuditLog.prev_checksum, AuditLog.checksum
+        )
+
+    async def _chain_entry(self, company_id: Optional[UUID], seq: int) -> Optional[Dict[str, Any]]:
+        company_filter = AuditLog.company_id == company_id if company_id else AuditLog.company_id.is_(None)
+        row = (await self.db.execute(
+            select(AuditLog.seq, AuditLog.checksum).where(and_(company_filter, AuditLog.seq == seq))
+        )).mappings().first()
+        return dict(row) if row else None
+
+    @staticmethod
+    def _checksum_matches(log: AuditLog) -> bool:
+        if log.checksum is None:
+            return False
+        values = {name: getattr(log, name) for name in CHECKSUM_FIELDS}
+        return audit_checksum(log.prev_checksum, values) == log.checksum
 
     def _get_severity(self, action: Optional[str]) -> str:
         """Determine severity based on action."""
@@ -333,7 +487,3 @@ class AuditDBService:
             return f"Exported {entity_type} data"
         else:
             return f"Action '{action}' on {entity_type}"
-
-
-# Import for timedelta
-from datetime import timedelta
@@ -1,15 +1,22 @@
 """
 QA-002: Audit Logging Service
 Comprehensive audit trail for compliance and security
+
+Entries go through the batched audit writer into the partitioned,
+hash-chained audit_logs table (see app.services.audit_writer).
 """
 from typing import Dict, Any, Optional, List
 from datetime import datetime, timedelta
 from app.core.datetime_utils import utc_now
 from dataclasses import dataclass, field
 from enum import Enum
+from uuid import UUID
 import json
-import hashlib
-import uuid
+
+from sqlalchemy import and_, desc, select
+
+from app.models.user import AuditLog
+from app.services.audit_writer import audit_entry, write_audit_entry
 
 
 class AuditAction(str, Enum):
@@ -88,7 +95,7 @@ class AuditLogEntry:
     """Single audit log entry."""
     id: str
     timestamp: datetime
-    action: AuditAction
+    action: AuditAction  # Plain string for actions logged outside this service
     severity: AuditSeverity
     user_id: Optional[str]
     user_email: Optional[str]
@@ -102,17 +109,7 @@ class AuditLogEntry:
     user_agent: Optional[str]
     request_id: Optional[str]
     metadata: Dict[str, Any] = field(default_factory=dict)
-    checksum: Optional[str] = None
-
-    def __post_init__(self):
-        """Calculate checksum for integrity verification."""
-        if not self.checksum:
-            self.checksum = self._calculate_checksum()
-
-    def _calculate_checksum(self) -> str:
-        """Calculate checksum of audit entry for tamper detection."""
-        data = f"{self.id}:{self.timestamp.isoformat()}:{self.action}:{self.user_id}:{self.entity_type}:{self.entity_id}"
-        return hashlib.sha256(data.encode()).hexdigest()[:16]
+    checksum: Optional[str] = None  # Set once the writer has chained the entry
 
 
 class AuditService:
@@ -121,8 +118,9 @@ class AuditService:
 
     Features:
     - Immutable audit logs
-    - Tamper detection via checksums
-    - Retention policies
+    - Tamper detection via per-company checksum chains
+    - Batched writes outside the request transaction
+    - Retention policies (monthly partitions dropped whole)
     - Search and filtering
     - Export capabilities
     """
@@ -146,9 +144,14 @@ class AuditService:
     # Retention period in days
     RETENTION_DAYS = 365 * 7  # 7 years for compliance
 
-    def __init__(self):
-        # In production, use database storage
-        self._logs: List[AuditLogEntry] = []
+    def __init__(self, session_factory: Any = None):
+        self._session_factory = session_factory
+
+    def _session(self):
+        if self._session_factory is None:
+            from app.db.session import async_session_maker
+            self._session_factory = async_session_maker
+        return self._session_factory()
 
     async def log(
         self,
@@ -188,10 +191,27 @@ class AuditService:
             Created audit log entry
         """
         severity = self.ACTION_SEVERITY.get(action, AuditSeverity.INFO)
+        metadata = metadata or {}
+
+        row = audit_entry(
+            action=action.value,
+            entity_type=entity_type,
+            user_id=user_id,
+            company_id=company_id,
+            entity_id=entity_id,
+            old_values=self._sanitize_values(old_values),
+            new_values=self._sanitize_values(new_values),
+            ip_address=ip_address,
+            user_agent=user_agent,
+            description=description,
+            request_id=request_id,
+            extra={**metadata, "user_email": user_email} if user_email else metadata,
+        )
+        await write_audit_entry(row)
 
         entry = AuditLogEntry(
-            id=str(uuid.uuid4()),
-            timestamp=utc_now(),
+            id=str(row["id"]),
+            timestamp=row["created_at"],
             action=action,
             severity=severity,
             user_id=user_id,
@@ -200,16 +220,14 @@ class AuditService:
             entity_type=entity_type,
             entity_id=entity_id,
             description=description,
-            old_values=self._sanitize_values(old_values),
-            new_values=self._sanitize_values(new_values),
-            ip_address=ip_address,
+            old_values=row["old_values"],
+            new_values=row["new_values"],
+            ip_address=row["ip_address"],
             user_agent=user_agent,
             request_id=request_id,
-            metadata=metadata or {},
+            metadata=metadata,
         )
 
-        self._logs.append(entry)
-
         # Alert on critical events
         if severity == AuditSeverity.CRITICAL:
             await self._alert_critical_event(entry)
@@ -312,30 +330,44 @@ class AuditService:
         limit: int = 100,
         offset: int = 0,
     ) -> List[AuditLogEntry]:
-        """Search audit logs with filters."""
-        results = self._logs.copy()
+        """
+        Search audit logs with filters.
 
-        if company_id:
-            results = [r for r in results if r.company_id == company_id]
-        if user_id:
-            results = [r for r in results if r.user_id == user_id]
+        Entries still queued in the writer are not visible yet; date
+        bounds limit the query to the matching monthly partitions.
+        """
+        filters = []
+        for column, value in (
+            (AuditLog.company_id, company_id),
+            (AuditLog.user_id, user_id),
+            (AuditLog.entity_id, entity_id),
+        ):
+            if value:
+                filters.append(column == (value if isinstance(value, UUID) else UUID(str(value))))
         if action:
-            results = [r for r in results if r.action == action]
+            filters.append(AuditLog.action == action.value)
         if entity_type:
-            results = [r for r in results if r.entity_type == entity_type]
-        if entity_id:
-            results = [r for r in results if r.entity_id == entity_id]
-        if severity:
-            results = [r for r in results if r.severity == severity]
+            filters.append(AuditLog.entity_type == entity_type)
+        if severity == AuditSeverity.INFO:
+            filters.append(AuditLog.action.notin_(
+                [a.value for a, s in self.ACTION_SEVERITY.items() if s != AuditSeverity.INFO]
+            ))
+        elif severity:
+            filters.append(AuditLog.action.in_(
+                [a.value for a, s in self.ACTION_SEVERITY.items() if s == severity]
+            ))
         if start_date:
-            results = [r for r in results if r.timestamp >= start_date]
+            filters.append(AuditLog.created_at >= start_date)
         if end_date:
-            results = [r for r in results if r.timestamp <= end_date]
+            filters.append(AuditLog.created_at <= end_date)
 
-        # Sort by timestamp descending
-        results.sort(key=lambda x: x.timestamp, reverse=True)
+        query = select(AuditLog).order_by(desc(AuditLog.created_at)).offset(offset).limit(limit)
+        if filters:
+            query = query.where(and_(*filters))
 
-        return results[offset:offset + limit]
+        async with self._session() as session:
+            logs = (await session.execute(query)).scalars().all()
+        return [self._to_entry(log) for log in logs]
 
     async def get_user_activity(
         self,
@@ -348,7 +380,8 @@ class AuditService:
 
         action_counts = {}
         for log in logs:
-            action_counts[log.action.value] = action_counts.get(log.action.value, 0) + 1
+            action = getattr(log.action, "value", log.action)
+            action_counts[action] = action_counts.get(action, 0) + 1
 
         return {
             "user_id": user_id,
@@ -378,7 +411,7 @@ class AuditService:
                 {
                     "id": log.id,
                     "timestamp": log.timestamp.isoformat(),
-                    "action": log.action.value,
+                    "action": getattr(log.action, "value", log.action),
                     "severity": log.severity.value,
                     "user_email": log.user_email,
                     "entity_type": log.entity_type,
@@ -394,26 +427,42 @@ class AuditService:
         lines = ["timestamp,action,severity,user_email,entity_type,entity_id,description,ip_address"]
         for log in logs:
             lines.append(
-                f"{log.timestamp.isoformat()},{log.action.value},{log.severity.value},"
+                f"{log.timestamp.isoformat()},{getattr(log.action, 'value', log.action)},{log.severity.value},"
                 f"{log.user_email},{log.entity_type},{log.entity_id},"
                 f"\"{log.description}\",{log.ip_address}"
             )
         return "\n".join(lines)
 
     async def verify_integrity(self, log_id: str) -> bool:
-        """Verify integrity of audit log entry."""
-        for log in self._logs:
-            if log.id == log_id:
-                expected = log._calculate_checksum()
-                return expected == log.checksum
-        return False
-
-    async def cleanup_old_logs(self) -> int:
-        """Remove logs older than retention period."""
-        cutoff = utc_now() - timedelta(days=self.RETENTION_DAYS)
-        original_count = len(self._logs)
-        self._logs = [log for log in self._logs if log.timestamp > cutoff]
-        return original_count - len(self._logs)
+        """Verify an entry's checksum and its link to the previous entry."""
+        from app.services.audit_db_service import AuditDBService, AuditLogNotFoundError
+
+        async with self._session() as session:
+            try:
+                result = await AuditDBService(session).verify_log(UUID(str(log_id)))
+            except (ValueError, AuditLogNotFoundError):
+                return False
+        return result["is_valid"]
+
+    async def verify_range(
+        self,
+        company_id: Optional[str],
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+    ) -> Dict[str, Any]:
+        """Verify a company's checksum chain over a period in one pass."""
+        from app.services.audit_db_service import AuditDBService
+
+        async with self._session() as session:
+            service = AuditDBService(session, UUID(str(company_id)) if company_id else None)
+            return await service.verify_integrity(start_date, end_date)
+
+    async def cleanup_old_logs(self) -> Dict[str, Any]:
+        """Drop the monthly partitions past the retention period."""
+        from app.services.audit_db_service import AuditDBService
+
+        async with self._session() as session:
+            return await AuditDBService(session).cleanup_old_logs(self.RETENTION_DAYS)
 
     def _sanitize_values(self, values: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
         """Sanitize sensitive fields in values."""
@@ -446,6 +495,30 @@ class AuditService:
 
         return changes
 
+    def _to_entry(self, log: AuditLog) -> AuditLogEntry:
+        """AuditLogEntry of a stored row."""
+        action = AuditAction(log.action) if log.action in AuditAction._value2member_map_ else log.action
+        metadata = dict(log.extra or {})
+        return AuditLogEntry(
+            id=str(log.id),
+            timestamp=log.created_at,
+            action=action,
+            severity=self.ACTION_SEVERITY.get(action, AuditSeverity.INFO),
+            user_id=str(log.user_id) if log.user_id else None,
+            user_email=metadata.pop("user_email", None),
+            company_id=str(log.company_id) if log.company_id else None,
+            entity_type=log.entity_type or "",
+            entity_id=str(log.entity_id) if log.entity_id else None,
+            description=log.description or "",
+            old_values=log.old_values,
+            new_values=log.new_values,
+            ip_address=str(log.ip_address) if log.ip_address else None,
+            user_agent=log.user_agent,
+            request_id=log.request_id,
+            metadata=metadata,
+            checksum=log.checksum,
+        )
+
     async def _alert_critical_event(self, entry: AuditLogEntry) -> None:
         """Send alert for critical events."""
         # In production, send to monitoring/alerting system
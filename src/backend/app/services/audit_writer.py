@@ -0,0 +1,438 @@
+"""
+Audit Log Writer - Batched, hash-chained audit logging
+
+Entries are put on a bounded in-process queue and written by one
+background task in multi-row INSERTs, every AUDIT_FLUSH_INTERVAL_MS or
+AUDIT_BATCH_SIZE entries, outside the request's transaction.
+
+Each company's entries form a hash chain: an entry's checksum is the
+SHA-256 of its canonical content and the previous entry's checksum, and
+seq numbers the chain. The chain head lives in audit_chain_heads and is
+locked per flush, so writers in several processes extend one chain.
+audit_logs is range-partitioned by month; partitions are created on
+demand and dropped whole once past retention.
+"""
+import asyncio
+import hashlib
+import ipaddress
+import json
+import logging
+import time
+import uuid
+from datetime import date, datetime, timezone
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import and_, insert, select, text, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.engine import Connection
+
+from app.core.datetime_utils import utc_now
+from app.models.user import AuditChainHead, AuditLog
+
+logger = logging.getLogger(__name__)
+
+
+# Entries waiting to be written; log() waits for room when the queue is full
+AUDIT_QUEUE_SIZE = 10000
+
+# Entries written per INSERT
+AUDIT_BATCH_SIZE = 500
+
+# Longest an entry waits in the queue before it is written
+AUDIT_FLUSH_INTERVAL_MS = 200
+
+# Wait before retrying a failed flush (doubles up to 30 seconds)
+AUDIT_RETRY_SECONDS = 1.0
+
+# Chain of entries without a company
+SYSTEM_CHAIN_ID = uuid.UUID(int=0)
+
+PARTITION_PREFIX = "audit_logs_"
+
+# Fields covered by the checksum, in order
+CHECKSUM_FIELDS = (
+    "id", "company_id", "seq", "created_at", "user_id", "action", "entity_type",
+    "entity_id", "old_values", "new_values", "ip_address", "user_agent",
+    "description", "request_id", "extra",
+)
+
+
+# =====================
+# Hash chain
+# =====================
+
+def _canonical(value: Any) -> Any:
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.astimezone(timezone.utc).isoformat()
+    if isinstance(value, (dict, list)):
+        return value
+    return str(value)
+
+
+def audit_checksum(prev_checksum: Optional[str], entry: Dict[str, Any]) -> str:
+    """SHA-256 of an entry's canonical JSON chained to the previous checksum."""
+    payload = json.dumps(
+        [prev_checksum or ""] + [_canonical(entry.get(name)) for name in CHECKSUM_FIELDS],
+        sort_keys=True, separators=(",", ":"), default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def chain_entries(
+    entries: List[Dict[str, Any]],
+    head_seq: int,
+    head_checksum: Optional[str]
+) -> Tuple[int, Optional[str]]:
+    """Number and checksum entries in order after a chain head; returns the new head."""
+    for entry in entries:
+        head_seq += 1
+        entry["seq"] = head_seq
+        entry["prev_checksum"] = head_checksum
+        entry["checksum"] = head_checksum = audit_checksum(head_checksum, entry)
+    return head_seq, head_checksum
+
+
+def verify_chain(
+    rows: Iterable[Dict[str, Any]],
+    prev_checksum: Optional[str] = None,
+    prev_seq: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Check entries ordered by seq in one pass: every checksum must match
+    the entry's content, link to the previous checksum and follow it in
+    seq. prev_checksum/prev_seq describe the entry before the range.
+    """
+    checked = 0
+    for row in rows:
+        problem = None
+        if prev_seq is not None and row["seq"] != prev_seq + 1:
+            problem = f"expected seq {prev_seq + 1}"
+        elif (checked or prev_checksum is not None) and row["prev_checksum"] != prev_checksum:
+            problem = "broken link to the previous entry"
+        elif audit_checksum(row["prev_checksum"], row) != row["checksum"]:
+            problem = "content does not match checksum"
+        if problem:
+            return {
+                "is_valid": False, "checked": checked,
+                "first_invalid_seq": row["seq"], "first_invalid_id": str(row["id"]), "reason": problem
+            }
+        prev_seq, prev_checksum = row["seq"], row["checksum"]
+        checked += 1
+    return {"is_valid": True, "checked": checked, "first_invalid_seq": None, "first_invalid_id": None, "reason": None}
+
+
+# =====================
+# Monthly partitions
+# =====================
+
+def month_start(day: date) -> date:
+    return date(day.year, day.month, 1)
+
+
+def next_month(day: date) -> date:
+    return date(day.year + day.month // 12, day.month % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{PARTITION_PREFIX}{month.year:04d}_{month.month:02d}"
+
+
+def ensure_partitions(connection: Connection, months: Iterable[date]) -> None:
+    """Create the monthly partitions of audit_logs that do not exist yet."""
+    for month in sorted(set(months)):
+        name = partition_name(month)
+        if connection.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar() is not None:
+            continue
+        # Serialise creation with other writers; CREATE ... IF NOT EXISTS alone can race
+        connection.execute(text("SELECT pg_advisory_xact_lock(hashtext('audit_logs_partitions'))"))
+        connection.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF audit_logs "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{next_month(month).isoformat()}')"
+        ))
+
+
+def list_partitions(connection: Connection) -> List[Tuple[str, date]]:
+    """Monthly partitions of audit_logs as (name, first day), oldest first."""
+    names = connection.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = 'audit_logs'"
+    )).scalars().all()
+    partitions = []
+    for name in names:
+        try:
+            year, month = name[len(PARTITION_PREFIX):].split("_")
+            partitions.append((name, date(int(year), int(month), 1)))
+        except ValueError:
+            continue
+    return sorted(partitions, key=lambda partition: partition[1])
+
+
+def drop_expired_partitions(connection: Connection, cutoff: datetime) -> Dict[str, Any]:
+    """
+    Drop partitions that end before the cutoff and delete the expired
+    rows of the partition containing it. Other partitions are untouched.
+    """
+    cutoff_month = month_start(cutoff.date())
+    dropped, deleted = [], 0
+    for name, month in list_partitions(connection):
+        if next_month(month) <= cutoff_month:
+            connection.execute(text(f"DROP TABLE IF EXISTS {name}"))
+            dropped.append(name)
+        elif month == cutoff_month:
+            deleted += connection.execute(
+                text(f"DELETE FROM {name} WHERE created_at < :cutoff"), {"cutoff": cutoff}
+            ).rowcount or 0
+    return {"partitions_dropped": dropped, "rows_deleted": deleted}
+
+
+# =====================
+# Writer
+# =====================
+
+def audit_entry(
+    action: str,
+    entity_type: Optional[str] = None,
+    user_id: Optional[Any] = None,
+    company_id: Optional[Any] = None,
+    entity_id: Optional[Any] = None,
+    old_values: Optional[Dict[str, Any]] = None,
+    new_values: Optional[Dict[str, Any]] = None,
+    ip_address: Optional[str] = None,
+    user_agent: Optional[str] = None,
+    description: Optional[str] = None,
+    request_id: Optional[str] = None,
+    extra: Optional[Dict[str, Any]] = None,
+    created_at: Optional[datetime] = None,
+) -> Dict[str, Any]:
+    """
+    Row of an audit entry. Values are normalised to what the database
+    stores (JSON round trip, canonical IP, column lengths), so the checksum
+    covers exactly the stored row and no entry can fail its batch's INSERT.
+    """
+    def as_uuid(value: Any) -> Optional[uuid.UUID]:
+        if value is None or isinstance(value, uuid.UUID):
+            return value
+        try:
+            return uuid.UUID(str(value))
+        except ValueError:
+            return None
+
+    def as_json(value: Any) -> Any:
+        return json.loads(json.dumps(value, default=str)) if value is not None else None
+
+    def as_ip(value: Any) -> Optional[str]:
+        try:
+            return str(ipaddress.ip_address(value)) if value else None
+        except ValueError:
+            return None
+
+    def clip(value: Optional[str], length: int) -> Optional[str]:
+        return value[:length] if value else value
+
+    return {
+        "id": uuid.uuid4(),
+        "user_id": as_uuid(user_id),
+        "company_id": as_uuid(company_id),
+        "action": clip(str(getattr(action, "value", action)), 100),
+        "entity_type": clip(entity_type, 50),
+        "entity_id": as_uuid(entity_id),
+        "old_values": as_json(old_values),
+        "new_values": as_json(new_values),
+        "ip_address": as_ip(ip_address),
+        "user_agent": clip(user_agent, 500),
+        "description": description,
+        "request_id": clip(request_id, 100),
+        "extra": as_json(extra) or None,
+        "created_at": created_at or utc_now(),
+    }
+
+
+class AuditLogWriter:
+    """Background writer draining the audit queue in batches."""
+
+    def __init__(
+        self,
+        queue_size: int = AUDIT_QUEUE_SIZE,
+        batch_size: int = AUDIT_BATCH_SIZE,
+        flush_interval_ms: int = AUDIT_FLUSH_INTERVAL_MS,
+        session_factory: Any = None,
+    ):
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self._session_factory = session_factory
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._pending: List[Dict[str, Any]] = []
+        self._known_partitions: Set[date] = set()
+        self.written = 0
+
+    @property
+    def queue(self) -> asyncio.Queue:
+        # Created lazily so the queue belongs to the running event loop
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+        return self._queue
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def submit(self, entry: Dict[str, Any]) -> None:
+        """Queue an entry, waiting for room when the queue is full."""
+        await self.queue.put(entry)
+
+    async def start(self) -> None:
+        if not self.running:
+            self._task = asyncio.create_task(self._run(), name="audit-log-writer")
+
+    async def stop(self) -> None:
+        """Stop the background task and write everything still queued."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def flush(self) -> int:
+        """Write the pending batch and everything queued now; returns entries written."""
+        written = 0
+        while True:
+            self._take(self.batch_size)
+            if not self._pending:
+                return written
+            written += await self._write_pending()
+
+    def _take(self, limit: int) -> None:
+        while len(self._pending) < limit:
+            try:
+                self._pending.append(self.queue.get_nowait())
+            except asyncio.QueueEmpty:
+                return
+
+    async def _run(self) -> None:
+        retry = AUDIT_RETRY_SECONDS
+        while True:
+            if not self._pending:
+                self._pending.append(await self.queue.get())
+            deadline = time.monotonic() + self.flush_interval
+            while len(self._pending) < self.batch_size:
+                self._take(self.batch_size)
+                remaining = deadline - time.monotonic()
+                if len(self._pending) >= self.batch_size or remaining <= 0:
+                    break
+                try:
+                    self._pending.append(await asyncio.wait_for(self.queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            try:
+                await self._write_pending()
+                retry = AUDIT_RETRY_SECONDS
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # The batch stays pending; the queue applies back-pressure meanwhile
+                logger.exception("Audit log flush failed; retrying in %.0fs", retry)
+                await asyncio.sleep(retry)
+                retry = min(retry * 2, 30.0)
+
+    async def _write_pending(self) -> int:
+        batch = self._pending
+        session_factory = self._session_factory
+        if session_factory is None:
+            from app.db.session import async_session_maker
+            session_factory = async_session_maker
+
+        async with session_factory() as session:
+            async with session.begin():
+                connection = await session.connection()
+                months = {month_start(entry["created_at"].date()) for entry in batch}
+                if not months <= self._known_partitions:
+                    await connection.run_sync(ensure_partitions, months)
+                await self.write_batch(connection, batch)
+        self._known_partitions |= months
+        self._pending = []
+        self.written += len(batch)
+        return len(batch)
+
+    @staticmethod
+    async def write_batch(connection: Any, batch: List[Dict[str, Any]]) -> None:
+        """Chain a batch onto each company's head and insert it in one multi-row INSERT."""
+        chains: Dict[uuid.UUID, List[Dict[str, Any]]] = {}
+        for entry in sorted(batch, key=lambda e: e["created_at"]):
+            chains.setdefault(entry["company_id"] or SYSTEM_CHAIN_ID, []).append(entry)
+
+        # Sorted, so concurrent writers lock heads in the same order
+        chain_ids = sorted(chains, key=str)
+        await connection.execute(
+            pg_insert(AuditChainHead)
+            .values([{"chain_id": chain_id, "seq": 0} for chain_id in chain_ids])
+            .on_conflict_do_nothing(index_elements=["chain_id"])
+        )
+        heads = {
+            row.chain_id: (row.seq, row.checksum)
+            for row in await connection.execute(
+                select(AuditChainHead.chain_id, AuditChainHead.seq, AuditChainHead.checksum)
+                .where(AuditChainHead.chain_id.in_(chain_ids))
+                .order_by(AuditChainHead.chain_id)
+                .with_for_update()
+            )
+        }
+
+        for chain_id in chain_ids:
+            seq, checksum = chain_entries(chains[chain_id], *heads[chain_id])
+            await connection.execute(
+                update(AuditChainHead)
+                .where(AuditChainHead.chain_id == chain_id)
+                .values(seq=seq, checksum=checksum, updated_at=utc_now())
+            )
+
+        await connection.execute(insert(AuditLog), batch)
+
+
+audit_writer = AuditLogWriter()
+
+
+async def write_audit_entry(entry: Dict[str, Any]) -> uuid.UUID:
+    """
+    Queue an entry on the shared writer, starting it on first use.
+    Returns the entry id.
+    """
+    if not audit_writer.running:
+        await audit_writer.start()
+    await audit_writer.submit(entry)
+    return entry["id"]
+
+
+async def iter_chain_pages(
+    connection: Any,
+    chain_company_id: Optional[uuid.UUID],
+    first_seq: int,
+    last_seq: int,
+    page_size: int = 5000
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """Entries of a company chain between two seq numbers, in order, one page at a time."""
+    company_filter = (
+        AuditLog.company_id.is_(None) if chain_company_id is None else AuditLog.company_id == chain_company_id
+    )
+    columns = [AuditLog.__table__.c[name] for name in CHECKSUM_FIELDS] + [AuditLog.prev_checksum, AuditLog.checksum]
+    seq = first_seq
+    while seq <= last_seq:
+        rows = (await connection.execute(
+            select(*columns)
+            .where(and_(company_filter, AuditLog.seq >= seq, AuditLog.seq <= last_seq))
+            .order_by(AuditLog.seq)
+            .limit(page_size)
+        )).mappings().all()
+        if not rows:
+            return
+        yield [dict(row) for row in rows]
+        seq = rows[-1]["seq"] + 1
+
@@ -0,0 +1,412 @@
+"""
+Bank Reconciliation Engine - BE-028
+Indexed matching of book entries against bank statement lines
+"""
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date
+from decimal import Decimal, ROUND_CEILING, ROUND_HALF_UP
+from typing import List, Dict, Any, Optional, Tuple
+
+from app.schemas.banking import ReconciliationMatch
+
+
+# Minimum score for an amount/date match to be accepted
+MIN_AMOUNT_DATE_SCORE = 0.7
+
+# Components larger than this (per side) are assigned greedily by score
+# instead of with the O(n^3) Hungarian algorithm
+MAX_ASSIGNMENT_SIZE = 150
+
+
+@dataclass
+class _Entry:
+    """Book or bank entry with amount and reference parsed once."""
+    index: int
+    id: Any
+    amount: Decimal
+    cents: int
+    date: Optional[date]
+    reference: str
+
+
+def _prepare(entries: List[Dict[str, Any]]) -> List[_Entry]:
+    """Parse entries once and return them sorted by date (stable)."""
+    prepared = []
+    for entry in sorted(entries, key=lambda x: x.get('date', date.min)):
+        amount = Decimal(str(entry.get('amount', 0)))
+        prepared.append(_Entry(
+            index=len(prepared),
+            id=entry['id'],
+            amount=amount,
+            cents=int((amount * 100).to_integral_value(rounding=ROUND_HALF_UP)),
+            date=entry.get('date'),
+            reference=(entry.get('reference') or '').strip().upper()
+        ))
+    return prepared
+
+
+class ReconciliationEngine:
+    """
+    Indexed auto-reconciliation.
+
+    Matching passes:
+    1. Reference pass - hash index on normalised reference; each book entry is
+       matched to the earliest unmatched bank entry with the same reference
+       and an amount within tolerance.
+    2. Amount/date pass - entries that share an exact amount with other
+       entries (e.g. identical salary debits) are paired by sweeping both
+       sides in (date, reference) order, which avoids emitting an edge for
+       every pair. The rest of the bank entries are bucketed by amount (bucket
+       width = tolerance) and sorted by date inside each bucket, so each book
+       entry only scores candidates within tolerance and the date window. The
+       resulting candidate graph is split into connected components and each
+       component is solved with optimal (maximum total score) assignment.
+    """
+
+    def __init__(
+        self,
+        tolerance: Decimal = Decimal("0.01"),
+        date_range: int = 3
+    ):
+        self.tolerance = tolerance
+        self.date_range = date_range
+        # Amounts are bucketed in whole cents; the extra cent absorbs rounding
+        # so any pair within tolerance lands in the same or an adjacent bucket
+        tolerance_cents = int((tolerance * 100).to_integral_value(rounding=ROUND_CEILING))
+        self.bucket_width = tolerance_cents + 1
+
+    def reconcile(
+        self,
+        book_entries: List[Dict[str, Any]],
+        bank_entries: List[Dict[str, Any]]
+    ) -> List[ReconciliationMatch]:
+        """Match book entries to bank entries; returns reference matches first."""
+        books = _prepare(book_entries)
+        banks = _prepare(bank_entries)
+        matched_book = [False] * len(books)
+        matched_bank = [False] * len(banks)
+
+        matches = self._match_by_reference(books, banks, matched_book, matched_bank)
+        matches.extend(self._match_by_amount_date(books, banks, matched_book, matched_bank))
+        return matches
+
+    # ============= Pass 1: Reference =============
+
+    def _match_by_reference(
+        self,
+        books: List[_Entry],
+        banks: List[_Entry],
+        matched_book: List[bool],
+        matched_bank: List[bool]
+    ) -> List[ReconciliationMatch]:
+        by_reference: Dict[str, List[_Entry]] = defaultdict(list)
+        for bank in banks:
+            if bank.reference:
+                by_reference[bank.reference].append(bank)
+
+        matches = []
+        for book in books:
+            if not book.reference:
+                continue
+            for bank in by_reference.get(book.reference, ()):
+                if matched_bank[bank.index]:
+                    continue
+                if abs(book.amount - bank.amount) <= self.tolerance:
+                    matches.append(self._build_match(book, bank, 1.0, "exact"))
+                    matched_book[book.index] = True
+                    matched_bank[bank.index] = True
+                    break
+        return matches
+
+    # ============= Pass 2: Amount and date =============
+
+    def _match_by_amount_date(
+        self,
+        books: List[_Entry],
+        banks: List[_Entry],
+        matched_book: List[bool],
+        matched_bank: List[bool]
+    ) -> List[ReconciliationMatch]:
+        matches = self._sweep_equal_amounts(books, banks, matched_book, matched_bank)
+
+        # Amount buckets, each holding date-sorted entries and their ordinals
+        buckets: Dict[int, Tuple[List[int], List[_Entry]]] = defaultdict(lambda: ([], []))
+        for bank in banks:
+            if matched_bank[bank.index] or bank.date is None:
+                continue
+            ordinals, entries = buckets[bank.cents // self.bucket_width]
+            ordinals.append(bank.date.toordinal())
+            entries.append(bank)
+
+        # Candidate edges: book index -> [(bank index, score)]
+        edges: Dict[int, List[Tuple[int, float]]] = {}
+        for book in books:
+            if matched_book[book.index] or book.date is None:
+                continue
+            book_ordinal = book.date.toordinal()
+            bucket = book.cents // self.bucket_width
+            candidates = []
+            for key in (bucket - 1, bucket, bucket + 1):
+                if key not in buckets:
+                    continue
+                ordinals, entries = buckets[key]
+                lo = bisect_left(ordinals, book_ordinal - self.date_range)
+                hi = bisect_right(ordinals, book_ordinal + self.date_range)
+                for bank in entries[lo:hi]:
+                    score = self._score(book, bank)
+                    if score is not None and score >= MIN_AMOUNT_DATE_SCORE:
+                        candidates.append((bank.index, score))
+            if candidates:
+                edges[book.index] = candidates
+
+        assignment = self._assign(edges)
+
+        for book_index in sorted(assignment):
+            bank_index, score = assignment[book_index]
+            book = books[book_index]
+            bank = banks[bank_index]
+            matches.append(self._build_match(book, bank, score, "amount_date"))
+            matched_book[book_index] = True
+            matched_bank[bank_index] = True
+        return matches
+
+    def _sweep_equal_amounts(
+        self,
+        books: List[_Entry],
+        banks: List[_Entry],
+        matched_book: List[bool],
+        matched_bank: List[bool]
+    ) -> List[ReconciliationMatch]:
+        """
+        Pair entries of identical amount without building candidate edges.
+
+        Within one amount the entries are interchangeable apart from date and
+        reference, so walking both sides in (date, reference) order and
+        pairing each book entry with the earliest acceptable bank entry gives
+        a maximum matching with the smallest date gaps. Only amounts with
+        more than one entry on both sides are swept; everything else goes
+        through scored assignment.
+        """
+        book_groups: Dict[int, List[_Entry]] = defaultdict(list)
+        bank_groups: Dict[int, List[_Entry]] = defaultdict(list)
+        for book in books:
+            if not matched_book[book.index] and book.date is not None:
+                book_groups[book.cents].append(book)
+        for bank in banks:
+            if not matched_bank[bank.index] and bank.date is not None:
+                bank_groups[bank.cents].append(bank)
+
+        def order(entry: _Entry):
+            return (entry.date, entry.reference, entry.index)
+
+        matches = []
+        for cents, group_books in book_groups.items():
+            group_banks = bank_groups.get(cents, ())
+            if len(group_books) < 2 or len(group_banks) < 2:
+                continue
+            group_books = sorted(group_books, key=order)
+            group_banks = sorted(group_banks, key=order)
+
+            i = j = 0
+            while i < len(group_books) and j < len(group_banks):
+                book, bank = group_books[i], group_banks[j]
+                score = self._score(book, bank)
+                if score is not None and score >= MIN_AMOUNT_DATE_SCORE:
+                    matches.append(self._build_match(book, bank, score, "amount_date"))
+                    matched_book[book.index] = True
+                    matched_bank[bank.index] = True
+                    i += 1
+                    j += 1
+                elif bank.date < book.date:
+                    j += 1
+                else:
+                    i += 1
+        return matches
+
+    def _score(self, book: _Entry, bank: _Entry) -> Optional[float]:
+        """Score a candidate pair (higher is better), or None if out of range."""
+        amount_diff = abs(book.amount - bank.amount)
+        if amount_diff > self.tolerance:
+            return None
+        date_diff = abs((book.date - bank.date).days)
+        if date_diff > self.date_range:
+            return None
+
+        score = 1.0 - (date_diff / (self.date_range + 1))
+        score *= (1 - float(amount_diff / max(book.amount, Decimal("1"))))
+        return score
+
+    # ============= Assignment =============
+
+    def _assign(
+        self,
+        edges: Dict[int, List[Tuple[int, float]]]
+    ) -> Dict[int, Tuple[int, float]]:
+        """Maximum-score assignment, solved per connected component."""
+        assignment: Dict[int, Tuple[int, float]] = {}
+        for component_books, component_banks in self._components(edges):
+            if len(component_books) == 1 and len(edges[component_books[0]]) == 1:
+                book_index = component_books[0]
+                assignment[book_index] = edges[book_index][0]
+            elif max(len(component_books), len(component_banks)) <= MAX_ASSIGNMENT_SIZE:
+                assignment.update(_hungarian(component_books, component_banks, edges))
+            else:
+                assignment.update(_greedy(component_books, edges))
+        return assignment
+
+    @staticmethod
+    def _components(
+        edges: Dict[int, List[Tuple[int, float]]]
+    ) -> List[Tuple[List[int], List[int]]]:
+        """Connected components of the book/bank candidate graph (union-find)."""
+        parent: Dict[Tuple[str, int], Tuple[str, int]] = {}
+
+        def find(node):
+            root = node
+            while parent[root] != root:
+                root = parent[root]
+            while parent[node] != root:
+                parent[node], node = root, parent[node]
+            return root
+
+        for book_index, candidates in edges.items():
+            book_node = ("book", book_index)
+            parent.setdefault(book_node, book_node)
+            for bank_index, _ in candidates:
+                bank_node = ("bank", bank_index)
+                parent.setdefault(bank_node, bank_node)
+                root_a, root_b = find(book_node), find(bank_node)
+                if root_a != root_b:
+                    parent[root_b] = root_a
+
+        groups: Dict[Tuple[str, int], Tuple[List[int], List[int]]] = defaultdict(lambda: ([], []))
+        for node in parent:
+            side, index = node
+            group = groups[find(node)]
+            (group[0] if side == "book" else group[1]).append(index)
+
+        return [(sorted(b), sorted(k)) for b, k in groups.values()]
+
+    @staticmethod
+    def _build_match(
+        book: _Entry,
+        bank: _Entry,
+        score: float,
+        match_type: str
+    ) -> ReconciliationMatch:
+        return ReconciliationMatch(
+            book_entry_id=book.id,
+            bank_entry_id=bank.id,
+            book_amount=book.amount,
+            bank_amount=bank.amount,
+            book_date=book.date,
+            bank_date=bank.date,
+            match_score=score,
+            match_type=match_type
+        )
+
+
+def _greedy(
+    books: List[int],
+    edges: Dict[int, List[Tuple[int, float]]]
+) -> Dict[int, Tuple[int, float]]:
+    """Assign highest-scoring pairs first (fallback for huge components)."""
+    pairs = sorted(
+        ((score, book_index, bank_index)
+         for book_index in books
+         for bank_index, score in edges[book_index]),
+        key=lambda p: (-p[0], p[1], p[2])
+    )
+    used_banks = set()
+    assignment: Dict[int, Tuple[int, float]] = {}
+    for score, book_index, bank_index in pairs:
+        if book_index in assignment or bank_index in used_banks:
+            continue
+        assignment[book_index] = (bank_index, score)
+        used_banks.add(bank_index)
+    return assignment
+
+
+def _hungarian(
+    books: List[int],
+    banks: List[int],
+    edges: Dict[int, List[Tuple[int, float]]]
+) -> Dict[int, Tuple[int, float]]:
+    """
+    Maximum total score assignment with the Hungarian algorithm.
+
+    Pairs without a candidate edge cost 0, so they are never preferred over a
+    real match and are dropped from the result.
+    """
+    transpose = len(books) > len(banks)
+    rows, cols = (banks, books) if transpose else (books, banks)
+    row_pos = {index: pos for pos, index in enumerate(rows)}
+    col_pos = {index: pos for pos, index in enumerate(cols)}
+
+    n, m = len(rows), len(cols)
+    cost = [[0.0] * m for _ in range(n)]
+    scores: Dict[Tuple[int, int], float] = {}
+    for book_index in books:
+        for bank_index, score in edges[book_index]:
+            if transpose:
+                r, c = row_pos[bank_index], col_pos[book_index]
+            else:
+                r, c = row_pos[book_index], col_pos[bank_index]
+            cost[r][c] = -score
+            scores[(r, c)] = score
+
+    # Jonker-Volgenant style O(n^2 m) implementation, 1-indexed potentials
+    inf = float("inf")
+    u = [0.0] * (n + 1)
+    v = [0.0] * (m + 1)
+    p = [0] * (m + 1)
+    way = [0] * (m + 1)
+    for i in range(1, n + 1):
+        p[0] = i
+        j0 = 0
+        minv = [inf] * (m + 1)
+        used = [False] * (m + 1)
+        while True:
+            used[j0] = True
+            i0 = p[j0]
+            delta = inf
+            j1 = 0
+            row = cost[i0 - 1]
+            for j in range(1, m + 1):
+                if not used[j]:
+                    cur = row[j - 1] - u[i0] - v[j]
+                    if cur < minv[j]:
+                        minv[j] = cur
+                        way[j] = j0
+                    if minv[j] < delta:
+                        delta = minv[j]
+                        j1 = j
+            for j in range(m + 1):
+                if used[j]:
+                    u[p[j]] += delta
+                    v[j] -= delta
+                else:
+                    minv[j] -= delta
+            j0 = j1
+            if p[j0] == 0:
+                break
+        while True:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+            if j0 == 0:
+                break
+
+    assignment: Dict[int, Tuple[int, float]] = {}
+    for j in range(1, m + 1):
+        i = p[j]
+        if i == 0 or (i - 1, j - 1) not in scores:
+            continue
+        score = scores[(i - 1, j - 1)]
+        if transpose:
+            assignment[cols[j - 1]] = (rows[i - 1], score)
+        else:
+            assignment[rows[i - 1]] = (cols[j - 1], score)
+    return assignment
@@ -22,6 +22,7 @@ from app.schemas.banking import (
     PaymentModeEnum, PaymentBatchTypeEnum,
     TransactionTypeEnum
 )
+from app.services.banking_reconciliation import ReconciliationEngine
 
 
 # ============= IFSC Code Database (Major Banks) =============
@@ -639,8 +640,11 @@ class BankingService:
 
         Matching logic:
         1. Exact match by reference number and amount
-        2. Match by amount and date (within tolerance)
-        3. Fuzzy match by amount, date range, and partial description
+        2. Match by amount and date (within tolerance), using optimal
+           assignment so one early match cannot steal a better candidate
+
+        Both passes use hash/date indexes (see ReconciliationEngine), so
+        each book entry only examines candidates within tolerance.
 
         Args:
             book_entries: Entries from accounting system
@@ -651,96 +655,8 @@ class BankingService:
         Returns:
             List of ReconciliationMatch objects
         """
-        matches: List[ReconciliationMatch] = []
-        matched_book_ids: set = set()
-        matched_bank_ids: set = set()
-
-        # Sort entries by date
-        book_entries = sorted(book_entries, key=lambda x: x.get('date', date.min))
-        bank_entries = sorted(bank_entries, key=lambda x: x.get('date', date.min))
-
-        # Pass 1: Exact match by reference
-        for book in book_entries:
-            if book['id'] in matched_book_ids:
-                continue
-
-            book_ref = book.get('reference', '').strip().upper()
-            book_amount = Decimal(str(book.get('amount', 0)))
-
-            for bank in bank_entries:
-                if bank['id'] in matched_bank_ids:
-                    continue
-
-                bank_ref = bank.get('reference', '').strip().upper()
-                bank_amount = Decimal(str(bank.get('amount', 0)))
-
-                if book_ref and bank_ref and book_ref == bank_ref:
-                    if abs(book_amount - bank_amount) <= tolerance:
-                        matches.append(ReconciliationMatch(
-                            book_entry_id=book['id'],
-                            bank_entry_id=bank['id'],
-                            book_amount=book_amount,
-                            bank_amount=bank_amount,
-                            book_date=book.get('date'),
-                            bank_date=bank.get('date'),
-                            match_score=1.0,
-                            match_type="exact"
-                        ))
-                        matched_book_ids.add(book['id'])
-                        matched_bank_ids.add(bank['id'])
-                        break
-
-        # Pass 2: Match by amount and date
-        for book in book_entries:
-            if book['id'] in matched_book_ids:
-                continue
-
-            book_date = book.get('date')
-            book_amount = Decimal(str(book.get('amount', 0)))
-
-            best_match = None
-            best_score = 0
-
-            for bank in bank_entries:
-                if bank['id'] in matched_bank_ids:
-                    continue
-
-                bank_date = bank.get('date')
-                bank_amount = Decimal(str(bank.get('amount', 0)))
-
-                # Amount match
-                if abs(book_amount - bank_amount) > tolerance:
-                    continue
-
-                # Date match
-                if book_date and bank_date:
-                    date_diff = abs((book_date - bank_date).days)
-                    if date_diff > date_range:
-                        continue
-
-                    # Calculate score (higher is better)
-                    score = 1.0 - (date_diff / (date_range + 1))
-                    score *= (1 - float(abs(book_amount - bank_amount) / max(book_amount, Decimal("1"))))
-
-                    if score > best_score:
-                        best_score = score
-                        best_match = bank
-
-            if best_match and best_score >= 0.7:
-                matches.append(ReconciliationMatch(
-                    book_entry_id=book['id'],
-                    bank_entry_id=best_match['id'],
-                    book_amount=book_amount,
-                    bank_amount=Decimal(str(best_match.get('amount', 0))),
-                    book_date=book_date,
-                    bank_date=best_match.get('date'),
-                    match_score=best_score,
-                    match_type="amount_date"
-                ))
-                matched_book_ids.add(book['id'])
-                matched_bank_ids.add(best_match['id'])
-
-        return matches
+        engine = ReconciliationEngine(tolerance=tolerance, date_range=date_range)
+        return engine.reconcile(book_entries, bank_entries)
 
     # ============= Payment File Generation =============
 
@@ -34,6 +34,7 @@ from app.schemas.crm import (
     Customer360View, CustomerTransactionSummary,
     StateWiseDistribution, StateWiseReport
 )
+from app.services.sequence_service import SequenceService
 
 
 class CRMService:
@@ -526,21 +527,11 @@ class CRMService:
     @classmethod
     async def _generate_lead_number(cls, db: AsyncSession, company_id: UUID) -> str:
         """Generate unique lead number: LD-YYYYMM-XXXX."""
-        prefix = datetime.now().strftime("LD-%Y%m-")
-
-        result = await db.execute(
-            select(func.count())
-            .select_from(Lead)
-            .where(
-                and_(
-                    Lead.company_id == company_id,
-                    Lead.lead_number.like(f"{prefix}%")
-                )
-            )
+        numbers = await SequenceService.next_numbers(
+            db, company_id, "LD", "{prefix}-{period}-{value:04d}",
+            period=datetime.now().strftime("%Y%m")
         )
-        count = result.scalar() or 0
-
-        return f"{prefix}{(count + 1):04d}"
+        return numbers[0]
 
     # ========================================================================
     # Contact Management
@@ -1010,14 +1001,10 @@ class CRMService:
     @classmethod
     async def _generate_customer_code(cls, db: AsyncSession, company_id: UUID) -> str:
         """Generate unique customer code: CUST-XXXX."""
-        result = await db.execute(
-            select(func.count())
-            .select_from(Customer)
-            .where(Customer.company_id == company_id)
+        numbers = await SequenceService.next_numbers(
+            db, company_id, "CUST", "{prefix}-{value:04d}"
         )
-        count = result.scalar() or 0
-
-        return f"CUST-{(count + 1):04d}"
+        return numbers[0]
 
     # ========================================================================
     # Opportunity Management
@@ -1405,21 +1392,11 @@ class CRMService:
     @classmethod
     async def _generate_opportunity_number(cls, db: AsyncSession, company_id: UUID) -> str:
         """Generate unique opportunity number: OP-YYYYMM-XXXX."""
-        prefix = datetime.now().strftime("OP-%Y%m-")
-
-        result = await db.execute(
-            select(func.count())
-            .select_from(Opportunity)
-            .where(
-                and_(
-                    Opportunity.company_id == company_id,
-                    Opportunity.opportunity_number.like(f"{prefix}%")
-                )
-            )
+        numbers = await SequenceService.next_numbers(
+            db, company_id, "OP", "{prefix}-{period}-{value:04d}",
+            period=datetime.now().strftime("%Y%m")
         )
-        count = result.scalar() or 0
-
-        return f"{prefix}{(count + 1):04d}"
+        return numbers[0]
 
     # ========================================================================
     # Activity Management
@@ -3,7 +3,7 @@ Exchange Rate Service - Multi-Currency Module (MOD-19)
 """
 from datetime import datetime, date, timedelta
 from decimal import Decimal
-from typing import List, Optional, Tuple, Dict
+from typing import List, Optional, Sequence, Tuple, Dict
 from uuid import UUID, uuid4
 
 from sqlalchemy import select, and_, func
@@ -18,6 +18,7 @@ from app.schemas.currency import (
     ExchangeRateCreate, ExchangeRateUpdate,
     CurrencyConversionRequest, CurrencyConversionResponse
 )
+from app.services.currency.rate_table import get_rate_table
 
 
 class ExchangeRateService:
@@ -86,49 +87,31 @@ class ExchangeRateService:
         rate_date: Optional[date] = None,
         rate_type: ExchangeRateType = ExchangeRateType.SPOT
     ) -> Optional[Decimal]:
-        """Get exchange rate between currencies."""
-        if rate_date is None:
-            rate_date = date.today()
+        """
+        Get exchange rate between currencies.
 
-        # Try direct rate
-        result = await db.execute(
-            select(ExchangeRate).where(
-                and_(
-                    ExchangeRate.company_id == company_id,
-                    ExchangeRate.from_currency_id == from_currency_id,
-                    ExchangeRate.to_currency_id == to_currency_id,
-                    ExchangeRate.rate_type == rate_type,
-                    ExchangeRate.effective_date <= rate_date,
-                    ExchangeRate.is_active == True,
-                    (ExchangeRate.expiry_date.is_(None)) | (ExchangeRate.expiry_date >= rate_date)
-                )
-            ).order_by(ExchangeRate.effective_date.desc()).limit(1)
-        )
-        rate = result.scalar_one_or_none()
-
-        if rate:
-            return rate.rate
-
-        # Try inverse rate
-        result = await db.execute(
-            select(ExchangeRate).where(
-                and_(
-                    ExchangeRate.company_id == company_id,
-                    ExchangeRate.from_currency_id == to_currency_id,
-                    ExchangeRate.to_currency_id == from_currency_id,
-                    ExchangeRate.rate_type == rate_type,
-                    ExchangeRate.effective_date <= rate_date,
-                    ExchangeRate.is_active == True,
-                    (ExchangeRate.expiry_date.is_(None)) | (ExchangeRate.expiry_date >= rate_date)
-                )
-            ).order_by(ExchangeRate.effective_date.desc()).limit(1)
-        )
-        rate = result.scalar_one_or_none()
+        Direct, inverse and cross rates (through the functional currency)
+        come from the company's cached rate table.
+        """
+        table = await get_rate_table(db, company_id, rate_type)
+        return table.rate(from_currency_id, to_currency_id, rate_date or date.today())
 
-        if rate and rate.rate > 0:
-            return Decimal('1') / rate.rate
-
-        return None
+    @staticmethod
+    async def convert_many(
+        db: AsyncSession,
+        company_id: UUID,
+        items: Sequence[Tuple[Decimal, UUID, date]],
+        to_currency_id: Optional[UUID] = None,
+        rate_type: ExchangeRateType = ExchangeRateType.SPOT
+    ) -> List[Optional[Decimal]]:
+        """
+        Convert (amount, currency_id, rate_date) items in one pass.
+
+        Amounts are converted to to_currency_id (default: the functional
+        currency) and rounded to 2 places; items without a rate give None.
+        """
+        table = await get_rate_table(db, company_id, rate_type)
+        return table.convert_many(items, to_currency_id)
 
     @staticmethod
     async def list_exchange_rates(
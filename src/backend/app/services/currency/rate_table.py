@@ -0,0 +1,200 @@
+"""
+Exchange Rate Tables - Multi-Currency Module (MOD-19)
+Cached per-company rate tables
+
+Rates are quoted per currency against a base currency (1 foreign = X base).
+A table holds every active rate of one company and rate type as sorted
+effective-date arrays, so a lookup is a bisect and a cross rate is two
+lookups through a common base currency.
+"""
+import time
+from bisect import bisect_right
+from collections import Counter, OrderedDict
+from datetime import date
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import and_, event, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.currency import CompanyCurrency, Currency, ExchangeRate, ExchangeRateType
+
+
+# Tables kept per process, keyed by (company, rate type)
+RATE_CACHE_SIZE = 1024
+
+# Rates entered through other processes are picked up after this many seconds
+RATE_CACHE_TTL_SECONDS = 300
+
+ONE = Decimal("1")
+
+# (currency_id, base_currency_id, rate_date, rate, company-specific)
+RateRow = Tuple[UUID, UUID, date, Decimal, bool]
+
+
+class RateTable:
+    """
+    Exchange rates of one company for one rate type.
+
+    Each (currency, base currency) series is a pair of parallel lists:
+    effective dates as ordinals, ascending, and the rates from that date.
+    Company rates replace the shared (company-less) series of the same
+    pair.
+    """
+
+    __slots__ = ("series", "bases", "base_currency_id", "loaded_at")
+
+    def __init__(self, rows: Iterable[RateRow], base_currency_id: Optional[UUID], loaded_at: float):
+        by_pair: Dict[Tuple[UUID, UUID], Dict[bool, Dict[int, Decimal]]] = {}
+        for currency_id, base_id, rate_date, rate, own in rows:
+            if rate and rate > 0:
+                by_pair.setdefault((currency_id, base_id), {}).setdefault(own, {})[rate_date.toordinal()] = rate
+
+        self.series: Dict[Tuple[UUID, UUID], Tuple[List[int], List[Decimal]]] = {}
+        base_counts: Counter = Counter()
+        for pair, sources in by_pair.items():
+            rates = sources.get(True) or sources[False]
+            days = sorted(rates)
+            self.series[pair] = (days, [rates[day] for day in days])
+            base_counts[pair[1]] += 1
+
+        # The functional currency is tried first, then the most quoted bases
+        if base_currency_id is None and base_counts:
+            base_currency_id = base_counts.most_common(1)[0][0]
+        self.base_currency_id = base_currency_id
+        self.bases = sorted(base_counts, key=lambda base: (base != base_currency_id, -base_counts[base]))
+        self.loaded_at = loaded_at
+
+    def _to_base(self, currency_id: UUID, base_id: UUID, day: int) -> Optional[Decimal]:
+        """Value of 1 unit of a currency in a base currency on a day ordinal."""
+        if currency_id == base_id:
+            return ONE
+        series = self.series.get((currency_id, base_id))
+        if series is None:
+            return None
+        position = bisect_right(series[0], day) - 1
+        return series[1][position] if position >= 0 else None
+
+    def rate(self, from_currency_id: UUID, to_currency_id: UUID, on: date) -> Optional[Decimal]:
+        """
+        Value of 1 unit of from_currency in to_currency on a date.
+
+        Direct, inverse and cross rates are all the ratio of the two
+        currencies' values in a common base currency.
+        """
+        if from_currency_id == to_currency_id:
+            return ONE
+        day = on.toordinal()
+        for base_id in self.bases:
+            from_value = self._to_base(from_currency_id, base_id, day)
+            if from_value is None:
+                continue
+            to_value = self._to_base(to_currency_id, base_id, day)
+            if to_value is not None:
+                return from_value if to_value == ONE else from_value / to_value
+        return None
+
+    def convert_many(
+        self,
+        items: Iterable[Tuple[Decimal, UUID, date]],
+        to_currency_id: Optional[UUID] = None
+    ) -> List[Optional[Decimal]]:
+        """
+        Convert (amount, currency_id, rate_date) items to one currency
+        (the functional currency by default), rounded to 2 places.
+
+        Items without a rate convert to None. Rates are looked up once per
+        (currency, date).
+        """
+        to_currency_id = to_currency_id or self.base_currency_id
+        rates: Dict[Tuple[UUID, date], Optional[Decimal]] = {}
+        converted: List[Optional[Decimal]] = []
+        for amount, currency_id, rate_date in items:
+            key = (currency_id, rate_date)
+            if key not in rates:
+                rates[key] = self.rate(currency_id, to_currency_id, rate_date) if to_currency_id else None
+            rate = rates[key]
+            converted.append(None if rate is None else (Decimal(amount) * rate).quantize(Decimal("0.01")))
+        return converted
+
+
+_rate_tables: "OrderedDict[Tuple[str, ExchangeRateType], RateTable]" = OrderedDict()
+
+
+def invalidate_rate_tables(company_id: Any = None) -> None:
+    """Drop cached tables of a company, or all tables (shared rates changed)."""
+    if company_id is None:
+        _rate_tables.clear()
+        return
+    company_key = str(company_id)
+    for key in [k for k in _rate_tables if k[0] == company_key]:
+        del _rate_tables[key]
+
+
+@event.listens_for(ExchangeRate, "after_insert")
+@event.listens_for(ExchangeRate, "after_update")
+@event.listens_for(ExchangeRate, "after_delete")
+def _invalidate_on_rate_change(mapper, connection, target) -> None:
+    invalidate_rate_tables(target.company_id)
+
+
+@event.listens_for(CompanyCurrency, "after_insert")
+@event.listens_for(CompanyCurrency, "after_update")
+@event.listens_for(CompanyCurrency, "after_delete")
+def _invalidate_on_base_currency_change(mapper, connection, target) -> None:
+    invalidate_rate_tables(target.company_id)
+
+
+async def get_rate_table(
+    db: AsyncSession,
+    company_id: UUID,
+    rate_type: ExchangeRateType = ExchangeRateType.SPOT
+) -> RateTable:
+    """
+    Rate table of a company, loaded with one query for the rates and one
+    for the functional currency when not cached (or older than
+    RATE_CACHE_TTL_SECONDS).
+    """
+    now = time.monotonic()
+    key = (str(company_id), rate_type)
+    table = _rate_tables.get(key)
+    if table is not None and now - table.loaded_at < RATE_CACHE_TTL_SECONDS:
+        _rate_tables.move_to_end(key)
+        return table
+
+    result = await db.execute(
+        select(
+            ExchangeRate.currency_id, Currency.id, ExchangeRate.rate_date,
+            ExchangeRate.exchange_rate, ExchangeRate.company_id
+        )
+        .join(Currency, Currency.code == ExchangeRate.base_currency_code)
+        .where(
+            and_(
+                or_(ExchangeRate.company_id == company_id, ExchangeRate.company_id.is_(None)),
+                ExchangeRate.rate_type == rate_type,
+                ExchangeRate.is_active == True
+            )
+        )
+        .order_by(ExchangeRate.rate_date, ExchangeRate.created_at)
+    )
+    rows = [
+        (currency_id, base_id, rate_date, rate, owner is not None)
+        for currency_id, base_id, rate_date, rate, owner in result
+    ]
+
+    base_currency_id = await db.scalar(
+        select(CompanyCurrency.currency_id).where(
+            and_(
+                CompanyCurrency.company_id == company_id,
+                CompanyCurrency.is_base_currency == True,
+                CompanyCurrency.is_active == True
+            )
+        ).limit(1)
+    )
+
+    table = _rate_tables[key] = RateTable(rows, base_currency_id, now)
+    _rate_tables.move_to_end(key)
+    while len(_rate_tables) > RATE_CACHE_SIZE:
+        _rate_tables.popitem(last=False)
+    return table
@@ -3,7 +3,7 @@ Revaluation Service - Multi-Currency Module (MOD-19)
 """
 from datetime import datetime, date
 from decimal import Decimal
-from typing import List, Optional, Tuple
+from typing import List, Optional, Sequence, Tuple
 from uuid import UUID, uuid4
 
 from sqlalchemy import select, and_, func
@@ -12,6 +12,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.currency import CurrencyRevaluation, CurrencyRevaluationItem, ExchangeRateType
 from app.schemas.currency import CurrencyRevaluationCreate, CurrencyRevaluationUpdate
 from app.core.datetime_utils import utc_now
+from app.services.currency.exchange_rate_service import ExchangeRateService
 
 
 class RevaluationService:
@@ -231,3 +232,27 @@ class RevaluationService:
         original_base = balance * original_rate
         current_base = balance * current_rate
         return current_base - original_base
+
+    @staticmethod
+    async def calculate_unrealized_gain_loss_many(
+        db: AsyncSession,
+        company_id: UUID,
+        items: Sequence[Tuple[UUID, Decimal, Decimal]],
+        revaluation_date: date,
+        rate_type: ExchangeRateType = ExchangeRateType.SPOT
+    ) -> List[Optional[Decimal]]:
+        """
+        Unrealized gain/loss of (currency_id, balance, original_rate) items
+        at the revaluation date, priced together from the rate table.
+
+        Items without a rate for the date give None.
+        """
+        current = await ExchangeRateService.convert_many(
+            db, company_id,
+            [(balance, currency_id, revaluation_date) for currency_id, balance, _ in items],
+            rate_type=rate_type
+        )
+        return [
+            None if current_base is None else current_base - (balance * original_rate).quantize(Decimal('0.01'))
+            for (_, balance, original_rate), current_base in zip(items, current)
+        ]
@@ -1,4 +1,5 @@
 """Email service package - BE-036."""
 from app.services.email.email_service import EmailService
+from app.services.email.bulk_sender import BulkEmailSender, compile_email_template
 
-__all__ = ["EmailService"]
+__all__ = ["EmailService", "BulkEmailSender", "compile_email_template"]
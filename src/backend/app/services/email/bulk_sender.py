@@ -0,0 +1,391 @@
+"""
+Bulk Email Delivery - BE-036
+Send thousands of emails (e.g. a payroll run's payslips) over pooled SMTP connections
+
+Each of a few worker coroutines owns one persistent SMTP connection and
+sends message after message on it, with RSET in between, instead of
+connecting, negotiating TLS and logging in per message. Connections are
+recycled after a number of messages (relays cap messages per session).
+A per-relay throttle spaces out messages, transient (4xx) failures are
+retried with backoff, and permanent (5xx) ones are reported. smtplib's
+blocking calls run in threads, one per connection.
+"""
+import asyncio
+import calendar
+import smtplib
+import time
+from dataclasses import dataclass
+from typing import Any, AsyncIterable, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+import jinja2
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.services.email.email_service import EmailConfig, EmailMessage, EmailService, open_smtp
+from app.services.pdf.bulk_renderer import BulkRenderer, count_payslips, iter_payslip_jobs
+
+
+# Connections (and concurrent sends) per relay
+SMTP_POOL_SIZE = 4
+
+# Messages sent on a connection before it is replaced
+MESSAGES_PER_CONNECTION = 100
+
+# Messages per second per relay (None: unthrottled)
+SMTP_RATE_PER_SECOND: Optional[float] = 20.0
+
+# Attempts per message for transient failures
+MAX_SEND_ATTEMPTS = 3
+
+# Wait before the first retry (doubles per attempt)
+RETRY_DELAY_SECONDS = 2.0
+
+# Payslips rendered (and held in memory) per batch when emailing a run
+PAYSLIP_EMAIL_PAGE_SIZE = 200
+
+Messages = Union[Iterable[EmailMessage], AsyncIterable[EmailMessage]]
+
+
+# =====================
+# Templates
+# =====================
+
+# HTML bodies are autoescaped; subjects and text bodies are plain text
+_html_environment = jinja2.Environment(autoescape=True, undefined=jinja2.ChainableUndefined)
+_text_environment = jinja2.Environment(autoescape=False, undefined=jinja2.ChainableUndefined)
+
+
+@dataclass
+class EmailTemplate:
+    """Subject and bodies of an email, compiled once and rendered per recipient."""
+    subject: jinja2.Template
+    body_html: jinja2.Template
+    body_text: Optional[jinja2.Template] = None
+
+    def message(
+        self,
+        to: List[str],
+        context: Dict[str, Any],
+        attachments: Optional[List[Dict[str, Any]]] = None,
+        **kwargs
+    ) -> EmailMessage:
+        return EmailMessage(
+            to=to,
+            # Line breaks in a subject would start new headers
+            subject=" ".join(self.subject.render(**context).split()),
+            body_html=self.body_html.render(**context),
+            body_text=self.body_text.render(**context) if self.body_text else None,
+            attachments=attachments,
+            **kwargs
+        )
+
+
+def compile_email_template(subject: str, body_html: str, body_text: Optional[str] = None) -> EmailTemplate:
+    return EmailTemplate(
+        subject=_text_environment.from_string(subject),
+        body_html=_html_environment.from_string(body_html),
+        body_text=_text_environment.from_string(body_text) if body_text else None,
+    )
+
+
+PAYSLIP_EMAIL_SUBJECT = "Payslip for {{ month_name }} {{ period.year }}"
+
+PAYSLIP_EMAIL_HTML = """
+<html>
+<body>
+    <p>Dear {{ employee.name }},</p>
+    <p>Please find attached your payslip for {{ month_name }} {{ period.year }}.</p>
+    <p>Best regards,<br>HR Team</p>
+</body>
+</html>
+"""
+
+
+# =====================
+# Delivery
+# =====================
+
+def is_transient(error: Exception) -> bool:
+    """Whether a send failure is worth retrying (4xx replies, dropped connections)."""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(400 <= code < 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    return isinstance(error, (smtplib.SMTPServerDisconnected, OSError))
+
+
+def _error_code(error: Exception) -> Optional[int]:
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return max(code for code, _ in error.recipients.values())
+    return getattr(error, "smtp_code", None)
+
+
+class SMTPConnection:
+    """
+    One persistent SMTP session. Blocking; used from one thread at a time.
+
+    Before each message after the first the session is reset (RSET), and
+    after max_messages it is replaced by a new one.
+    """
+
+    def __init__(self, config: EmailConfig, max_messages: int = MESSAGES_PER_CONNECTION):
+        self.config = config
+        self.max_messages = max_messages
+        self.connects = 0
+        self._server: Optional[smtplib.SMTP] = None
+        self._sent = 0
+
+    def _connect(self) -> None:
+        self.close()
+        self._server = open_smtp(self.config)
+        self.connects += 1
+        self._sent = 0
+
+    def send(self, message: str, recipients: List[str]) -> Dict[str, Tuple[int, bytes]]:
+        """Send one message; returns the recipients the relay refused."""
+        if self._server is None or self._sent >= self.max_messages:
+            self._connect()
+        elif self._sent:
+            try:
+                self._server.rset()
+            except smtplib.SMTPException:
+                # The relay dropped or soured the idle session
+                self._connect()
+        refused = self._server.sendmail(self.config.from_email, recipients, message)
+        self._sent += 1
+        return refused
+
+    def discard(self) -> None:
+        """Forget a session in an unknown state after a failure."""
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+
+    def close(self) -> None:
+        if self._server is not None:
+            try:
+                self._server.quit()
+            except smtplib.SMTPException:
+                self._server.close()
+            except OSError:
+                pass
+            self._server = None
+
+
+class Throttle:
+    """Spaces out events to at most rate per second."""
+
+    def __init__(self, rate: Optional[float]):
+        self.interval = 1 / rate if rate else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            if self._next > now:
+                await asyncio.sleep(self._next - now)
+            self._next = max(now, self._next) + self.interval
+
+
+class BulkEmailSender:
+    """
+    Pool of SMTP connections to one relay sending many messages.
+
+    Use as an async context manager, so the connections are closed:
+
+        async with BulkEmailSender(config) as sender:
+            result = await sender.send_many(messages)
+    """
+
+    def __init__(
+        self,
+        config: EmailConfig,
+        connections: int = SMTP_POOL_SIZE,
+        rate_per_second: Optional[float] = SMTP_RATE_PER_SECOND,
+        messages_per_connection: int = MESSAGES_PER_CONNECTION,
+        max_attempts: int = MAX_SEND_ATTEMPTS,
+        retry_delay: float = RETRY_DELAY_SECONDS,
+    ):
+        self.config = config
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self._builder = EmailService(config)
+        self._throttle = Throttle(rate_per_second)
+        self._connections = [SMTPConnection(config, messages_per_connection) for _ in range(max(connections, 1))]
+
+    async def __aenter__(self) -> "BulkEmailSender":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        await asyncio.gather(*(asyncio.to_thread(c.close) for c in self._connections))
+
+    @property
+    def connects(self) -> int:
+        """SMTP sessions opened so far."""
+        return sum(c.connects for c in self._connections)
+
+    async def send_many(
+        self,
+        messages: Messages,
+        progress: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> Dict[str, Any]:
+        """
+        Send messages over the pool; returns counts and the failed messages.
+
+        progress(result) is called after every message.
+        """
+        result: Dict[str, Any] = {"sent": 0, "failed": 0, "retries": 0, "refused": [], "failures": []}
+        jobs: asyncio.Queue = asyncio.Queue(maxsize=2 * len(self._connections))
+
+        async def work(connection: SMTPConnection) -> None:
+            while True:
+                message = await jobs.get()
+                try:
+                    if message is None:
+                        return
+                    await self._deliver(connection, message, result)
+                    if progress:
+                        progress(result)
+                finally:
+                    jobs.task_done()
+
+        workers = [asyncio.create_task(work(connection)) for connection in self._connections]
+        try:
+            if hasattr(messages, "__aiter__"):
+                async for message in messages:
+                    await jobs.put(message)
+            else:
+                for message in messages:
+                    await jobs.put(message)
+            for _ in workers:
+                await jobs.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            for worker in workers:
+                worker.cancel()
+        return result
+
+    async def _deliver(self, connection: SMTPConnection, message: EmailMessage, result: Dict[str, Any]) -> None:
+        try:
+            msg, recipients = self._builder.build_message(message)
+            payload = msg.as_string()
+        except (ValueError, OSError) as e:
+            result["failed"] += 1
+            result["failures"].append({"to": message.to, "code": None, "error": str(e)})
+            return
+
+        for attempt in range(1, self.max_attempts + 1):
+            await self._throttle.wait()
+            try:
+                refused = await asyncio.to_thread(connection.send, payload, recipients)
+            except Exception as e:
+                if not isinstance(e, smtplib.SMTPResponseException) or e.smtp_code in (421, 451):
+                    # Session state is unknown, or the relay is closing it
+                    await asyncio.to_thread(connection.discard)
+                if is_transient(e) and attempt < self.max_attempts:
+                    result["retries"] += 1
+                    await asyncio.sleep(self.retry_delay * 2 ** (attempt - 1))
+                    continue
+                result["failed"] += 1
+                result["failures"].append({"to": message.to, "code": _error_code(e), "error": str(e)})
+                return
+            result["sent"] += 1
+            if refused:
+                result["refused"].extend(
+                    {"recipient": recipient, "code": code} for recipient, (code, _) in refused.items()
+                )
+            return
+
+
+# =====================
+# Payroll payslips
+# =====================
+
+class _CollectingSink:
+    """Keeps rendered documents in memory, in rendering order."""
+
+    def __init__(self):
+        self.documents: List[Tuple[str, bytes]] = []
+
+    def write(self, path: str, content: bytes) -> None:
+        self.documents.append((path, content))
+
+    def close(self) -> None:
+        pass
+
+
+def _payslip_messages(template: EmailTemplate, jobs: List[Any], documents: List[Tuple[str, bytes]]):
+    for (_, _, context), (_, pdf) in zip(jobs, documents):
+        period = context["period"]
+        yield template.message(
+            [context["employee"]["email"]],
+            {**context, "month_name": calendar.month_name[period["month"]]},
+            attachments=[{"content": pdf, "filename": f"payslip_{period['year']}_{period['month']:02d}.pdf"}],
+        )
+
+
+async def email_payroll_payslips(
+    db: AsyncSession,
+    payroll_run_id: Any,
+    company_id: Any,
+    company_data: Dict[str, Any],
+    sender: BulkEmailSender,
+    workers: Optional[int] = None,
+    page_size: int = PAYSLIP_EMAIL_PAGE_SIZE,
+    progress: Optional[Callable[[int, int], None]] = None
+) -> Dict[str, Any]:
+    """
+    Render every payslip of a payroll run and email it to the employee.
+
+    Pages of payslips are rendered in the renderer's process pool while
+    the previous page is being sent. Employees without an email address
+    are listed in no_email. progress(processed, total) is called per page.
+    """
+    template = compile_email_template(PAYSLIP_EMAIL_SUBJECT, PAYSLIP_EMAIL_HTML)
+    total = await count_payslips(db, payroll_run_id, company_id)
+    summary: Dict[str, Any] = {
+        "payroll_run_id": str(payroll_run_id), "total": total, "sent": 0, "failed": 0,
+        "retries": 0, "no_email": [], "refused": [], "failures": [],
+    }
+    processed = 0
+
+    def render(renderer: BulkRenderer, jobs: List[Any]) -> List[Tuple[str, bytes]]:
+        sink = _CollectingSink()
+        renderer.render(jobs, sink)
+        return sink.documents
+
+    async def collect(sending: "asyncio.Task[Dict[str, Any]]", count: int) -> None:
+        nonlocal processed
+        result = await sending
+        for key in ("sent", "failed", "retries"):
+            summary[key] += result[key]
+        summary["refused"].extend(result["refused"])
+        summary["failures"].extend(result["failures"])
+        processed += count
+        if progress:
+            progress(processed, total)
+
+    sending, sending_count = None, 0
+    with BulkRenderer(workers) as renderer:
+        try:
+            async for jobs in iter_payslip_jobs(db, payroll_run_id, company_id, company_data, page_size):
+                addressed = [job for job in jobs if job[2]["employee"]["email"]]
+                summary["no_email"].extend(job[2]["employee"]["id"] for job in jobs if not job[2]["employee"]["email"])
+                documents = await asyncio.to_thread(render, renderer, addressed)
+                if sending is not None:
+                    await collect(sending, sending_count)
+                sending = asyncio.create_task(sender.send_many(_payslip_messages(template, addressed, documents)))
+                sending_count = len(jobs)
+            if sending is not None:
+                await collect(sending, sending_count)
+                sending = None
+        finally:
+            if sending is not None:
+                sending.cancel()
+
+    return summary
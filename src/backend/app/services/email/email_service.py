@@ -9,7 +9,7 @@ from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.base import MIMEBase
 from email import encoders
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from dataclasses import dataclass
 from pathlib import Path
 import jinja2
@@ -30,8 +30,27 @@ class EmailConfig:
     smtp_user: str = ""
     smtp_password: str = ""
     use_tls: bool = True
+    use_ssl: bool = False  # Implicit TLS (port 465) instead of STARTTLS
     from_email: str = ""
     from_name: str = "GanaPortal"
+    timeout: float = 30.0
+
+
+def open_smtp(config: EmailConfig) -> smtplib.SMTP:
+    """Connect, secure and log in to the configured SMTP relay."""
+    if config.use_ssl:
+        server = smtplib.SMTP_SSL(config.smtp_host, config.smtp_port, timeout=config.timeout)
+    else:
+        server = smtplib.SMTP(config.smtp_host, config.smtp_port, timeout=config.timeout)
+    try:
+        if config.use_tls and not config.use_ssl:
+            server.starttls()
+        if config.smtp_user:
+            server.login(config.smtp_user, config.smtp_password)
+    except Exception:
+        server.close()
+        raise
+    return server
 
 
 @dataclass
@@ -65,13 +84,8 @@ class EmailService:
             autoescape=True
         )
 
-    def send_email(self, message: EmailMessage) -> Dict[str, Any]:
-        """
-        Send an email.
-
-        Returns:
-            Dictionary with success status and message ID
-        """
+    def build_message(self, message: EmailMessage) -> Tuple[MIMEMultipart, List[str]]:
+        """MIME message and envelope recipients (To, Cc and Bcc) of an email."""
         msg = MIMEMultipart("alternative")
         msg["Subject"] = message.subject
         msg["From"] = f"{self.config.from_name} <{self.config.from_email}>"
@@ -102,11 +116,21 @@ class EmailService:
         if message.bcc:
             recipients.extend(message.bcc)
 
+        return msg, recipients
+
+    def send_email(self, message: EmailMessage) -> Dict[str, Any]:
+        """
+        Send an email over a connection of its own.
+
+        For many messages use BulkEmailSender, which keeps connections open.
+
+        Returns:
+            Dictionary with success status and message ID
+        """
+        msg, recipients = self.build_message(message)
+
         try:
-            with smtplib.SMTP(self.config.smtp_host, self.config.smtp_port) as server:
-                if self.config.use_tls:
-                    server.starttls()
-                server.login(self.config.smtp_user, self.config.smtp_password)
+            with open_smtp(self.config) as server:
                 server.sendmail(self.config.from_email, recipients, msg.as_string())
 
             return {"success": True, "message": "Email sent successfully"}
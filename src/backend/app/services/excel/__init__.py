@@ -1,4 +1,15 @@
 """Excel service package - BE-038."""
 from app.services.excel.excel_service import ExcelService
+from app.services.excel.streaming_export import (
+    MEDIA_TYPES, export_format, iter_export, stream_query, stream_rows, write_export
+)
 
-__all__ = ["ExcelService"]
+__all__ = [
+    "ExcelService",
+    "MEDIA_TYPES",
+    "export_format",
+    "iter_export",
+    "stream_query",
+    "stream_rows",
+    "write_export",
+]
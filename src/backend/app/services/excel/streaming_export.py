@@ -0,0 +1,267 @@
+"""
+Streaming Export - BE-038
+CSV and XLSX exports written row by row
+
+Rows come from an iterable or async iterable (usually a server-side cursor
+over a query), and only one chunk of output is held at a time: CSV is
+yielded as it is written, XLSX is written by openpyxl's write-only
+workbook into a temporary file that is then read back in chunks. Memory
+stays flat whatever the number of rows. The workbook is built in a worker
+thread so large XLSX exports do not stall the event loop.
+"""
+import asyncio
+import csv
+import io
+import tempfile
+from datetime import date, datetime
+from decimal import Decimal
+from enum import Enum
+from typing import Any, AsyncIterable, AsyncIterator, BinaryIO, Iterable, List, Mapping, Sequence, Tuple, Union
+from uuid import UUID
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select
+
+
+# Rows fetched per round trip from the server-side cursor
+EXPORT_FETCH_ROWS = 1000
+
+# Bytes of output buffered before a chunk is yielded
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+# Excel's row limit per worksheet; larger exports continue on a new sheet
+XLSX_MAX_ROWS = 1_048_576
+
+CSV, XLSX = "csv", "xlsx"
+
+MEDIA_TYPES = {
+    CSV: "text/csv",
+    XLSX: "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+NUMBER_FORMATS = {
+    "currency": "#,##0.00",
+    "number": "#,##0.##",
+    "date": "yyyy-mm-dd",
+}
+
+Rows = Union[Iterable[Mapping[str, Any]], AsyncIterable[Mapping[str, Any]]]
+
+# (key, label, data_type)
+ExportColumn = Tuple[str, str, str]
+
+
+def export_format(output_format: Any) -> str:
+    """csv or xlsx for an output format name or enum ("excel" is xlsx)."""
+    name = str(getattr(output_format, "value", output_format)).lower()
+    if name == CSV:
+        return CSV
+    if name in (XLSX, "excel"):
+        return XLSX
+    raise ValueError(f"Unsupported export format: {name}")
+
+
+def export_columns(columns: Sequence[Any]) -> List[ExportColumn]:
+    """Column dicts ({"key", "label"}) or ColumnConfig objects as tuples."""
+    normalised = []
+    for column in columns:
+        if isinstance(column, Mapping):
+            normalised.append((column["key"], column.get("label", column["key"]), column.get("data_type", "string")))
+        elif getattr(column, "visible", True):
+            normalised.append((column.key, column.label, column.data_type))
+    return normalised
+
+
+def _xlsx_value(value: Any) -> Any:
+    if value is None or isinstance(value, (str, int, float, Decimal, date, datetime)):
+        if isinstance(value, datetime) and value.tzinfo is not None:
+            return value.replace(tzinfo=None)
+        return value
+    if isinstance(value, Enum):
+        return value.value
+    return str(value)
+
+
+def _csv_value(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, UUID):
+        return str(value)
+    return value
+
+
+async def _aiter(rows: Rows) -> AsyncIterator[Mapping[str, Any]]:
+    if hasattr(rows, "__aiter__"):
+        async for row in rows:
+            yield row
+    else:
+        for row in rows:
+            yield row
+
+
+async def stream_rows(
+    db: AsyncSession,
+    statement: Select,
+    fetch_rows: int = EXPORT_FETCH_ROWS
+) -> AsyncIterator[Mapping[str, Any]]:
+    """Rows of a query as mappings, read through a server-side cursor."""
+    result = await db.stream(statement.execution_options(yield_per=fetch_rows))
+    async for row in result.mappings():
+        yield row
+
+
+async def stream_query(
+    statement: Select,
+    fetch_rows: int = EXPORT_FETCH_ROWS
+) -> AsyncIterator[Mapping[str, Any]]:
+    """
+    stream_rows in a session of its own, for response bodies that are
+    sent after the request's session has been closed.
+    """
+    from app.db.session import async_session_maker
+
+    async with async_session_maker() as session:
+        async for row in stream_rows(session, statement, fetch_rows):
+            yield row
+
+
+async def iter_csv(
+    rows: Rows,
+    columns: Sequence[Any],
+    chunk_bytes: int = EXPORT_CHUNK_BYTES
+) -> AsyncIterator[bytes]:
+    """UTF-8 CSV (with BOM, so Excel detects the encoding) in chunks."""
+    columns = export_columns(columns)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write("\ufeff")
+    writer.writerow([label for _, label, _ in columns])
+
+    async for row in _aiter(rows):
+        writer.writerow([_csv_value(row.get(key)) for key, _, _ in columns])
+        if buffer.tell() >= chunk_bytes:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+async def write_xlsx(
+    rows: Rows,
+    columns: Sequence[Any],
+    target: BinaryIO,
+    sheet_title: str = "Report",
+    max_rows: int = XLSX_MAX_ROWS,
+    page_rows: int = EXPORT_FETCH_ROWS
+) -> int:
+    """
+    Write rows to an XLSX file with a write-only workbook, one worksheet
+    per max_rows rows (header included). Returns the number of data rows.
+
+    openpyxl is synchronous: rows are handed to a worker thread page_rows
+    at a time so the event loop keeps serving other requests.
+    """
+    columns = export_columns(columns)
+    workbook = Workbook(write_only=True)
+    header_font = Font(bold=True)
+    formats = [NUMBER_FORMATS.get(data_type) for _, _, data_type in columns]
+
+    def add_sheet():
+        number = len(workbook.worksheets) + 1
+        sheet = workbook.create_sheet(title=sheet_title[:31] if number == 1 else f"{sheet_title[:24]} ({number})")
+        header = []
+        for _, label, _ in columns:
+            cell = WriteOnlyCell(sheet, value=label)
+            cell.font = header_font
+            header.append(cell)
+        sheet.append(header)
+        return sheet
+
+    sheet = add_sheet()
+    sheet_rows = 1
+    count = 0
+
+    def append_rows(page):
+        nonlocal sheet, sheet_rows, count
+        for row in page:
+            if sheet_rows >= max_rows:
+                sheet = add_sheet()
+                sheet_rows = 1
+            values = []
+            for (key, _, _), number_format in zip(columns, formats):
+                value = _xlsx_value(row.get(key))
+                if number_format is not None and value is not None:
+                    cell = WriteOnlyCell(sheet, value=value)
+                    cell.number_format = number_format
+                    value = cell
+                values.append(value)
+            sheet.append(values)
+            sheet_rows += 1
+            count += 1
+
+    # Rows are read on the event loop; building cells, compressing and
+    # saving are CPU work and run in a thread, one page at a time
+    page = []
+    async for row in _aiter(rows):
+        page.append(row)
+        if len(page) >= page_rows:
+            await asyncio.to_thread(append_rows, page)
+            page = []
+    if page:
+        await asyncio.to_thread(append_rows, page)
+
+    await asyncio.to_thread(workbook.save, target)
+    return count
+
+
+async def iter_xlsx(
+    rows: Rows,
+    columns: Sequence[Any],
+    sheet_title: str = "Report",
+    chunk_bytes: int = EXPORT_CHUNK_BYTES
+) -> AsyncIterator[bytes]:
+    """XLSX in chunks, built in a temporary file first (a zip needs its central directory last)."""
+    with tempfile.TemporaryFile() as spool:
+        await write_xlsx(rows, columns, spool, sheet_title)
+        spool.seek(0)
+        while True:
+            chunk = await asyncio.to_thread(spool.read, chunk_bytes)
+            if not chunk:
+                return
+            yield chunk
+
+
+def iter_export(
+    rows: Rows,
+    columns: Sequence[Any],
+    output_format: Any,
+    sheet_title: str = "Report"
+) -> AsyncIterator[bytes]:
+    """Chunks of a CSV or XLSX export, e.g. for a StreamingResponse."""
+    if export_format(output_format) == CSV:
+        return iter_csv(rows, columns)
+    return iter_xlsx(rows, columns, sheet_title)
+
+
+async def write_export(
+    rows: Rows,
+    columns: Sequence[Any],
+    output_format: Any,
+    target: BinaryIO,
+    sheet_title: str = "Report"
+) -> None:
+    """Write a CSV or XLSX export to a binary file object."""
+    if export_format(output_format) == XLSX:
+        await write_xlsx(rows, columns, target, sheet_title)
+        return
+    async for chunk in iter_csv(rows, columns):
+        target.write(chunk)
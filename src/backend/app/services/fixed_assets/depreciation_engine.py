@@ -0,0 +1,366 @@
+"""
+Depreciation Engine - Fixed Assets Module (MOD-20)
+Bulk depreciation over all assets of a company
+
+Money is held as integer paise in NumPy int64 arrays and every method is an
+exact integer ratio rounded half up, so a batch of thousands of assets is
+computed in a few array operations and matches the per-asset Decimal
+calculations in DepreciationService to the paisa.
+
+Each asset is carried forward from its latest depreciation entry, posted
+or not, and months that already have an entry are not depreciated again.
+"""
+import calendar
+from datetime import date
+from decimal import Decimal
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+from uuid import UUID, uuid4
+
+import numpy as np
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.fixed_assets import (
+    AssetDepreciation, AssetStatus, DepreciationMethod, DepreciationSchedule, FixedAsset
+)
+
+
+# Assets read, computed and inserted per batch
+DEPRECIATION_BATCH_SIZE = 5000
+
+# Annual rate of written down value depreciation (percent)
+WDV_RATE_PERCENT = 15
+
+# Method codes in AssetBatch.method; anything else depreciates straight-line
+STRAIGHT_LINE, WRITTEN_DOWN, DOUBLE_DECLINING, SUM_OF_YEARS = range(4)
+METHOD_CODES = {
+    DepreciationMethod.STRAIGHT_LINE: STRAIGHT_LINE,
+    DepreciationMethod.WRITTEN_DOWN: WRITTEN_DOWN,
+    DepreciationMethod.DOUBLE_DECLINING: DOUBLE_DECLINING,
+    DepreciationMethod.SUM_OF_YEARS: SUM_OF_YEARS,
+}
+
+# Columns read per asset
+ASSET_COLUMNS = (
+    FixedAsset.id, FixedAsset.asset_code, FixedAsset.name, FixedAsset.depreciation_method,
+    FixedAsset.depreciation_start_date, FixedAsset.useful_life_years, FixedAsset.useful_life_months,
+    FixedAsset.total_cost, FixedAsset.salvage_value, FixedAsset.book_value,
+    FixedAsset.accumulated_depreciation
+)
+
+
+def month_index(day: date) -> int:
+    """Months since year 0, so month arithmetic is integer subtraction."""
+    return day.year * 12 + day.month - 1
+
+
+def month_end(index: int) -> date:
+    year, month = divmod(index, 12)
+    return date(year, month + 1, calendar.monthrange(year, month + 1)[1])
+
+
+def to_paise_value(value: Any) -> int:
+    return int(Decimal(value or 0) * 100)
+
+
+def to_paise(values: Sequence[Any]) -> np.ndarray:
+    return np.fromiter((to_paise_value(value) for value in values), dtype=np.int64, count=len(values))
+
+
+def from_paise(value: Any) -> Decimal:
+    return Decimal(int(value)).scaleb(-2)
+
+
+def _ratio(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    """numerator / denominator rounded half up; 0 where the denominator is 0 or the ratio negative."""
+    valid = denominator > 0
+    safe = np.where(valid, denominator, 1)
+    return np.where(valid, np.maximum((2 * numerator + safe) // (2 * safe), 0), 0)
+
+
+class AssetBatch:
+    """Depreciation inputs of a batch of assets as parallel arrays."""
+
+    __slots__ = (
+        "ids", "codes", "names", "method", "start", "life_months", "life_years",
+        "cost", "salvage", "book", "accumulated", "recorded"
+    )
+
+    def __init__(self, rows: Sequence[Any]):
+        self.ids = [row.id for row in rows]
+        self.codes = [row.asset_code for row in rows]
+        self.names = [row.name for row in rows]
+        count = len(rows)
+        self.method = np.fromiter(
+            (METHOD_CODES.get(row.depreciation_method, STRAIGHT_LINE) for row in rows), dtype=np.int8, count=count
+        )
+        self.start = np.fromiter(
+            (month_index(row.depreciation_start_date) for row in rows), dtype=np.int64, count=count
+        )
+        self.life_years = np.fromiter((row.useful_life_years or 0 for row in rows), dtype=np.int64, count=count)
+        self.life_months = self.life_years * 12 + np.fromiter(
+            (row.useful_life_months or 0 for row in rows), dtype=np.int64, count=count
+        )
+        self.cost = to_paise([row.total_cost for row in rows])
+        self.salvage = to_paise([row.salvage_value for row in rows])
+        self.book = to_paise([row.book_value for row in rows])
+        self.accumulated = to_paise([row.accumulated_depreciation for row in rows])
+        # (asset position, month index) -> closing value (paise) of an entry already recorded
+        self.recorded: Dict[Tuple[int, int], int] = {}
+
+    def carry_forward(self, latest: Dict[UUID, Any], recorded: Sequence[Any]) -> None:
+        """
+        Open each asset at its latest earlier entry (closing value and
+        accumulated depreciation, posted or not) and note the months of
+        the period that already have an entry.
+        """
+        position = {asset_id: i for i, asset_id in enumerate(self.ids)}
+        for asset_id, entry in latest.items():
+            i = position[asset_id]
+            self.book[i] = to_paise_value(entry.closing_value)
+            self.accumulated[i] = to_paise_value(entry.accumulated_depreciation)
+        for entry in recorded:
+            self.recorded[position[entry.asset_id], month_index(entry.depreciation_date)] = (
+                to_paise_value(entry.closing_value)
+            )
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def monthly(self, book: np.ndarray, month: int) -> np.ndarray:
+        """
+        Depreciation (paise) of every asset for one month at the given book
+        values; never below 0 or past the salvage value.
+        """
+        depreciable = self.cost - self.salvage
+        years_done = np.maximum(month - self.start, 0) // 12
+        remaining_years = np.maximum(self.life_years - years_done, 0)
+
+        amount = np.select(
+            [
+                self.method == WRITTEN_DOWN,
+                self.method == DOUBLE_DECLINING,
+                self.method == SUM_OF_YEARS,
+            ],
+            [
+                _ratio(book * WDV_RATE_PERCENT, np.full_like(book, 1200)),
+                _ratio(book * 2, self.life_years * 12),
+                _ratio(depreciable * remaining_years, 6 * self.life_years * (self.life_years + 1)),
+            ],
+            default=_ratio(depreciable, self.life_months)
+        )
+        amount = np.minimum(amount, np.maximum(book - self.salvage, 0))
+        return np.where((self.start <= month) & (book > self.salvage), amount, 0)
+
+    def project(self, months: Sequence[int]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Depreciation and closing value matrices (months x assets), carrying
+        book values forward month by month. A month with a recorded entry
+        gets no new depreciation and closes at the recorded value.
+        """
+        shape = (len(months), len(self))
+        rows = {month: row for row, month in enumerate(months)}
+        recorded = np.zeros(shape, dtype=bool)
+        recorded_closing = np.zeros(shape, dtype=np.int64)
+        for (i, month), value in self.recorded.items():
+            if month in rows:
+                recorded[rows[month], i] = True
+                recorded_closing[rows[month], i] = value
+
+        schedule = np.zeros(shape, dtype=np.int64)
+        closing = np.zeros(shape, dtype=np.int64)
+        book = self.book.copy()
+        for row, month in enumerate(months):
+            schedule[row] = np.where(recorded[row], 0, self.monthly(book, month))
+            book = np.where(recorded[row], recorded_closing[row], book - schedule[row])
+            closing[row] = book
+        return schedule, closing
+
+
+async def iter_asset_batches(
+    db: AsyncSession,
+    company_id: UUID,
+    period_from: date,
+    period_to: date,
+    asset_ids: Optional[Sequence[UUID]] = None,
+    category_ids: Optional[Sequence[UUID]] = None,
+    batch_size: int = DEPRECIATION_BATCH_SIZE
+) -> AsyncIterator[AssetBatch]:
+    """
+    Active assets depreciating by period_to, in keyset-paged batches,
+    carried forward from their depreciation entries (see carry_forward).
+    A run repeated after a partial failure only fills in missing months.
+    """
+    filters = [
+        FixedAsset.company_id == company_id,
+        FixedAsset.status == AssetStatus.ACTIVE,
+        FixedAsset.depreciation_start_date <= period_to,
+        FixedAsset.deleted_at.is_(None)
+    ]
+    if asset_ids:
+        filters.append(FixedAsset.id.in_(asset_ids))
+    if category_ids:
+        filters.append(FixedAsset.category_id.in_(category_ids))
+
+    # Entries are matched by month, so one dated earlier in the first month still counts
+    first_day = period_from.replace(day=1)
+    last_id = None
+    while True:
+        query = select(*ASSET_COLUMNS).where(*filters)
+        if last_id is not None:
+            query = query.where(FixedAsset.id > last_id)
+        rows = (await db.execute(query.order_by(FixedAsset.id).limit(batch_size))).all()
+        if not rows:
+            return
+
+        batch = AssetBatch(rows)
+        latest = (await db.execute(
+            select(
+                AssetDepreciation.asset_id,
+                AssetDepreciation.closing_value,
+                AssetDepreciation.accumulated_depreciation
+            )
+            .where(
+                AssetDepreciation.asset_id.in_(batch.ids),
+                AssetDepreciation.depreciation_date < first_day
+            )
+            .distinct(AssetDepreciation.asset_id)
+            .order_by(
+                AssetDepreciation.asset_id,
+                AssetDepreciation.depreciation_date.desc(),
+                AssetDepreciation.created_at.desc()
+            )
+        )).all()
+        recorded = (await db.execute(
+            select(
+                AssetDepreciation.asset_id,
+                AssetDepreciation.depreciation_date,
+                AssetDepreciation.closing_value
+            )
+            .where(
+                AssetDepreciation.asset_id.in_(batch.ids),
+                AssetDepreciation.depreciation_date >= first_day,
+                AssetDepreciation.depreciation_date <= period_to
+            )
+            # The last entry of a month wins
+            .order_by(AssetDepreciation.depreciation_date, AssetDepreciation.created_at)
+        )).all()
+        batch.carry_forward({entry.asset_id: entry for entry in latest}, recorded)
+        yield batch
+        last_id = rows[-1].id
+
+
+async def run_bulk_depreciation(
+    db: AsyncSession,
+    company_id: UUID,
+    user_id: Optional[UUID],
+    period_from: date,
+    period_to: date,
+    fiscal_year: str,
+    asset_ids: Optional[Sequence[UUID]] = None,
+    category_ids: Optional[Sequence[UUID]] = None,
+    preview_only: bool = True,
+    batch_size: int = DEPRECIATION_BATCH_SIZE
+) -> Dict[str, Any]:
+    """
+    Depreciate assets for every month from period_from to period_to.
+
+    Preview runs (e.g. a whole fiscal year) write nothing. Otherwise one
+    AssetDepreciation per asset and month is bulk inserted, unposted, with
+    a DepreciationSchedule covering the run; book values change when the
+    schedule is posted. Returns the DepreciationRunResponse fields plus
+    monthly totals.
+    """
+    if period_to < period_from:
+        raise ValueError("period_to must not be before period_from")
+
+    months = list(range(month_index(period_from), month_index(period_to) + 1))
+    month_dates = [min(month_end(month), period_to) for month in months]
+    periods = [f"{day.year:04d}-{day.month:02d}" for day in month_dates]
+
+    schedule = None
+    if not preview_only:
+        schedule = DepreciationSchedule(
+            id=uuid4(),
+            company_id=company_id,
+            schedule_name=(
+                f"Depreciation {period_from.strftime('%B %Y')}" if len(months) == 1
+                else f"Depreciation {period_from.strftime('%b %Y')} - {period_to.strftime('%b %Y')}"
+            ),
+            fiscal_year=fiscal_year,
+            run_date=date.today(),
+            period_from=period_from,
+            period_to=period_to,
+            assets_processed=0,
+            total_depreciation=Decimal('0'),
+            status="preview",
+            created_by=user_id
+        )
+        db.add(schedule)
+        await db.flush()
+
+    monthly_totals = np.zeros(len(months), dtype=np.int64)
+    items: List[Dict[str, Any]] = []
+    assets_processed = 0
+
+    async for batch in iter_asset_batches(
+        db, company_id, period_from, period_to, asset_ids, category_ids, batch_size=batch_size
+    ):
+        schedule_matrix, closing = batch.project(months)
+        monthly_totals += schedule_matrix.sum(axis=1)
+        totals = schedule_matrix.sum(axis=0)
+        depreciated = np.nonzero(totals)[0]
+        assets_processed += len(depreciated)
+
+        for i in depreciated:
+            items.append({
+                "asset_id": batch.ids[i],
+                "asset_code": batch.codes[i],
+                "asset_name": batch.names[i],
+                "opening_value": from_paise(batch.book[i]),
+                "depreciation_amount": from_paise(totals[i]),
+                "closing_value": from_paise(closing[-1, i])
+            })
+
+        if preview_only:
+            continue
+
+        # Book value plus accumulated depreciation stays constant month to month
+        accumulated = batch.accumulated + (batch.book - closing)
+        rows = []
+        for m, i in zip(*np.nonzero(schedule_matrix)):
+            rows.append({
+                "company_id": company_id,
+                "asset_id": batch.ids[i],
+                "depreciation_date": month_dates[m],
+                "period": periods[m],
+                "fiscal_year": fiscal_year,
+                "opening_value": from_paise(closing[m, i] + schedule_matrix[m, i]),
+                "depreciation_amount": from_paise(schedule_matrix[m, i]),
+                "closing_value": from_paise(closing[m, i]),
+                "accumulated_depreciation": from_paise(accumulated[m, i]),
+                "posted": False
+            })
+        if rows:
+            await db.execute(insert(AssetDepreciation), rows)
+
+    total = from_paise(monthly_totals.sum())
+    if schedule is not None:
+        schedule.assets_processed = assets_processed
+        schedule.total_depreciation = total
+        await db.commit()
+
+    return {
+        "schedule_id": schedule.id if schedule is not None else None,
+        "period_from": period_from,
+        "period_to": period_to,
+        "fiscal_year": fiscal_year,
+        "assets_processed": assets_processed,
+        "total_depreciation": total,
+        "items": items,
+        "is_preview": preview_only,
+        "monthly_totals": [
+            {"period": period, "depreciation_amount": from_paise(amount)}
+            for period, amount in zip(periods, monthly_totals)
+        ]
+    }
@@ -3,10 +3,10 @@ Depreciation Service - Fixed Assets Module (MOD-20)
 """
 from datetime import datetime, date
 from decimal import Decimal, ROUND_HALF_UP
-from typing import List, Optional, Tuple
-from uuid import UUID, uuid4
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
 
-from sqlalchemy import select, and_, func
+from sqlalchemy import select, and_, func, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.datetime_utils import utc_now
@@ -14,7 +14,8 @@ from app.models.fixed_assets import (
     FixedAsset, AssetDepreciation, DepreciationSchedule,
     DepreciationMethod, AssetStatus
 )
-from app.schemas.fixed_assets import DepreciationScheduleCreate
+from app.schemas.fixed_assets import DepreciationRunRequest, DepreciationScheduleCreate
+from app.services.fixed_assets.depreciation_engine import run_bulk_depreciation
 
 
 class DepreciationService:
@@ -113,72 +114,50 @@ class DepreciationService:
         period_date: date,
         fiscal_year: str
     ) -> DepreciationSchedule:
-        """Run depreciation for all active assets."""
-        # Get all active assets
-        result = await db.execute(
-            select(FixedAsset).where(
-                and_(
-                    FixedAsset.company_id == company_id,
-                    FixedAsset.status == AssetStatus.ACTIVE,
-                    FixedAsset.depreciation_start_date <= period_date,
-                    FixedAsset.deleted_at.is_(None)
-                )
-            )
-        )
-        assets = result.scalars().all()
-
-        # Create schedule
-        schedule = DepreciationSchedule(
-            id=uuid4(),
-            company_id=company_id,
-            schedule_name=f"Depreciation {period_date.strftime('%B %Y')}",
-            fiscal_year=fiscal_year,
-            run_date=date.today(),
+        """Run depreciation for all active assets for the month of period_date."""
+        result = await run_bulk_depreciation(
+            db, company_id, user_id,
             period_from=period_date.replace(day=1),
             period_to=period_date,
-            assets_processed=0,
-            total_depreciation=Decimal('0'),
-            status="preview",
-            created_by=user_id
+            fiscal_year=fiscal_year,
+            preview_only=False
         )
-        db.add(schedule)
-
-        total_depreciation = Decimal('0')
-        period_str = period_date.strftime('%Y-%m')
-
-        for asset in assets:
-            depreciation_amount = await DepreciationService.calculate_depreciation(asset)
-
-            if depreciation_amount > 0:
-                # Don't exceed book value - salvage
-                max_depreciation = asset.book_value - asset.salvage_value
-                if depreciation_amount > max_depreciation:
-                    depreciation_amount = max_depreciation
+        return await db.get(DepreciationSchedule, result["schedule_id"])
 
-                # Create depreciation entry
-                entry = AssetDepreciation(
-                    id=uuid4(),
-                    company_id=company_id,
-                    asset_id=asset.id,
-                    depreciation_date=period_date,
-                    period=period_str,
-                    fiscal_year=fiscal_year,
-                    opening_value=asset.book_value,
-                    depreciation_amount=depreciation_amount,
-                    closing_value=asset.book_value - depreciation_amount,
-                    accumulated_depreciation=asset.accumulated_depreciation + depreciation_amount,
-                    posted=False
-                )
-                db.add(entry)
-
-                total_depreciation += depreciation_amount
-                schedule.assets_processed += 1
-
-        schedule.total_depreciation = total_depreciation
+    @staticmethod
+    async def run_depreciation_bulk(
+        db: AsyncSession,
+        company_id: UUID,
+        user_id: UUID,
+        request: DepreciationRunRequest
+    ) -> Dict[str, Any]:
+        """Run (or preview) depreciation for every month of the requested period."""
+        return await run_bulk_depreciation(
+            db, company_id, user_id,
+            period_from=request.period_from,
+            period_to=request.period_to,
+            fiscal_year=request.fiscal_year,
+            asset_ids=request.asset_ids,
+            category_ids=request.category_ids,
+            preview_only=request.preview_only
+        )
 
-        await db.commit()
-        await db.refresh(schedule)
-        return schedule
+    @staticmethod
+    async def preview_depreciation(
+        db: AsyncSession,
+        company_id: UUID,
+        request: DepreciationRunRequest
+    ) -> Dict[str, Any]:
+        """Projected depreciation for the requested period (e.g. a whole fiscal year); nothing is written."""
+        return await run_bulk_depreciation(
+            db, company_id, None,
+            period_from=request.period_from,
+            period_to=request.period_to,
+            fiscal_year=request.fiscal_year,
+            asset_ids=request.asset_ids,
+            category_ids=request.category_ids,
+            preview_only=True
+        )
 
     @staticmethod
     async def post_depreciation_schedule(
@@ -186,40 +165,52 @@ class DepreciationService:
         schedule: DepreciationSchedule,
         user_id: UUID
     ) -> DepreciationSchedule:
-        """Post depreciation schedule and update asset values."""
-        # Get all entries for this schedule
-        result = await db.execute(
-            select(AssetDepreciation).where(
-                and_(
-                    AssetDepreciation.company_id == schedule.company_id,
-                    AssetDepreciation.period == schedule.period_from.strftime('%Y-%m'),
-                    AssetDepreciation.fiscal_year == schedule.fiscal_year,
-                    AssetDepreciation.posted == False
-                )
-            )
+        """
+        Post depreciation schedule and update asset values.
+
+        Asset values are updated from the schedule's unposted entries in one
+        UPDATE ... FROM, then the entries are marked posted in another.
+        """
+        now = utc_now()
+        pending = and_(
+            AssetDepreciation.company_id == schedule.company_id,
+            AssetDepreciation.depreciation_date >= schedule.period_from,
+            AssetDepreciation.depreciation_date <= schedule.period_to,
+            AssetDepreciation.fiscal_year == schedule.fiscal_year,
+            AssetDepreciation.posted == False
         )
-        entries = result.scalars().all()
 
-        for entry in entries:
-            # Update asset
-            result = await db.execute(
-                select(FixedAsset).where(FixedAsset.id == entry.asset_id)
+        totals = (
+            select(
+                AssetDepreciation.asset_id.label("asset_id"),
+                func.sum(AssetDepreciation.depreciation_amount).label("amount"),
+                func.min(AssetDepreciation.closing_value).label("closing_value"),
+                func.max(AssetDepreciation.accumulated_depreciation).label("accumulated")
             )
-            asset = result.scalar_one_or_none()
-
-            if asset:
-                asset.accumulated_depreciation = entry.accumulated_depreciation
-                asset.book_value = entry.closing_value
-                asset.ytd_depreciation += entry.depreciation_amount
-                asset.updated_at = utc_now()
-
-            # Mark entry as posted
-            entry.posted = True
-            entry.posted_at = utc_now()
-            entry.posted_by = user_id
+            .where(pending)
+            .group_by(AssetDepreciation.asset_id)
+            .subquery()
+        )
+        await db.execute(
+            update(FixedAsset)
+            .where(FixedAsset.id == totals.c.asset_id)
+            .values(
+                accumulated_depreciation=totals.c.accumulated,
+                book_value=totals.c.closing_value,
+                ytd_depreciation=func.coalesce(FixedAsset.ytd_depreciation, 0) + totals.c.amount,
+                updated_at=now
+            )
+            .execution_options(synchronize_session=False)
+        )
+        await db.execute(
+            update(AssetDepreciation)
+            .where(pending)
+            .values(posted=True, posted_at=now, posted_by=user_id)
+            .execution_options(synchronize_session=False)
+        )
 
         schedule.status = "posted"
-        schedule.posted_at = utc_now()
+        schedule.posted_at = now
         schedule.posted_by = user_id
 
         await db.commit()
@@ -2,14 +2,17 @@
 GST Service - Business Logic for India GST Compliance
 Handles GSTR-1, GSTR-3B generation, reconciliation, ITC eligibility
 """
+import copy
 import re
+from collections import OrderedDict
 from datetime import date, datetime, timedelta
 from decimal import Decimal, ROUND_HALF_UP
-from typing import Optional, List, Dict, Any, Tuple
+from typing import Optional, List, Dict, Any, Tuple, IO
 from uuid import UUID
 from dataclasses import dataclass, field
 
-from sqlalchemy import select, and_, or_, func
+from sqlalchemy import select, and_, or_, func, insert, delete, case, event, inspect
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.datetime_utils import utc_now
@@ -18,6 +21,7 @@ from app.models.gst import (
     GSTReturnType, GSTReturnStatus, GSTR2AAction, ReconciliationStatus,
     INDIAN_STATE_CODES
 )
+from app.models.invoice import Invoice, InvoiceItem, InvoiceType, InvoiceStatus, GSTTreatment
 from app.schemas.gst import (
     GSTReturnCreate, GSTReturnResponse, GSTR1Data, GSTR1B2BInvoice,
     GSTR1B2CInvoice, GSTR1CreditDebitNote, GSTR3BData, GSTR3BLiability,
@@ -26,6 +30,7 @@ from app.schemas.gst import (
     GSTCalculation, TaxBreakdown, GSTINValidationResponse, GSTComplianceSummary,
     GSTDashboardResponse, GSTReturnSummary
 )
+from app.services.gstr2a_parser import iter_gstr2a_invoices
 
 
 # ----- Constants -----
@@ -53,6 +58,79 @@ ENTITY_TYPE_CODES = {
 # ITC Rules - 180 days for payment
 ITC_PAYMENT_DEADLINE_DAYS = 180
 
+# GSTR-2A reconciliation batch sizes
+GSTR2A_IMPORT_BATCH_SIZE = 1000
+GSTR2A_RECONCILE_FETCH_SIZE = 2000
+# Items per category returned with a reconciliation report
+GSTR2A_REPORT_PAGE_SIZE = 500
+
+# GSTR-1 generation
+GSTR1_FETCH_SIZE = 2000
+GSTR1_CACHE_SIZE = 256
+GSTR1_INVOICE_STATUSES = (
+    InvoiceStatus.APPROVED, InvoiceStatus.SENT, InvoiceStatus.PARTIALLY_PAID, InvoiceStatus.PAID
+)
+
+# Unit Quantity Codes accepted by the GST portal
+GST_UQC_CODES = frozenset({
+    "BAG", "BAL", "BDL", "BKL", "BOU", "BOX", "BTL", "BUN", "CAN", "CBM",
+    "CCM", "CMS", "CTN", "DOZ", "DRM", "GGK", "GMS", "GRS", "GYD", "KGS",
+    "KLR", "KME", "LTR", "MLT", "MTR", "MTS", "NOS", "OTH", "PAC", "PCS",
+    "PRS", "QTL", "ROL", "SET", "SQF", "SQM", "SQY", "TBS", "TGM", "THD",
+    "TON", "TUB", "UGS", "UNT", "YDS",
+})
+
+# Common free-text units of measure and their UQC
+UOM_TO_UQC = {
+    "NO": "NOS", "NUMBER": "NOS", "NUMBERS": "NOS",
+    "PC": "PCS", "PIECE": "PCS", "PIECES": "PCS",
+    "UNIT": "UNT", "UNITS": "UNT",
+    "KG": "KGS", "KILOGRAM": "KGS", "KILOGRAMS": "KGS",
+    "G": "GMS", "GM": "GMS", "GRAM": "GMS", "GRAMS": "GMS",
+    "L": "LTR", "LITRE": "LTR", "LITRES": "LTR", "LITER": "LTR", "LITERS": "LTR",
+    "ML": "MLT", "M": "MTR", "METER": "MTR", "METRE": "MTR", "METERS": "MTR", "METRES": "MTR",
+    "TONNE": "MTS", "TONNES": "MTS", "DOZEN": "DOZ", "PAIR": "PRS", "PAIRS": "PRS",
+    "BOXES": "BOX", "SETS": "SET", "SQFT": "SQF",
+}
+
+
+def gst_uqc(uom: Optional[str]) -> str:
+    """
+    Map an invoice item's unit of measure to a GST Unit Quantity Code.
+
+    Missing units default to NOS; anything unrecognised is reported as OTH.
+    """
+    if not uom:
+        return "NOS"
+    unit = re.sub(r"[^A-Z0-9]", "", uom.upper())
+    if unit in GST_UQC_CODES:
+        return unit
+    return UOM_TO_UQC.get(unit, "OTH")
+
+
+# ----- GSTR-1 Cache -----
+
+# (company_id, gstin, period, include_draft) -> (fingerprint, generation result)
+_gstr1_cache: "OrderedDict[Tuple[str, str, str, bool], Tuple[Any, Dict[str, Any]]]" = OrderedDict()
+
+
+def invalidate_gstr1_cache(company_id: Any, period: Optional[str] = None) -> None:
+    """Drop cached GSTR-1 results for a company, optionally for one period."""
+    company_key = str(company_id)
+    for key in [k for k in _gstr1_cache if k[0] == company_key and period in (None, k[2])]:
+        del _gstr1_cache[key]
+
+
+@event.listens_for(Invoice, "after_insert")
+@event.listens_for(Invoice, "after_update")
+@event.listens_for(Invoice, "after_delete")
+def _invalidate_gstr1_on_invoice_change(mapper, connection, target) -> None:
+    """Evict the period an invoice is in (and was in, if its date moved)."""
+    history = inspect(target).attrs.invoice_date.history
+    for invoice_date in {target.invoice_date, *(history.deleted or ())}:
+        if invoice_date:
+            invalidate_gstr1_cache(target.company_id, f"{invoice_date.month:02d}{invoice_date.year}")
+
 
 # ----- Data Classes -----
 
@@ -363,6 +441,168 @@ class GSTService:
 
     # ----- GSTR-1 Generation -----
 
+    @staticmethod
+    def _period_bounds(period: str) -> Tuple[date, date]:
+        """First and last day of a return period (MMYYYY)."""
+        month = int(period[:2])
+        year = int(period[2:])
+        start_date = date(year, month, 1)
+        if month == 12:
+            end_date = date(year + 1, 1, 1) - timedelta(days=1)
+        else:
+            end_date = date(year, month + 1, 1) - timedelta(days=1)
+        return start_date, end_date
+
+    @staticmethod
+    def _gstr1_invoice_filter(
+        company_id: UUID,
+        start_date: date,
+        end_date: date,
+        include_draft: bool = False
+    ):
+        """WHERE clause for invoices reportable in GSTR-1 for a period."""
+        statuses = list(GSTR1_INVOICE_STATUSES)
+        if include_draft:
+            statuses.append(InvoiceStatus.DRAFT)
+        return and_(
+            Invoice.company_id == company_id,
+            Invoice.invoice_date >= start_date,
+            Invoice.invoice_date <= end_date,
+            Invoice.status.in_(statuses),
+            Invoice.invoice_type.in_([
+                InvoiceType.TAX_INVOICE, InvoiceType.CREDIT_NOTE, InvoiceType.DEBIT_NOTE
+            ]),
+            Invoice.deleted_at.is_(None)
+        )
+
+    @staticmethod
+    def _gstr1_category(supplier_state: str):
+        """
+        SQL expression for the GSTR-1 table of a document.
+
+        Credit and debit notes are reported separately and categorised as
+        "note"; everything not B2B, B2CL or export falls into B2CS. Same
+        rules as _categorize_invoice_for_gstr1.
+        """
+        return case(
+            (Invoice.invoice_type != InvoiceType.TAX_INVOICE, "note"),
+            (Invoice.gst_treatment == GSTTreatment.ZERO_RATED, "export"),
+            (func.length(func.coalesce(Invoice.billing_gstin, "")) == 15, "b2b"),
+            (
+                and_(
+                    func.coalesce(Invoice.total_amount, 0) > B2B_THRESHOLD,
+                    func.coalesce(Invoice.place_of_supply, supplier_state) != supplier_state
+                ),
+                "b2cl"
+            ),
+            else_="b2cs"
+        )
+
+    async def _gstr1_fingerprint(
+        self,
+        company_id: UUID,
+        start_date: date,
+        end_date: date
+    ) -> Tuple[int, Optional[datetime], int, Optional[datetime]]:
+        """
+        Cheap change marker for a period's invoices and their line items.
+
+        Covers every status and soft-deleted rows, so inserts, edits,
+        status changes and deletes made by other processes all change it.
+        Item counts and timestamps are included because items can be
+        edited without touching their invoice.
+        """
+        period_filter = and_(
+            Invoice.company_id == company_id,
+            Invoice.invoice_date >= start_date,
+            Invoice.invoice_date <= end_date
+        )
+        result = await self.db.execute(
+            select(func.count(Invoice.id), func.max(Invoice.updated_at)).where(period_filter)
+        )
+        count, last_updated = result.one()
+
+        result = await self.db.execute(
+            select(func.count(InvoiceItem.id), func.max(InvoiceItem.updated_at))
+            .join(Invoice, InvoiceItem.invoice_id == Invoice.id)
+            .where(period_filter)
+        )
+        item_count, item_last_updated = result.one()
+        return count, last_updated, item_count, item_last_updated
+
+    async def _hsn_summary_rows(
+        self,
+        company_id: UUID,
+        start_date: date,
+        end_date: date,
+        include_draft: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        HSN/SAC rollup of outward supplies (tax invoices and debit notes).
+
+        Grouped in the database by code, unit and tax rates. Units are then
+        mapped to GST UQC codes, and groups that end up with the same code,
+        UQC and rates are merged.
+        """
+        query = select(
+            InvoiceItem.hsn_sac_code,
+            InvoiceItem.uom,
+            InvoiceItem.cgst_rate,
+            InvoiceItem.sgst_rate,
+            InvoiceItem.igst_rate,
+            func.min(InvoiceItem.description).label("description"),
+            func.sum(InvoiceItem.quantity).label("quantity"),
+            func.sum(InvoiceItem.total_amount).label("total_value"),
+            func.sum(InvoiceItem.taxable_amount).label("taxable_value"),
+            func.sum(InvoiceItem.cgst_amount).label("cgst"),
+            func.sum(InvoiceItem.sgst_amount).label("sgst"),
+            func.sum(InvoiceItem.igst_amount).label("igst"),
+            func.sum(InvoiceItem.cess_amount).label("cess")
+        ).join(
+            Invoice, InvoiceItem.invoice_id == Invoice.id
+        ).where(
+            self._gstr1_invoice_filter(company_id, start_date, end_date, include_draft),
+            Invoice.invoice_type != InvoiceType.CREDIT_NOTE,
+            InvoiceItem.hsn_sac_code.isnot(None)
+        ).group_by(
+            InvoiceItem.hsn_sac_code,
+            InvoiceItem.uom,
+            InvoiceItem.cgst_rate,
+            InvoiceItem.sgst_rate,
+            InvoiceItem.igst_rate
+        ).order_by(InvoiceItem.hsn_sac_code)
+
+        zero = Decimal("0")
+        rows: Dict[Tuple[Any, ...], Dict[str, Any]] = {}
+        for row in (await self.db.execute(query)).all():
+            hsn_code = row.hsn_sac_code.strip()[:8]
+            uqc = gst_uqc(row.uom)
+            rates = (row.cgst_rate or zero, row.sgst_rate or zero, row.igst_rate or zero)
+            key = (hsn_code, uqc, *rates)
+            summary = rows.get(key)
+            if summary is None:
+                rows[key] = {
+                    "hsn_code": hsn_code,
+                    "description": row.description,
+                    "uqc": uqc,
+                    "quantity": row.quantity or zero,
+                    "total_value": row.total_value or zero,
+                    "taxable_value": row.taxable_value or zero,
+                    "cgst_rate": rates[0],
+                    "cgst": row.cgst or zero,
+                    "sgst_rate": rates[1],
+                    "sgst": row.sgst or zero,
+                    "igst_rate": rates[2],
+                    "igst": row.igst or zero,
+                    "cess": row.cess or zero,
+                }
+                continue
+            if row.description and (not summary["description"] or row.description < summary["description"]):
+                summary["description"] = row.description
+            for column in ("quantity", "total_value", "taxable_value", "cgst", "sgst", "igst", "cess"):
+                summary[column] += getattr(row, column) or zero
+        return list(rows.values())
+
     async def generate_gstr1(
         self,
         company_id: UUID,
@@ -380,6 +620,12 @@ class GSTService:
         - CDNR: Credit/Debit notes for registered
         - CDNUR: Credit/Debit notes for unregistered
 
+        Categorisation happens in SQL. Invoice-wise tables are streamed from
+        a single column-only query, while B2CS (by place of supply and rate)
+        and the HSN summary are aggregated with GROUP BY. The result is
+        cached per company and period until an invoice or invoice item in
+        the period changes; callers always get their own copy.
+
         Args:
             company_id: Company UUID
             gstin: Company GSTIN
@@ -389,178 +635,161 @@ class GSTService:
         Returns:
             GSTR-1 data structure
         """
-        # Parse period
         month = int(period[:2])
         year = int(period[2:])
+        start_date, end_date = self._period_bounds(period)
 
-        # Get start and end date of the period
-        start_date = date(year, month, 1)
-        if month == 12:
-            end_date = date(year + 1, 1, 1) - timedelta(days=1)
-        else:
-            end_date = date(year, month + 1, 1) - timedelta(days=1)
-
-        # Query invoices from database
-        from app.models.invoice import Invoice, InvoiceType, InvoiceStatus, GSTTreatment
-        from app.models.party import Party
-
-        # Get all approved/sent/paid invoices for the period
-        invoice_query = select(Invoice).where(
-            and_(
-                Invoice.company_id == company_id,
-                Invoice.invoice_date >= start_date,
-                Invoice.invoice_date <= end_date,
-                Invoice.status.in_([InvoiceStatus.APPROVED, InvoiceStatus.SENT, InvoiceStatus.PARTIALLY_PAID, InvoiceStatus.PAID]),
-                Invoice.invoice_type == InvoiceType.TAX_INVOICE
-            )
-        )
-        invoice_result = await self.db.execute(invoice_query)
-        invoices = list(invoice_result.scalars().all())
-
-        # Get credit notes for the period
-        cn_query = select(Invoice).where(
-            and_(
-                Invoice.company_id == company_id,
-                Invoice.invoice_date >= start_date,
-                Invoice.invoice_date <= end_date,
-                Invoice.status.in_([InvoiceStatus.APPROVED, InvoiceStatus.SENT, InvoiceStatus.PARTIALLY_PAID, InvoiceStatus.PAID]),
-                Invoice.invoice_type == InvoiceType.CREDIT_NOTE
-            )
-        )
-        cn_result = await self.db.execute(cn_query)
-        cn_invoices = list(cn_result.scalars().all())
-
-        # Get debit notes for the period
-        dn_query = select(Invoice).where(
-            and_(
-                Invoice.company_id == company_id,
-                Invoice.invoice_date >= start_date,
-                Invoice.invoice_date <= end_date,
-                Invoice.status.in_([InvoiceStatus.APPROVED, InvoiceStatus.SENT, InvoiceStatus.PARTIALLY_PAID, InvoiceStatus.PAID]),
-                Invoice.invoice_type == InvoiceType.DEBIT_NOTE
-            )
-        )
-        dn_result = await self.db.execute(dn_query)
-        dn_invoices = list(dn_result.scalars().all())
-
-        # Categorize invoices into B2B, B2CL, B2CS
-        b2b_invoices: List[GSTR1B2BInvoice] = []
-        b2cl_invoices: List[GSTR1B2CInvoice] = []
-        b2cs_summary: List[GSTR1B2CInvoice] = []
-        exports: List[Dict] = []
+        cache_key = (str(company_id), gstin, period, include_draft)
+        fingerprint = await self._gstr1_fingerprint(company_id, start_date, end_date)
+        cached = _gstr1_cache.get(cache_key)
+        if cached is not None and cached[0] == fingerprint:
+            if await self.db.get(GSTReturn, UUID(cached[1]["return_id"])) is not None:
+                _gstr1_cache.move_to_end(cache_key)
+                return copy.deepcopy(cached[1])
 
         supplier_state = gstin[:2] if gstin else ""
-
-        for inv in invoices:
-            # Determine invoice category
-            customer_gstin = inv.billing_gstin
-            inv_place_of_supply = inv.place_of_supply or ""
-            taxable = Decimal(str(inv.taxable_amount or 0))
-
-            if inv.gst_treatment == GSTTreatment.ZERO_RATED:
-                # Export invoice
+        invoice_filter = self._gstr1_invoice_filter(company_id, start_date, end_date, include_draft)
+        category = self._gstr1_category(supplier_state)
+
+        b2b_invoices: List[Dict[str, Any]] = []
+        b2cl_invoices: List[Dict[str, Any]] = []
+        credit_notes: List[Dict[str, Any]] = []
+        debit_notes: List[Dict[str, Any]] = []
+        exports: List[Dict[str, Any]] = []
+
+        zero = Decimal("0")
+        taxable = {"b2b": zero, "b2cl": zero, "b2cs": zero, "export": zero, "C": zero, "D": zero}
+        tax = dict(taxable)
+
+        # Invoice-wise tables: one streamed query for all document types
+        documents_query = select(
+            Invoice.invoice_number,
+            Invoice.invoice_type,
+            Invoice.invoice_date,
+            Invoice.reference_number,
+            Invoice.billing_gstin,
+            Invoice.place_of_supply,
+            Invoice.reverse_charge,
+            Invoice.taxable_amount,
+            Invoice.cgst_amount,
+            Invoice.sgst_amount,
+            Invoice.igst_amount,
+            Invoice.cess_amount,
+            Invoice.grand_total,
+            category.label("category")
+        ).where(
+            invoice_filter,
+            category != "b2cs"
+        ).order_by(Invoice.invoice_date, Invoice.invoice_number)
+
+        stream = await self.db.stream(
+            documents_query.execution_options(yield_per=GSTR1_FETCH_SIZE)
+        )
+        async for row in stream:
+            row_taxable = row.taxable_amount or zero
+            cgst = row.cgst_amount or zero
+            sgst = row.sgst_amount or zero
+            igst = row.igst_amount or zero
+            cess = row.cess_amount or zero
+            invoice_date = row.invoice_date.isoformat() if row.invoice_date else ""
+            place_of_supply = row.place_of_supply or ""
+
+            if row.category == "note":
+                note_type = "C" if row.invoice_type == InvoiceType.CREDIT_NOTE else "D"
+                (credit_notes if note_type == "C" else debit_notes).append({
+                    "note_number": row.invoice_number,
+                    "note_date": invoice_date,
+                    "note_type": note_type,
+                    "original_invoice_number": row.reference_number or "",
+                    "original_invoice_date": "",
+                    "customer_gstin": row.billing_gstin or "",
+                    "place_of_supply": place_of_supply,
+                    "taxable_value": float(row_taxable),
+                    "cgst": float(cgst),
+                    "sgst": float(sgst),
+                    "igst": float(igst),
+                    "cess": float(cess),
+                    "reason": "Sales return" if note_type == "C" else "Price increase"
+                })
+                bucket = note_type
+            elif row.category == "export":
                 exports.append({
-                    "invoice_number": inv.invoice_number,
-                    "invoice_date": inv.invoice_date.isoformat() if inv.invoice_date else "",
-                    "taxable_value": float(taxable),
+                    "invoice_number": row.invoice_number,
+                    "invoice_date": invoice_date,
+                    "taxable_value": float(row_taxable),
                     "shipping_bill_number": "",
                     "shipping_bill_date": ""
                 })
-            elif customer_gstin and len(customer_gstin) == 15:
-                # B2B - registered customer
-                b2b_invoices.append(GSTR1B2BInvoice(
-                    gstin=customer_gstin,
-                    invoice_number=inv.invoice_number,
-                    invoice_date=inv.invoice_date.isoformat() if inv.invoice_date else "",
-                    invoice_value=float(inv.grand_total or 0),
-                    place_of_supply=inv_place_of_supply,
-                    reverse_charge="Y" if inv.reverse_charge else "N",
-                    invoice_type="R",
-                    taxable_value=float(taxable),
-                    cgst=float(inv.cgst_amount or 0),
-                    sgst=float(inv.sgst_amount or 0),
-                    igst=float(inv.igst_amount or 0),
-                    cess=float(inv.cess_amount or 0)
-                ))
-            elif taxable >= B2B_THRESHOLD and inv_place_of_supply != supplier_state:
-                # B2CL - Large inter-state to unregistered
-                b2cl_invoices.append(GSTR1B2CInvoice(
-                    invoice_number=inv.invoice_number,
-                    invoice_date=inv.invoice_date.isoformat() if inv.invoice_date else "",
-                    invoice_value=float(inv.grand_total or 0),
-                    place_of_supply=inv_place_of_supply,
-                    taxable_value=float(taxable),
-                    cgst=float(inv.cgst_amount or 0),
-                    sgst=float(inv.sgst_amount or 0),
-                    igst=float(inv.igst_amount or 0),
-                    cess=float(inv.cess_amount or 0)
-                ))
+                bucket = "export"
             else:
-                # B2CS - Small value or intra-state to unregistered
-                b2cs_summary.append(GSTR1B2CInvoice(
-                    invoice_number=inv.invoice_number,
-                    invoice_date=inv.invoice_date.isoformat() if inv.invoice_date else "",
-                    invoice_value=float(inv.grand_total or 0),
-                    place_of_supply=inv_place_of_supply,
-                    taxable_value=float(taxable),
-                    cgst=float(inv.cgst_amount or 0),
-                    sgst=float(inv.sgst_amount or 0),
-                    igst=float(inv.igst_amount or 0),
-                    cess=float(inv.cess_amount or 0)
-                ))
+                document = {
+                    "invoice_number": row.invoice_number,
+                    "invoice_date": invoice_date,
+                    "invoice_value": float(row.grand_total or 0),
+                    "place_of_supply": place_of_supply,
+                    "is_igst": igst > 0,
+                    "taxable_value": float(row_taxable),
+                    "cgst": float(cgst),
+                    "sgst": float(sgst),
+                    "igst": float(igst),
+                    "cess": float(cess)
+                }
+                if row.category == "b2b":
+                    document.update(
+                        customer_gstin=row.billing_gstin,
+                        is_reverse_charge=bool(row.reverse_charge),
+                        invoice_type="R"
+                    )
+                    b2b_invoices.append(document)
+                else:
+                    document["invoice_type"] = "b2cl"
+                    b2cl_invoices.append(document)
+                bucket = row.category
+
+            taxable[bucket] += row_taxable
+            tax[bucket] += cgst + sgst + igst + cess
+
+        # B2CS: consolidated by place of supply and rate in the database
+        b2cs_query = select(
+            Invoice.place_of_supply,
+            InvoiceItem.gst_rate,
+            func.sum(InvoiceItem.taxable_amount).label("taxable_value"),
+            func.sum(InvoiceItem.cgst_amount).label("cgst"),
+            func.sum(InvoiceItem.sgst_amount).label("sgst"),
+            func.sum(InvoiceItem.igst_amount).label("igst"),
+            func.sum(InvoiceItem.cess_amount).label("cess")
+        ).join(
+            Invoice, InvoiceItem.invoice_id == Invoice.id
+        ).where(
+            invoice_filter,
+            category == "b2cs"
+        ).group_by(
+            Invoice.place_of_supply, InvoiceItem.gst_rate
+        ).order_by(Invoice.place_of_supply, InvoiceItem.gst_rate)
+
+        b2cs_summary: List[Dict[str, Any]] = []
+        for row in (await self.db.execute(b2cs_query)).all():
+            row_tax = [row.cgst or zero, row.sgst or zero, row.igst or zero, row.cess or zero]
+            b2cs_summary.append({
+                "invoice_type": "b2cs",
+                "place_of_supply": row.place_of_supply or "",
+                "rate": float(row.gst_rate or 0),
+                "is_igst": (row.place_of_supply or "") != supplier_state,
+                "taxable_value": float(row.taxable_value or 0),
+                "cgst": float(row_tax[0]),
+                "sgst": float(row_tax[1]),
+                "igst": float(row_tax[2]),
+                "cess": float(row_tax[3])
+            })
+            taxable["b2cs"] += row.taxable_value or zero
+            tax["b2cs"] += sum(row_tax)
+
+        hsn_rows = await self._hsn_summary_rows(company_id, start_date, end_date, include_draft)
+
+        # Calculate totals (exports are zero-rated but part of outward supplies)
+        outward_taxable = taxable["b2b"] + taxable["b2cl"] + taxable["b2cs"] + taxable["export"]
+        outward_tax = tax["b2b"] + tax["b2cl"] + tax["b2cs"] + tax["export"]
 
-        # Process credit notes
-        credit_notes: List[GSTR1CreditDebitNote] = []
-        for cn in cn_invoices:
-            credit_notes.append(GSTR1CreditDebitNote(
-                note_number=cn.invoice_number,
-                note_date=cn.invoice_date.isoformat() if cn.invoice_date else "",
-                note_type="C",
-                gstin=cn.billing_gstin or "",
-                original_invoice_number=cn.reference_number or "",
-                original_invoice_date="",
-                reason="Sales return",
-                taxable_value=float(cn.taxable_amount or 0),
-                cgst=float(cn.cgst_amount or 0),
-                sgst=float(cn.sgst_amount or 0),
-                igst=float(cn.igst_amount or 0),
-                cess=float(cn.cess_amount or 0)
-            ))
-
-        # Process debit notes
-        debit_notes: List[GSTR1CreditDebitNote] = []
-        for dn in dn_invoices:
-            debit_notes.append(GSTR1CreditDebitNote(
-                note_number=dn.invoice_number,
-                note_date=dn.invoice_date.isoformat() if dn.invoice_date else "",
-                note_type="D",
-                gstin=dn.billing_gstin or "",
-                original_invoice_number=dn.reference_number or "",
-                original_invoice_date="",
-                reason="Price increase",
-                taxable_value=float(dn.taxable_amount or 0),
-                cgst=float(dn.cgst_amount or 0),
-                sgst=float(dn.sgst_amount or 0),
-                igst=float(dn.igst_amount or 0),
-                cess=float(dn.cess_amount or 0)
-            ))
-
-        hsn_summary: List[HSNSummaryData] = []
-
-        # Calculate totals
-        b2b_taxable = sum(inv.taxable_value for inv in b2b_invoices)
-        b2b_tax = sum(inv.cgst + inv.sgst + inv.igst + inv.cess for inv in b2b_invoices)
-
-        b2c_taxable = sum(inv.taxable_value for inv in b2cl_invoices + b2cs_summary)
-        b2c_tax = sum(inv.cgst + inv.sgst + inv.igst + inv.cess for inv in b2cl_invoices + b2cs_summary)
-
-        cn_taxable = sum(cn.taxable_value for cn in credit_notes)
-        cn_tax = sum(cn.cgst + cn.sgst + cn.igst + cn.cess for cn in credit_notes)
-
-        dn_taxable = sum(dn.taxable_value for dn in debit_notes)
-        dn_tax = sum(dn.cgst + dn.sgst + dn.igst + dn.cess for dn in debit_notes)
-
-        # Create or update GSTR-1 return
         financial_year = self._get_financial_year(year, month)
 
         gst_return = GSTReturn(
@@ -570,49 +799,64 @@ class GSTService:
             period=period,
             financial_year=financial_year,
             status=GSTReturnStatus.GENERATED,
-            total_taxable_value=b2b_taxable + b2c_taxable + dn_taxable - cn_taxable,
-            total_tax=(b2b_tax + b2c_tax + dn_tax - cn_tax)
+            total_taxable_value=outward_taxable + taxable["D"] - taxable["C"],
+            total_tax=outward_tax + tax["D"] - tax["C"]
         )
+        self.db.add(gst_return)
+        await self.db.flush()
 
-        # Create GSTR1 detail record
         gstr1 = GSTR1(
             return_id=gst_return.id,
-            b2b_invoices=[inv.model_dump() for inv in b2b_invoices],
+            b2b_invoices=b2b_invoices,
             b2b_count=len(b2b_invoices),
-            b2b_taxable_value=b2b_taxable,
-            b2b_tax=b2b_tax,
-            b2cl_invoices=[inv.model_dump() for inv in b2cl_invoices],
+            b2b_taxable_value=taxable["b2b"],
+            b2b_tax=tax["b2b"],
+            b2cl_invoices=b2cl_invoices,
             b2cl_count=len(b2cl_invoices),
-            b2cs_invoices=[inv.model_dump() for inv in b2cs_summary],
-            b2cs_taxable_value=sum(inv.taxable_value for inv in b2cs_summary),
-            credit_notes=[cn.model_dump() for cn in credit_notes],
+            b2cl_taxable_value=taxable["b2cl"],
+            b2cl_tax=tax["b2cl"],
+            b2cs_invoices=b2cs_summary,
+            b2cs_taxable_value=taxable["b2cs"],
+            b2cs_tax=tax["b2cs"],
+            credit_notes=credit_notes,
             credit_notes_count=len(credit_notes),
-            credit_notes_taxable=cn_taxable,
-            debit_notes=[dn.model_dump() for dn in debit_notes],
+            credit_notes_taxable=taxable["C"],
+            credit_notes_tax=tax["C"],
+            debit_notes=debit_notes,
             debit_notes_count=len(debit_notes),
-            debit_notes_taxable=dn_taxable,
-            exports=exports
+            debit_notes_taxable=taxable["D"],
+            debit_notes_tax=tax["D"],
+            exports=exports,
+            exports_taxable_value=taxable["export"],
+            exports_tax=tax["export"]
         )
-
-        self.db.add(gst_return)
         self.db.add(gstr1)
+        self.db.add_all([HSNSummary(return_id=gst_return.id, **row) for row in hsn_rows])
 
-        return {
+        result = {
             "return_id": str(gst_return.id),
             "period": period,
             "status": "generated",
             "summary": {
-                "b2b": {"count": len(b2b_invoices), "taxable": float(b2b_taxable), "tax": float(b2b_tax)},
-                "b2cl": {"count": len(b2cl_invoices), "taxable": float(sum(i.taxable_value for i in b2cl_invoices))},
-                "b2cs": {"taxable": float(sum(i.taxable_value for i in b2cs_summary))},
-                "cdnr": {"count": len(credit_notes), "taxable": float(cn_taxable)},
-                "dnr": {"count": len(debit_notes), "taxable": float(dn_taxable)},
+                "b2b": {"count": len(b2b_invoices), "taxable": float(taxable["b2b"]), "tax": float(tax["b2b"])},
+                "b2cl": {"count": len(b2cl_invoices), "taxable": float(taxable["b2cl"])},
+                "b2cs": {"count": len(b2cs_summary), "taxable": float(taxable["b2cs"])},
+                "cdnr": {"count": len(credit_notes), "taxable": float(taxable["C"])},
+                "dnr": {"count": len(debit_notes), "taxable": float(taxable["D"])},
                 "exports": {"count": len(exports)},
+                "hsn": {"count": len(hsn_rows)},
             },
             "total_taxable_value": float(gst_return.total_taxable_value),
             "total_tax": float(gst_return.total_tax)
         }
 
+        _gstr1_cache[cache_key] = (fingerprint, copy.deepcopy(result))
+        _gstr1_cache.move_to_end(cache_key)
+        while len(_gstr1_cache) > GSTR1_CACHE_SIZE:
+            _gstr1_cache.popitem(last=False)
+
+        return result
+
     def _categorize_invoice_for_gstr1(
         self,
         invoice: Dict,
@@ -785,27 +1029,252 @@ class GSTService:
 
     # ----- GSTR-2A Reconciliation -----
 
+    async def import_gstr2a(
+        self,
+        company_id: UUID,
+        period: str,
+        gstr2a_file: IO,
+        batch_size: int = GSTR2A_IMPORT_BATCH_SIZE
+    ) -> int:
+        """
+        Load a GSTR-2A/2B JSON download into the gstr2a table.
+
+        The file is streamed supplier by supplier and upserted with multi-row
+        INSERT ... ON CONFLICT on (company, period, supplier GSTIN, invoice
+        number). Re-importing refreshes the portal values but keeps the
+        user's accept/reject action and manual matches; rows that dropped
+        out of the download are removed only if nobody acted on them.
+
+        Returns:
+            Number of supplier invoices imported
+        """
+        month = int(period[:2])
+        year = int(period[2:])
+        financial_year = self._get_financial_year(year, month)
+        synced_at = utc_now().replace(tzinfo=None)
+
+        imported = 0
+        batch: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        for invoice in iter_gstr2a_invoices(gstr2a_file):
+            # A statement may not touch the same row twice, so duplicates
+            # within a batch collapse to the last occurrence
+            batch[(invoice["supplier_gstin"], invoice["invoice_number"])] = {
+                "company_id": company_id,
+                "period": period,
+                "financial_year": financial_year,
+                "supplier_gstin": invoice["supplier_gstin"],
+                "supplier_name": invoice["supplier_name"],
+                "supplier_state_code": invoice["supplier_gstin"][:2],
+                "invoice_number": invoice["invoice_number"],
+                "invoice_date": invoice["invoice_date"],
+                "invoice_type": invoice["invoice_type"],
+                "taxable_value": invoice["taxable_value"],
+                "cgst": invoice["cgst"],
+                "sgst": invoice["sgst"],
+                "igst": invoice["igst"],
+                "cess": invoice["cess"],
+                "total_tax": invoice["cgst"] + invoice["sgst"] + invoice["igst"] + invoice["cess"],
+                "place_of_supply": invoice["place_of_supply"],
+                "is_reverse_charge": invoice["is_reverse_charge"],
+                "synced_at": synced_at,
+            }
+            if len(batch) >= batch_size:
+                await self._upsert_gstr2a_batch(list(batch.values()))
+                imported += len(batch)
+                batch = {}
+
+        if batch:
+            await self._upsert_gstr2a_batch(list(batch.values()))
+            imported += len(batch)
+
+        await self.db.execute(
+            delete(GSTR2A).where(
+                and_(
+                    GSTR2A.company_id == company_id,
+                    GSTR2A.period == period,
+                    or_(GSTR2A.synced_at.is_(None), GSTR2A.synced_at < synced_at),
+                    or_(GSTR2A.action.is_(None), GSTR2A.action == GSTR2AAction.PENDING),
+                    GSTR2A.matched_bill_id.is_(None),
+                )
+            )
+        )
+
+        await self.db.flush()
+        return imported
+
+    async def _upsert_gstr2a_batch(self, rows: List[Dict[str, Any]]) -> None:
+        """Insert or refresh portal rows, leaving user actions untouched."""
+        stmt = pg_insert(GSTR2A).values(rows)
+        refreshed = (
+            "financial_year", "supplier_name", "supplier_state_code", "invoice_date",
+            "invoice_type", "taxable_value", "cgst", "sgst", "igst", "cess",
+            "total_tax", "place_of_supply", "is_reverse_charge", "synced_at",
+        )
+        stmt = stmt.on_conflict_do_update(
+            constraint="uq_gstr2a_period_invoice",
+            set_={
+                **{column: stmt.excluded[column] for column in refreshed},
+                "updated_at": func.now(),
+            }
+        )
+        await self.db.execute(stmt)
+
+    @staticmethod
+    def _normalized_invoice_number_sql(column):
+        """SQL twin of gstr2a_parser.normalize_invoice_number."""
+        return func.ltrim(
+            func.upper(func.regexp_replace(column, "[^A-Za-z0-9]", "", "g")),
+            "0"
+        )
+
+    def _gstr2a_match_query(self, company_id: UUID, period: str):
+        """
+        Full outer join of purchase bills and GSTR-2A rows for a period.
+
+        Both sides are keyed by (supplier GSTIN, normalised invoice number,
+        invoice date, occurrence). The occurrence number pairs up duplicate
+        invoices one-to-one instead of producing a cross product.
+        """
+        from app.models.bill import Bill, BillType, BillStatus
+        from app.models.customer import Party
+
+        month = int(period[:2])
+        year = int(period[2:])
+        start_date = date(year, month, 1)
+        end_date = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+
+        book_gstin = func.upper(Bill.vendor_gstin)
+        book_number = func.coalesce(Bill.vendor_invoice_number, Bill.bill_number)
+        book_key = self._normalized_invoice_number_sql(book_number)
+        book_date = func.coalesce(Bill.vendor_invoice_date, Bill.bill_date)
+        books = (
+            select(
+                book_gstin.label("gstin"),
+                book_key.label("key"),
+                book_date.label("invoice_date"),
+                func.row_number().over(
+                    partition_by=(book_gstin, book_key, book_date),
+                    order_by=Bill.id
+                ).label("occurrence"),
+                book_number.label("invoice_number"),
+                Party.name.label("supplier_name"),
+                Bill.taxable_amount,
+                Bill.cgst_amount,
+                Bill.sgst_amount,
+                Bill.igst_amount,
+                Bill.cess_amount,
+            )
+            .outerjoin(Party, Party.id == Bill.vendor_id)
+            .where(
+                and_(
+                    Bill.company_id == company_id,
+                    Bill.bill_type == BillType.PURCHASE_INVOICE,
+                    Bill.status.in_([
+                        BillStatus.APPROVED, BillStatus.PARTIALLY_PAID,
+                        BillStatus.PAID, BillStatus.OVERDUE
+                    ]),
+                    Bill.vendor_gstin.isnot(None),
+                    Bill.bill_date >= start_date,
+                    Bill.bill_date < end_date,
+                )
+            )
+            .cte("books")
+        )
+
+        portal_gstin = func.upper(GSTR2A.supplier_gstin)
+        portal_key = self._normalized_invoice_number_sql(GSTR2A.invoice_number)
+        portal = (
+            select(
+                portal_gstin.label("gstin"),
+                portal_key.label("key"),
+                GSTR2A.invoice_date.label("invoice_date"),
+                func.row_number().over(
+                    partition_by=(portal_gstin, portal_key, GSTR2A.invoice_date),
+                    order_by=GSTR2A.id
+                ).label("occurrence"),
+                GSTR2A.invoice_number,
+                GSTR2A.supplier_name,
+                GSTR2A.taxable_value,
+                GSTR2A.cgst,
+                GSTR2A.sgst,
+                GSTR2A.igst,
+                GSTR2A.cess,
+            )
+            .where(and_(GSTR2A.company_id == company_id, GSTR2A.period == period))
+            .cte("portal")
+        )
+
+        query = select(
+            books.c.gstin.label("book_gstin"),
+            books.c.invoice_number.label("book_invoice_number"),
+            books.c.invoice_date.label("book_date"),
+            books.c.supplier_name.label("book_supplier_name"),
+            books.c.taxable_amount,
+            books.c.cgst_amount,
+            books.c.sgst_amount,
+            books.c.igst_amount,
+            books.c.cess_amount,
+            portal.c.gstin.label("portal_gstin"),
+            portal.c.invoice_number.label("portal_invoice_number"),
+            portal.c.invoice_date.label("portal_date"),
+            portal.c.supplier_name.label("portal_supplier_name"),
+            portal.c.taxable_value,
+            portal.c.cgst,
+            portal.c.sgst,
+            portal.c.igst,
+            portal.c.cess,
+        ).select_from(
+            books.join(
+                portal,
+                and_(
+                    books.c.gstin == portal.c.gstin,
+                    books.c.key == portal.c.key,
+                    books.c.invoice_date == portal.c.invoice_date,
+                    books.c.occurrence == portal.c.occurrence,
+                ),
+                full=True
+            )
+        )
+        # A stable order lets callers page through the items of one category
+        return query.order_by(
+            func.coalesce(books.c.gstin, portal.c.gstin),
+            func.coalesce(books.c.key, portal.c.key),
+            func.coalesce(books.c.invoice_date, portal.c.invoice_date),
+            func.coalesce(books.c.occurrence, portal.c.occurrence),
+        )
+
     async def reconcile_gstr2a(
         self,
         company_id: UUID,
         gstin: str,
         period: str,
-        tolerance_amount: Decimal = Decimal("1.00")
+        tolerance_amount: Decimal = Decimal("1.00"),
+        gstr2a_file: Optional[IO] = None,
+        items_offset: int = 0,
+        items_limit: int = GSTR2A_REPORT_PAGE_SIZE
     ) -> ReconciliationReport:
         """
         Reconcile purchase invoices with GSTR-2A data.
 
-        Matches:
+        Matches on a composite key:
         - Supplier GSTIN
-        - Invoice number
+        - Invoice number (normalised)
         - Invoice date
-        - Amount (within tolerance)
+        - Amount (taxable value and total tax within tolerance)
+
+        The join runs in the database and results are streamed, so memory
+        for matching stays flat regardless of the number of invoices. The
+        summary counts every invoice, while each item list only holds one
+        page (``items_offset``/``items_limit``) of its category.
 
         Args:
             company_id: Company UUID
             gstin: Company GSTIN
             period: Return period (MMYYYY)
             tolerance_amount: Amount tolerance for matching
+            gstr2a_file: Optional GSTR-2A/2B JSON download to import first
+            items_offset: Items to skip in each category
+            items_limit: Maximum items returned per category
 
         Returns:
             ReconciliationReport with matched/unmatched items
@@ -814,59 +1283,142 @@ class GSTService:
         year = int(period[2:])
         financial_year = self._get_financial_year(year, month)
 
-        # TODO: Query purchase bills and GSTR-2A data
+        if gstr2a_file is not None:
+            await self.import_gstr2a(company_id, period, gstr2a_file)
 
-        # Initialize empty reconciliation
-        matched_items: List[ReconciliationItem] = []
-        mismatched_items: List[ReconciliationItem] = []
-        only_in_books: List[ReconciliationItem] = []
-        only_in_gstr2a: List[ReconciliationItem] = []
+        items: Dict[str, List[ReconciliationItem]] = {
+            "matched": [], "value_mismatch": [], "only_in_books": [], "only_in_gstr2a": []
+        }
+        counts = dict.fromkeys(items, 0)
+        page_end = items_offset + items_limit
 
-        # Calculate summary
-        books_total = sum(item.books_value for item in matched_items + mismatched_items + only_in_books)
-        gstr2a_total = sum(item.gstr2a_value for item in matched_items + mismatched_items + only_in_gstr2a)
+        zero = Decimal("0")
+        books_total = gstr2a_total = zero
+        books_tax = {"cgst": zero, "sgst": zero, "igst": zero, "cess": zero}
+        gstr2a_tax = dict(books_tax)
+
+        stream = await self.db.stream(
+            self._gstr2a_match_query(company_id, period).execution_options(
+                yield_per=GSTR2A_RECONCILE_FETCH_SIZE
+            )
+        )
+        async for row in stream:
+            in_books = row.book_gstin is not None
+            in_portal = row.portal_gstin is not None
+
+            row_books_tax = TaxBreakdown(
+                cgst=row.cgst_amount or zero, sgst=row.sgst_amount or zero,
+                igst=row.igst_amount or zero, cess=row.cess_amount or zero
+            ) if in_books else TaxBreakdown()
+            row_portal_tax = TaxBreakdown(
+                cgst=row.cgst or zero, sgst=row.sgst or zero,
+                igst=row.igst or zero, cess=row.cess or zero
+            ) if in_portal else TaxBreakdown()
+            books_value = (row.taxable_amount or zero) if in_books else zero
+            portal_value = (row.taxable_value or zero) if in_portal else zero
+
+            if in_books and in_portal:
+                value_ok = abs(books_value - portal_value) <= tolerance_amount
+                tax_ok = abs(row_books_tax.total - row_portal_tax.total) <= tolerance_amount
+                match_status = "matched" if value_ok and tax_ok else "value_mismatch"
+            else:
+                match_status = "only_in_books" if in_books else "only_in_gstr2a"
+
+            if items_offset <= counts[match_status] < page_end:
+                items[match_status].append(ReconciliationItem(
+                    supplier_gstin=row.book_gstin if in_books else row.portal_gstin,
+                    supplier_name=row.portal_supplier_name if in_portal else row.book_supplier_name,
+                    invoice_number=row.book_invoice_number if in_books else row.portal_invoice_number,
+                    invoice_date=row.book_date if in_books else row.portal_date,
+                    books_value=books_value,
+                    gstr2a_value=portal_value,
+                    difference=books_value - portal_value,
+                    match_status=match_status,
+                    books_tax=row_books_tax,
+                    gstr2a_tax=row_portal_tax
+                ))
+            counts[match_status] += 1
+
+            books_total += books_value
+            gstr2a_total += portal_value
+            for head in books_tax:
+                books_tax[head] += getattr(row_books_tax, head)
+                gstr2a_tax[head] += getattr(row_portal_tax, head)
+
+        matched_count = counts["matched"]
+        mismatched_count = counts["value_mismatch"]
+        only_in_books_count = counts["only_in_books"]
+        only_in_gstr2a_count = counts["only_in_gstr2a"]
 
         summary = ReconciliationSummary(
-            total_invoices_books=len(matched_items) + len(mismatched_items) + len(only_in_books),
-            total_invoices_gstr2a=len(matched_items) + len(mismatched_items) + len(only_in_gstr2a),
-            matched_count=len(matched_items),
-            value_mismatch_count=len(mismatched_items),
-            only_in_books_count=len(only_in_books),
-            only_in_gstr2a_count=len(only_in_gstr2a),
+            total_invoices_books=matched_count + mismatched_count + only_in_books_count,
+            total_invoices_gstr2a=matched_count + mismatched_count + only_in_gstr2a_count,
+            matched_count=matched_count,
+            value_mismatch_count=mismatched_count,
+            only_in_books_count=only_in_books_count,
+            only_in_gstr2a_count=only_in_gstr2a_count,
             books_total=books_total,
             gstr2a_total=gstr2a_total,
             difference=books_total - gstr2a_total,
-            books_tax=TaxBreakdown(),
-            gstr2a_tax=TaxBreakdown(),
-            tax_difference=TaxBreakdown()
+            books_tax=TaxBreakdown(**books_tax),
+            gstr2a_tax=TaxBreakdown(**gstr2a_tax),
+            tax_difference=TaxBreakdown(**{
+                head: abs(books_tax[head] - gstr2a_tax[head]) for head in books_tax
+            })
         )
 
         # Determine status
-        if len(matched_items) == summary.total_invoices_books == summary.total_invoices_gstr2a:
-            status = ReconciliationStatus.MATCHED
-        elif len(mismatched_items) > 0 or len(only_in_books) > 0 or len(only_in_gstr2a) > 0:
+        if matched_count == summary.total_invoices_books == summary.total_invoices_gstr2a:
+            status = ReconciliationStatus.MATCHED if matched_count else ReconciliationStatus.PENDING
+        elif mismatched_count > 0 or only_in_books_count > 0 or only_in_gstr2a_count > 0:
             status = ReconciliationStatus.MISMATCHED
         else:
             status = ReconciliationStatus.PENDING
 
-        # Create reconciliation record
-        recon = GSTReconciliation(
-            company_id=company_id,
-            period=period,
-            financial_year=financial_year,
-            gstin=gstin,
-            books_value=books_total,
-            gstr2a_value=gstr2a_total,
-            difference=books_total - gstr2a_total,
-            matched_count=len(matched_items),
-            unmatched_books_count=len(only_in_books),
-            unmatched_gstr2a_count=len(only_in_gstr2a),
-            value_mismatch_count=len(mismatched_items),
-            status=status,
-            last_reconciled_at=utc_now()
+        # Create or update reconciliation record
+        existing = await self.db.execute(
+            select(GSTReconciliation).where(
+                and_(
+                    GSTReconciliation.company_id == company_id,
+                    GSTReconciliation.gstin == gstin,
+                    GSTReconciliation.period == period
+                )
+            )
         )
-
-        self.db.add(recon)
+        recon = existing.scalar_one_or_none()
+        if recon is None:
+            recon = GSTReconciliation(
+                company_id=company_id,
+                period=period,
+                financial_year=financial_year,
+                gstin=gstin
+            )
+            self.db.add(recon)
+
+        recon.books_value = books_total
+        recon.books_cgst = books_tax["cgst"]
+        recon.books_sgst = books_tax["sgst"]
+        recon.books_igst = books_tax["igst"]
+        recon.books_cess = books_tax["cess"]
+        recon.books_invoice_count = summary.total_invoices_books
+        recon.gstr2a_value = gstr2a_total
+        recon.gstr2a_cgst = gstr2a_tax["cgst"]
+        recon.gstr2a_sgst = gstr2a_tax["sgst"]
+        recon.gstr2a_igst = gstr2a_tax["igst"]
+        recon.gstr2a_cess = gstr2a_tax["cess"]
+        recon.gstr2a_invoice_count = summary.total_invoices_gstr2a
+        recon.difference = books_total - gstr2a_total
+        recon.difference_cgst = books_tax["cgst"] - gstr2a_tax["cgst"]
+        recon.difference_sgst = books_tax["sgst"] - gstr2a_tax["sgst"]
+        recon.difference_igst = books_tax["igst"] - gstr2a_tax["igst"]
+        recon.difference_cess = books_tax["cess"] - gstr2a_tax["cess"]
+        recon.matched_count = matched_count
+        recon.unmatched_books_count = only_in_books_count
+        recon.unmatched_gstr2a_count = only_in_gstr2a_count
+        recon.value_mismatch_count = mismatched_count
+        recon.status = status
+        recon.last_reconciled_at = utc_now().replace(tzinfo=None)
+        await self.db.flush()
 
         return ReconciliationReport(
             id=recon.id,
@@ -875,10 +1427,12 @@ class GSTService:
             gstin=gstin,
             status=status,
             summary=summary,
-            matched_items=matched_items,
-            mismatched_items=mismatched_items,
-            only_in_books=only_in_books,
-            only_in_gstr2a=only_in_gstr2a,
+            matched_items=items["matched"],
+            mismatched_items=items["value_mismatch"],
+            only_in_books=items["only_in_books"],
+            only_in_gstr2a=items["only_in_gstr2a"],
+            items_offset=items_offset,
+            items_limit=items_limit,
             last_reconciled_at=recon.last_reconciled_at,
             created_at=recon.created_at
         )
@@ -1010,9 +1564,12 @@ class GSTService:
         Returns:
             HSNSummaryResponse with consolidated HSN data
         """
-        # TODO: Query invoice items and group by HSN code
-
-        hsn_items: List[HSNSummaryData] = []
+        start_date, end_date = self._period_bounds(period)
+        hsn_items: List[HSNSummaryData] = [
+            HSNSummaryData(**row)
+            for row in await self._hsn_summary_rows(company_id, start_date, end_date)
+            if len(row["hsn_code"]) >= 4
+        ]
 
         total_taxable = sum(item.taxable_value for item in hsn_items)
         total_tax = TaxBreakdown(
@@ -0,0 +1,204 @@
+"""
+GSTR-2A / GSTR-2B JSON Parser
+Streams supplier invoices out of a portal download without loading the file
+"""
+import codecs
+import json
+import re
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, IO, Iterator, Optional
+
+
+# Bytes read from the upload per refill
+READ_CHUNK_SIZE = 64 * 1024
+
+_WHITESPACE = " \t\r\n"
+
+
+class GSTR2AParseError(Exception):
+    """Raised when a GSTR-2A/2B file cannot be parsed."""
+    pass
+
+
+def normalize_invoice_number(invoice_number: Optional[str]) -> str:
+    """
+    Normalise a supplier invoice number for matching.
+
+    Uppercases, drops separators/whitespace and strips leading zeros, so
+    "inv/0042-24" and "INV004224" compare equal. Must stay in sync with
+    GSTService._normalized_invoice_number_sql.
+    """
+    if not invoice_number:
+        return ""
+    return re.sub(r"[^A-Za-z0-9]", "", invoice_number).upper().lstrip("0")
+
+
+def iter_json_array(fp: IO, key: str, chunk_size: int = READ_CHUNK_SIZE) -> Iterator[Any]:
+    """
+    Yield elements of the first JSON array stored under ``key``.
+
+    Only one array element is held in memory at a time (plus one read
+    chunk), so very large portal downloads can be processed incrementally.
+    Elements are decoded from an offset into the buffer and the consumed
+    prefix is only dropped on refill, so parsing stays linear in the file
+    size.
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder("utf-8")()
+    marker = f'"{key}"'
+    buffer = ""
+    pos = 0
+    eof = False
+
+    def refill() -> bool:
+        nonlocal buffer, pos, eof
+        if eof:
+            return False
+        # Read at least as much as is still pending, so an element that
+        # spans many chunks is re-decoded a logarithmic number of times
+        data = fp.read(max(chunk_size, len(buffer) - pos))
+        if not data:
+            eof = True
+            return False
+        if isinstance(data, bytes):
+            data = text_decoder.decode(data)
+        buffer = buffer[pos:] + data
+        pos = 0
+        return True
+
+    # Locate `"key"` followed by ':' and '['
+    search_from = 0
+    while True:
+        found = buffer.find(marker, search_from)
+        if found == -1:
+            # Keep a tail in case the marker straddles two chunks
+            pos = max(0, len(buffer) - len(marker))
+            search_from = 0
+            if not refill():
+                return
+            continue
+
+        rest = buffer[found + len(marker):].lstrip(_WHITESPACE)
+        if rest.startswith(":"):
+            rest = rest[1:].lstrip(_WHITESPACE)
+            if rest.startswith("["):
+                buffer = rest[1:]
+                pos = 0
+                break
+        if not rest:
+            pos = found
+            search_from = 0
+            if not refill():
+                return
+            continue
+        # Marker was a string value or not an array - keep looking
+        search_from = found + 1
+
+    skip = _WHITESPACE + ","
+    while True:
+        while pos < len(buffer) and buffer[pos] in skip:
+            pos += 1
+        if pos == len(buffer):
+            if refill():
+                continue
+            raise GSTR2AParseError(f"Unexpected end of file inside '{key}' array")
+        if buffer[pos] == "]":
+            return
+
+        try:
+            item, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError as e:
+            if refill():
+                continue
+            raise GSTR2AParseError(f"Invalid JSON in '{key}' array: {e}") from e
+
+        # A number at the very end of the buffer may be truncated
+        if end == len(buffer) and not eof and not isinstance(item, (dict, list, str)):
+            if refill():
+                continue
+
+        pos = end
+        yield item
+
+
+def _parse_date(value: Optional[str]) -> Optional[date]:
+    if not value:
+        return None
+    for fmt in ("%d-%m-%Y", "%d/%m/%Y", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def _amount(value: Any) -> Decimal:
+    return Decimal(str(value or 0))
+
+
+def _invoice_from_2a(supplier: Dict[str, Any], inv: Dict[str, Any]) -> Dict[str, Any]:
+    """GSTR-2A layout: tax amounts are inside itms[].itm_det."""
+    taxable = cgst = sgst = igst = cess = Decimal("0")
+    for item in inv.get("itms", []):
+        det = item.get("itm_det", item)
+        taxable += _amount(det.get("txval"))
+        igst += _amount(det.get("iamt"))
+        cgst += _amount(det.get("camt"))
+        sgst += _amount(det.get("samt"))
+        cess += _amount(det.get("csamt"))
+    return {
+        "supplier_gstin": (supplier.get("ctin") or "").upper(),
+        "supplier_name": supplier.get("trdnm"),
+        "invoice_number": inv.get("inum", ""),
+        "invoice_date": _parse_date(inv.get("idt")),
+        "invoice_type": inv.get("inv_typ", "R"),
+        "invoice_value": _amount(inv.get("val")),
+        "place_of_supply": inv.get("pos"),
+        "is_reverse_charge": inv.get("rchrg", "N") == "Y",
+        "taxable_value": taxable,
+        "cgst": cgst,
+        "sgst": sgst,
+        "igst": igst,
+        "cess": cess,
+    }
+
+
+def _invoice_from_2b(supplier: Dict[str, Any], inv: Dict[str, Any]) -> Dict[str, Any]:
+    """GSTR-2B layout: tax amounts are flat on the invoice."""
+    return {
+        "supplier_gstin": (supplier.get("ctin") or "").upper(),
+        "supplier_name": supplier.get("trdnm"),
+        "invoice_number": inv.get("inum", ""),
+        "invoice_date": _parse_date(inv.get("dt")),
+        "invoice_type": inv.get("typ", "R"),
+        "invoice_value": _amount(inv.get("val")),
+        "place_of_supply": inv.get("pos"),
+        "is_reverse_charge": inv.get("rev", "N") == "Y",
+        "taxable_value": _amount(inv.get("txval")),
+        "cgst": _amount(inv.get("cgst")),
+        "sgst": _amount(inv.get("sgst")),
+        "igst": _amount(inv.get("igst")),
+        "cess": _amount(inv.get("cess")),
+    }
+
+
+def iter_gstr2a_invoices(fp: IO) -> Iterator[Dict[str, Any]]:
+    """
+    Stream B2B supplier invoices from a GSTR-2A or GSTR-2B JSON download.
+
+    Both layouts group invoices per supplier under a ``b2b`` array
+    (top-level for 2A, ``data.docdata.b2b`` for 2B); the layout of each
+    invoice is detected from its keys. Invoices without a date are skipped.
+    """
+    for supplier in iter_json_array(fp, "b2b"):
+        if not isinstance(supplier, dict):
+            continue
+        for inv in supplier.get("inv", []):
+            if "itms" in inv or "idt" in inv:
+                invoice = _invoice_from_2a(supplier, inv)
+            else:
+                invoice = _invoice_from_2b(supplier, inv)
+            if invoice["invoice_date"] is None or not invoice["supplier_gstin"]:
+                continue
+            yield invoice
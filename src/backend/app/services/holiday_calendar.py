@@ -0,0 +1,210 @@
+"""
+Holiday Calendar - Cached company working-day calendars
+Per-year prefix sums of working, weekend and holiday days, so day counts
+between two dates are subtractions instead of day-by-day walks
+"""
+import time
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from datetime import date
+from itertools import accumulate
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import and_, event, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.leave import Holiday
+
+
+# Weekend days (0 = Monday, 6 = Sunday)
+WEEKEND_DAYS = frozenset({5, 6})
+
+# Calendars kept per process, keyed by (company, year)
+HOLIDAY_CACHE_SIZE = 1024
+
+# Edits made by other processes are picked up after this many seconds
+HOLIDAY_CACHE_TTL_SECONDS = 300
+
+
+class YearCalendar:
+    """
+    Working-day calendar of one company for one calendar year.
+
+    Prefix arrays hold the number of days of each kind before a day index
+    (index 0 = 1 January), so counts over a range are one subtraction and
+    the first/last working day of a range is a bisect.
+    """
+
+    __slots__ = ("year", "start", "holidays", "holiday_dates", "working", "weekend", "holiday", "loaded_at")
+
+    def __init__(self, year: int, holidays: List[Holiday], loaded_at: float):
+        self.year = year
+        self.start = date(year, 1, 1).toordinal()
+        self.holidays = sorted(holidays, key=lambda h: h.holiday_date)
+        self.holiday_dates = [h.holiday_date for h in self.holidays]
+        self.loaded_at = loaded_at
+
+        holiday_set = set(self.holiday_dates)
+        size = date(year, 12, 31).toordinal() - self.start + 1
+        is_weekend = [date.fromordinal(self.start + i).weekday() in WEEKEND_DAYS for i in range(size)]
+        is_holiday = [
+            not is_weekend[i] and date.fromordinal(self.start + i) in holiday_set
+            for i in range(size)
+        ]
+        self.weekend = [0, *accumulate(is_weekend)]
+        self.holiday = [0, *accumulate(is_holiday)]
+        self.working = [
+            index - weekend - holiday
+            for index, (weekend, holiday) in enumerate(zip(self.weekend, self.holiday))
+        ]
+
+    def index(self, day: date) -> int:
+        return day.toordinal() - self.start
+
+    def first_working(self, first: int, last: int) -> Optional[int]:
+        """Index of the first working day in [first, last], if any."""
+        position = bisect_right(self.working, self.working[first]) - 1
+        return position if position <= last else None
+
+    def last_working(self, first: int, last: int) -> Optional[int]:
+        """Index of the last working day in [first, last], if any."""
+        if self.working[last + 1] == self.working[first]:
+            return None
+        return bisect_left(self.working, self.working[last + 1]) - 1
+
+
+class HolidayCalendar:
+    """Working-day arithmetic over the cached years of one company."""
+
+    def __init__(self, years: Dict[int, YearCalendar]):
+        self.years = years
+
+    def _segments(self, from_date: date, to_date: date) -> Iterable[Tuple[YearCalendar, int, int]]:
+        """(year calendar, first index, last index) of each year the range touches."""
+        for year in range(from_date.year, to_date.year + 1):
+            calendar = self.years[year]
+            first = calendar.index(max(from_date, date(year, 1, 1)))
+            last = calendar.index(min(to_date, date(year, 12, 31)))
+            yield calendar, first, last
+
+    def _count(self, attribute: str, from_date: date, to_date: date) -> int:
+        if from_date > to_date:
+            return 0
+        total = 0
+        for calendar, first, last in self._segments(from_date, to_date):
+            prefix = getattr(calendar, attribute)
+            total += prefix[last + 1] - prefix[first]
+        return total
+
+    def working_days(self, from_date: date, to_date: date) -> int:
+        """Working days in [from_date, to_date]."""
+        return self._count("working", from_date, to_date)
+
+    def weekend_days(self, from_date: date, to_date: date) -> int:
+        return self._count("weekend", from_date, to_date)
+
+    def holiday_days(self, from_date: date, to_date: date) -> int:
+        """Holidays in the range that fall on a weekday."""
+        return self._count("holiday", from_date, to_date)
+
+    def is_working_day(self, day: date) -> bool:
+        return self.working_days(day, day) == 1
+
+    def first_working_day(self, from_date: date, to_date: date) -> Optional[date]:
+        for calendar, first, last in self._segments(from_date, to_date):
+            index = calendar.first_working(first, last)
+            if index is not None:
+                return date.fromordinal(calendar.start + index)
+        return None
+
+    def last_working_day(self, from_date: date, to_date: date) -> Optional[date]:
+        for calendar, first, last in reversed(list(self._segments(from_date, to_date))):
+            index = calendar.last_working(first, last)
+            if index is not None:
+                return date.fromordinal(calendar.start + index)
+        return None
+
+    def holidays_between(self, from_date: date, to_date: date) -> List[Holiday]:
+        """Holidays (including weekend ones) in the range, by date."""
+        holidays: List[Holiday] = []
+        for calendar, first, last in self._segments(from_date, to_date):
+            lo = bisect_left(calendar.holiday_dates, date.fromordinal(calendar.start + first))
+            hi = bisect_right(calendar.holiday_dates, date.fromordinal(calendar.start + last))
+            holidays.extend(calendar.holidays[lo:hi])
+        return holidays
+
+
+_calendar_cache: "OrderedDict[Tuple[str, int], YearCalendar]" = OrderedDict()
+
+
+def invalidate_holiday_calendar(company_id: Any, year: Optional[int] = None) -> None:
+    """Drop cached calendars of a company, optionally for one year."""
+    company_key = str(company_id)
+    for key in [k for k in _calendar_cache if k[0] == company_key and year in (None, k[1])]:
+        del _calendar_cache[key]
+
+
+@event.listens_for(Holiday, "after_insert")
+@event.listens_for(Holiday, "after_update")
+@event.listens_for(Holiday, "after_delete")
+def _invalidate_calendar_on_holiday_change(mapper, connection, target) -> None:
+    """Evict the year a holiday is in (and was in, if its date moved)."""
+    history = inspect(target).attrs.holiday_date.history
+    for holiday_date in {target.holiday_date, *(history.deleted or ())}:
+        if holiday_date:
+            invalidate_holiday_calendar(target.company_id, holiday_date.year)
+
+
+async def get_holiday_calendar(
+    db: AsyncSession,
+    company_id: UUID,
+    from_date: date,
+    to_date: date
+) -> HolidayCalendar:
+    """
+    Calendar covering from_date..to_date.
+
+    Years not cached (or older than HOLIDAY_CACHE_TTL_SECONDS) are loaded
+    together in one query. Only active, non-optional holidays count as
+    non-working days.
+    """
+    now = time.monotonic()
+    company_key = str(company_id)
+    years: Dict[int, YearCalendar] = {}
+    missing: List[int] = []
+
+    for year in range(min(from_date, to_date).year, max(from_date, to_date).year + 1):
+        calendar = _calendar_cache.get((company_key, year))
+        if calendar is not None and now - calendar.loaded_at < HOLIDAY_CACHE_TTL_SECONDS:
+            _calendar_cache.move_to_end((company_key, year))
+            years[year] = calendar
+        else:
+            missing.append(year)
+
+    if missing:
+        result = await db.execute(
+            select(*Holiday.__table__.columns).where(
+                and_(
+                    Holiday.company_id == company_id,
+                    Holiday.holiday_date >= date(missing[0], 1, 1),
+                    Holiday.holiday_date <= date(missing[-1], 12, 31),
+                    Holiday.is_active == True,
+                    Holiday.is_optional == False  # Exclude optional holidays
+                )
+            )
+        )
+        # Detached copies, so cached calendars never touch a session
+        by_year: Dict[int, List[Holiday]] = {year: [] for year in missing}
+        for row in result:
+            holiday = Holiday(**row._mapping)
+            if holiday.holiday_date.year in by_year:
+                by_year[holiday.holiday_date.year].append(holiday)
+
+        for year, holidays in by_year.items():
+            calendar = YearCalendar(year, holidays, now)
+            years[year] = _calendar_cache[(company_key, year)] = calendar
+        while len(_calendar_cache) > HOLIDAY_CACHE_SIZE:
+            _calendar_cache.popitem(last=False)
+
+    return HolidayCalendar(years)
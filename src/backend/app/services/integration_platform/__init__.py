@@ -1,10 +1,12 @@
 """Integration Platform Services (MOD-17)"""
 from app.services.integration_platform.connector_service import ConnectorService
 from app.services.integration_platform.webhook_service import WebhookService
+from app.services.integration_platform.webhook_dispatcher import WebhookDispatcher
 from app.services.integration_platform.sync_service import SyncService
 
 __all__ = [
     "ConnectorService",
     "WebhookService",
+    "WebhookDispatcher",
     "SyncService",
 ]
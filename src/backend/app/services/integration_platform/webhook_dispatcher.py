@@ -0,0 +1,587 @@
+"""
+Webhook Dispatcher - Integration Platform Module (MOD-17)
+
+Drains the webhook_deliveries queue. Due deliveries are claimed in
+batches with FOR UPDATE SKIP LOCKED, so several workers share the queue
+without double sends; a claim is a lease (status "sending" until
+next_attempt_at), so deliveries of a crashed worker are picked up again.
+
+Claimed deliveries are signed and POSTed through one shared keep-alive
+HTTP client. Each subscription has its own concurrency cap and circuit
+breaker, and only a bounded backlog of it is claimed at a time (capped in
+the claim query itself), so one slow or failing receiver cannot hold up
+the others. Results are written back in bulk every few hundred
+deliveries; deliveries not yet sent when a run's deadline passes are
+handed back to the queue instead of being sent late.
+"""
+import asyncio
+import base64
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Set
+from uuid import UUID
+
+import httpx
+from sqlalchemy import and_, case, func, literal, or_, select, update
+
+from app.core.datetime_utils import utc_now
+from app.models.integration import AuthType, WebhookDelivery, WebhookStatus, WebhookSubscription
+from app.services.integration_platform.webhook_service import WebhookService
+
+logger = logging.getLogger(__name__)
+
+
+# Deliveries claimed per query
+WEBHOOK_CLAIM_BATCH = 500
+
+# Deliveries in flight per worker
+WEBHOOK_MAX_IN_FLIGHT = 1000
+
+# Concurrent requests per subscription
+WEBHOOK_SUBSCRIPTION_CONCURRENCY = 8
+
+# Deliveries of one subscription claimed ahead of its concurrency
+WEBHOOK_SUBSCRIPTION_BACKLOG = 4 * WEBHOOK_SUBSCRIPTION_CONCURRENCY
+
+# Shared HTTP client pool; a request (connect to last byte) is cut off after the timeout
+WEBHOOK_MAX_CONNECTIONS = 200
+WEBHOOK_TIMEOUT_SECONDS = 10.0
+
+# Results written back per bulk update, at least every WEBHOOK_FLUSH_SECONDS
+WEBHOOK_RESULT_BATCH = 200
+WEBHOOK_FLUSH_SECONDS = 1.0
+
+# Longest a claimed delivery waits for its result to be written: queued
+# behind its subscription's backlog, one request timeout per round
+WEBHOOK_BATCH_SECONDS = (
+    WEBHOOK_SUBSCRIPTION_BACKLOG // WEBHOOK_SUBSCRIPTION_CONCURRENCY * WEBHOOK_TIMEOUT_SECONDS
+    + WEBHOOK_FLUSH_SECONDS
+)
+
+# Claimed deliveries not finished by then are claimable again. Must outlast
+# WEBHOOK_BATCH_SECONDS and the dispatch task's time limit, or a delivery
+# still being sent could be claimed and sent a second time.
+WEBHOOK_LEASE_SECONDS = 300
+
+# Consecutive failures opening a subscription's breaker, and how long it stays open
+BREAKER_FAILURE_THRESHOLD = 5
+BREAKER_OPEN_SECONDS = 60.0
+
+# Consecutive failed deliveries marking a subscription as failing
+SUBSCRIPTION_FAILING_THRESHOLD = WebhookService.FAILING_THRESHOLD
+
+# Response bodies are stored up to this many characters
+RESPONSE_BODY_LIMIT = 2000
+
+PENDING, SENDING, RETRY, SUCCESS, FAILED = "pending", "sending", "retry", "success", "failed"
+CLAIMABLE = (PENDING, RETRY, SENDING)
+
+
+def _now() -> datetime:
+    # Delivery timestamps are naive UTC columns
+    return utc_now().replace(tzinfo=None)
+
+
+def _status(status: WebhookStatus):
+    # Bound with the column's enum type, so it is stored like ORM-assigned values
+    return literal(status, WebhookSubscription.status.type)
+
+
+class CircuitBreaker:
+    """
+    Closed until failure_threshold consecutive failures, then open for
+    open_seconds; after that one trial request is let through (half-open),
+    whose outcome closes or re-opens it.
+    """
+
+    def __init__(self, failure_threshold: int = BREAKER_FAILURE_THRESHOLD, open_seconds: float = BREAKER_OPEN_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial = False
+
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+
+    def retry_at(self) -> float:
+        """Monotonic time at which the breaker lets a trial through."""
+        return (self.opened_at or 0.0) + self.open_seconds
+
+    def allow(self) -> bool:
+        if self.opened_at is None:
+            return True
+        if self._trial or time.monotonic() < self.retry_at():
+            return False
+        self._trial = True
+        return True
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self._trial or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+        self._trial = False
+
+
+@dataclass
+class ClaimedDelivery:
+    id: UUID
+    subscription_id: UUID
+    request_url: str
+    request_headers: Dict[str, Any]
+    request_body: str
+    attempt_number: int
+
+
+@dataclass
+class _SubscriptionState:
+    semaphore: asyncio.Semaphore
+    breaker: CircuitBreaker
+    in_flight: int = 0
+
+
+@dataclass
+class _Outcome:
+    """Result of one attempt, as the row values to write."""
+    values: Dict[str, Any]
+    subscription_id: UUID
+    delivered: Optional[bool] = None  # None: not attempted (breaker open, subscription gone)
+
+
+def retry_delay(attempt_number: int) -> int:
+    delays = WebhookService.RETRY_DELAYS
+    return delays[min(attempt_number - 1, len(delays) - 1)]
+
+
+def is_retryable_status(status_code: int) -> bool:
+    return status_code >= 500 or status_code in (408, 425, 429)
+
+
+def auth_headers(subscription: Any) -> Dict[str, str]:
+    """Authentication headers configured on a subscription."""
+    config = subscription.auth_config or {}
+    if subscription.auth_type == AuthType.BEARER and config.get("token"):
+        return {"Authorization": f"Bearer {config['token']}"}
+    if subscription.auth_type == AuthType.BASIC and config.get("username"):
+        credentials = f"{config['username']}:{config.get('password', '')}".encode()
+        return {"Authorization": f"Basic {base64.b64encode(credentials).decode()}"}
+    if subscription.auth_type == AuthType.API_KEY and config.get("key"):
+        return {config.get("header", "X-API-Key"): config["key"]}
+    return {}
+
+
+def signed_headers(delivery: ClaimedDelivery, subscription: Any) -> Dict[str, str]:
+    """Stored request headers plus auth and a timestamped HMAC signature of the body."""
+    headers = {**(delivery.request_headers or {}), **auth_headers(subscription)}
+    timestamp = str(int(time.time()))
+    headers["X-Webhook-Timestamp"] = timestamp
+    headers["X-Webhook-Attempt"] = str(delivery.attempt_number)
+    if subscription.secret:
+        signature = WebhookService.sign_payload(f"{timestamp}.{delivery.request_body}", subscription.secret)
+        headers["X-Webhook-Signature"] = f"sha256={signature}"
+    return headers
+
+
+class WebhookDispatcher:
+    """
+    Worker draining due webhook deliveries.
+
+        async with WebhookDispatcher() as dispatcher:
+            stats = await dispatcher.run(max_seconds=240)
+    """
+
+    def __init__(
+        self,
+        session_factory: Any = None,
+        client: Optional[httpx.AsyncClient] = None,
+        claim_batch: int = WEBHOOK_CLAIM_BATCH,
+        max_in_flight: int = WEBHOOK_MAX_IN_FLIGHT,
+        subscription_concurrency: int = WEBHOOK_SUBSCRIPTION_CONCURRENCY,
+        subscription_backlog: int = WEBHOOK_SUBSCRIPTION_BACKLOG,
+        result_batch: int = WEBHOOK_RESULT_BATCH,
+    ):
+        self.claim_batch = claim_batch
+        self.max_in_flight = max_in_flight
+        self.subscription_concurrency = subscription_concurrency
+        self.subscription_backlog = subscription_backlog
+        self.result_batch = result_batch
+        self._session_factory = session_factory
+        self._client = client
+        self._owns_client = client is None
+        self._subscriptions: Dict[UUID, _SubscriptionState] = {}
+        self._outcomes: List[_Outcome] = []
+        self._released: List[UUID] = []
+        self._in_flight: Set[asyncio.Task] = set()
+        self._closing = False
+        self.stats = {"claimed": 0, "delivered": 0, "retried": 0, "failed": 0, "deferred": 0, "released": 0}
+
+    async def __aenter__(self) -> "WebhookDispatcher":
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=WEBHOOK_TIMEOUT_SECONDS,
+                limits=httpx.Limits(
+                    max_connections=WEBHOOK_MAX_CONNECTIONS,
+                    max_keepalive_connections=WEBHOOK_MAX_CONNECTIONS,
+                ),
+                follow_redirects=False,
+            )
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight, return_exceptions=True)
+        await self.flush()
+        if self._owns_client and self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _session(self):
+        if self._session_factory is None:
+            from app.db.session import async_session_maker
+            self._session_factory = async_session_maker
+        return self._session_factory()
+
+    def _state(self, subscription_id: UUID) -> _SubscriptionState:
+        state = self._subscriptions.get(subscription_id)
+        if state is None:
+            state = self._subscriptions[subscription_id] = _SubscriptionState(
+                asyncio.Semaphore(self.subscription_concurrency), CircuitBreaker()
+            )
+        return state
+
+    # ---------- Queue ----------
+
+    async def claim(self, limit: int) -> List[ClaimedDelivery]:
+        """
+        Lease up to limit due deliveries, skipping rows other workers hold
+        and subscriptions whose breaker is open. No subscription gets more
+        than its free backlog here (subscription_backlog minus in flight).
+        """
+        now = _now()
+        room: Dict[UUID, int] = {}
+        busy = []
+        for subscription_id, state in self._subscriptions.items():
+            free = 0 if state.breaker.is_open else self.subscription_backlog - state.in_flight
+            if free <= 0:
+                busy.append(subscription_id)
+            elif free < self.subscription_backlog:
+                room[subscription_id] = free
+
+        is_due = and_(
+            WebhookDelivery.status.in_(CLAIMABLE),
+            or_(WebhookDelivery.next_attempt_at.is_(None), WebhookDelivery.next_attempt_at <= now),
+        )
+        if busy:
+            is_due = and_(is_due, WebhookDelivery.subscription_id.notin_(busy))
+        cap = (
+            case(room, value=WebhookDelivery.subscription_id, else_=self.subscription_backlog)
+            if room else literal(self.subscription_backlog)
+        )
+        # Window functions cannot be combined with FOR UPDATE: rank the due
+        # rows per subscription first, then lock the capped candidates
+        ranked = (
+            select(
+                WebhookDelivery.id,
+                WebhookDelivery.next_attempt_at,
+                func.row_number().over(
+                    partition_by=WebhookDelivery.subscription_id,
+                    order_by=WebhookDelivery.next_attempt_at.nulls_first(),
+                ).label("position"),
+                cap.label("cap"),
+            )
+            .where(is_due)
+            .subquery()
+        )
+        candidates = (
+            select(ranked.c.id)
+            .where(ranked.c.position <= ranked.c.cap)
+            .order_by(ranked.c.next_attempt_at.nulls_first())
+            .limit(limit)
+        )
+        due = (
+            # The due check is repeated: a row may have been claimed since the ranking snapshot
+            select(WebhookDelivery.id)
+            .where(and_(is_due, WebhookDelivery.id.in_(candidates.scalar_subquery())))
+            .with_for_update(skip_locked=True)
+        )
+
+        async with self._session() as session:
+            async with session.begin():
+                rows = (await session.execute(
+                    update(WebhookDelivery)
+                    .where(WebhookDelivery.id.in_(due.scalar_subquery()))
+                    .values(
+                        status=SENDING,
+                        next_attempt_at=now + timedelta(seconds=WEBHOOK_LEASE_SECONDS),
+                        # A reclaimed lease counts as an attempt: the request may have gone out
+                        attempt_number=case(
+                            (WebhookDelivery.status == SENDING, WebhookDelivery.attempt_number + 1),
+                            else_=WebhookDelivery.attempt_number,
+                        ),
+                    )
+                    .returning(
+                        WebhookDelivery.id, WebhookDelivery.subscription_id, WebhookDelivery.request_url,
+                        WebhookDelivery.request_headers, WebhookDelivery.request_body, WebhookDelivery.attempt_number,
+                    )
+                    .execution_options(synchronize_session=False)
+                )).all()
+        claimed = [ClaimedDelivery(*row) for row in rows]
+        self.stats["claimed"] += len(claimed)
+        return claimed
+
+    async def _load_subscriptions(self, ids: Set[UUID]) -> Dict[UUID, Any]:
+        async with self._session() as session:
+            rows = (await session.execute(
+                select(
+                    WebhookSubscription.id, WebhookSubscription.method, WebhookSubscription.secret,
+                    WebhookSubscription.auth_type, WebhookSubscription.auth_config,
+                    WebhookSubscription.status, WebhookSubscription.deleted_at,
+                ).where(WebhookSubscription.id.in_(ids))
+            )).all()
+        return {row.id: row for row in rows}
+
+    # ---------- Sending ----------
+
+    async def _attempt(self, delivery: ClaimedDelivery, subscription: Any) -> Optional[_Outcome]:
+        """Send one delivery; None if the run closed before it was sent."""
+        state = self._state(delivery.subscription_id)
+        try:
+            async with state.semaphore:
+                if self._closing:
+                    return None
+                if subscription is None or subscription.deleted_at is not None or subscription.status == WebhookStatus.INACTIVE:
+                    return self._failed(delivery, "Subscription is inactive or deleted", final=True)
+                if not state.breaker.allow():
+                    return self._deferred(delivery, state.breaker)
+
+                started = time.monotonic()
+                try:
+                    # httpx times each phase separately; bound the whole request
+                    response = await asyncio.wait_for(
+                        self._client.request(
+                            subscription.method or "POST",
+                            delivery.request_url,
+                            content=delivery.request_body.encode(),
+                            headers=signed_headers(delivery, subscription),
+                        ),
+                        WEBHOOK_TIMEOUT_SECONDS,
+                    )
+                except (httpx.HTTPError, asyncio.TimeoutError) as e:
+                    state.breaker.record_failure()
+                    return self._failed(delivery, f"{type(e).__name__}: {e}", duration=time.monotonic() - started)
+
+                duration = time.monotonic() - started
+                if 200 <= response.status_code < 300:
+                    state.breaker.record_success()
+                    return _Outcome(
+                        self._values(
+                            delivery, SUCCESS, response=response, duration=duration, delivered_at=_now()
+                        ),
+                        delivery.subscription_id, delivered=True,
+                    )
+                if is_retryable_status(response.status_code):
+                    state.breaker.record_failure()
+                else:
+                    # The receiver answered; it is up, it just rejects this delivery
+                    state.breaker.record_success()
+                return self._failed(
+                    delivery, f"HTTP {response.status_code}", response=response, duration=duration,
+                    final=not is_retryable_status(response.status_code),
+                )
+        finally:
+            state.in_flight -= 1
+
+    @staticmethod
+    def _values(delivery: ClaimedDelivery, status: str, response: Optional[httpx.Response] = None,
+                duration: Optional[float] = None, error: Optional[str] = None,
+                attempt_number: Optional[int] = None, next_attempt_at: Optional[datetime] = None,
+                delivered_at: Optional[datetime] = None) -> Dict[str, Any]:
+        return {
+            "id": delivery.id,
+            "status": status,
+            "response_status": response.status_code if response is not None else None,
+            "response_headers": dict(response.headers) if response is not None else None,
+            "response_body": response.text[:RESPONSE_BODY_LIMIT] if response is not None else None,
+            "duration_ms": int(duration * 1000) if duration is not None else None,
+            "error_message": error,
+            "attempt_number": attempt_number or delivery.attempt_number,
+            "next_attempt_at": next_attempt_at,
+            "delivered_at": delivered_at or _now(),
+        }
+
+    def _failed(self, delivery: ClaimedDelivery, error: str, final: bool = False, **kwargs) -> _Outcome:
+        if final or delivery.attempt_number >= WebhookService.MAX_RETRY_ATTEMPTS:
+            values = self._values(delivery, FAILED, error=error, **kwargs)
+        else:
+            values = self._values(
+                delivery, RETRY, error=error, attempt_number=delivery.attempt_number + 1,
+                next_attempt_at=_now() + timedelta(seconds=retry_delay(delivery.attempt_number)), **kwargs
+            )
+        return _Outcome(values, delivery.subscription_id, delivered=False)
+
+    def _deferred(self, delivery: ClaimedDelivery, breaker: CircuitBreaker) -> _Outcome:
+        """Put a delivery back, unattempted, until the breaker lets requests through."""
+        wait = max(breaker.retry_at() - time.monotonic(), 1.0)
+        values = self._values(
+            delivery, RETRY, error="Circuit open: receiver failing", next_attempt_at=_now() + timedelta(seconds=wait)
+        )
+        return _Outcome(values, delivery.subscription_id)
+
+    async def _send(self, delivery: ClaimedDelivery, subscription: Any) -> None:
+        try:
+            outcome = await self._attempt(delivery, subscription)
+        except Exception as e:
+            logger.exception("Webhook delivery %s failed unexpectedly", delivery.id)
+            outcome = self._failed(delivery, str(e))
+        if outcome is None:
+            self._released.append(delivery.id)
+            self.stats["released"] += 1
+            return
+        self._outcomes.append(outcome)
+        if outcome.delivered is None:
+            self.stats["deferred"] += 1
+        elif outcome.delivered:
+            self.stats["delivered"] += 1
+        elif outcome.values["status"] == RETRY:
+            self.stats["retried"] += 1
+        else:
+            self.stats["failed"] += 1
+
+    # ---------- Results ----------
+
+    async def flush(self) -> int:
+        """Write finished deliveries, released leases and subscription health back in bulk."""
+        outcomes, self._outcomes = self._outcomes, []
+        released, self._released = self._released, []
+        if not outcomes and not released:
+            return 0
+
+        health: Dict[UUID, Dict[str, Any]] = {}
+        for outcome in outcomes:
+            if outcome.delivered is None:
+                continue
+            # Outcomes are in completion order: failures after the last success count
+            entry = health.setdefault(outcome.subscription_id, {"success": None, "failures": 0, "failure_at": None})
+            if outcome.delivered:
+                entry["success"] = outcome.values["delivered_at"]
+                entry["failures"] = 0
+            else:
+                entry["failures"] += 1
+                entry["failure_at"] = outcome.values["delivered_at"]
+
+        now = _now()
+        async with self._session() as session:
+            async with session.begin():
+                if released:
+                    # Never sent: due again at once, without counting an attempt
+                    await session.execute(
+                        update(WebhookDelivery)
+                        .where(and_(WebhookDelivery.id.in_(released), WebhookDelivery.status == SENDING))
+                        .values(
+                            status=case((WebhookDelivery.attempt_number > 1, RETRY), else_=PENDING),
+                            next_attempt_at=now,
+                        )
+                        .execution_options(synchronize_session=False)
+                    )
+                if outcomes:
+                    # ORM bulk UPDATE by primary key: one executemany for the batch
+                    await session.execute(update(WebhookDelivery), [outcome.values for outcome in outcomes])
+                for subscription_id, entry in health.items():
+                    values: Dict[str, Any] = {"last_triggered_at": now}
+                    if entry["failure_at"] is not None:
+                        values["last_failure_at"] = entry["failure_at"]
+                    if entry["success"] is not None:
+                        failure_count = literal(entry["failures"])
+                        values["last_success_at"] = entry["success"]
+                    else:
+                        failure_count = WebhookSubscription.failure_count + entry["failures"]
+                    values["failure_count"] = failure_count
+                    values["status"] = case(
+                        (WebhookSubscription.status == WebhookStatus.INACTIVE, _status(WebhookStatus.INACTIVE)),
+                        (failure_count >= SUBSCRIPTION_FAILING_THRESHOLD, _status(WebhookStatus.FAILING)),
+                        else_=_status(WebhookStatus.ACTIVE),
+                    )
+                    await session.execute(
+                        update(WebhookSubscription)
+                        .where(WebhookSubscription.id == subscription_id)
+                        .values(**values)
+                        .execution_options(synchronize_session=False)
+                    )
+        return len(outcomes) + len(released)
+
+    # ---------- Loop ----------
+
+    async def dispatch_once(self) -> int:
+        """Claim one batch and start sending it; returns the number claimed."""
+        room = min(self.claim_batch, self.max_in_flight - len(self._in_flight))
+        if room <= 0:
+            return 0
+        claimed = await self.claim(room)
+        if not claimed:
+            return 0
+
+        subscriptions = await self._load_subscriptions({d.subscription_id for d in claimed})
+        for delivery in claimed:
+            self._state(delivery.subscription_id).in_flight += 1
+            task = asyncio.create_task(self._send(delivery, subscriptions.get(delivery.subscription_id)))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+        return len(claimed)
+
+    async def run(self, max_seconds: Optional[float] = None, idle_exit: bool = True,
+                  poll_seconds: float = 1.0) -> Dict[str, int]:
+        """
+        Dispatch until the queue is empty (idle_exit) or max_seconds pass.
+
+        After the deadline nothing new is claimed or sent: requests already
+        under way are finished and recorded, deliveries still queued behind
+        them have their leases released before returning.
+        """
+        deadline = time.monotonic() + max_seconds if max_seconds else None
+
+        def wait_limit(seconds: Optional[float]) -> Optional[float]:
+            # Waits never run past the deadline
+            if deadline is None:
+                return seconds
+            remaining = max(deadline - time.monotonic(), 0.0)
+            return remaining if seconds is None else min(seconds, remaining)
+
+        last_flush = time.monotonic()
+        self._closing = False
+        while deadline is None or time.monotonic() < deadline:
+            claimed = await self.dispatch_once()
+            if not claimed and not self._in_flight and idle_exit:
+                break
+
+            if len(self._outcomes) >= self.result_batch or time.monotonic() - last_flush >= WEBHOOK_FLUSH_SECONDS:
+                await self.flush()
+                last_flush = time.monotonic()
+
+            if not claimed:
+                # Nothing claimable now: wait for sends to finish or new work to become due
+                if self._in_flight:
+                    await asyncio.wait(
+                        self._in_flight, timeout=wait_limit(poll_seconds), return_when=asyncio.FIRST_COMPLETED
+                    )
+                else:
+                    await asyncio.sleep(wait_limit(poll_seconds))
+            elif len(self._in_flight) >= self.max_in_flight:
+                await asyncio.wait(
+                    self._in_flight, timeout=wait_limit(None), return_when=asyncio.FIRST_COMPLETED
+                )
+            else:
+                await asyncio.sleep(0)
+
+        self._closing = True
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight, return_exceptions=True)
+        await self.flush()
+        return dict(self.stats)
@@ -6,8 +6,9 @@ from typing import List, Optional, Tuple, Dict, Any
 from uuid import UUID, uuid4
 import hashlib
 import hmac
+import json
 
-from sqlalchemy import select, and_, func
+from sqlalchemy import select, and_, func, insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.datetime_utils import utc_now
@@ -24,6 +25,7 @@ class WebhookService:
 
     MAX_RETRY_ATTEMPTS = 5
     RETRY_DELAYS = [60, 300, 900, 3600, 7200]  # seconds
+    FAILING_THRESHOLD = 10  # consecutive failures before a subscription is marked failing
 
     @staticmethod
     def generate_secret_key() -> str:
@@ -147,8 +149,7 @@ class WebhookService:
                 and_(
                     WebhookSubscription.company_id == company_id,
                     WebhookSubscription.status == WebhookStatus.ACTIVE,
-                    WebhookSubscription.is_active == True,
-                    WebhookSubscription.event_types.contains([event_type]),
+                    WebhookSubscription.events.contains([event_type]),
                     WebhookSubscription.deleted_at.is_(None)
                 )
             )
@@ -156,6 +157,37 @@ class WebhookService:
         return result.scalars().all()
 
     # Delivery Methods
+    @staticmethod
+    def build_event(event_type: str, payload: Dict[str, Any]) -> Tuple[str, str]:
+        """Event id and JSON request body for an event."""
+        event_id = str(uuid4())
+        body = json.dumps(
+            {"id": event_id, "event": event_type, "created_at": utc_now().isoformat(), "data": payload},
+            default=str, separators=(",", ":")
+        )
+        return event_id, body
+
+    @staticmethod
+    def delivery_values(
+        subscription: WebhookSubscription,
+        event_type: str,
+        event_id: str,
+        body: str
+    ) -> Dict[str, Any]:
+        """Row values of a pending delivery; the dispatcher signs and sends it."""
+        return {
+            "id": uuid4(),
+            "subscription_id": subscription.id,
+            "event": event_type,
+            "event_id": event_id,
+            "request_url": subscription.url,
+            "request_headers": {"Content-Type": "application/json", **(subscription.headers or {})},
+            "request_body": body,
+            "status": "pending",
+            "attempt_number": 1,
+            "next_attempt_at": utc_now().replace(tzinfo=None),
+        }
+
     @staticmethod
     async def create_delivery(
         db: AsyncSession,
@@ -164,19 +196,35 @@ class WebhookService:
         payload: Dict[str, Any]
     ) -> WebhookDelivery:
         """Create a webhook delivery record."""
-        delivery = WebhookDelivery(
-            id=uuid4(),
-            subscription_id=subscription.id,
-            event_type=event_type,
-            payload=payload,
-            attempt_count=0,
-            status="pending"
-        )
+        event_id, body = WebhookService.build_event(event_type, payload)
+        delivery = WebhookDelivery(**WebhookService.delivery_values(subscription, event_type, event_id, body))
         db.add(delivery)
         await db.commit()
         await db.refresh(delivery)
         return delivery
 
+    @staticmethod
+    async def enqueue_event(
+        db: AsyncSession,
+        company_id: UUID,
+        event_type: str,
+        payload: Dict[str, Any]
+    ) -> int:
+        """
+        Queue one delivery per active subscriber of an event, in a single
+        insert; WebhookDispatcher sends them. Returns the number queued.
+        """
+        subscriptions = await WebhookService.get_active_subscriptions(db, company_id, event_type)
+        if not subscriptions:
+            return 0
+        event_id, body = WebhookService.build_event(event_type, payload)
+        await db.execute(
+            insert(WebhookDelivery),
+            [WebhookService.delivery_values(s, event_type, event_id, body) for s in subscriptions]
+        )
+        await db.commit()
+        return len(subscriptions)
+
     @staticmethod
     async def get_delivery(
         db: AsyncSession,
@@ -221,11 +269,11 @@ class WebhookService:
         response_body: Optional[str] = None
     ) -> WebhookDelivery:
         """Mark delivery as successful."""
-        delivery.status = "delivered"
+        delivery.status = "success"
         delivery.response_status = response_status
         delivery.response_body = response_body
-        delivery.delivered_at = utc_now()
-        delivery.attempt_count += 1
+        delivery.delivered_at = utc_now().replace(tzinfo=None)
+        delivery.next_attempt_at = None
 
         # Reset subscription failure count
         result = await db.execute(
@@ -236,7 +284,8 @@ class WebhookService:
         subscription = result.scalar_one_or_none()
         if subscription:
             subscription.failure_count = 0
-            subscription.last_triggered_at = utc_now()
+            subscription.last_triggered_at = utc_now().replace(tzinfo=None)
+            subscription.last_success_at = subscription.last_triggered_at
 
         await db.commit()
         await db.refresh(delivery)
@@ -250,12 +299,12 @@ class WebhookService:
         response_status: Optional[int] = None
     ) -> WebhookDelivery:
         """Mark delivery as failed and schedule retry."""
-        delivery.attempt_count += 1
         delivery.error_message = error_message
         delivery.response_status = response_status
 
-        if delivery.attempt_count >= WebhookService.MAX_RETRY_ATTEMPTS:
+        if delivery.attempt_number >= WebhookService.MAX_RETRY_ATTEMPTS:
             delivery.status = "failed"
+            delivery.next_attempt_at = None
 
             # Update subscription failure count
             result = await db.execute(
@@ -266,14 +315,15 @@ class WebhookService:
             subscription = result.scalar_one_or_none()
             if subscription:
                 subscription.failure_count += 1
-                if subscription.failure_count >= 10:
-                    subscription.status = WebhookStatus.FAILED
+                if subscription.failure_count >= WebhookService.FAILING_THRESHOLD:
+                    subscription.status = WebhookStatus.FAILING
         else:
             delivery.status = "retry"
             retry_delay = WebhookService.RETRY_DELAYS[
-                min(delivery.attempt_count - 1, len(WebhookService.RETRY_DELAYS) - 1)
+                min(delivery.attempt_number - 1, len(WebhookService.RETRY_DELAYS) - 1)
             ]
-            delivery.next_retry_at = utc_now() + timedelta(seconds=retry_delay)
+            delivery.attempt_number += 1
+            delivery.next_attempt_at = utc_now().replace(tzinfo=None) + timedelta(seconds=retry_delay)
 
         await db.commit()
         await db.refresh(delivery)
@@ -281,15 +331,16 @@ class WebhookService:
 
     @staticmethod
     async def get_pending_retries(
-        db: AsyncSession
+        db: AsyncSession,
+        limit: int = 100
     ) -> List[WebhookDelivery]:
         """Get deliveries pending retry."""
         result = await db.execute(
             select(WebhookDelivery).where(
                 and_(
                     WebhookDelivery.status == "retry",
-                    WebhookDelivery.next_retry_at <= utc_now()
+                    WebhookDelivery.next_attempt_at <= utc_now().replace(tzinfo=None)
                 )
-            ).limit(100)
+            ).order_by(WebhookDelivery.next_attempt_at).limit(limit)
         )
         return result.scalars().all()
@@ -30,6 +30,7 @@ from app.schemas.leave import (
     LeaveDaysCalculationRequest, LeaveDaysCalculationResponse,
     LeaveBalanceSummary, LeaveCalendarEntry, CreditAnnualLeavesRequest
 )
+from app.services.holiday_calendar import WEEKEND_DAYS, HolidayCalendar, get_holiday_calendar
 
 
 @dataclass
@@ -56,7 +57,7 @@ class LeaveService:
     FY_START_DAY = 1
 
     # Weekend days (0 = Monday, 6 = Sunday)
-    WEEKEND_DAYS = {5, 6}  # Saturday, Sunday
+    WEEKEND_DAYS = WEEKEND_DAYS  # Saturday, Sunday
 
     @staticmethod
     def get_financial_year(dt: date = None) -> str:
@@ -135,46 +136,79 @@ class LeaveService:
         Returns:
             LeaveCalculationResult with all calculations
         """
-        # Get holidays in the date range
-        holidays = await cls._get_holidays_in_range(
-            db, company_id, from_date, to_date, employee_id
+        calendar = await get_holiday_calendar(db, company_id, from_date, to_date)
+        return cls.calculate_leave_days_from_calendar(
+            calendar, from_date, to_date, from_day_type, to_day_type, apply_sandwich_rule
         )
-        holiday_dates = {h.holiday_date for h in holidays}
 
-        # Calculate days
+    @classmethod
+    async def calculate_leave_days_batch(
+        cls,
+        db: AsyncSession,
+        company_id: UUID,
+        requests: List[LeaveDaysCalculationRequest],
+        apply_sandwich_rule: Optional[Dict[UUID, bool]] = None
+    ) -> List[LeaveCalculationResult]:
+        """
+        Calculate leave days for many date ranges with one calendar lookup.
+
+        Args:
+            db: Database session
+            company_id: Company ID for holiday lookup
+            requests: Date ranges and day types to calculate
+            apply_sandwich_rule: Sandwich rule by leave type ID; looked up
+                from the leave policies when omitted
+
+        Returns:
+            One LeaveCalculationResult per request, in order
+        """
+        if not requests:
+            return []
+
+        if apply_sandwich_rule is None:
+            apply_sandwich_rule = {}
+            for leave_type_id in {r.leave_type_id for r in requests if r.leave_type_id}:
+                policy = await cls._get_leave_policy(db, company_id, leave_type_id)
+                apply_sandwich_rule[leave_type_id] = policy.apply_sandwich_rule if policy else False
+
+        calendar = await get_holiday_calendar(
+            db, company_id,
+            min(r.from_date for r in requests),
+            max(r.to_date for r in requests)
+        )
+        return [
+            cls.calculate_leave_days_from_calendar(
+                calendar, r.from_date, r.to_date, r.from_day_type, r.to_day_type,
+                apply_sandwich_rule.get(r.leave_type_id, False)
+            )
+            for r in requests
+        ]
+
+    @classmethod
+    def calculate_leave_days_from_calendar(
+        cls,
+        calendar: HolidayCalendar,
+        from_date: date,
+        to_date: date,
+        from_day_type: DayType = DayType.FULL,
+        to_day_type: DayType = DayType.FULL,
+        apply_sandwich_rule: bool = False
+    ) -> LeaveCalculationResult:
+        """
+        Leave days from a holiday calendar, without database access.
+
+        Day counts come from the calendar's prefix sums; half days on the
+        first and last day are then taken off the full working days.
+        """
         calendar_days = (to_date - from_date).days + 1
-        weekend_days = 0
-        holiday_days_count = 0
-        working_days = Decimal("0")
-
-        current_date = from_date
-        while current_date <= to_date:
-            is_weekend = current_date.weekday() in cls.WEEKEND_DAYS
-            is_holiday = current_date in holiday_dates
-
-            if is_weekend:
-                weekend_days += 1
-            elif is_holiday:
-                holiday_days_count += 1
-            else:
-                # Working day
-                if current_date == from_date:
-                    # First day
-                    if from_day_type == DayType.FULL:
-                        working_days += Decimal("1")
-                    else:
-                        working_days += Decimal("0.5")
-                elif current_date == to_date:
-                    # Last day
-                    if to_day_type == DayType.FULL:
-                        working_days += Decimal("1")
-                    else:
-                        working_days += Decimal("0.5")
-                else:
-                    # Middle day
-                    working_days += Decimal("1")
-
-            current_date += timedelta(days=1)
+        weekend_days = calendar.weekend_days(from_date, to_date)
+        holiday_days_count = calendar.holiday_days(from_date, to_date)
+        working_days = Decimal(calendar.working_days(from_date, to_date))
+
+        if from_day_type != DayType.FULL and calendar.is_working_day(from_date):
+            working_days -= Decimal("0.5")
+        if to_date != from_date and to_day_type != DayType.FULL and calendar.is_working_day(to_date):
+            working_days -= Decimal("0.5")
 
         # Apply sandwich rule
         sandwich_days = Decimal("0")
@@ -184,7 +218,7 @@ class LeaveService:
             # Sandwich rule: If leave is taken before and after weekend/holiday,
             # those days also count as leave
             sandwich_days = cls._calculate_sandwich_days(
-                from_date, to_date, holiday_dates, working_days
+                calendar, from_date, to_date, working_days
             )
             total_days = working_days + sandwich_days
 
@@ -195,55 +229,35 @@ class LeaveService:
             weekend_days=weekend_days,
             holiday_days=holiday_days_count,
             sandwich_days=sandwich_days,
-            holidays=holidays,
+            holidays=calendar.holidays_between(from_date, to_date),
             apply_sandwich_rule=apply_sandwich_rule
         )
 
     @classmethod
     def _calculate_sandwich_days(
         cls,
+        calendar: HolidayCalendar,
         from_date: date,
         to_date: date,
-        holiday_dates: set,
         working_days: Decimal
     ) -> Decimal:
         """
         Calculate sandwich days (weekends/holidays between working leave days).
 
         Sandwich rule: If leave is taken on Friday and Monday, Saturday and Sunday
-        are also counted as leave days.
+        are also counted as leave days. These are the non-working days between
+        the first and last working day of the leave.
         """
         if working_days < Decimal("2"):
             return Decimal("0")
 
-        sandwich_days = Decimal("0")
-        current_date = from_date
-        in_leave_block = False
-        sandwich_start = None
-
-        while current_date <= to_date:
-            is_non_working = (
-                current_date.weekday() in cls.WEEKEND_DAYS or
-                current_date in holiday_dates
-            )
-
-            if not is_non_working:
-                # Working day
-                if sandwich_start is not None:
-                    # End of potential sandwich - count the days
-                    days_between = (current_date - sandwich_start).days - 1
-                    if days_between > 0 and in_leave_block:
-                        sandwich_days += Decimal(str(days_between))
-                    sandwich_start = None
-                in_leave_block = True
-            else:
-                # Non-working day
-                if in_leave_block and sandwich_start is None:
-                    sandwich_start = current_date
-
-            current_date += timedelta(days=1)
+        first = calendar.first_working_day(from_date, to_date)
+        last = calendar.last_working_day(from_date, to_date)
+        if first is None or last is None:
+            return Decimal("0")
 
-        return sandwich_days
+        span = (last - first).days + 1
+        return Decimal(span - calendar.working_days(first, last))
 
     @classmethod
     async def _get_holidays_in_range(
@@ -832,7 +846,8 @@ class LeaveService:
             ))
 
         # Get holidays
-        holidays = await cls._get_holidays_in_range(db, company_id, from_date, to_date)
+        calendar = await get_holiday_calendar(db, company_id, from_date, to_date)
+        holidays = calendar.holidays_between(from_date, to_date)
 
         return entries, holidays
 
@@ -1,6 +1,7 @@
 """Mobile Apps API Services (MOD-18)"""
 from app.services.mobile.device_service import DeviceService
 from app.services.mobile.sync_service import MobileSyncService
+from app.services.mobile.offline_processor import OfflineActionProcessor
 from app.services.mobile.notification_service import MobileNotificationService
 
 # Aliases for endpoint compatibility
@@ -10,6 +11,7 @@ NotificationService = MobileNotificationService
 __all__ = [
     "DeviceService",
     "MobileSyncService",
+    "OfflineActionProcessor",
     "MobileNotificationService",
     "SyncService",
     "NotificationService",
@@ -0,0 +1,579 @@
+"""
+Offline Action Processor - Mobile Apps API Module (MOD-18)
+
+Applies the actions a device queued while offline. Actions are grouped by
+entity type; each group is one transaction that claims its actions in
+offline_actions (the idempotency record, unique per company, user and
+client_action_id), applies them with bulk statements and stores each
+action's result. A resent action is not applied again: its stored result
+is returned instead.
+
+Referenced records (leave types, expense categories, projects, advances)
+are checked in one query each before the bulk statements, so an action
+pointing at a missing or foreign record fails on its own. If the
+database still rejects a bulk statement, its actions are applied again
+one savepoint each and only the offending ones fail.
+"""
+import logging
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from uuid import UUID, uuid4
+
+from pydantic import ValidationError
+from sqlalchemy import and_, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import DataError, IntegrityError, SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.datetime_utils import utc_now
+from app.models.employee import Employee
+from app.models.expense import ExpenseAdvance, ExpenseCategory, ExpenseClaim, ExpenseItem, ExpenseStatus
+from app.models.leave import DayType, LeaveRequest, LeaveStatus, LeaveType
+from app.models import mobile as mobile_models
+from app.models.mobile import MobileAttendancePunch, OfflineAction
+from app.models.project import Project
+from app.schemas.expense import ExpenseClaimCreate, ExpenseClaimUpdate
+from app.schemas.leave import LeaveDaysCalculationRequest
+from app.schemas.mobile import (
+    MobileAttendancePunchBase, MobileLeaveRequestBase, OfflineActionCreate, OfflineActionType, SyncEntityType
+)
+
+logger = logging.getLogger(__name__)
+
+
+# Actions applied per transaction
+OFFLINE_GROUP_SIZE = 500
+
+# Expense claim fields an offline update may change
+EXPENSE_UPDATE_FIELDS = tuple(ExpenseClaimUpdate.model_fields)
+
+SUCCESS, FAILED, PROCESSING = "success", "failed", "processing"
+
+
+def _naive(value: datetime) -> datetime:
+    # offline_actions and mobile punch timestamps are naive UTC columns
+    return value.astimezone(timezone.utc).replace(tzinfo=None) if value.tzinfo else value
+
+
+def _chunks(items: List[Any], size: int) -> Iterable[List[Any]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _validation_message(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in e['loc']) or 'payload'}: {e['msg']}" for e in error.errors()
+    )
+
+
+@dataclass(eq=False)
+class PendingAction:
+    """A claimed action and its outcome, filled in by the handlers."""
+    action: OfflineActionCreate
+    record_id: UUID
+    status: str = SUCCESS
+    server_entity_id: Optional[UUID] = None
+    error_message: Optional[str] = None
+
+    def fail(self, message: str) -> None:
+        self.status = FAILED
+        self.error_message = message
+
+
+class OfflineActionProcessor:
+    """
+    Processes one device's offline actions for a user.
+
+        processor = OfflineActionProcessor(db, company_id, user_id, device_id)
+        results = await processor.process(batch.actions)
+    """
+
+    def __init__(self, db: AsyncSession, company_id: UUID, user_id: UUID, device_id: UUID,
+                 group_size: int = OFFLINE_GROUP_SIZE):
+        self.db = db
+        self.company_id = company_id
+        self.user_id = user_id
+        self.device_id = device_id
+        self.group_size = group_size
+        self.employee_id: Optional[UUID] = None
+        self.handlers: Dict[tuple, Callable] = {
+            (SyncEntityType.ATTENDANCE, OfflineActionType.CREATE): self._create_attendance,
+            (SyncEntityType.LEAVE, OfflineActionType.CREATE): self._create_leave,
+            (SyncEntityType.LEAVE, OfflineActionType.UPDATE): self._update_leave,
+            (SyncEntityType.LEAVE, OfflineActionType.DELETE): self._delete_leave,
+            (SyncEntityType.EXPENSE, OfflineActionType.CREATE): self._create_expense,
+            (SyncEntityType.EXPENSE, OfflineActionType.UPDATE): self._update_expense,
+            (SyncEntityType.EXPENSE, OfflineActionType.DELETE): self._delete_expense,
+        }
+
+    async def process(self, actions: List[OfflineActionCreate]) -> List[Dict[str, Any]]:
+        """Apply actions; returns one result per action, in order."""
+        self.employee_id = (await self.db.execute(
+            select(Employee.id).where(and_(
+                Employee.user_id == self.user_id,
+                Employee.company_id == self.company_id,
+                Employee.deleted_at.is_(None)
+            )).limit(1)
+        )).scalar_one_or_none()
+
+        # A client_action_id repeated within the batch is applied once
+        unique: Dict[str, OfflineActionCreate] = {}
+        for action in actions:
+            unique.setdefault(action.client_action_id, action)
+        groups: Dict[SyncEntityType, List[OfflineActionCreate]] = defaultdict(list)
+        for action in unique.values():
+            groups[action.entity_type].append(action)
+
+        results: Dict[str, Dict[str, Any]] = {}
+        for entity_type, group in groups.items():
+            for chunk in _chunks(sorted(group, key=lambda a: _naive(a.client_timestamp)), self.group_size):
+                try:
+                    results.update(await self._apply_group(entity_type, chunk))
+                except SQLAlchemyError as e:
+                    # Rolled back, claims included, so the client can send these again
+                    await self.db.rollback()
+                    logger.exception("Offline %s actions failed for user %s", entity_type.value, self.user_id)
+                    for action in chunk:
+                        results[action.client_action_id] = self._result(
+                            action, None, FAILED, error_message=f"Not applied, retry later: {type(e).__name__}"
+                        )
+
+        duplicates = [client_id for client_id in unique if client_id not in results]
+        if duplicates:
+            stored = await self.db.execute(
+                select(OfflineAction).where(and_(
+                    OfflineAction.company_id == self.company_id,
+                    OfflineAction.user_id == self.user_id,
+                    OfflineAction.client_action_id.in_(duplicates)
+                ))
+            )
+            for record in stored.scalars():
+                results[record.client_action_id] = self._stored_result(record)
+
+        return [results[action.client_action_id] for action in actions]
+
+    # ---------- Groups ----------
+
+    async def _apply_group(self, entity_type: SyncEntityType, actions: List[OfflineActionCreate]) -> Dict[str, Dict[str, Any]]:
+        """Claim, apply and record one group in a single transaction."""
+        now = _naive(utc_now())
+        records = {
+            action.client_action_id: {
+                "id": uuid4(),
+                "company_id": self.company_id,
+                "device_id": self.device_id,
+                "user_id": self.user_id,
+                "client_action_id": action.client_action_id,
+                "entity_type": mobile_models.SyncEntityType(action.entity_type.value),
+                "entity_id": action.entity_id,
+                "action_type": mobile_models.OfflineActionType(action.action_type.value),
+                "payload": action.payload,
+                "client_timestamp": _naive(action.client_timestamp),
+                "status": PROCESSING,
+                "retry_count": 0,
+            }
+            for action in actions
+        }
+        # Actions already recorded, or being recorded by a concurrent upload, are skipped here
+        claimed = set((await self.db.execute(
+            pg_insert(OfflineAction)
+            .values(list(records.values()))
+            .on_conflict_do_nothing(index_elements=["company_id", "user_id", "client_action_id"])
+            .returning(OfflineAction.client_action_id)
+        )).scalars())
+        pending = [
+            PendingAction(action, records[action.client_action_id]["id"])
+            for action in actions if action.client_action_id in claimed
+        ]
+        if not pending:
+            await self.db.rollback()
+            return {}
+
+        by_type: Dict[OfflineActionType, List[PendingAction]] = defaultdict(list)
+        for item in pending:
+            by_type[item.action.action_type].append(item)
+        for action_type in (OfflineActionType.CREATE, OfflineActionType.UPDATE, OfflineActionType.DELETE):
+            items = by_type.get(action_type)
+            if not items:
+                continue
+            handler = self.handlers.get((entity_type, action_type))
+            if handler is None:
+                for item in items:
+                    item.fail(f"{action_type.value} {entity_type.value} is not supported offline")
+            elif self.employee_id is None:
+                for item in items:
+                    item.fail("No employee record for this user")
+            else:
+                await self._apply_handler(handler, items)
+
+        # ORM bulk UPDATE by primary key: one executemany for the group
+        await self.db.execute(update(OfflineAction), [
+            {
+                "id": item.record_id,
+                "status": item.status,
+                "server_entity_id": item.server_entity_id,
+                "error_message": item.error_message,
+                "processed_at": now,
+            }
+            for item in pending
+        ])
+        await self.db.commit()
+
+        created_at = utc_now()
+        return {
+            item.action.client_action_id: self._result(
+                item.action, item.record_id, item.status, item.server_entity_id, item.error_message,
+                processed_at=now, created_at=created_at
+            )
+            for item in pending
+        }
+
+    def _result(self, action: OfflineActionCreate, record_id: Optional[UUID], status: str,
+                server_entity_id: Optional[UUID] = None, error_message: Optional[str] = None,
+                processed_at: Optional[datetime] = None, created_at: Optional[datetime] = None) -> Dict[str, Any]:
+        return {
+            "id": record_id or uuid4(),
+            "device_id": self.device_id,
+            "client_action_id": action.client_action_id,
+            "entity_type": action.entity_type,
+            "entity_id": action.entity_id,
+            "action_type": action.action_type,
+            "payload": action.payload,
+            "client_timestamp": action.client_timestamp,
+            "status": status,
+            "server_entity_id": server_entity_id,
+            "error_message": error_message,
+            "processed_at": processed_at,
+            "created_at": created_at or utc_now(),
+        }
+
+    @staticmethod
+    def _stored_result(record: OfflineAction) -> Dict[str, Any]:
+        return {
+            field: getattr(record, field)
+            for field in (
+                "id", "device_id", "client_action_id", "entity_type", "entity_id", "action_type", "payload",
+                "client_timestamp", "status", "server_entity_id", "error_message", "processed_at", "created_at",
+            )
+        }
+
+    async def _apply_handler(self, handler: Callable, items: List[PendingAction]) -> None:
+        """
+        Run a handler's bulk statements in a savepoint; if the database
+        rejects them, run the actions again one savepoint each.
+        """
+        try:
+            async with self.db.begin_nested():
+                await handler(items)
+            return
+        except (IntegrityError, DataError) as e:
+            logger.warning("Offline bulk apply rejected, applying one by one: %s", type(e).__name__)
+
+        for item in items:
+            item.status, item.server_entity_id, item.error_message = SUCCESS, None, None
+            try:
+                async with self.db.begin_nested():
+                    await handler([item])
+            except (IntegrityError, DataError) as e:
+                item.server_entity_id = None
+                item.fail(f"Rejected by the database: {type(e).__name__}")
+
+    # ---------- Helpers ----------
+
+    @staticmethod
+    def _parse(items: List[PendingAction], schema: Any) -> List[tuple]:
+        """(item, parsed payload) for payloads that validate; the rest fail."""
+        parsed = []
+        for item in items:
+            try:
+                parsed.append((item, schema.model_validate(item.action.payload)))
+            except ValidationError as e:
+                item.fail(f"Invalid payload: {_validation_message(e)}")
+        return parsed
+
+    async def _existing(self, column: Any, ids: Iterable[Optional[UUID]], *conditions: Any) -> set:
+        """Those of ids found in column's table under conditions, in one query."""
+        ids = {value for value in ids if value is not None}
+        if not ids:
+            return set()
+        return set((await self.db.execute(select(column).where(column.in_(ids), *conditions))).scalars())
+
+    async def _load_owned(self, model: Any, owner: Any, items: List[PendingAction],
+                          extra: Optional[Any] = None) -> List[tuple]:
+        """(item, row) for items whose target row belongs to the user; the rest fail."""
+        ids = {item.action.entity_id for item in items if item.action.entity_id}
+        rows = {}
+        if ids:
+            query = select(model).where(and_(model.id.in_(ids), owner == self.employee_id))
+            if extra is not None:
+                query = query.where(extra)
+            rows = {row.id: row for row in (await self.db.execute(query)).scalars()}
+        found = []
+        for item in items:
+            row = rows.get(item.action.entity_id)
+            if row is None:
+                item.fail("Record not found")
+            else:
+                found.append((item, row))
+        return found
+
+    @staticmethod
+    def _leave_days(payload: MobileLeaveRequestBase) -> Dict[str, Any]:
+        from_date, to_date = payload.start_date.date(), payload.end_date.date()
+        if to_date < from_date:
+            raise ValueError("end_date is before start_date")
+        from_day_type = to_day_type = DayType.FULL
+        if payload.half_day:
+            half = DayType(payload.half_day_type or DayType.FIRST_HALF.value)
+            if half == DayType.FULL:
+                raise ValueError("half_day_type must be first_half or second_half")
+            if from_date == to_date:
+                from_day_type = to_day_type = half
+            elif half == DayType.FIRST_HALF:
+                # A half day across several days: the afternoon off on the first day
+                from_day_type = DayType.SECOND_HALF
+            else:
+                to_day_type = DayType.FIRST_HALF
+        return {
+            "leave_type_id": payload.leave_type_id,
+            "from_date": from_date,
+            "to_date": to_date,
+            "from_day_type": from_day_type,
+            "to_day_type": to_day_type,
+            "reason": payload.reason,
+        }
+
+    async def _leave_values(self, parsed: List[tuple]) -> List[tuple]:
+        """(item, leave request values) with days calculated for all items in one calendar lookup."""
+        from app.services.leave_service import LeaveService
+
+        leave_types = await self._existing(
+            LeaveType.id, (payload.leave_type_id for _, payload in parsed), LeaveType.is_active.is_(True)
+        )
+        valid = []
+        for item, payload in parsed:
+            if payload.leave_type_id not in leave_types:
+                item.fail("Leave type not found")
+                continue
+            try:
+                valid.append((item, self._leave_days(payload)))
+            except ValueError as e:
+                item.fail(str(e))
+        if not valid:
+            return []
+
+        calculations = await LeaveService.calculate_leave_days_batch(
+            self.db, self.company_id,
+            [LeaveDaysCalculationRequest(**{k: v[k] for k in (
+                "from_date", "to_date", "from_day_type", "to_day_type", "leave_type_id"
+            )}) for _, v in valid]
+        )
+        results = []
+        for (item, values), calculation in zip(valid, calculations):
+            if calculation.total_days <= 0:
+                item.fail("No working days in the requested period")
+                continue
+            values.update(
+                financial_year=LeaveService.get_financial_year(values["from_date"]),
+                total_days=calculation.total_days,
+                working_days=calculation.working_days,
+                sandwich_days=calculation.sandwich_days,
+                holiday_days=Decimal(calculation.holiday_days),
+            )
+            results.append((item, values))
+        return results
+
+    # ---------- Attendance ----------
+
+    async def _create_attendance(self, items: List[PendingAction]) -> None:
+        rows = []
+        for item, punch in self._parse(items, MobileAttendancePunchBase):
+            item.server_entity_id = uuid4()
+            rows.append({
+                "id": item.server_entity_id,
+                "company_id": self.company_id,
+                "employee_id": self.employee_id,
+                "device_id": self.device_id,
+                "punch_time": _naive(item.action.client_timestamp),
+                "status": "pending",
+                "synced_to_attendance": False,
+                **punch.model_dump(),
+            })
+        if rows:
+            await self.db.execute(pg_insert(MobileAttendancePunch).values(rows))
+
+    # ---------- Leave ----------
+
+    async def _create_leave(self, items: List[PendingAction]) -> None:
+        from app.services.leave_service import LeaveService
+
+        rows = []
+        for item, values in await self._leave_values(self._parse(items, MobileLeaveRequestBase)):
+            item.server_entity_id = uuid4()
+            rows.append({
+                "id": item.server_entity_id,
+                "request_number": LeaveService.generate_request_number("LR"),
+                "employee_id": self.employee_id,
+                "company_id": self.company_id,
+                # Drafts: the balance is checked when the employee submits
+                "status": LeaveStatus.DRAFT,
+                "created_by": self.user_id,
+                **values,
+            })
+        if rows:
+            await self.db.execute(pg_insert(LeaveRequest).values(rows))
+
+    async def _update_leave(self, items: List[PendingAction]) -> None:
+        owned = await self._load_owned(LeaveRequest, LeaveRequest.employee_id, items)
+        drafts = []
+        for item, row in owned:
+            if row.status != LeaveStatus.DRAFT:
+                item.fail("Only draft leave requests can be changed offline")
+            else:
+                drafts.append(item)
+        updates = []
+        for item, values in await self._leave_values(self._parse(drafts, MobileLeaveRequestBase)):
+            item.server_entity_id = item.action.entity_id
+            values.pop("financial_year", None)
+            updates.append({"id": item.action.entity_id, "updated_by": self.user_id, **values})
+        if updates:
+            await self.db.execute(update(LeaveRequest), updates)
+
+    async def _delete_leave(self, items: List[PendingAction]) -> None:
+        owned = await self._load_owned(LeaveRequest, LeaveRequest.employee_id, items)
+        ids = []
+        for item, row in owned:
+            if row.status != LeaveStatus.DRAFT:
+                item.fail("Only draft leave requests can be withdrawn offline")
+            else:
+                item.server_entity_id = row.id
+                ids.append(row.id)
+        if ids:
+            await self.db.execute(
+                update(LeaveRequest)
+                .where(LeaveRequest.id.in_(ids))
+                .values(
+                    status=LeaveStatus.CANCELLED,
+                    cancelled_at=utc_now(),
+                    cancelled_by=self.user_id,
+                    cancellation_reason="Withdrawn from mobile app",
+                )
+                .execution_options(synchronize_session=False)
+            )
+
+    # ---------- Expense ----------
+
+    async def _check_expense_references(self, parsed: List[tuple]) -> List[tuple]:
+        """
+        (item, claim) for claims whose categories and project belong to the
+        company and whose advance belongs to the employee; the rest fail.
+        """
+        lines = [line for _, claim in parsed for line in getattr(claim, "items", ())]
+        categories = await self._existing(
+            ExpenseCategory.id, (line.category_id for line in lines),
+            ExpenseCategory.company_id == self.company_id, ExpenseCategory.deleted_at.is_(None),
+        )
+        projects = await self._existing(
+            Project.id, (claim.project_id for _, claim in parsed), Project.company_id == self.company_id
+        )
+        advances = await self._existing(
+            ExpenseAdvance.id, (getattr(claim, "advance_id", None) for _, claim in parsed),
+            ExpenseAdvance.company_id == self.company_id, ExpenseAdvance.employee_id == self.employee_id,
+            ExpenseAdvance.deleted_at.is_(None),
+        )
+        valid = []
+        for item, claim in parsed:
+            advance_id = getattr(claim, "advance_id", None)
+            if any(line.category_id not in categories for line in getattr(claim, "items", ())):
+                item.fail("Expense category not found")
+            elif claim.project_id is not None and claim.project_id not in projects:
+                item.fail("Project not found")
+            elif advance_id is not None and advance_id not in advances:
+                item.fail("Expense advance not found")
+            else:
+                valid.append((item, claim))
+        return valid
+
+    async def _create_expense(self, items: List[PendingAction]) -> None:
+        from app.services.expense.expense_service import ExpenseService
+
+        claims, lines = [], []
+        for item, claim in await self._check_expense_references(self._parse(items, ExpenseClaimCreate)):
+            item.server_entity_id = uuid4()
+            total_amount = sum((line.total_amount for line in claim.items), Decimal("0"))
+            tax_amount = sum((line.tax_amount for line in claim.items), Decimal("0"))
+            claims.append({
+                "id": item.server_entity_id,
+                "company_id": self.company_id,
+                "employee_id": self.employee_id,
+                # Claim numbers are per second; the suffix keeps a batch unique
+                "claim_number": f"{ExpenseService.generate_claim_number()}-{uuid4().hex[:6].upper()}",
+                "status": ExpenseStatus.DRAFT,
+                "total_amount": total_amount,
+                "approved_amount": Decimal("0"),
+                "tax_amount": tax_amount,
+                "advance_adjusted": Decimal("0"),
+                "net_payable": total_amount,
+                **claim.model_dump(exclude={"items"}),
+            })
+            lines.extend(
+                {
+                    "id": uuid4(),
+                    "claim_id": item.server_entity_id,
+                    "approved_amount": Decimal("0"),
+                    "status": "pending",
+                    **line.model_dump(),
+                }
+                for line in claim.items
+            )
+        if claims:
+            await self.db.execute(pg_insert(ExpenseClaim).values(claims))
+        if lines:
+            await self.db.execute(pg_insert(ExpenseItem).values(lines))
+
+    async def _expense_drafts(self, items: List[PendingAction]) -> List[tuple]:
+        owned = await self._load_owned(
+            ExpenseClaim, ExpenseClaim.employee_id, items, ExpenseClaim.deleted_at.is_(None)
+        )
+        drafts = []
+        for item, row in owned:
+            if row.status != ExpenseStatus.DRAFT:
+                item.fail("Only draft expense claims can be changed offline")
+            else:
+                drafts.append((item, row))
+        return drafts
+
+    async def _update_expense(self, items: List[PendingAction]) -> None:
+        drafts = await self._expense_drafts(items)
+        parsed = dict(await self._check_expense_references(
+            self._parse([item for item, _ in drafts], ExpenseClaimUpdate)
+        ))
+        updates = []
+        for item, row in drafts:
+            if item not in parsed:
+                continue
+            changes = parsed[item].model_dump(exclude_unset=True)
+            item.server_entity_id = row.id
+            # Every row carries the same keys, so the update runs as one executemany
+            updates.append({
+                "id": row.id,
+                **{field: changes.get(field, getattr(row, field)) for field in EXPENSE_UPDATE_FIELDS},
+            })
+        if updates:
+            await self.db.execute(update(ExpenseClaim), updates)
+
+    async def _delete_expense(self, items: List[PendingAction]) -> None:
+        ids = []
+        for item, row in await self._expense_drafts(items):
+            item.server_entity_id = row.id
+            ids.append(row.id)
+        if ids:
+            await self.db.execute(
+                update(ExpenseClaim)
+                .where(ExpenseClaim.id.in_(ids))
+                .values(deleted_at=utc_now())
+                .execution_options(synchronize_session=False)
+            )
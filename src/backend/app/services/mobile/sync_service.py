@@ -1,23 +1,229 @@
 """
 Mobile Sync Service - Mobile Apps API Module (MOD-18)
+
+Delta sync: each entity type is read in (changed_at, id) order from a
+per-entity high-water mark carried in an opaque cursor, one keyset page
+at a time, so a device catches up in bounded requests however long it
+was offline. Deletes come from soft-deleted rows and from sync_tombstones,
+which a trigger fills when a synced row is hard-deleted.
+
+Rows are stamped when they are written but become visible only when their
+transaction commits, so a sync must not move a mark past a timestamp that
+an open transaction could still commit. The cut-off is therefore held
+behind the start of the oldest transaction that has written something
+(pg_stat_activity), minus MOBILE_SYNC_SAFETY_LAG_SECONDS. The remaining
+gaps: a row stamped more than the lag before its transaction's first
+write, and transactions open longer than SYNC_MAX_HOLD, which stop
+holding the cut-off back.
 """
-from datetime import datetime
-from typing import List, Optional, Dict, Any
+import base64
+import json
+import zlib
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Dict, Any, Tuple
 from uuid import UUID, uuid4
 
+from sqlalchemy import and_, select, text, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import settings
 from app.core.datetime_utils import utc_now
+from app.models.employee import Employee
+from app.models.expense import ExpenseClaim
+from app.models.leave import LeaveRequest
+from app.models.mobile import OfflineAction, PushNotification, PushNotificationRecipient, SyncTombstone
+from app.models.project import Task
+from app.models.timesheet import AttendanceLog, Timesheet
 from app.schemas.mobile import (
     MobileSyncRequest, MobileSyncResponse, SyncDataItem,
     OfflineActionCreate, OfflineActionBatchCreate, OfflineActionBatchResponse,
-    SyncEntityType, OfflineActionType
+    SyncEntityType
 )
+from app.services.mobile.offline_processor import OfflineActionProcessor
+
+
+# Rows fetched from the database per round trip while streaming a page
+SYNC_STREAM_CHUNK = 200
+
+# Writing transactions open longer than this no longer hold the cut-off
+# back (in practice sessions left idle in a transaction)
+SYNC_MAX_HOLD = timedelta(minutes=10)
+
+# pg_stat_activity is snapshotted once per transaction; clear the snapshot
+# so a later sync in the same transaction sees the writers open now
+CLEAR_STATS_SNAPSHOT = text("SELECT pg_stat_clear_snapshot()")
+
+# Start of the oldest other transaction that has written to this database
+OLDEST_WRITER_QUERY = text(
+    "SELECT min(xact_start) FROM pg_stat_activity "
+    "WHERE datname = current_database() AND backend_xid IS NOT NULL "
+    "AND pid <> pg_backend_pid() AND xact_start > clock_timestamp() - make_interval(secs => :max_hold)"
+)
+
+CURSOR_VERSION = 1
+_MIN_ID = UUID(int=0)
+
+
+@dataclass(frozen=True)
+class SyncSource:
+    """How one entity type is read for delta sync."""
+    entity_type: SyncEntityType
+    model: Any
+    changed_at: Any
+    columns: Tuple[Any, ...]
+    # "company": every row of the company; "employee"/"user": rows whose
+    # owner column is the requesting user's employee / user id
+    scope: str
+    owner: Any
+    deleted_at: Any = None
+    join: Optional[Tuple[Any, Any]] = None
+
+    @property
+    def naive(self) -> bool:
+        return not getattr(self.changed_at.type, "timezone", False)
+
+
+SYNC_SOURCES: Dict[SyncEntityType, SyncSource] = {
+    source.entity_type: source for source in (
+        SyncSource(
+            SyncEntityType.EMPLOYEE, Employee, Employee.updated_at,
+            (
+                Employee.employee_code, Employee.first_name, Employee.middle_name, Employee.last_name,
+                Employee.profile_photo_url, Employee.department_id, Employee.designation_id,
+                Employee.reporting_to, Employee.employment_status, Employee.user_id,
+            ),
+            scope="company", owner=Employee.company_id, deleted_at=Employee.deleted_at,
+        ),
+        SyncSource(
+            SyncEntityType.ATTENDANCE, AttendanceLog, AttendanceLog.created_at,
+            (
+                AttendanceLog.log_date, AttendanceLog.log_time, AttendanceLog.log_type, AttendanceLog.source,
+                AttendanceLog.latitude, AttendanceLog.longitude, AttendanceLog.location_address,
+                AttendanceLog.is_verified,
+            ),
+            scope="employee", owner=AttendanceLog.employee_id,
+        ),
+        SyncSource(
+            SyncEntityType.LEAVE, LeaveRequest, LeaveRequest.updated_at,
+            (
+                LeaveRequest.request_number, LeaveRequest.leave_type_id, LeaveRequest.from_date,
+                LeaveRequest.to_date, LeaveRequest.from_day_type, LeaveRequest.to_day_type,
+                LeaveRequest.total_days, LeaveRequest.reason, LeaveRequest.status,
+                LeaveRequest.approver_remarks, LeaveRequest.rejection_reason,
+                LeaveRequest.submitted_at, LeaveRequest.approved_at,
+            ),
+            scope="employee", owner=LeaveRequest.employee_id,
+        ),
+        SyncSource(
+            SyncEntityType.EXPENSE, ExpenseClaim, ExpenseClaim.updated_at,
+            (
+                ExpenseClaim.claim_number, ExpenseClaim.title, ExpenseClaim.status,
+                ExpenseClaim.expense_period_from, ExpenseClaim.expense_period_to,
+                ExpenseClaim.total_amount, ExpenseClaim.approved_amount, ExpenseClaim.currency,
+                ExpenseClaim.submitted_at, ExpenseClaim.approved_at, ExpenseClaim.paid_at,
+                ExpenseClaim.rejection_reason,
+            ),
+            scope="employee", owner=ExpenseClaim.employee_id, deleted_at=ExpenseClaim.deleted_at,
+        ),
+        SyncSource(
+            SyncEntityType.TASK, Task, Task.updated_at,
+            (
+                Task.task_number, Task.title, Task.description, Task.project_id, Task.status,
+                Task.priority, Task.start_date, Task.due_date, Task.progress_percentage,
+                Task.completed_at,
+            ),
+            scope="employee", owner=Task.assignee_id,
+        ),
+        SyncSource(
+            SyncEntityType.TIMESHEET, Timesheet, Timesheet.updated_at,
+            (
+                Timesheet.date, Timesheet.week_ending, Timesheet.total_hours,
+                Timesheet.total_billable_hours, Timesheet.status, Timesheet.submitted_at,
+                Timesheet.approved_at, Timesheet.rejection_reason,
+            ),
+            scope="employee", owner=Timesheet.employee_id,
+        ),
+        SyncSource(
+            SyncEntityType.NOTIFICATION, PushNotificationRecipient, PushNotificationRecipient.updated_at,
+            (
+                PushNotificationRecipient.notification_id, PushNotification.title, PushNotification.body,
+                PushNotification.data, PushNotification.action_url, PushNotificationRecipient.status,
+                PushNotificationRecipient.delivered_at, PushNotificationRecipient.read_at,
+            ),
+            scope="user", owner=PushNotificationRecipient.user_id,
+            join=(PushNotification, PushNotification.id == PushNotificationRecipient.notification_id),
+        ),
+    )
+}
+
+
+@dataclass
+class SyncCursor:
+    """
+    Per-entity high-water marks: the (changed_at, id) of the last change
+    and of the last tombstone sent. Encoded as compressed, URL-safe JSON.
+    """
+    since: Optional[datetime] = None
+    marks: Dict[str, Dict[str, Tuple[datetime, UUID]]] = field(default_factory=dict)
+
+    def mark(self, entity_type: SyncEntityType, kind: str) -> Tuple[datetime, UUID]:
+        stored = self.marks.get(entity_type.value, {}).get(kind)
+        if stored is not None:
+            return stored
+        return (self.since or datetime(1970, 1, 1, tzinfo=timezone.utc), _MIN_ID)
+
+    def advance(self, entity_type: SyncEntityType, kind: str, changed_at: datetime, entity_id: UUID) -> None:
+        self.marks.setdefault(entity_type.value, {})[kind] = (changed_at, entity_id)
+
+    def encode(self) -> str:
+        payload = {
+            "v": CURSOR_VERSION,
+            "s": self.since.isoformat() if self.since else None,
+            "m": {
+                entity: {kind: [ts.isoformat(), str(entity_id)] for kind, (ts, entity_id) in kinds.items()}
+                for entity, kinds in self.marks.items()
+            },
+        }
+        raw = zlib.compress(json.dumps(payload, separators=(",", ":")).encode())
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    @classmethod
+    def decode(cls, token: str) -> "SyncCursor":
+        try:
+            raw = zlib.decompress(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+            payload = json.loads(raw)
+            if payload.get("v") != CURSOR_VERSION:
+                raise ValueError("unsupported version")
+            return cls(
+                since=_as_utc(datetime.fromisoformat(payload["s"])) if payload.get("s") else None,
+                marks={
+                    entity: {
+                        kind: (_as_utc(datetime.fromisoformat(ts)), UUID(entity_id))
+                        for kind, (ts, entity_id) in kinds.items()
+                    }
+                    for entity, kinds in payload["m"].items()
+                },
+            )
+        except (ValueError, KeyError, TypeError, zlib.error) as e:
+            raise ValueError(f"Invalid sync cursor: {e}") from e
+
+
+def _as_utc(value: datetime) -> datetime:
+    # Naive timestamps in this schema are UTC
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+def _column_value(source: SyncSource, value: datetime) -> datetime:
+    return value.replace(tzinfo=None) if source.naive else value
 
 
 class MobileSyncService:
     """Service for mobile data synchronization."""
 
+    DEFAULT_PAGE_SIZE = 500
+    MAX_PAGE_SIZE = 2000
+
     @staticmethod
     async def sync_data(
         db: AsyncSession,
@@ -25,54 +231,196 @@ class MobileSyncService:
         user_id: UUID,
         request: MobileSyncRequest
     ) -> MobileSyncResponse:
-        """Sync data for mobile app."""
-        sync_id = uuid4()
-        items = []
-        has_more = False
+        """
+        Return up to request.limit changes after the request's cursor (or
+        last_sync_at), in entity order. next_cursor resumes after the last
+        item; has_more says whether to call again straight away.
+        """
+        cursor = SyncCursor.decode(request.cursor) if request.cursor else SyncCursor(
+            since=_as_utc(request.last_sync_at) if request.last_sync_at else None
+        )
+        limit = min(request.limit or MobileSyncService.DEFAULT_PAGE_SIZE, MobileSyncService.MAX_PAGE_SIZE)
+        until = await MobileSyncService._sync_cutoff(db)
+        owners = await MobileSyncService._resolve_owners(db, company_id, user_id, request.entity_types)
 
-        for entity_type in request.entity_types:
-            entity_items = await MobileSyncService._get_entity_changes(
-                db, company_id, user_id, entity_type,
-                request.last_sync_at, request.include_deleted
-            )
-            items.extend(entity_items)
+        items: List[SyncDataItem] = []
+        has_more = False
+        for entity_type in dict.fromkeys(request.entity_types):
+            source = SYNC_SOURCES[entity_type]
+            owner = owners.get(source.scope)
+            if owner is None:
+                continue
 
-        # Limit items and set has_more
-        if len(items) > 100:
-            items = items[:100]
-            has_more = True
+            kinds = ("changes", "deletes") if request.include_deleted else ("changes",)
+            for kind in kinds:
+                budget = limit - len(items)
+                if budget <= 0:
+                    has_more = True
+                    break
+                fetch = (
+                    MobileSyncService._get_entity_changes if kind == "changes"
+                    else MobileSyncService._get_entity_tombstones
+                )
+                page, last_mark, more = await fetch(
+                    db, source, owner, cursor.mark(entity_type, kind), until, request.include_deleted, budget
+                )
+                items.extend(page)
+                if more:
+                    cursor.advance(entity_type, kind, *last_mark)
+                    has_more = True
+                    break
+                # Everything before the cut-off has been sent; resume from there
+                cursor.advance(entity_type, kind, until, _MIN_ID)
+            if has_more:
+                break
 
         return MobileSyncResponse(
-            sync_id=sync_id,
+            sync_id=uuid4(),
             device_id=request.device_id,
             sync_timestamp=utc_now(),
             items=items,
             has_more=has_more,
-            next_cursor=str(sync_id) if has_more else None
+            next_cursor=cursor.encode()
         )
 
     @staticmethod
-    async def _get_entity_changes(
+    async def _sync_cutoff(db: AsyncSession) -> datetime:
+        """
+        Changes stamped before this are final: no open transaction can
+        still commit a row stamped earlier (see the module docstring).
+        """
+        await db.execute(CLEAR_STATS_SNAPSHOT)
+        oldest_writer = (await db.execute(
+            OLDEST_WRITER_QUERY, {"max_hold": SYNC_MAX_HOLD.total_seconds()}
+        )).scalar_one_or_none()
+        until = utc_now()
+        if oldest_writer is not None:
+            until = min(until, _as_utc(oldest_writer))
+        return until - timedelta(seconds=settings.MOBILE_SYNC_SAFETY_LAG_SECONDS)
+
+    @staticmethod
+    async def _resolve_owners(
         db: AsyncSession,
         company_id: UUID,
         user_id: UUID,
-        entity_type: SyncEntityType,
-        last_sync: Optional[datetime],
-        include_deleted: bool
-    ) -> List[SyncDataItem]:
-        """Get changes for an entity type since last sync."""
+        entity_types: List[SyncEntityType]
+    ) -> Dict[str, Optional[UUID]]:
+        """Owner id per sync scope; the employee scope needs the user's employee record."""
+        owners: Dict[str, Optional[UUID]] = {"company": company_id, "user": user_id, "employee": None}
+        if any(SYNC_SOURCES[entity_type].scope == "employee" for entity_type in entity_types):
+            owners["employee"] = (await db.execute(
+                select(Employee.id).where(and_(
+                    Employee.user_id == user_id,
+                    Employee.company_id == company_id,
+                    Employee.deleted_at.is_(None)
+                )).limit(1)
+            )).scalar_one_or_none()
+        return owners
+
+    @staticmethod
+    async def _stream_page(db: AsyncSession, query, limit: int) -> Tuple[List[Any], bool]:
+        """Up to limit rows, streamed in chunks; True if more rows follow."""
+        result = await db.stream(
+            query.limit(limit + 1).execution_options(yield_per=min(limit + 1, SYNC_STREAM_CHUNK))
+        )
+        rows = []
+        more = False
+        try:
+            async for row in result:
+                if len(rows) == limit:
+                    more = True
+                    break
+                rows.append(row)
+        finally:
+            await result.close()
+        return rows, more
+
+    @staticmethod
+    async def _get_entity_changes(
+        db: AsyncSession,
+        source: SyncSource,
+        owner: UUID,
+        mark: Tuple[datetime, UUID],
+        until: datetime,
+        include_deleted: bool,
+        limit: int
+    ) -> Tuple[List[SyncDataItem], Optional[Tuple[datetime, UUID]], bool]:
+        """
+        Next keyset page of rows of one entity type changed after mark,
+        with the (changed_at, id) of its last row.
+        """
+        mark_at, mark_id = mark
+        query = select(
+            source.model.id.label("_id"),
+            source.changed_at.label("_changed_at"),
+            *((source.deleted_at.label("_deleted_at"),) if source.deleted_at is not None else ()),
+            *source.columns
+        )
+        if source.join is not None:
+            query = query.join(*source.join)
+        query = query.where(
+            source.owner == owner,
+            tuple_(source.changed_at, source.model.id) > tuple_(_column_value(source, mark_at), mark_id),
+            source.changed_at < _column_value(source, until),
+        ).order_by(source.changed_at, source.model.id)
+        if source.deleted_at is not None and not include_deleted:
+            query = query.where(source.deleted_at.is_(None))
+
+        rows, more = await MobileSyncService._stream_page(db, query, limit)
         items = []
+        for row in rows:
+            values = row._asdict()
+            entity_id, changed_at = values.pop("_id"), _as_utc(values.pop("_changed_at"))
+            if values.pop("_deleted_at", None) is not None:
+                items.append(SyncDataItem(
+                    entity_type=source.entity_type, entity_id=entity_id, action="delete",
+                    data={}, updated_at=changed_at
+                ))
+                continue
+            items.append(SyncDataItem(
+                entity_type=source.entity_type,
+                entity_id=entity_id,
+                action="upsert",
+                # Nulls are left out to keep pages small; absent means null
+                data={key: value for key, value in values.items() if value is not None},
+                updated_at=changed_at
+            ))
+        last_mark = (items[-1].updated_at, items[-1].entity_id) if items else None
+        return items, last_mark, more
 
-        # This would query the appropriate tables based on entity_type
-        # For now, return empty list as placeholder
-        # In real implementation, would query:
-        # - employees table for EMPLOYEE
-        # - attendance_records for ATTENDANCE
-        # - leave_requests for LEAVE
-        # - expense_claims for EXPENSE
-        # - etc.
+    @staticmethod
+    async def _get_entity_tombstones(
+        db: AsyncSession,
+        source: SyncSource,
+        owner: UUID,
+        mark: Tuple[datetime, UUID],
+        until: datetime,
+        include_deleted: bool,
+        limit: int
+    ) -> Tuple[List[SyncDataItem], Optional[Tuple[datetime, UUID]], bool]:
+        """
+        Next keyset page of hard deletes of one entity type after mark,
+        with the (deleted_at, tombstone id) of its last row.
+        """
+        mark_at, mark_id = mark
+        query = select(SyncTombstone.entity_id, SyncTombstone.deleted_at, SyncTombstone.id).where(
+            SyncTombstone.entity_type == source.entity_type.value,
+            SyncTombstone.owner_id == owner,
+            tuple_(SyncTombstone.deleted_at, SyncTombstone.id) > tuple_(mark_at, mark_id),
+            SyncTombstone.deleted_at < until,
+        ).order_by(SyncTombstone.deleted_at, SyncTombstone.id)
 
-        return items
+        rows, more = await MobileSyncService._stream_page(db, query, limit)
+        items = [
+            SyncDataItem(
+                entity_type=source.entity_type, entity_id=row.entity_id, action="delete",
+                data={}, updated_at=_as_utc(row.deleted_at)
+            )
+            for row in rows
+        ]
+        # Tombstones are paged by their own id, not the deleted entity's
+        last_mark = (_as_utc(rows[-1].deleted_at), rows[-1].id) if rows else None
+        return items, last_mark, more
 
     @staticmethod
     async def process_offline_actions(
@@ -81,116 +429,60 @@ class MobileSyncService:
         user_id: UUID,
         batch: OfflineActionBatchCreate
     ) -> OfflineActionBatchResponse:
-        """Process offline actions from mobile app."""
-        batch_id = uuid4()
-        results = []
-        success_count = 0
-        failed_count = 0
-
-        for action in batch.actions:
-            try:
-                result = await MobileSyncService._process_single_action(
-                    db, company_id, user_id, action
-                )
-                if result.get('success'):
-                    success_count += 1
-                else:
-                    failed_count += 1
-                results.append(result)
-            except Exception as e:
-                failed_count += 1
-                results.append({
-                    'id': uuid4(),
-                    'client_action_id': action.client_action_id,
-                    'status': 'failed',
-                    'error_message': str(e),
-                    'processed_at': utc_now()
-                })
+        """
+        Process offline actions from mobile app: grouped by entity type,
+        applied in bulk and deduplicated on client_action_id.
+        """
+        processor = OfflineActionProcessor(db, company_id, user_id, batch.device_id)
+        results = await processor.process(batch.actions)
+        success_count = sum(1 for result in results if result['status'] == 'success')
 
         return OfflineActionBatchResponse(
-            batch_id=batch_id,
+            batch_id=uuid4(),
             processed_count=len(batch.actions),
             success_count=success_count,
-            failed_count=failed_count,
+            failed_count=len(results) - success_count,
             results=results
         )
 
     @staticmethod
-    async def _process_single_action(
+    async def submit_offline_actions_batch(
         db: AsyncSession,
         company_id: UUID,
         user_id: UUID,
-        action: OfflineActionCreate
-    ) -> Dict[str, Any]:
-        """Process a single offline action."""
-        result = {
-            'id': uuid4(),
-            'client_action_id': action.client_action_id,
-            'entity_type': action.entity_type,
-            'action_type': action.action_type,
-            'status': 'success',
-            'processed_at': utc_now(),
-            'success': True
-        }
-
-        try:
-            if action.action_type == OfflineActionType.CREATE:
-                # Create entity
-                server_id = await MobileSyncService._create_entity(
-                    db, company_id, user_id, action.entity_type, action.payload
-                )
-                result['server_entity_id'] = server_id
-            elif action.action_type == OfflineActionType.UPDATE:
-                # Update entity
-                await MobileSyncService._update_entity(
-                    db, action.entity_id, action.entity_type, action.payload
-                )
-                result['server_entity_id'] = action.entity_id
-            elif action.action_type == OfflineActionType.DELETE:
-                # Delete entity
-                await MobileSyncService._delete_entity(
-                    db, action.entity_id, action.entity_type
-                )
-
-        except Exception as e:
-            result['status'] = 'failed'
-            result['error_message'] = str(e)
-            result['success'] = False
-
-        return result
+        batch: OfflineActionBatchCreate
+    ) -> List[Dict[str, Any]]:
+        """Process a batch of offline actions; one result per action."""
+        processor = OfflineActionProcessor(db, company_id, user_id, batch.device_id)
+        return await processor.process(batch.actions)
 
     @staticmethod
-    async def _create_entity(
+    async def submit_offline_action(
         db: AsyncSession,
         company_id: UUID,
         user_id: UUID,
-        entity_type: SyncEntityType,
-        payload: Dict[str, Any]
-    ) -> UUID:
-        """Create an entity from offline action."""
-        # Placeholder - would create the appropriate entity
-        return uuid4()
-
-    @staticmethod
-    async def _update_entity(
-        db: AsyncSession,
-        entity_id: UUID,
-        entity_type: SyncEntityType,
-        payload: Dict[str, Any]
-    ) -> None:
-        """Update an entity from offline action."""
-        # Placeholder - would update the appropriate entity
-        pass
+        data: OfflineActionCreate
+    ) -> Dict[str, Any]:
+        """Process a single offline action."""
+        processor = OfflineActionProcessor(db, company_id, user_id, data.device_id)
+        return (await processor.process([data]))[0]
 
     @staticmethod
-    async def _delete_entity(
+    async def get_offline_action(
         db: AsyncSession,
-        entity_id: UUID,
-        entity_type: SyncEntityType
-    ) -> None:
-        """Delete an entity from offline action."""
-        # Placeholder - would delete the appropriate entity
-        pass
+        action_id: UUID,
+        company_id: UUID
+    ) -> Optional[OfflineAction]:
+        """Get a processed offline action by ID."""
+        result = await db.execute(
+            select(OfflineAction).where(
+                and_(
+                    OfflineAction.id == action_id,
+                    OfflineAction.company_id == company_id
+                )
+            )
+        )
+        return result.scalar_one_or_none()
 
     @staticmethod
     async def get_sync_status(
@@ -1,24 +1,32 @@
 """
 Payroll Database Service - Async database operations for payroll
 """
+import asyncio
 import logging
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from decimal import Decimal
-from datetime import date, datetime
-from typing import List, Dict, Any, Optional, Tuple
+from datetime import date, datetime, timedelta
+from calendar import monthrange
+from typing import List, Dict, Any, Optional, Tuple, Callable
 from uuid import UUID
 
 logger = logging.getLogger(__name__)
 
-from sqlalchemy import select, func, and_, desc
+from sqlalchemy import select, func, and_, or_, desc, insert, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
 from app.models.payroll import (
-    PayrollRun, Payslip, EmployeeSalary, PayrollStatus,
+    PayrollRun, PayrollRunCheckpoint, Payslip, EmployeeSalary, PayrollStatus,
     PFMonthlyData, ESIMonthlyData, TDSMonthlyData
 )
 from app.models.employee import Employee, EmploymentStatus
-from app.services.payroll.calculator import PayrollCalculator, SalaryStructure
+from app.services.payroll.calculator import PayrollCalculator, SalaryStructure, PayslipData
+from app.services.payroll.payroll_service import (
+    PayrollService, PayrollChunkResult, calculate_payroll_chunk
+)
 from app.core.datetime_utils import utc_now
 
 
@@ -32,11 +40,20 @@ class PayrollRunNotFoundError(PayrollDBServiceError):
     pass
 
 
+class PayrollRunInProgressError(PayrollDBServiceError):
+    """Raised when another worker is still processing the payroll run."""
+    pass
+
+
 class PayrollDBService:
     """
     Async database service for payroll operations.
     """
 
+    # A processing run whose last chunk committed longer ago than this is
+    # treated as abandoned and may be resumed by another worker.
+    RUN_LEASE_TIMEOUT = timedelta(minutes=10)
+
     def __init__(self, db: AsyncSession, company_id: UUID):
         self.db = db
         self.company_id = company_id
@@ -469,40 +486,7 @@ class PayrollDBService:
                 )
 
                 # Create payslip record
-                payslip = Payslip(
-                    payroll_run_id=payroll_run.id,
-                    employee_id=emp.id,
-                    year=year,
-                    month=month,
-                    working_days=working_days,
-                    days_worked=working_days,
-                    lop_days=0,
-                    basic=payslip_data.earnings.basic,
-                    hra=payslip_data.earnings.hra,
-                    special_allowance=payslip_data.earnings.special_allowance,
-                    other_earnings=payslip_data.earnings.other_allowances,
-                    gross_salary=payslip_data.gross_earnings,
-                    pf_employee=payslip_data.deductions.employee_pf,
-                    pf_employer=payslip_data.employer_contributions.employer_pf + payslip_data.employer_contributions.employer_eps,
-                    esi_employee=payslip_data.deductions.employee_esi,
-                    esi_employer=payslip_data.employer_contributions.employer_esi,
-                    professional_tax=payslip_data.deductions.professional_tax,
-                    tds=payslip_data.deductions.tds,
-                    other_deductions=payslip_data.deductions.other_deductions,
-                    total_deductions=payslip_data.total_deductions,
-                    net_salary=payslip_data.net_salary,
-                    earnings_breakdown={
-                        "basic": float(payslip_data.earnings.basic),
-                        "hra": float(payslip_data.earnings.hra),
-                        "special_allowance": float(payslip_data.earnings.special_allowance)
-                    },
-                    deductions_breakdown={
-                        "pf": float(payslip_data.deductions.employee_pf),
-                        "esi": float(payslip_data.deductions.employee_esi),
-                        "pt": float(payslip_data.deductions.professional_tax),
-                        "tds": float(payslip_data.deductions.tds)
-                    }
-                )
+                payslip = Payslip(**self._payslip_values(payroll_run.id, emp.id, payslip_data))
                 self.db.add(payslip)
 
                 # Update totals
@@ -542,3 +526,414 @@ class PayrollDBService:
             "errors": errors if errors else None,
             "processed_at": payroll_run.run_at.isoformat() if payroll_run.run_at else None
         }
+
+    async def run_payroll_chunked(
+        self,
+        year: int,
+        month: int,
+        user_id: UUID,
+        working_days: int = 26,
+        tax_regime_default: str = "new",
+        employee_ids: Optional[List[UUID]] = None,
+        chunk_size: int = PayrollService.DEFAULT_CHUNK_SIZE,
+        max_workers: Optional[int] = None,
+        progress_callback: Optional[Callable[[int, int], None]] = None
+    ) -> Dict[str, Any]:
+        """
+        Create and process a payroll run in checkpointed chunks.
+
+        Employees are streamed from the database by keyset pagination on
+        employee id, calculated on a process pool, and each chunk's payslips
+        are bulk-inserted and committed together with a checkpoint row. A run
+        left in ``processing`` status (e.g. after a worker crash) resumes from
+        its last checkpoint instead of starting over; a run that fails here
+        releases its lease, so a retry can resume it straight away.
+
+        Args:
+            year: Payroll year
+            month: Payroll month (1-12)
+            user_id: User initiating the payroll run
+            working_days: Working days in the month
+            tax_regime_default: Default tax regime (new/old)
+            employee_ids: Optional list of specific employee IDs to process
+            chunk_size: Employees per chunk
+            max_workers: Process pool size (None = CPU count; tasks pass
+                PAYROLL_WORKERS)
+            progress_callback: Called with (chunks_done, employees_done)
+                after each chunk commits
+
+        Returns:
+            Payroll run summary (same shape as create_payroll_run)
+        """
+        payroll_run, checkpoints = await self._start_chunked_run(year, month, user_id)
+        lease = payroll_run.run_at
+        await self.db.commit()
+
+        period_start = date(year, month, 1)
+        period_end = date(year, month, monthrange(year, month)[1])
+
+        cursor = checkpoints[-1].last_employee_id if checkpoints else None
+        chunk_index = len(checkpoints)
+        employees_done = sum(cp.employee_count or 0 for cp in checkpoints)
+
+        loop = asyncio.get_running_loop()
+        workers = max_workers or os.cpu_count() or 1
+        pending: deque = deque()
+        exhausted = False
+
+        run_id = payroll_run.id
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                while pending or not exhausted:
+                    # Keep the pool busy while earlier chunks are being written
+                    while not exhausted and len(pending) < workers:
+                        page = await self._fetch_payroll_page(
+                            cursor, chunk_size, period_start, period_end, employee_ids
+                        )
+                        if not page:
+                            exhausted = True
+                            break
+                        cursor = UUID(page[-1]["id"])
+
+                        ready = [emp for emp in page if emp["has_salary"]]
+                        missing = [
+                            {
+                                "employee_id": emp["id"],
+                                "employee_name": emp["name"],
+                                "error": "No salary structure defined"
+                            }
+                            for emp in page if not emp["has_salary"]
+                        ]
+                        future = loop.run_in_executor(
+                            pool, calculate_payroll_chunk,
+                            chunk_index, ready, year, month, working_days, tax_regime_default
+                        )
+                        pending.append((future, cursor, missing))
+                        chunk_index += 1
+
+                    if not pending:
+                        break
+
+                    future, last_employee_id, missing = pending.popleft()
+                    chunk_result: PayrollChunkResult = await future
+                    chunk_result.errors = missing + chunk_result.errors
+                    await self._commit_chunk(run_id, lease, chunk_result, last_employee_id)
+
+                    employees_done += len(chunk_result.payslips) + len(chunk_result.errors)
+                    if progress_callback:
+                        progress_callback(chunk_result.chunk_index + 1, employees_done)
+        except PayrollRunInProgressError:
+            raise
+        except Exception:
+            await self._release_lease(run_id, lease)
+            raise
+
+        return await self._finalize_chunked_run(payroll_run)
+
+    async def _start_chunked_run(
+        self,
+        year: int,
+        month: int,
+        user_id: UUID
+    ) -> Tuple[PayrollRun, List[PayrollRunCheckpoint]]:
+        """
+        Create, reset or resume the payroll run for a period.
+
+        The run row is locked with SELECT ... FOR UPDATE and its ``run_at`` is
+        stamped as this worker's lease, so two concurrent callers cannot both
+        process the same chunks. A ``processing`` run is only resumed once its
+        last heartbeat is older than RUN_LEASE_TIMEOUT.
+        """
+        existing = await self.db.execute(
+            select(PayrollRun).where(
+                and_(
+                    PayrollRun.company_id == self.company_id,
+                    PayrollRun.year == year,
+                    PayrollRun.month == month
+                )
+            ).with_for_update()
+        )
+        payroll_run = existing.scalar_one_or_none()
+
+        if payroll_run and payroll_run.status == PayrollStatus.finalized:
+            raise PayrollDBServiceError(f"Payroll for {month:02d}/{year} is already finalized")
+
+        if payroll_run and payroll_run.status == PayrollStatus.processing:
+            heartbeat = payroll_run.updated_at or payroll_run.run_at
+            if heartbeat and utc_now() - heartbeat < self.RUN_LEASE_TIMEOUT:
+                raise PayrollRunInProgressError(
+                    f"Payroll for {month:02d}/{year} is already being processed"
+                )
+
+            # Interrupted run - take over the lease and resume from committed checkpoints
+            payroll_run.run_by = user_id
+            payroll_run.run_at = utc_now()
+            result = await self.db.execute(
+                select(PayrollRunCheckpoint)
+                .where(PayrollRunCheckpoint.payroll_run_id == payroll_run.id)
+                .order_by(PayrollRunCheckpoint.chunk_index)
+            )
+            checkpoints = list(result.scalars().all())
+            logger.info(
+                f"Resuming payroll run {payroll_run.id} from chunk {len(checkpoints)}"
+            )
+            return payroll_run, checkpoints
+
+        if payroll_run:
+            # Re-run - discard previous results
+            await self.db.execute(
+                PayrollRunCheckpoint.__table__.delete().where(
+                    PayrollRunCheckpoint.payroll_run_id == payroll_run.id
+                )
+            )
+            await self.db.execute(
+                Payslip.__table__.delete().where(Payslip.payroll_run_id == payroll_run.id)
+            )
+            payroll_run.status = PayrollStatus.processing
+            payroll_run.run_by = user_id
+            payroll_run.run_at = utc_now()
+        else:
+            payroll_run = PayrollRun(
+                company_id=self.company_id,
+                year=year,
+                month=month,
+                status=PayrollStatus.processing,
+                run_by=user_id,
+                run_at=utc_now()
+            )
+            self.db.add(payroll_run)
+            await self.db.flush()
+
+        return payroll_run, []
+
+    async def _fetch_payroll_page(
+        self,
+        after_id: Optional[UUID],
+        limit: int,
+        period_start: date,
+        period_end: date,
+        employee_ids: Optional[List[UUID]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Fetch the next page of active employees as calculator input dicts.
+
+        Each employee is joined to the one salary revision in effect for the
+        period - the latest ``effective_from`` that overlaps it - so salary
+        history rows never produce duplicate payslips.
+        """
+        salary_in_effect = (
+            select(EmployeeSalary.id)
+            .where(
+                and_(
+                    EmployeeSalary.employee_id == Employee.id,
+                    EmployeeSalary.deleted_at.is_(None),
+                    EmployeeSalary.effective_from <= period_end,
+                    or_(
+                        EmployeeSalary.effective_to.is_(None),
+                        EmployeeSalary.effective_to >= period_start
+                    )
+                )
+            )
+            .order_by(EmployeeSalary.effective_from.desc())
+            .limit(1)
+            .correlate(Employee)
+            .scalar_subquery()
+        )
+        query = (
+            select(
+                Employee.id,
+                Employee.first_name,
+                Employee.middle_name,
+                Employee.last_name,
+                EmployeeSalary.id.label("salary_id"),
+                EmployeeSalary.basic,
+                EmployeeSalary.hra,
+                EmployeeSalary.special_allowance,
+                EmployeeSalary.tax_regime
+            )
+            .outerjoin(EmployeeSalary, EmployeeSalary.id == salary_in_effect)
+            .where(
+                and_(
+                    Employee.company_id == self.company_id,
+                    Employee.employment_status == EmploymentStatus.active,
+                    Employee.deleted_at.is_(None)
+                )
+            )
+            .order_by(Employee.id)
+            .limit(limit)
+        )
+        if after_id is not None:
+            query = query.where(Employee.id > after_id)
+        if employee_ids:
+            query = query.where(Employee.id.in_(employee_ids))
+
+        result = await self.db.execute(query)
+
+        page = []
+        for row in result.all():
+            name = " ".join(part for part in (row.first_name, row.middle_name, row.last_name) if part)
+            emp = {
+                "id": str(row.id),
+                "name": name,
+                "has_salary": row.salary_id is not None,
+                "basic": row.basic or Decimal("0"),
+                "hra": row.hra or Decimal("0"),
+                "special_allowance": row.special_allowance or Decimal("0"),
+            }
+            if row.tax_regime:
+                emp["tax_regime"] = row.tax_regime
+            page.append(emp)
+        return page
+
+    async def _commit_chunk(
+        self,
+        payroll_run_id: UUID,
+        lease: datetime,
+        chunk_result: PayrollChunkResult,
+        last_employee_id: UUID
+    ) -> None:
+        """
+        Bulk insert a chunk's payslips and its checkpoint in one transaction.
+
+        The run's heartbeat is bumped first, guarded by this worker's lease;
+        if another worker has taken the run over, nothing is written.
+        """
+        heartbeat = await self.db.execute(
+            update(PayrollRun)
+            .where(and_(PayrollRun.id == payroll_run_id, PayrollRun.run_at == lease))
+            .values(updated_at=utc_now())
+        )
+        if heartbeat.rowcount == 0:
+            await self.db.rollback()
+            raise PayrollRunInProgressError(
+                f"Payroll run {payroll_run_id} was taken over by another worker"
+            )
+
+        if chunk_result.payslips:
+            await self.db.execute(
+                insert(Payslip),
+                [
+                    self._payslip_values(payroll_run_id, UUID(ps.employee_id), ps)
+                    for ps in chunk_result.payslips
+                ]
+            )
+
+        self.db.add(PayrollRunCheckpoint(
+            payroll_run_id=payroll_run_id,
+            chunk_index=chunk_result.chunk_index,
+            last_employee_id=last_employee_id,
+            employee_count=len(chunk_result.payslips),
+            total_gross=chunk_result.total_gross,
+            total_deductions=chunk_result.total_deductions,
+            total_net=chunk_result.total_net,
+            total_employer_contributions=chunk_result.total_employer_contributions,
+            errors=chunk_result.errors
+        ))
+        await self.db.commit()
+
+    async def _release_lease(self, payroll_run_id: UUID, lease: datetime) -> None:
+        """
+        Give up this worker's lease after a failure, so a retry resumes from
+        the committed checkpoints at once instead of waiting out
+        RUN_LEASE_TIMEOUT. Only a lease this worker still holds is cleared.
+        """
+        try:
+            await self.db.rollback()
+            await self.db.execute(
+                update(PayrollRun)
+                .where(and_(PayrollRun.id == payroll_run_id, PayrollRun.run_at == lease))
+                .values(run_at=None, updated_at=None)
+            )
+            await self.db.commit()
+        except Exception as e:
+            logger.warning(f"Could not release the lease of payroll run {payroll_run_id}: {e}")
+
+    async def _finalize_chunked_run(self, payroll_run: PayrollRun) -> Dict[str, Any]:
+        """Merge checkpoint totals into the payroll run and close it."""
+        totals_result = await self.db.execute(
+            select(
+                func.coalesce(func.sum(PayrollRunCheckpoint.employee_count), 0),
+                func.coalesce(func.sum(PayrollRunCheckpoint.total_gross), 0),
+                func.coalesce(func.sum(PayrollRunCheckpoint.total_deductions), 0),
+                func.coalesce(func.sum(PayrollRunCheckpoint.total_net), 0),
+            ).where(PayrollRunCheckpoint.payroll_run_id == payroll_run.id)
+        )
+        processed_count, total_gross, total_deductions, total_net = totals_result.one()
+
+        errors_result = await self.db.execute(
+            select(PayrollRunCheckpoint.errors)
+            .where(PayrollRunCheckpoint.payroll_run_id == payroll_run.id)
+            .order_by(PayrollRunCheckpoint.chunk_index)
+        )
+        errors = [error for chunk_errors in errors_result.scalars().all() for error in (chunk_errors or [])]
+
+        if not processed_count and not errors:
+            payroll_run.status = PayrollStatus.draft
+            await self.db.commit()
+            raise PayrollDBServiceError("No active employees found for payroll processing")
+
+        payroll_run.total_gross = total_gross
+        payroll_run.total_deductions = total_deductions
+        payroll_run.total_net = total_net
+        payroll_run.employee_count = processed_count
+        payroll_run.status = PayrollStatus.finalized if not errors else PayrollStatus.draft
+
+        await self.db.commit()
+
+        return {
+            "run_id": str(payroll_run.id),
+            "company_id": str(self.company_id),
+            "period": f"{payroll_run.month:02d}/{payroll_run.year}",
+            "status": payroll_run.status.value,
+            "summary": {
+                "total_employees": processed_count,
+                "total_gross": float(total_gross),
+                "total_deductions": float(total_deductions),
+                "total_net": float(total_net)
+            },
+            "errors_count": len(errors),
+            "errors": errors if errors else None,
+            "processed_at": payroll_run.run_at.isoformat() if payroll_run.run_at else None
+        }
+
+    @staticmethod
+    def _payslip_values(
+        payroll_run_id: UUID,
+        employee_id: UUID,
+        payslip_data: PayslipData
+    ) -> Dict[str, Any]:
+        """Column values for a Payslip row built from calculator output."""
+        return {
+            "payroll_run_id": payroll_run_id,
+            "employee_id": employee_id,
+            "year": payslip_data.year,
+            "month": payslip_data.month,
+            "working_days": payslip_data.working_days,
+            "days_worked": payslip_data.days_worked,
+            "lop_days": payslip_data.lop_days,
+            "basic": payslip_data.earnings.basic,
+            "hra": payslip_data.earnings.hra,
+            "special_allowance": payslip_data.earnings.special_allowance,
+            "other_earnings": payslip_data.earnings.other_allowances,
+            "gross_salary": payslip_data.gross_earnings,
+            "pf_employee": payslip_data.deductions.employee_pf,
+            "pf_employer": payslip_data.employer_contributions.employer_pf + payslip_data.employer_contributions.employer_eps,
+            "esi_employee": payslip_data.deductions.employee_esi,
+            "esi_employer": payslip_data.employer_contributions.employer_esi,
+            "professional_tax": payslip_data.deductions.professional_tax,
+            "tds": payslip_data.deductions.tds,
+            "other_deductions": payslip_data.deductions.other_deductions,
+            "total_deductions": payslip_data.total_deductions,
+            "net_salary": payslip_data.net_salary,
+            "earnings_breakdown": {
+                "basic": float(payslip_data.earnings.basic),
+                "hra": float(payslip_data.earnings.hra),
+                "special_allowance": float(payslip_data.earnings.special_allowance)
+            },
+            "deductions_breakdown": {
+                "pf": float(payslip_data.deductions.employee_pf),
+                "esi": float(payslip_data.deductions.employee_esi),
+                "pt": float(payslip_data.deductions.professional_tax),
+                "tds": float(payslip_data.deductions.tds)
+            }
+        }
@@ -2,11 +2,15 @@
 Payroll Service - BE-011
 Monthly payroll processing orchestration
 """
+import os
 import uuid
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from decimal import Decimal
 from datetime import date, datetime
-from typing import List, Dict, Any, Optional
-from dataclasses import dataclass
+from itertools import islice
+from typing import List, Dict, Any, Optional, Iterable, Iterator, Callable
+from dataclasses import dataclass, field
 
 from app.services.payroll.calculator import PayrollCalculator, SalaryStructure, PayslipData
 from app.services.payroll.pf import PFCalculator
@@ -34,6 +38,125 @@ class PayrollRunResult:
     processed_at: datetime
 
 
+@dataclass
+class PayrollChunkResult:
+    """Result of processing one chunk of employees."""
+    chunk_index: int
+    payslips: List[PayslipData] = field(default_factory=list)
+    errors: List[Dict[str, Any]] = field(default_factory=list)
+    total_gross: Decimal = Decimal("0")
+    total_deductions: Decimal = Decimal("0")
+    total_net: Decimal = Decimal("0")
+    total_employer_contributions: Decimal = Decimal("0")
+    last_employee_id: Optional[str] = None
+
+
+def _amount(emp: Dict[str, Any], key: str) -> Decimal:
+    """Read a monetary field from an employee dict as Decimal."""
+    value = emp.get(key, 0)
+    if isinstance(value, Decimal):
+        return value
+    return Decimal(str(value or 0))
+
+
+def calculate_employee_payslip(
+    emp: Dict[str, Any],
+    year: int,
+    month: int,
+    working_days: int,
+    tax_regime_default: str
+) -> PayslipData:
+    """Calculate the payslip for a single employee data dictionary."""
+    salary_structure = SalaryStructure(
+        basic=_amount(emp, 'basic'),
+        hra=_amount(emp, 'hra'),
+        da=_amount(emp, 'da'),
+        conveyance=_amount(emp, 'conveyance'),
+        special_allowance=_amount(emp, 'special_allowance'),
+        medical_allowance=_amount(emp, 'medical_allowance'),
+        lta=_amount(emp, 'lta'),
+        other_allowances=_amount(emp, 'other_allowances')
+    )
+
+    return PayrollCalculator.calculate_monthly_salary(
+        salary_structure=salary_structure,
+        month=month,
+        year=year,
+        working_days=working_days,
+        days_worked=emp.get('days_worked', working_days),
+        tax_regime=emp.get('tax_regime', tax_regime_default),
+        existing_deductions_80c=_amount(emp, 'deductions_80c'),
+        existing_deductions_80d=_amount(emp, 'deductions_80d'),
+        hra_exemption=_amount(emp, 'hra_exemption'),
+        loan_recovery=_amount(emp, 'loan_recovery'),
+        advance_recovery=_amount(emp, 'advance_recovery'),
+        other_deductions=_amount(emp, 'other_deductions'),
+        overtime=_amount(emp, 'overtime'),
+        bonus=_amount(emp, 'bonus'),
+        incentive=_amount(emp, 'incentive'),
+        arrears=_amount(emp, 'arrears'),
+        reimbursements=_amount(emp, 'reimbursements'),
+        employee_id=str(emp.get('id', '')),
+        employee_name=emp.get('name', ''),
+        bank_account=emp.get('bank_account', ''),
+        pan=emp.get('pan', ''),
+        uan=emp.get('uan', '')
+    )
+
+
+def calculate_payroll_chunk(
+    chunk_index: int,
+    employees: List[Dict[str, Any]],
+    year: int,
+    month: int,
+    working_days: int = 26,
+    tax_regime_default: str = "new"
+) -> PayrollChunkResult:
+    """
+    Calculate payslips and totals for one chunk of employees.
+
+    Module-level so it can be shipped to a process pool worker.
+    """
+    result = PayrollChunkResult(chunk_index=chunk_index)
+
+    for emp in employees:
+        try:
+            payslip = calculate_employee_payslip(
+                emp, year, month, working_days, tax_regime_default
+            )
+            result.payslips.append(payslip)
+
+            result.total_gross += payslip.gross_earnings
+            result.total_deductions += payslip.total_deductions
+            result.total_net += payslip.net_salary
+            result.total_employer_contributions += payslip.employer_contributions.total
+
+        except Exception as e:
+            result.errors.append({
+                "employee_id": emp.get('id'),
+                "employee_name": emp.get('name'),
+                "error": str(e)
+            })
+
+    if employees:
+        result.last_employee_id = str(employees[-1].get('id', ''))
+
+    return result
+
+
+def iter_employee_chunks(
+    employees: Iterable[Dict[str, Any]],
+    chunk_size: int
+) -> Iterator[List[Dict[str, Any]]]:
+    """Split an employee stream into lists of at most chunk_size items."""
+    iterator = iter(employees)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
 class PayrollService:
     """
     Payroll processing service.
@@ -46,6 +169,8 @@ class PayrollService:
     5. Create accounting entries
     """
 
+    DEFAULT_CHUNK_SIZE = 500
+
     @classmethod
     def run_payroll(
         cls,
@@ -70,76 +195,115 @@ class PayrollService:
         Returns:
             PayrollRunResult with all payslips and summary
         """
-        run_id = str(uuid.uuid4())
-        payslips = []
-        errors = []
+        chunk = calculate_payroll_chunk(
+            0, employees, year, month, working_days, tax_regime_default
+        )
+        return cls.merge_chunk_results(company_id, year, month, [chunk])
+
+    @classmethod
+    def run_payroll_chunked(
+        cls,
+        company_id: str,
+        year: int,
+        month: int,
+        employees: Iterable[Dict[str, Any]],
+        working_days: int = 26,
+        tax_regime_default: str = "new",
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        max_workers: Optional[int] = None,
+        completed_chunks: Optional[Dict[int, PayrollChunkResult]] = None,
+        on_chunk_complete: Optional[Callable[[PayrollChunkResult], None]] = None
+    ) -> PayrollRunResult:
+        """
+        Process payroll in chunks across a process pool.
+
+        Employees are consumed lazily from ``employees`` so callers can stream
+        them from the database. At most ``2 * max_workers`` chunks are in
+        flight at once, which keeps memory bounded for very large companies.
+
+        Args:
+            company_id: Company ID
+            year: Payroll year
+            month: Payroll month (1-12)
+            employees: Iterable of employee data dictionaries
+            working_days: Working days in the month
+            tax_regime_default: Default tax regime
+            chunk_size: Employees per chunk
+            max_workers: Process pool size (None = CPU count, 0 = in-process)
+            completed_chunks: Chunk results restored from a checkpoint; these
+                chunk indexes are not recalculated
+            on_chunk_complete: Called in chunk order after each chunk finishes,
+                e.g. to persist a checkpoint
+
+        Returns:
+            PayrollRunResult identical to the serial ``run_payroll`` path
+        """
+        completed = dict(completed_chunks or {})
+        chunks = (
+            (index, chunk)
+            for index, chunk in enumerate(iter_employee_chunks(employees, chunk_size))
+            if index not in completed
+        )
+
+        def _record(chunk_result: PayrollChunkResult) -> None:
+            completed[chunk_result.chunk_index] = chunk_result
+            if on_chunk_complete:
+                on_chunk_complete(chunk_result)
+
+        if max_workers == 0:
+            for index, chunk in chunks:
+                _record(calculate_payroll_chunk(
+                    index, chunk, year, month, working_days, tax_regime_default
+                ))
+        else:
+            workers = max_workers or os.cpu_count() or 1
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                in_flight_limit = 2 * workers
+                pending: deque = deque()
+
+                for index, chunk in chunks:
+                    pending.append(pool.submit(
+                        calculate_payroll_chunk,
+                        index, chunk, year, month, working_days, tax_regime_default
+                    ))
+                    # Drain in submission order so checkpoints form a prefix
+                    while len(pending) >= in_flight_limit:
+                        _record(pending.popleft().result())
+
+                while pending:
+                    _record(pending.popleft().result())
+
+        ordered = [completed[index] for index in sorted(completed)]
+        return cls.merge_chunk_results(company_id, year, month, ordered)
+
+    @classmethod
+    def merge_chunk_results(
+        cls,
+        company_id: str,
+        year: int,
+        month: int,
+        chunks: List[PayrollChunkResult],
+        run_id: Optional[str] = None
+    ) -> PayrollRunResult:
+        """Merge per-chunk results (in chunk order) into a single run result."""
+        payslips: List[PayslipData] = []
+        errors: List[Dict[str, Any]] = []
 
         total_gross = Decimal("0")
         total_deductions = Decimal("0")
         total_net = Decimal("0")
         total_employer = Decimal("0")
 
-        for emp in employees:
-            try:
-                # Build salary structure from employee data
-                salary_structure = SalaryStructure(
-                    basic=Decimal(str(emp.get('basic', 0))),
-                    hra=Decimal(str(emp.get('hra', 0))),
-                    da=Decimal(str(emp.get('da', 0))),
-                    conveyance=Decimal(str(emp.get('conveyance', 0))),
-                    special_allowance=Decimal(str(emp.get('special_allowance', 0))),
-                    medical_allowance=Decimal(str(emp.get('medical_allowance', 0))),
-                    lta=Decimal(str(emp.get('lta', 0))),
-                    other_allowances=Decimal(str(emp.get('other_allowances', 0)))
-                )
-
-                # Get employee attendance
-                days_worked = emp.get('days_worked', working_days)
-                tax_regime = emp.get('tax_regime', tax_regime_default)
-
-                # Calculate payroll
-                payslip = PayrollCalculator.calculate_monthly_salary(
-                    salary_structure=salary_structure,
-                    month=month,
-                    year=year,
-                    working_days=working_days,
-                    days_worked=days_worked,
-                    tax_regime=tax_regime,
-                    existing_deductions_80c=Decimal(str(emp.get('deductions_80c', 0))),
-                    existing_deductions_80d=Decimal(str(emp.get('deductions_80d', 0))),
-                    hra_exemption=Decimal(str(emp.get('hra_exemption', 0))),
-                    loan_recovery=Decimal(str(emp.get('loan_recovery', 0))),
-                    advance_recovery=Decimal(str(emp.get('advance_recovery', 0))),
-                    other_deductions=Decimal(str(emp.get('other_deductions', 0))),
-                    overtime=Decimal(str(emp.get('overtime', 0))),
-                    bonus=Decimal(str(emp.get('bonus', 0))),
-                    incentive=Decimal(str(emp.get('incentive', 0))),
-                    arrears=Decimal(str(emp.get('arrears', 0))),
-                    reimbursements=Decimal(str(emp.get('reimbursements', 0))),
-                    employee_id=str(emp.get('id', '')),
-                    employee_name=emp.get('name', ''),
-                    bank_account=emp.get('bank_account', ''),
-                    pan=emp.get('pan', ''),
-                    uan=emp.get('uan', '')
-                )
-
-                payslips.append(payslip)
-
-                # Update totals
-                total_gross += payslip.gross_earnings
-                total_deductions += payslip.total_deductions
-                total_net += payslip.net_salary
-                total_employer += payslip.employer_contributions.total
-
-            except Exception as e:
-                errors.append({
-                    "employee_id": emp.get('id'),
-                    "employee_name": emp.get('name'),
-                    "error": str(e)
-                })
+        for chunk in chunks:
+            payslips.extend(chunk.payslips)
+            errors.extend(chunk.errors)
+            total_gross += chunk.total_gross
+            total_deductions += chunk.total_deductions
+            total_net += chunk.total_net
+            total_employer += chunk.total_employer_contributions
 
         return PayrollRunResult(
-            run_id=run_id,
+            run_id=run_id or str(uuid.uuid4()),
             company_id=company_id,
             year=year,
             month=month,
@@ -1,4 +1,13 @@
 """PDF service package - BE-037."""
 from app.services.pdf.pdf_service import PDFService
+from app.services.pdf.bulk_renderer import (
+    BulkRenderer, DirectorySink, ZipSink, render_payroll_payslips
+)
 
-__all__ = ["PDFService"]
+__all__ = [
+    "PDFService",
+    "BulkRenderer",
+    "DirectorySink",
+    "ZipSink",
+    "render_payroll_payslips",
+]
@@ -0,0 +1,273 @@
+"""
+Bulk PDF Rendering - BE-037
+Render thousands of documents (e.g. a payroll run's payslips) in one job
+
+Documents are rendered in a process pool whose workers compile the
+templates once at start-up, in bounded windows so only a few hundred
+contexts and PDFs are in flight at a time. Rendered files go straight to
+a sink: one ZIP archive, or one file per document in a directory tree.
+"""
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import islice
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional, Tuple, Union
+from uuid import UUID
+
+from sqlalchemy import and_, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.company import CompanyProfile
+from app.models.employee import Employee, EmployeeIdentity
+from app.models.payroll import PayrollRun, Payslip
+from app.services.pdf.pdf_service import html_to_pdf, require_pdf_renderer
+from app.services.pdf.templates import TEMPLATE_SOURCES, get_template, render_html
+
+
+# Documents sent to a worker per task
+RENDER_CHUNK_SIZE = 16
+
+# Documents in flight per worker (bounds memory for very large runs)
+RENDER_WINDOW_PER_WORKER = 8 * RENDER_CHUNK_SIZE
+
+# Payslips read per query
+PAYSLIP_PAGE_SIZE = 1000
+
+# (path inside the archive / storage, template name, context)
+RenderJob = Tuple[str, str, Dict[str, Any]]
+
+
+def _init_worker() -> None:
+    """Compile every template once when a worker process starts."""
+    for name in TEMPLATE_SOURCES:
+        get_template(name)
+
+
+def render_document(job: RenderJob) -> Tuple[str, bytes]:
+    """Render one job to (path, PDF bytes); runs inside the worker processes."""
+    path, template, context = job
+    return path, html_to_pdf(render_html(template, context))
+
+
+class ZipSink:
+    """Writes rendered documents into one ZIP archive."""
+
+    def __init__(self, target: Union[str, Any]):
+        # PDFs are already compressed; deflating them again only costs time
+        self.archive = zipfile.ZipFile(target, "w", compression=zipfile.ZIP_STORED, allowZip64=True)
+
+    def write(self, path: str, content: bytes) -> None:
+        self.archive.writestr(path, content)
+
+    def close(self) -> None:
+        self.archive.close()
+
+
+class DirectorySink:
+    """Writes each rendered document to its own file under a directory."""
+
+    def __init__(self, directory: str):
+        self.directory = os.path.realpath(directory)
+        self.paths: List[str] = []
+
+    def write(self, path: str, content: bytes) -> None:
+        file_path = os.path.realpath(os.path.join(self.directory, path))
+        if not file_path.startswith(self.directory + os.sep):
+            raise ValueError(f"Document path escapes the storage directory: {path}")
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, "wb") as f:
+            f.write(content)
+        self.paths.append(file_path)
+
+    def close(self) -> None:
+        pass
+
+
+class BulkRenderer:
+    """
+    Process pool rendering document jobs into a sink.
+
+    With workers=1 (or 0) documents are rendered in the calling process,
+    e.g. in Celery workers whose pool does not allow child processes.
+
+    Raises PDFRendererUnavailable on entry when WeasyPrint is missing, so
+    a bulk job never writes HTML files under .pdf names.
+    """
+
+    def __init__(self, workers: Optional[int] = None, chunk_size: int = RENDER_CHUNK_SIZE):
+        self.workers = (os.cpu_count() or 1) if workers is None else max(workers, 1)
+        self.chunk_size = chunk_size
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def __enter__(self) -> "BulkRenderer":
+        require_pdf_renderer()
+        if self.workers > 1:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    @property
+    def window(self) -> int:
+        return self.workers * RENDER_WINDOW_PER_WORKER
+
+    def render(
+        self,
+        jobs: Iterable[RenderJob],
+        sink: Any,
+        progress: Optional[Callable[[int], None]] = None
+    ) -> int:
+        """Render jobs window by window into the sink; returns the number rendered."""
+        jobs = iter(jobs)
+        rendered = 0
+        while True:
+            window = list(islice(jobs, self.window))
+            if not window:
+                return rendered
+            if self._executor is None:
+                results = map(render_document, window)
+            else:
+                results = self._executor.map(render_document, window, chunksize=self.chunk_size)
+            for path, content in results:
+                sink.write(path, content)
+                rendered += 1
+            if progress:
+                progress(rendered)
+
+
+def payslip_document_path(employee_code: str, year: int, month: int) -> str:
+    """Per-employee path of a payslip, e.g. EMP001/payslip_2026_03.pdf."""
+    safe_code = "".join(c if c.isalnum() or c in "-_" else "_" for c in employee_code)
+    return f"{safe_code}/payslip_{year}_{month:02d}.pdf"
+
+
+def payslip_context(row: Any, company_data: Dict[str, Any], generated_at: str) -> Dict[str, Any]:
+    """Template context of one payslip row (Payslip joined with the employee)."""
+    return {
+        "company": company_data,
+        "employee": {
+            "id": row.employee_code,
+            "name": " ".join(part for part in (row.first_name, row.last_name) if part),
+            "pan": row.pan or "",
+            "uan": row.uan or "",
+            "email": row.work_email or row.personal_email,
+        },
+        "period": {
+            "month": row.month,
+            "year": row.year,
+            "working_days": row.working_days,
+            "days_worked": row.days_worked,
+        },
+        "earnings": {
+            "basic": row.basic,
+            "hra": row.hra,
+            "special_allowance": row.special_allowance,
+            "conveyance": (row.earnings_breakdown or {}).get("conveyance"),
+        },
+        "deductions": {
+            "employee_pf": row.pf_employee,
+            "employee_esi": row.esi_employee,
+            "professional_tax": row.professional_tax,
+            "tds": row.tds,
+        },
+        "summary": {
+            "gross_earnings": row.gross_salary,
+            "total_deductions": row.total_deductions,
+            "net_salary": row.net_salary,
+        },
+        "generated_at": generated_at,
+    }
+
+
+async def load_company_data(db: AsyncSession, company_id: UUID) -> Dict[str, Any]:
+    """Company header fields of the documents."""
+    company = await db.get(CompanyProfile, company_id)
+    if company is None:
+        return {}
+    address = ", ".join(
+        part for part in (company.address_line1, company.address_line2, company.city, company.state, company.pincode)
+        if part
+    )
+    return {"name": company.legal_name or company.name, "address": address, "gstin": company.gstin or ""}
+
+
+async def count_payslips(db: AsyncSession, payroll_run_id: UUID, company_id: UUID) -> int:
+    return await db.scalar(
+        select(func.count(Payslip.id))
+        .join(PayrollRun, PayrollRun.id == Payslip.payroll_run_id)
+        .where(and_(Payslip.payroll_run_id == payroll_run_id, PayrollRun.company_id == company_id))
+    ) or 0
+
+
+async def iter_payslip_jobs(
+    db: AsyncSession,
+    payroll_run_id: UUID,
+    company_id: UUID,
+    company_data: Dict[str, Any],
+    page_size: int = PAYSLIP_PAGE_SIZE
+) -> AsyncIterator[List[RenderJob]]:
+    """Render jobs of a payroll run's payslips, a keyset-paged batch at a time."""
+    generated_at = datetime.now().strftime('%Y-%m-%d %H:%M')
+    query = (
+        select(
+            Payslip.id, Payslip.year, Payslip.month, Payslip.working_days, Payslip.days_worked,
+            Payslip.basic, Payslip.hra, Payslip.special_allowance, Payslip.earnings_breakdown,
+            Payslip.gross_salary, Payslip.pf_employee, Payslip.esi_employee,
+            Payslip.professional_tax, Payslip.tds, Payslip.total_deductions, Payslip.net_salary,
+            Employee.employee_code, Employee.first_name, Employee.last_name,
+            Employee.work_email, Employee.personal_email, EmployeeIdentity.pan, EmployeeIdentity.uan
+        )
+        .join(PayrollRun, PayrollRun.id == Payslip.payroll_run_id)
+        .join(Employee, Employee.id == Payslip.employee_id)
+        .outerjoin(EmployeeIdentity, EmployeeIdentity.employee_id == Employee.id)
+        .where(and_(Payslip.payroll_run_id == payroll_run_id, PayrollRun.company_id == company_id))
+        .order_by(Payslip.id)
+        .limit(page_size)
+    )
+
+    last_id = None
+    while True:
+        page = query if last_id is None else query.where(Payslip.id > last_id)
+        rows = (await db.execute(page)).all()
+        if not rows:
+            return
+        yield [
+            (
+                payslip_document_path(row.employee_code, row.year, row.month),
+                "payslip",
+                payslip_context(row, company_data, generated_at),
+            )
+            for row in rows
+        ]
+        last_id = rows[-1].id
+
+
+async def render_payroll_payslips(
+    db: AsyncSession,
+    payroll_run_id: UUID,
+    company_id: UUID,
+    company_data: Dict[str, Any],
+    sink: Any,
+    workers: Optional[int] = None,
+    progress: Optional[Callable[[int, int], None]] = None
+) -> Dict[str, Any]:
+    """
+    Render every payslip of a payroll run into a sink.
+
+    progress(rendered, total) is called after each rendering window.
+    """
+    total = await count_payslips(db, payroll_run_id, company_id)
+    rendered = 0
+
+    with BulkRenderer(workers) as renderer:
+        async for jobs in iter_payslip_jobs(db, payroll_run_id, company_id, company_data):
+            done = rendered
+            rendered += renderer.render(
+                jobs, sink, progress=(lambda n: progress(done + n, total)) if progress else None
+            )
+
+    return {"payroll_run_id": str(payroll_run_id), "total": total, "rendered": rendered}
@@ -0,0 +1,253 @@
+"""
+PDF Templates - BE-037
+Jinja2 sources of the PDF documents, compiled once per process
+"""
+from typing import Any, Dict
+
+import jinja2
+
+
+PAYSLIP_TEMPLATE = """
+<!DOCTYPE html>
+<html>
+<head>
+    <style>
+        body { font-family: Arial, sans-serif; margin: 20px; }
+        .header { text-align: center; margin-bottom: 20px; }
+        .company-name { font-size: 24px; font-weight: bold; }
+        .payslip-title { font-size: 18px; margin-top: 10px; }
+        table { width: 100%; border-collapse: collapse; margin: 10px 0; }
+        th, td { border: 1px solid #ddd; padding: 8px; text-align: left; }
+        th { background-color: #f4f4f4; }
+        .section-title { background-color: #e0e0e0; font-weight: bold; }
+        .amount { text-align: right; }
+        .total-row { font-weight: bold; background-color: #f9f9f9; }
+        .footer { margin-top: 30px; font-size: 12px; }
+    </style>
+</head>
+<body>
+    <div class="header">
+        <div class="company-name">{{ company.name or 'Company Name' }}</div>
+        <div>{{ company.address }}</div>
+        <div class="payslip-title">PAYSLIP</div>
+        <div>For the month of {{ period.month }}/{{ period.year }}</div>
+    </div>
+
+    <table>
+        <tr>
+            <td><strong>Employee ID:</strong> {{ employee.id }}</td>
+            <td><strong>Name:</strong> {{ employee.name }}</td>
+        </tr>
+        <tr>
+            <td><strong>PAN:</strong> {{ employee.pan }}</td>
+            <td><strong>UAN:</strong> {{ employee.uan }}</td>
+        </tr>
+        <tr>
+            <td><strong>Working Days:</strong> {{ period.working_days or 0 }}</td>
+            <td><strong>Days Worked:</strong> {{ period.days_worked or 0 }}</td>
+        </tr>
+    </table>
+
+    <table>
+        <tr class="section-title">
+            <th colspan="2">Earnings</th>
+            <th colspan="2">Deductions</th>
+        </tr>
+        <tr>
+            <td>Basic</td>
+            <td class="amount">Rs.{{ earnings.basic | money }}</td>
+            <td>PF</td>
+            <td class="amount">Rs.{{ deductions.employee_pf | money }}</td>
+        </tr>
+        <tr>
+            <td>HRA</td>
+            <td class="amount">Rs.{{ earnings.hra | money }}</td>
+            <td>ESI</td>
+            <td class="amount">Rs.{{ deductions.employee_esi | money }}</td>
+        </tr>
+        <tr>
+            <td>Special Allowance</td>
+            <td class="amount">Rs.{{ earnings.special_allowance | money }}</td>
+            <td>Professional Tax</td>
+            <td class="amount">Rs.{{ deductions.professional_tax | money }}</td>
+        </tr>
+        <tr>
+            <td>Conveyance</td>
+            <td class="amount">Rs.{{ earnings.conveyance | money }}</td>
+            <td>TDS</td>
+            <td class="amount">Rs.{{ deductions.tds | money }}</td>
+        </tr>
+        <tr class="total-row">
+            <td>Total Earnings</td>
+            <td class="amount">Rs.{{ summary.gross_earnings | money }}</td>
+            <td>Total Deductions</td>
+            <td class="amount">Rs.{{ summary.total_deductions | money }}</td>
+        </tr>
+    </table>
+
+    <table>
+        <tr class="total-row">
+            <td colspan="3">NET SALARY</td>
+            <td class="amount">Rs.{{ summary.net_salary | money }}</td>
+        </tr>
+    </table>
+
+    <div class="footer">
+        <p>This is a computer-generated payslip and does not require a signature.</p>
+        <p>Generated on: {{ generated_at }}</p>
+    </div>
+</body>
+</html>
+"""
+
+INVOICE_TEMPLATE = """
+<!DOCTYPE html>
+<html>
+<head>
+    <style>
+        body { font-family: Arial, sans-serif; margin: 20px; }
+        .header { display: flex; justify-content: space-between; }
+        .invoice-info { text-align: right; }
+        table { width: 100%; border-collapse: collapse; margin: 20px 0; }
+        th, td { border: 1px solid #ddd; padding: 10px; }
+        th { background-color: #f4f4f4; }
+        .amount { text-align: right; }
+        .total-section { margin-top: 20px; }
+    </style>
+</head>
+<body>
+    <div class="header">
+        <div class="company-info">
+            <h2>{{ company.name }}</h2>
+            <p>{{ company.address }}</p>
+            <p>GSTIN: {{ company.gstin }}</p>
+        </div>
+        <div class="invoice-info">
+            <h1>TAX INVOICE</h1>
+            <p><strong>Invoice #:</strong> {{ invoice.invoice_number }}</p>
+            <p><strong>Date:</strong> {{ invoice.invoice_date }}</p>
+            <p><strong>Due Date:</strong> {{ invoice.due_date }}</p>
+        </div>
+    </div>
+
+    <div class="bill-to">
+        <h3>Bill To:</h3>
+        <p><strong>{{ invoice.customer_name }}</strong></p>
+        <p>{{ invoice.customer_address }}</p>
+        <p>GSTIN: {{ invoice.customer_gstin }}</p>
+    </div>
+
+    <table>
+        <thead>
+            <tr>
+                <th>#</th>
+                <th>Description</th>
+                <th>HSN/SAC</th>
+                <th>Qty</th>
+                <th>Rate</th>
+                <th>GST %</th>
+                <th>Amount</th>
+            </tr>
+        </thead>
+        <tbody>
+            {% for item in invoice.get('items') or [] %}
+            <tr>
+                <td>{{ loop.index }}</td>
+                <td>{{ item.description }}</td>
+                <td>{{ item.hsn_sac }}</td>
+                <td class="amount">{{ item.quantity }}</td>
+                <td class="amount">{{ item.rate | money }}</td>
+                <td class="amount">{{ item.gst_rate }}</td>
+                <td class="amount">{{ item.amount | money }}</td>
+            </tr>
+            {% endfor %}
+        </tbody>
+    </table>
+
+    <div class="total-section">
+        <table style="width: 50%; margin-left: auto;">
+            <tr>
+                <td>Subtotal</td>
+                <td class="amount">Rs.{{ invoice.subtotal | money }}</td>
+            </tr>
+            <tr>
+                <td>CGST</td>
+                <td class="amount">Rs.{{ invoice.cgst | money }}</td>
+            </tr>
+            <tr>
+                <td>SGST</td>
+                <td class="amount">Rs.{{ invoice.sgst | money }}</td>
+            </tr>
+            <tr style="font-weight: bold;">
+                <td>Total</td>
+                <td class="amount">Rs.{{ invoice.total | money }}</td>
+            </tr>
+        </table>
+    </div>
+
+    <div class="footer">
+        <p><strong>Amount in words:</strong> {{ invoice.amount_in_words }}</p>
+        <p><strong>Terms & Conditions:</strong> {{ invoice.terms }}</p>
+    </div>
+</body>
+</html>
+"""
+
+REPORT_TEMPLATE = """
+<!DOCTYPE html>
+<html>
+<head>
+    <style>
+        body { font-family: Arial, sans-serif; margin: 20px; }
+        h1 { text-align: center; }
+        table { width: 100%; border-collapse: collapse; }
+        th, td { border: 1px solid #ddd; padding: 8px; }
+        th { background-color: #4CAF50; color: white; }
+        tr:nth-child(even) { background-color: #f2f2f2; }
+    </style>
+</head>
+<body>
+    <h1>{{ title }}</h1>
+    <p>Company: {{ company.name }}</p>
+    <p>Generated: {{ generated_at }}</p>
+
+    <table>
+        <thead><tr>{% for column in columns %}<th>{{ column.label }}</th>{% endfor %}</tr></thead>
+        <tbody>
+        {% for row in rows %}
+            <tr>{% for column in columns %}<td>{{ row.get(column.key, '') }}</td>{% endfor %}</tr>
+        {% endfor %}
+        </tbody>
+    </table>
+</body>
+</html>
+"""
+
+TEMPLATE_SOURCES = {
+    "payslip": PAYSLIP_TEMPLATE,
+    "invoice": INVOICE_TEMPLATE,
+    "report": REPORT_TEMPLATE,
+}
+
+
+def _money(value: Any) -> str:
+    return f"{value or 0:,.2f}"
+
+
+_environment = jinja2.Environment(
+    loader=jinja2.DictLoader(TEMPLATE_SOURCES),
+    autoescape=True,
+    undefined=jinja2.ChainableUndefined,
+    trim_blocks=True,
+    lstrip_blocks=True,
+)
+_environment.filters["money"] = _money
+
+
+def get_template(name: str) -> jinja2.Template:
+    """Compiled template; the environment's cache compiles each source once."""
+    return _environment.get_template(name)
+
+
+def render_html(name: str, context: Dict[str, Any]) -> str:
+    return get_template(name).render(**context)
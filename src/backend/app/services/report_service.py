@@ -2,17 +2,24 @@
 Report Service - BE-050
 Comprehensive report generation service for HR, Payroll, Compliance, and Financial reports
 """
-from typing import Dict, Any, List, Optional, Tuple
+from typing import Dict, Any, AsyncIterator, Callable, Iterable, List, Optional, Tuple
 from datetime import datetime, date, timedelta
 from decimal import Decimal
 from io import BytesIO
 from uuid import UUID
 import calendar
+import os
+import tempfile
 
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, and_, or_
+from sqlalchemy.sql import Select
 
 from app.core.datetime_utils import utc_now
+from app.models.accounting import AccountSubType, AccountType
+from app.models.company import CompanyProfile, Department, Designation
+from app.models.employee import Employee
+from app.models.payroll import PayrollRun, PayrollStatus, Payslip
 from app.schemas.reports import (
     ReportTypeEnum, ReportCategoryEnum, OutputFormatEnum,
     DateRange, ReportFilter, ColumnConfig,
@@ -24,6 +31,10 @@ from app.schemas.reports import (
     CashFlowEntry, AgingBucket, GSTR1Entry, GSTR3BData,
     HeadcountData, AttritionData
 )
+from app.services.accounting.ledger_service import (
+    AccountBalance, LedgerService, financial_year_start, split_balance
+)
+from app.services.excel.streaming_export import export_format, iter_export, stream_rows, write_export
 
 
 class ReportService:
@@ -37,6 +48,12 @@ class ReportService:
     - Financial Reports (trial balance, P&L, balance sheet, cash flow, aging)
     """
 
+    # Reports exportable straight from a query:
+    # report type -> (query builder, column builder, sheet title)
+    STREAMING_REPORTS: Dict[str, Tuple[str, str, str]] = {
+        "payroll_register": ("payroll_register_query", "_get_payroll_register_columns", "Payroll Register"),
+    }
+
     # =====================
     # Payroll Reports
     # =====================
@@ -713,6 +730,214 @@ class ReportService:
     # Financial Reports
     # =====================
 
+    @classmethod
+    async def _financial_context(
+        cls,
+        db: AsyncSession,
+        company_id: UUID,
+        on: date,
+        financial_year: Optional[str] = None
+    ) -> Tuple[Dict[str, Any], date]:
+        """Report company header and the start of the financial year containing a date."""
+        company_name = await db.scalar(select(CompanyProfile.name).where(CompanyProfile.id == company_id))
+        year = await LedgerService.get_financial_year(db, company_id, on)
+        start = year.start_date if year else financial_year_start(on)
+        label = year.name if year else f"{start.year}-{str(start.year + 1)[-2:]}"
+        return {"name": company_name, "financial_year": financial_year or label}, start
+
+    @classmethod
+    def _trial_balance_rows(
+        cls,
+        balances: List[AccountBalance],
+        include_zero_balances: bool = False
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, Decimal]]:
+        """Trial balance rows and column totals."""
+        keys = ("opening_debit", "opening_credit", "period_debit", "period_credit", "closing_debit", "closing_credit")
+        totals = {key: Decimal("0") for key in keys}
+        rows = []
+        for balance in balances:
+            if balance.is_zero and not include_zero_balances:
+                continue
+            opening_debit, opening_credit = split_balance(balance.opening)
+            closing_debit, closing_credit = split_balance(balance.closing)
+            row = {
+                "account_code": balance.code,
+                "account_name": balance.name,
+                "account_type": balance.account_type.value,
+                "opening_debit": opening_debit,
+                "opening_credit": opening_credit,
+                "period_debit": balance.period_debit,
+                "period_credit": balance.period_credit,
+                "closing_debit": closing_debit,
+                "closing_credit": closing_credit
+            }
+            for key in keys:
+                totals[key] += row[key]
+            rows.append(row)
+        return rows, totals
+
+    @classmethod
+    def _statement_section(
+        cls,
+        balances: Iterable[AccountBalance],
+        amount: Callable[[AccountBalance], Decimal],
+        include_zero_balances: bool = False
+    ) -> Dict[str, Any]:
+        """Section of account items with their total."""
+        items = []
+        for balance in balances:
+            value = amount(balance)
+            if value or include_zero_balances:
+                items.append({"account_code": balance.code, "particulars": balance.name, "amount": value})
+        return {"items": items, "total": sum((item["amount"] for item in items), Decimal("0"))}
+
+    @classmethod
+    def _profit_loss_sections(
+        cls,
+        balances: List[AccountBalance],
+        include_zero_balances: bool = False
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, Decimal]]:
+        """P&L sections and summary from income and expense movements."""
+        income = [b for b in balances if b.account_type == AccountType.INCOME]
+        expense = [b for b in balances if b.account_type == AccountType.EXPENSE]
+        groups = [
+            ("Revenue", [b for b in income if b.account_sub_type != AccountSubType.OTHER_INCOME]),
+            ("Cost of Goods Sold", [b for b in expense if b.account_sub_type == AccountSubType.COST_OF_GOODS]),
+            ("Operating Expenses", [
+                b for b in expense
+                if b.account_sub_type not in (AccountSubType.COST_OF_GOODS, AccountSubType.TAX_EXPENSE)
+            ]),
+            ("Other Income", [b for b in income if b.account_sub_type == AccountSubType.OTHER_INCOME]),
+            ("Tax Expense", [b for b in expense if b.account_sub_type == AccountSubType.TAX_EXPENSE]),
+        ]
+
+        sections = []
+        for name, accounts in groups:
+            section = cls._statement_section(accounts, lambda b: b.natural(b.movement), include_zero_balances)
+            sections.append({"name": name, **section})
+
+        revenue, cogs, opex, other_income, tax = (section["total"] for section in sections)
+        gross_profit = revenue - cogs
+        operating_profit = gross_profit - opex
+        profit_before_tax = operating_profit + other_income
+        return sections, {
+            "gross_profit": gross_profit,
+            "operating_profit": operating_profit,
+            "profit_before_tax": profit_before_tax,
+            "tax_expense": tax,
+            "net_profit": profit_before_tax - tax
+        }
+
+    @classmethod
+    def _balance_sheet_sections(
+        cls,
+        balances: List[AccountBalance],
+        include_zero_balances: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Balance sheet from balances whose period is the financial year to
+        date; income and expense balances become equity.
+        """
+        def closing(balance: AccountBalance) -> Decimal:
+            return balance.natural(balance.closing)
+
+        def section(accounts: List[AccountBalance]) -> Dict[str, Any]:
+            return cls._statement_section(accounts, closing, include_zero_balances)
+
+        assets = [b for b in balances if b.account_type == AccountType.ASSET]
+        liabilities = [b for b in balances if b.account_type == AccountType.LIABILITY]
+        profit_and_loss = [b for b in balances if b.account_type in (AccountType.INCOME, AccountType.EXPENSE)]
+
+        current_assets = section([b for b in assets if b.account_sub_type != AccountSubType.FIXED_ASSET])
+        non_current_assets = section([b for b in assets if b.account_sub_type == AccountSubType.FIXED_ASSET])
+        current_liabilities = section(
+            [b for b in liabilities if b.account_sub_type != AccountSubType.LONG_TERM_LIABILITY]
+        )
+        non_current_liabilities = section(
+            [b for b in liabilities if b.account_sub_type == AccountSubType.LONG_TERM_LIABILITY]
+        )
+
+        equity = section([b for b in balances if b.account_type == AccountType.EQUITY])
+        brought_forward = -sum((b.opening for b in profit_and_loss), Decimal("0"))
+        current_year = -sum((b.movement for b in profit_and_loss), Decimal("0"))
+        if brought_forward or include_zero_balances:
+            equity["items"].append({"particulars": "Profit & Loss Brought Forward", "amount": brought_forward})
+        equity["items"].append({"particulars": "Current Year Profit", "amount": current_year})
+        equity["total"] += brought_forward + current_year
+
+        total_assets = current_assets["total"] + non_current_assets["total"]
+        total_liabilities = current_liabilities["total"] + non_current_liabilities["total"]
+        return {
+            "assets": {
+                "current_assets": current_assets,
+                "non_current_assets": non_current_assets,
+                "total": total_assets
+            },
+            "liabilities": {
+                "current_liabilities": current_liabilities,
+                "non_current_liabilities": non_current_liabilities,
+                "total": total_liabilities
+            },
+            "equity": equity,
+            "total_liabilities_equity": total_liabilities + equity["total"],
+            "is_balanced": total_assets == total_liabilities + equity["total"]
+        }
+
+    @classmethod
+    def _cash_flow_sections(cls, balances: List[AccountBalance]) -> Tuple[Dict[str, Any], Dict[str, Decimal]]:
+        """
+        Indirect-method cash flow from the movements of a period.
+
+        Every non-cash account contributes the opposite of its movement, so
+        the three sections add up to the change in cash and bank balances.
+        Credit-balance fixed asset accounts (accumulated depreciation) are
+        added back under operating activities.
+        """
+        def is_cash(balance: AccountBalance) -> bool:
+            return balance.is_bank_account or balance.account_sub_type in (AccountSubType.CASH, AccountSubType.BANK)
+
+        operating: List[Dict[str, Any]] = []
+        investing: List[Dict[str, Any]] = []
+        financing: List[Dict[str, Any]] = []
+        net_profit = Decimal("0")
+
+        for balance in balances:
+            if is_cash(balance) or not balance.movement:
+                continue
+            if balance.account_type in (AccountType.INCOME, AccountType.EXPENSE):
+                net_profit -= balance.movement
+                continue
+
+            item = {"account_code": balance.code, "amount": -balance.movement}
+            if balance.account_sub_type == AccountSubType.FIXED_ASSET:
+                if balance.balance_type == "credit":
+                    operating.append({**item, "particulars": f"Add: {balance.name}"})
+                else:
+                    investing.append({**item, "particulars": balance.name})
+            elif balance.account_type == AccountType.EQUITY or balance.account_sub_type == AccountSubType.LONG_TERM_LIABILITY:
+                financing.append({**item, "particulars": balance.name})
+            elif balance.account_type == AccountType.ASSET:
+                operating.append({**item, "particulars": f"(Increase)/Decrease in {balance.name}"})
+            else:
+                operating.append({**item, "particulars": f"Increase/(Decrease) in {balance.name}"})
+
+        operating.insert(0, {"particulars": "Net Profit", "amount": net_profit})
+        sections = {
+            name: {"items": items, "total": sum((item["amount"] for item in items), Decimal("0"))}
+            for name, items in (
+                ("operating_activities", operating),
+                ("investing_activities", investing),
+                ("financing_activities", financing)
+            )
+        }
+
+        cash = [b for b in balances if is_cash(b)]
+        return sections, {
+            "net_increase_in_cash": sum((section["total"] for section in sections.values()), Decimal("0")),
+            "opening_cash": sum((b.opening for b in cash), Decimal("0")),
+            "closing_cash": sum((b.closing for b in cash), Decimal("0"))
+        }
+
     @classmethod
     async def generate_trial_balance(
         cls,
@@ -726,25 +951,23 @@ class ReportService:
         Returns:
         - Account-wise opening, period, and closing balances
         - Debit and credit totals
+
+        The period runs from the start of the financial year (or from_date)
+        to the as-of date.
         """
         as_of = request.as_of_date or date.today()
+        company, year_start = await cls._financial_context(db, company_id, as_of, request.financial_year)
+        balances = await LedgerService.get_account_balances(
+            db, company_id, as_of, request.from_date or year_start, request.cost_center_ids
+        )
+        rows, totals = cls._trial_balance_rows(balances, request.include_zero_balances)
 
         return {
             "report_name": "Trial Balance",
             "as_of_date": as_of.isoformat(),
             "generated_at": utc_now().isoformat(),
-            "company": {
-                "name": "Company Name",
-                "financial_year": request.financial_year or "2024-25"
-            },
-            "summary": {
-                "opening_debit": Decimal("50000000"),
-                "opening_credit": Decimal("50000000"),
-                "period_debit": Decimal("15000000"),
-                "period_credit": Decimal("15000000"),
-                "closing_debit": Decimal("55000000"),
-                "closing_credit": Decimal("55000000")
-            },
+            "company": company,
+            "summary": {**totals, "is_balanced": totals["closing_debit"] == totals["closing_credit"]},
             "columns": [
                 ColumnConfig(key="account_code", label="Code", data_type="string"),
                 ColumnConfig(key="account_name", label="Account", data_type="string"),
@@ -756,7 +979,7 @@ class ReportService:
                 ColumnConfig(key="closing_debit", label="Closing Dr", data_type="currency"),
                 ColumnConfig(key="closing_credit", label="Closing Cr", data_type="currency")
             ],
-            "data": []  # Account-wise data from DB
+            "data": rows
         }
 
     @classmethod
@@ -773,58 +996,24 @@ class ReportService:
         - Revenue breakdown
         - Cost of goods sold
         - Operating expenses
-        - Other income/expenses
+        - Other income and tax expense
         - Net profit/loss
         """
-        from_date = request.from_date or date.today().replace(month=4, day=1)
         to_date = request.to_date or date.today()
+        company, year_start = await cls._financial_context(db, company_id, to_date, request.financial_year)
+        from_date = request.from_date or year_start
+        balances = await LedgerService.get_account_balances(
+            db, company_id, to_date, from_date, request.cost_center_ids
+        )
+        sections, summary = cls._profit_loss_sections(balances, request.include_zero_balances)
 
         return {
             "report_name": "Profit & Loss Statement",
             "period": f"{from_date.strftime('%d-%b-%Y')} to {to_date.strftime('%d-%b-%Y')}",
             "generated_at": utc_now().isoformat(),
-            "company": {
-                "name": "Company Name",
-                "financial_year": request.financial_year or "2024-25"
-            },
-            "sections": [
-                {
-                    "name": "Revenue",
-                    "items": [
-                        {"particulars": "Sales Revenue", "amount": Decimal("10000000")},
-                        {"particulars": "Service Revenue", "amount": Decimal("5000000")},
-                        {"particulars": "Other Revenue", "amount": Decimal("500000")}
-                    ],
-                    "total": Decimal("15500000")
-                },
-                {
-                    "name": "Cost of Goods Sold",
-                    "items": [
-                        {"particulars": "Direct Materials", "amount": Decimal("4000000")},
-                        {"particulars": "Direct Labor", "amount": Decimal("2000000")},
-                        {"particulars": "Manufacturing Overhead", "amount": Decimal("500000")}
-                    ],
-                    "total": Decimal("6500000")
-                },
-                {
-                    "name": "Operating Expenses",
-                    "items": [
-                        {"particulars": "Salaries & Wages", "amount": Decimal("3000000")},
-                        {"particulars": "Rent", "amount": Decimal("600000")},
-                        {"particulars": "Utilities", "amount": Decimal("120000")},
-                        {"particulars": "Depreciation", "amount": Decimal("400000")},
-                        {"particulars": "Other Expenses", "amount": Decimal("380000")}
-                    ],
-                    "total": Decimal("4500000")
-                }
-            ],
-            "summary": {
-                "gross_profit": Decimal("9000000"),
-                "operating_profit": Decimal("4500000"),
-                "profit_before_tax": Decimal("4500000"),
-                "tax_expense": Decimal("1125000"),
-                "net_profit": Decimal("3375000")
-            }
+            "company": company,
+            "sections": sections,
+            "summary": summary
         }
 
     @classmethod
@@ -840,67 +1029,18 @@ class ReportService:
         Returns:
         - Assets (Current and Non-current)
         - Liabilities (Current and Non-current)
-        - Equity
+        - Equity, including profit brought forward and current year profit
         """
         as_of = request.as_of_date or date.today()
+        company, year_start = await cls._financial_context(db, company_id, as_of, request.financial_year)
+        balances = await LedgerService.get_account_balances(db, company_id, as_of, year_start)
 
         return {
             "report_name": "Balance Sheet",
             "as_of_date": as_of.isoformat(),
             "generated_at": utc_now().isoformat(),
-            "company": {
-                "name": "Company Name",
-                "financial_year": request.financial_year or "2024-25"
-            },
-            "assets": {
-                "current_assets": {
-                    "items": [
-                        {"particulars": "Cash and Cash Equivalents", "amount": Decimal("2500000")},
-                        {"particulars": "Accounts Receivable", "amount": Decimal("3500000")},
-                        {"particulars": "Inventory", "amount": Decimal("2000000")},
-                        {"particulars": "Prepaid Expenses", "amount": Decimal("200000")}
-                    ],
-                    "total": Decimal("8200000")
-                },
-                "non_current_assets": {
-                    "items": [
-                        {"particulars": "Property, Plant & Equipment", "amount": Decimal("15000000")},
-                        {"particulars": "Less: Accumulated Depreciation", "amount": Decimal("-3000000")},
-                        {"particulars": "Intangible Assets", "amount": Decimal("500000")},
-                        {"particulars": "Long-term Investments", "amount": Decimal("1000000")}
-                    ],
-                    "total": Decimal("13500000")
-                },
-                "total": Decimal("21700000")
-            },
-            "liabilities": {
-                "current_liabilities": {
-                    "items": [
-                        {"particulars": "Accounts Payable", "amount": Decimal("2000000")},
-                        {"particulars": "Short-term Loans", "amount": Decimal("1000000")},
-                        {"particulars": "Accrued Expenses", "amount": Decimal("500000")},
-                        {"particulars": "Current Tax Payable", "amount": Decimal("300000")}
-                    ],
-                    "total": Decimal("3800000")
-                },
-                "non_current_liabilities": {
-                    "items": [
-                        {"particulars": "Long-term Loans", "amount": Decimal("5000000")},
-                        {"particulars": "Deferred Tax Liability", "amount": Decimal("400000")}
-                    ],
-                    "total": Decimal("5400000")
-                },
-                "total": Decimal("9200000")
-            },
-            "equity": {
-                "items": [
-                    {"particulars": "Share Capital", "amount": Decimal("5000000")},
-                    {"particulars": "Retained Earnings", "amount": Decimal("4125000")},
-                    {"particulars": "Current Year Profit", "amount": Decimal("3375000")}
-                ],
-                "total": Decimal("12500000")
-            },
-            "total_liabilities_equity": Decimal("21700000")
+            "company": company,
+            **cls._balance_sheet_sections(balances, request.include_zero_balances)
         }
 
     @classmethod
@@ -911,54 +1051,26 @@ class ReportService:
         request: FinancialReportRequest
     ) -> Dict[str, Any]:
         """
-        Generate Cash Flow Statement.
+        Generate Cash Flow Statement (indirect method).
 
         Returns:
         - Operating activities
         - Investing activities
         - Financing activities
         """
-        from_date = request.from_date or date.today().replace(month=4, day=1)
         to_date = request.to_date or date.today()
+        company, year_start = await cls._financial_context(db, company_id, to_date, request.financial_year)
+        from_date = request.from_date or year_start
+        balances = await LedgerService.get_account_balances(db, company_id, to_date, from_date)
+        sections, summary = cls._cash_flow_sections(balances)
 
         return {
             "report_name": "Cash Flow Statement",
             "period": f"{from_date.strftime('%d-%b-%Y')} to {to_date.strftime('%d-%b-%Y')}",
             "generated_at": utc_now().isoformat(),
-            "company": {
-                "name": "Company Name"
-            },
-            "sections": {
-                "operating_activities": {
-                    "items": [
-                        {"particulars": "Net Profit", "amount": Decimal("3375000")},
-                        {"particulars": "Add: Depreciation", "amount": Decimal("400000")},
-                        {"particulars": "Increase in Receivables", "amount": Decimal("-500000")},
-                        {"particulars": "Increase in Payables", "amount": Decimal("300000")},
-                        {"particulars": "Decrease in Inventory", "amount": Decimal("200000")}
-                    ],
-                    "total": Decimal("3775000")
-                },
-                "investing_activities": {
-                    "items": [
-                        {"particulars": "Purchase of Fixed Assets", "amount": Decimal("-2000000")},
-                        {"particulars": "Sale of Investments", "amount": Decimal("500000")}
-                    ],
-                    "total": Decimal("-1500000")
-                },
-                "financing_activities": {
-                    "items": [
-                        {"particulars": "Loan Repayment", "amount": Decimal("-500000")},
-                        {"particulars": "Dividend Paid", "amount": Decimal("-1000000")}
-                    ],
-                    "total": Decimal("-1500000")
-                }
-            },
-            "summary": {
-                "net_increase_in_cash": Decimal("775000"),
-                "opening_cash": Decimal("1725000"),
-                "closing_cash": Decimal("2500000")
-            }
+            "company": company,
+            "sections": sections,
+            "summary": summary
         }
 
     @classmethod
@@ -1190,21 +1302,65 @@ class ReportService:
         """
         Export report data to Excel format.
 
-        Uses openpyxl for Excel generation.
+        Uses an openpyxl write-only workbook.
         Returns Excel file as bytes.
         """
-        from app.services.excel.excel_service import ExcelService
+        output = BytesIO()
+        await write_export(
+            report_data.get("data", []), columns, "xlsx", output,
+            sheet_title=report_data.get("report_name", "Report")
+        )
+        return output.getvalue()
 
-        # Convert columns to export format
-        export_columns = [
-            {"key": col.key, "label": col.label}
-            for col in columns
-        ]
+    @classmethod
+    def stream_export(
+        cls,
+        rows: Any,
+        columns: List[ColumnConfig],
+        output_format: OutputFormatEnum,
+        sheet_title: str = "Report"
+    ) -> AsyncIterator[bytes]:
+        """
+        Export rows (a list, or an async iterator such as stream_rows over
+        a query) to CSV or Excel as chunks for a StreamingResponse.
+        """
+        return iter_export(rows, columns, output_format, sheet_title)
 
-        return ExcelService.export_to_csv(
-            report_data.get("data", []),
-            export_columns
-        )
+    @classmethod
+    async def export_report_to_file(
+        cls,
+        db: AsyncSession,
+        company_id: UUID,
+        report_type: str,
+        parameters: Dict[str, Any],
+        output_format: str,
+        directory: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Export a streamable report straight from the database to a file.
+
+        Rows are read through a server-side cursor and written as they
+        arrive, so exports of millions of rows run in constant memory.
+        """
+        if report_type not in cls.STREAMING_REPORTS:
+            raise ValueError(f"Report type '{report_type}' cannot be exported to a file")
+        ext = export_format(output_format)
+        query_builder, columns_builder, title = cls.STREAMING_REPORTS[report_type]
+        statement = getattr(cls, query_builder)(company_id, parameters)
+
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        fd, file_path = tempfile.mkstemp(prefix=f"{report_type}_", suffix=f".{ext}", dir=directory)
+        with os.fdopen(fd, "wb") as target:
+            await write_export(
+                stream_rows(db, statement), getattr(cls, columns_builder)(), ext, target, sheet_title=title
+            )
+
+        return {
+            "file_path": file_path,
+            "file_size": os.path.getsize(file_path),
+            "generated_at": utc_now().isoformat(),
+        }
 
     @classmethod
     async def export_to_pdf(
@@ -1260,6 +1416,57 @@ class ReportService:
             ColumnConfig(key="net_salary", label="Net Salary", data_type="currency")
         ]
 
+    @classmethod
+    def payroll_register_query(
+        cls,
+        company_id: UUID,
+        parameters: Dict[str, Any]
+    ) -> Select:
+        """
+        Payslip rows of a payroll register, labelled with the keys of
+        _get_payroll_register_columns, for streaming exports. Only
+        finalized runs are included: draft and processing runs are still
+        being recalculated and cancelled ones were never paid.
+        """
+        request = PayrollReportRequest(**parameters)
+        query = (
+            select(
+                Employee.employee_code.label("employee_id"),
+                func.concat_ws(" ", Employee.first_name, Employee.last_name).label("employee_name"),
+                Department.name.label("department"),
+                Designation.name.label("designation"),
+                Payslip.working_days,
+                Payslip.days_worked,
+                Payslip.basic,
+                Payslip.hra,
+                Payslip.special_allowance,
+                Payslip.gross_salary,
+                Payslip.pf_employee,
+                Payslip.esi_employee,
+                Payslip.professional_tax,
+                Payslip.tds,
+                Payslip.total_deductions,
+                Payslip.net_salary
+            )
+            .join(PayrollRun, PayrollRun.id == Payslip.payroll_run_id)
+            .join(Employee, Employee.id == Payslip.employee_id)
+            .outerjoin(Department, Department.id == Employee.department_id)
+            .outerjoin(Designation, Designation.id == Employee.designation_id)
+            .where(
+                and_(
+                    PayrollRun.company_id == company_id,
+                    PayrollRun.status == PayrollStatus.finalized,
+                    Payslip.year == request.year,
+                    Payslip.month == request.month
+                )
+            )
+        )
+        if request.department_ids:
+            query = query.where(Employee.department_id.in_(request.department_ids))
+        if request.employee_ids:
+            query = query.where(Payslip.employee_id.in_(request.employee_ids))
+        return query.order_by(Employee.employee_code)
+
     @classmethod
     def _calculate_date_range(cls, date_range: DateRange) -> Tuple[date, date]:
         """Calculate actual dates from date range preset or custom dates."""
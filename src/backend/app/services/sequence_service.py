@@ -0,0 +1,110 @@
+"""
+Sequence Service - Document number allocation
+Per-company counters for lead, customer, opportunity and detection numbers
+"""
+from typing import List
+from uuid import UUID
+
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from app.models.company import DocumentSequence
+
+
+class SequenceService:
+    """
+    Allocates document numbers from DocumentSequence counter rows.
+
+    Each allocation is a single INSERT ... ON CONFLICT DO UPDATE ... RETURNING
+    on the (company, prefix, period) row: no scan of the document table, and
+    concurrent callers are serialised by the row lock so numbers are never
+    handed out twice.
+
+    By default the counter is bumped in its own short transaction, so the
+    row lock is held for one statement rather than for the caller's whole
+    request. The trade-off is that numbers reserved by a request that later
+    rolls back are skipped (the series may have gaps). Pass ``gapless=True``
+    to bump the counter in the caller's transaction instead: rolled-back
+    numbers are reused, but every creation in the series waits for the
+    previous caller to commit.
+    """
+
+    @staticmethod
+    async def allocate(
+        db: AsyncSession,
+        company_id: UUID,
+        prefix: str,
+        period: str = "",
+        count: int = 1,
+        gapless: bool = False
+    ) -> range:
+        """
+        Reserve a block of ``count`` consecutive numbers in one round-trip.
+
+        Args:
+            db: Database session
+            company_id: Company UUID
+            prefix: Sequence prefix (e.g. "LD")
+            period: Reset period (e.g. "202501"); "" for a running sequence
+            count: Number of values to reserve
+            gapless: Allocate in the caller's transaction (see class docstring)
+
+        Returns:
+            Range of the reserved values
+        """
+        if count < 1:
+            raise ValueError("count must be at least 1")
+
+        stmt = pg_insert(DocumentSequence).values(
+            company_id=company_id,
+            prefix=prefix,
+            period=period,
+            last_value=count
+        )
+        stmt = stmt.on_conflict_do_update(
+            constraint="uq_document_sequence",
+            set_={
+                "last_value": DocumentSequence.last_value + count,
+                "updated_at": func.now()
+            }
+        ).returning(DocumentSequence.last_value)
+
+        if not gapless and isinstance(db.bind, AsyncEngine):
+            async with db.bind.begin() as conn:
+                last_value = (await conn.execute(stmt)).scalar_one()
+        else:
+            last_value = (await db.execute(stmt)).scalar_one()
+        return range(last_value - count + 1, last_value + 1)
+
+    @classmethod
+    async def next_value(
+        cls,
+        db: AsyncSession,
+        company_id: UUID,
+        prefix: str,
+        period: str = "",
+        gapless: bool = False
+    ) -> int:
+        """Reserve a single number."""
+        return (await cls.allocate(db, company_id, prefix, period, gapless=gapless)).start
+
+    @classmethod
+    async def next_numbers(
+        cls,
+        db: AsyncSession,
+        company_id: UUID,
+        prefix: str,
+        template: str,
+        period: str = "",
+        count: int = 1,
+        gapless: bool = False
+    ) -> List[str]:
+        """
+        Reserve ``count`` numbers and format them.
+
+        ``template`` is a str.format pattern receiving ``prefix``, ``period``
+        and ``value``, e.g. "{prefix}-{period}-{value:04d}".
+        """
+        values = await cls.allocate(db, company_id, prefix, period, count, gapless)
+        return [template.format(prefix=prefix, period=period, value=value) for value in values]
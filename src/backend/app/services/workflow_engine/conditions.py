@@ -0,0 +1,271 @@
+"""
+Workflow Condition Compiler - Workflow Engine Module (MOD-16)
+
+Transition condition expressions are parsed once into nested closures and
+cached, so evaluating a transition is a plain function call on the
+variables dict.
+
+Grammar (keywords are case-insensitive):
+    expr       := and_expr ("or" and_expr)*
+    and_expr   := not_expr ("and" not_expr)*
+    not_expr   := ("not" | "!") not_expr | comparison
+    comparison := operand [op operand]
+    op         := == | != | > | < | >= | <= | in | not in | contains
+    operand    := "(" expr ")" | literal | list | variable
+    literal    := number | 'string' | "string" | true | false | none | null
+    variable   := name ("." name)*   (dot notation walks nested dicts)
+"""
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import ast
+import logging
+import operator
+import re
+
+logger = logging.getLogger(__name__)
+
+Variables = Dict[str, Any]
+CompiledCondition = Callable[[Variables], bool]
+
+# Compiled conditions kept per process
+CONDITION_CACHE_SIZE = 4096
+
+
+class ConditionSyntaxError(ValueError):
+    """Raised when a condition expression cannot be parsed."""
+
+
+def _contains(a: Any, b: Any) -> bool:
+    return b in a if isinstance(a, (str, list)) else False
+
+
+COMPARISON_OPERATORS: Dict[str, Callable[[Any, Any], bool]] = {
+    '==': operator.eq,
+    '!=': operator.ne,
+    '>': operator.gt,
+    '<': operator.lt,
+    '>=': operator.ge,
+    '<=': operator.le,
+    'in': lambda a, b: a in b,
+    'not in': lambda a, b: a not in b,
+    'contains': _contains,
+}
+
+_KEYWORD_LITERALS = {'true': True, 'false': False, 'none': None, 'null': None}
+
+_TOKEN_RE = re.compile(r"""
+    \s*(?:
+        (?P<number>-?\d+(?:\.\d+)?)
+      | (?P<string>'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*")
+      | (?P<symbol>==|!=|>=|<=|>|<|!|\(|\)|\[|\]|,)
+      | (?P<name>[A-Za-z_]\w*(?:\.\w+)*)
+    )
+""", re.VERBOSE)
+
+
+def tokenize(expression: str) -> List[Tuple[str, str]]:
+    """Split an expression into (kind, text) tokens."""
+    tokens = []
+    position = 0
+    length = len(expression)
+    while position < length:
+        match = _TOKEN_RE.match(expression, position)
+        if not match or match.end() == position:
+            if expression[position:].strip():
+                raise ConditionSyntaxError(
+                    f"Unexpected character at position {position}: {expression[position:]!r}"
+                )
+            break
+        kind = match.lastgroup
+        text = match.group(kind)
+        if kind == 'name' and text.lower() in ('and', 'or', 'not', 'in', 'contains'):
+            kind, text = 'keyword', text.lower()
+        tokens.append((kind, text))
+        position = match.end()
+    return tokens
+
+
+class _Parser:
+    """Recursive-descent parser producing closures."""
+
+    def __init__(self, expression: str):
+        self.tokens = tokenize(expression)
+        self.index = 0
+
+    def parse(self) -> Callable[[Variables], Any]:
+        node = self._or()
+        if self.index != len(self.tokens):
+            raise ConditionSyntaxError(f"Unexpected token {self.tokens[self.index][1]!r}")
+        return node
+
+    def _peek(self) -> Optional[Tuple[str, str]]:
+        return self.tokens[self.index] if self.index < len(self.tokens) else None
+
+    def _accept(self, *texts: str) -> Optional[str]:
+        token = self._peek()
+        if token and token[0] in ('keyword', 'symbol') and token[1] in texts:
+            self.index += 1
+            return token[1]
+        return None
+
+    def _expect(self, text: str) -> None:
+        if not self._accept(text):
+            raise ConditionSyntaxError(f"Expected {text!r}")
+
+    def _or(self) -> Callable[[Variables], Any]:
+        operands = [self._and()]
+        while self._accept('or'):
+            operands.append(self._and())
+        if len(operands) == 1:
+            return operands[0]
+        return lambda variables: any(operand(variables) for operand in operands)
+
+    def _and(self) -> Callable[[Variables], Any]:
+        operands = [self._not()]
+        while self._accept('and'):
+            operands.append(self._not())
+        if len(operands) == 1:
+            return operands[0]
+        return lambda variables: all(operand(variables) for operand in operands)
+
+    def _not(self) -> Callable[[Variables], Any]:
+        if self._accept('not', '!'):
+            operand = self._not()
+            return lambda variables: not operand(variables)
+        return self._comparison()
+
+    def _comparison(self) -> Callable[[Variables], Any]:
+        left = self._operand()
+        op_text = self._accept('==', '!=', '>=', '<=', '>', '<', 'in', 'contains')
+        if op_text is None:
+            token = self._peek()
+            next_token = self.tokens[self.index + 1] if self.index + 1 < len(self.tokens) else None
+            if token == ('keyword', 'not') and next_token == ('keyword', 'in'):
+                self.index += 2
+                op_text = 'not in'
+            else:
+                return left
+
+        op_func = COMPARISON_OPERATORS[op_text]
+        right = self._operand()
+        return lambda variables: op_func(left(variables), right(variables))
+
+    def _operand(self) -> Callable[[Variables], Any]:
+        if self._accept('('):
+            inner = self._or()
+            self._expect(')')
+            return inner
+        if self._accept('['):
+            items = []
+            if not self._accept(']'):
+                items.append(self._literal())
+                while self._accept(','):
+                    items.append(self._literal())
+                self._expect(']')
+            return lambda variables: items
+
+        token = self._peek()
+        if token and token[0] == 'name' and token[1].lower() not in _KEYWORD_LITERALS:
+            self.index += 1
+            return _variable(token[1])
+        value = self._literal()
+        return lambda variables: value
+
+    def _literal(self) -> Any:
+        token = self._peek()
+        if token is None:
+            raise ConditionSyntaxError("Unexpected end of expression")
+        kind, text = token
+        self.index += 1
+        if kind == 'number':
+            return float(text) if '.' in text else int(text)
+        if kind == 'string':
+            return ast.literal_eval(text)
+        if kind == 'name' and text.lower() in _KEYWORD_LITERALS:
+            return _KEYWORD_LITERALS[text.lower()]
+        raise ConditionSyntaxError(f"Expected a literal, got {text!r}")
+
+
+def _variable(name: str) -> Callable[[Variables], Any]:
+    """Variable lookup; dotted names walk nested dicts, missing keys give None."""
+    if '.' not in name:
+        return lambda variables: variables.get(name)
+
+    path = name.split('.')
+
+    def lookup(variables: Variables) -> Any:
+        value: Any = variables
+        for part in path:
+            if isinstance(value, dict) and part in value:
+                value = value[part]
+            else:
+                return None
+        return value
+
+    return lookup
+
+
+def _always_false(variables: Variables) -> bool:
+    return False
+
+
+@lru_cache(maxsize=CONDITION_CACHE_SIZE)
+def compile_condition(expression: Optional[str]) -> CompiledCondition:
+    """
+    Compile an expression into a predicate over a variables dict.
+
+    Empty expressions are always true. Invalid expressions are logged once
+    and compile to a predicate that is always false. Errors while evaluating
+    (e.g. comparing None with a number) also evaluate to false.
+    """
+    if not expression or not expression.strip():
+        return lambda variables: True
+
+    try:
+        node = _Parser(expression.strip()).parse()
+    except ConditionSyntaxError as e:
+        logger.error(f"Invalid condition expression '{expression}': {e}")
+        return _always_false
+
+    def condition(variables: Variables) -> bool:
+        try:
+            return bool(node(variables))
+        except Exception as e:
+            logger.error(f"Failed to evaluate condition expression '{expression}': {e}")
+            return False
+
+    return condition
+
+
+class ConditionCache:
+    """
+    Compiled transition conditions keyed by (transition id, version).
+
+    The version is the transition's updated_at, so editing a transition
+    recompiles it while unchanged transitions are never parsed again.
+    """
+
+    def __init__(self, max_size: int = CONDITION_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries: "OrderedDict[Tuple[Any, Any], CompiledCondition]" = OrderedDict()
+
+    def get(self, transition: Any) -> CompiledCondition:
+        """Compiled condition of a WorkflowTransition."""
+        key = (transition.id, transition.updated_at)
+        compiled = self._entries.get(key)
+        if compiled is not None:
+            self._entries.move_to_end(key)
+            return compiled
+
+        compiled = compile_condition(transition.condition_expression)
+        self._entries[key] = compiled
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        return compiled
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+condition_cache = ConditionCache()
@@ -11,6 +11,7 @@ from app.tasks.email_tasks import (
     send_payslip_email_task,
     send_invoice_email_task,
     send_leave_notification_task,
+    send_payslip_emails_task,
 )
 from app.tasks.report_tasks import (
     generate_report_task,
@@ -21,10 +22,21 @@ from app.tasks.notification_tasks import (
     send_bulk_notification_task,
     send_approval_reminder_task,
 )
+from app.tasks.payroll_tasks import (
+    run_payroll_task,
+    render_payslips_task,
+)
+from app.tasks.anomaly_tasks import (
+    run_anomaly_detection_task,
+)
 from app.tasks.maintenance_tasks import (
     cleanup_expired_sessions,
     cleanup_old_audit_logs,
     cleanup_old_login_history,
+    rotate_encryption_keys,
+)
+from app.tasks.webhook_tasks import (
+    dispatch_webhooks_task,
 )
 from app.tasks.task_auth import (
     TaskAuthorizationError,
@@ -39,6 +51,7 @@ __all__ = [
     "send_payslip_email_task",
     "send_invoice_email_task",
     "send_leave_notification_task",
+    "send_payslip_emails_task",
     # Report tasks
     "generate_report_task",
     "generate_daily_reports",
@@ -46,10 +59,18 @@ __all__ = [
     "send_notification_task",
     "send_bulk_notification_task",
     "send_approval_reminder_task",
+    # Payroll tasks
+    "run_payroll_task",
+    "render_payslips_task",
+    # Anomaly tasks
+    "run_anomaly_detection_task",
     # Maintenance tasks
     "cleanup_expired_sessions",
     "cleanup_old_audit_logs",
     "cleanup_old_login_history",
+    "rotate_encryption_keys",
+    # Webhook tasks
+    "dispatch_webhooks_task",
     # Authorization
     "TaskAuthorizationError",
     "TaskAuthorization",
@@ -0,0 +1,105 @@
+"""
+Anomaly Tasks - Batch anomaly detection via Celery
+
+Detection scans whole data-source windows (e.g. every expense line of the
+period) and scores them against baselines in one vectorised pass, so it
+runs off the request path and reports progress per data source.
+"""
+import asyncio
+from datetime import date
+from typing import Dict, Any, List, Optional
+from uuid import UUID
+from celery import shared_task
+from celery.utils.log import get_task_logger
+
+from app.tasks.task_auth import TaskAuthorizationError, require_user_company_access
+
+logger = get_task_logger(__name__)
+
+
+@shared_task(
+    bind=True,
+    max_retries=2,
+    default_retry_delay=120,
+    time_limit=1800,  # 30 minutes
+)
+def run_anomaly_detection_task(
+    self,
+    company_id: str,
+    user_id: str,
+    rule_ids: Optional[List[str]] = None,
+    category: Optional[str] = None,
+    data_source: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Run anomaly detection for a company.
+
+    SECURITY: Validates user has access to the company before processing.
+
+    Args:
+        company_id: Company UUID
+        user_id: Requesting user UUID
+        rule_ids: Optional list of rule UUIDs to run
+        category: Optional AnomalyCategory value
+        data_source: Optional data source name
+        start_date: First day scanned (ISO date)
+        end_date: Last day scanned (ISO date)
+
+    Returns:
+        Detection run summary
+    """
+    logger.info(f"Running anomaly detection for company {company_id}")
+
+    try:
+        require_user_company_access(user_id, company_id, ["admin", "accountant", "hr"])
+    except TaskAuthorizationError as auth_error:
+        logger.warning(f"Authorization failed for anomaly detection task: {auth_error}")
+        return {
+            "success": False,
+            "error": "Authorization failed - user does not have access to this company",
+        }
+
+    def report_progress(rules_done: int, rules_total: int, detections_created: int) -> None:
+        self.update_state(
+            state="PROGRESS",
+            meta={
+                "rules_done": rules_done,
+                "rules_total": rules_total,
+                "detections_created": detections_created,
+            },
+        )
+
+    async def _run() -> Dict[str, Any]:
+        # Import here to avoid circular imports
+        from app.db.session import task_session_maker
+        from app.models.anomaly_detection import AnomalyCategory
+        from app.services.anomaly_detection import detection_service
+
+        async with task_session_maker() as session_maker:
+            async with session_maker() as session:
+                result = await detection_service.run_detection(
+                    db=session,
+                    company_id=UUID(company_id),
+                    rule_ids=[UUID(r) for r in rule_ids] if rule_ids else None,
+                    category=AnomalyCategory(category) if category else None,
+                    data_source=data_source,
+                    start_date=date.fromisoformat(start_date) if start_date else None,
+                    end_date=date.fromisoformat(end_date) if end_date else None,
+                    progress_callback=report_progress,
+                )
+                return result.model_dump(mode="json")
+
+    try:
+        result = asyncio.run(_run())
+        logger.info(
+            f"Anomaly detection {result['job_id']} completed: "
+            f"{result['detections_created']} detections from {result['rules_executed']} rules"
+        )
+        return {"success": True, **result}
+    except Exception as e:
+        # Sources are committed one at a time and already-detected
+        # observations are skipped, so a retry does not duplicate detections
+        logger.error(f"Anomaly detection failed, retrying: {e}")
+        raise self.retry(exc=e)
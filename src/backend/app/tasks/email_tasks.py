@@ -1,28 +1,36 @@
 """
 Email Tasks - Async email sending via Celery
 """
+import asyncio
 import os
 from typing import List, Dict, Any, Optional
+from uuid import UUID
 from celery import shared_task
 from celery.utils.log import get_task_logger
 
 from app.services.email.email_service import EmailService, EmailConfig, EmailMessage
+from app.tasks.task_auth import TaskAuthorizationError, require_user_company_access
 
 logger = get_task_logger(__name__)
 
 
-def get_email_service() -> EmailService:
-    """Get configured email service instance."""
-    config = EmailConfig(
+def get_email_config() -> EmailConfig:
+    """SMTP relay configuration from the environment."""
+    return EmailConfig(
         smtp_host=os.getenv("SMTP_HOST", "smtp.gmail.com"),
         smtp_port=int(os.getenv("SMTP_PORT", "587")),
         smtp_user=os.getenv("SMTP_USER", ""),
         smtp_password=os.getenv("SMTP_PASSWORD", ""),
         use_tls=os.getenv("SMTP_USE_TLS", "true").lower() == "true",
+        use_ssl=os.getenv("SMTP_USE_SSL", "false").lower() == "true",
         from_email=os.getenv("SMTP_FROM", "noreply@ganakys.com"),
         from_name=os.getenv("SMTP_FROM_NAME", "GanaPortal"),
     )
-    return EmailService(config)
+
+
+def get_email_service() -> EmailService:
+    """Get configured email service instance."""
+    return EmailService(get_email_config())
 
 
 @shared_task(
@@ -219,3 +227,91 @@ def send_leave_notification_task(
     except Exception as e:
         logger.error(f"Failed to send leave notification: {str(e)}")
         raise self.retry(exc=e)
+
+
+@shared_task(
+    bind=True,
+    time_limit=4 * 3600,  # 4 hours
+)
+def send_payslip_emails_task(
+    self,
+    company_id: str,
+    user_id: str,
+    payroll_run_id: str,
+    connections: Optional[int] = None,
+    rate_per_second: Optional[float] = None,
+    workers: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Email every payslip of a payroll run to its employee.
+
+    Payslips are rendered in bulk and sent over a pool of persistent SMTP
+    connections. Not retried as a whole (that would resend delivered
+    payslips); failed recipients are listed in the result.
+
+    SECURITY: Validates user has access to the company before processing.
+
+    Args:
+        company_id: Company UUID
+        user_id: Requesting user UUID
+        payroll_run_id: Payroll run UUID
+        connections: SMTP connections to the relay (default SMTP_POOL_SIZE)
+        rate_per_second: Messages per second (default SMTP_RATE_PER_SECOND)
+        workers: Rendering processes (default PDF_RENDER_WORKERS)
+
+    Returns:
+        Delivery summary
+    """
+    from app.services.email.bulk_sender import SMTP_POOL_SIZE, SMTP_RATE_PER_SECOND
+
+    logger.info(f"Emailing payslips of payroll run {payroll_run_id} for company {company_id}")
+
+    try:
+        require_user_company_access(user_id, company_id, ["admin", "hr"])
+    except TaskAuthorizationError as auth_error:
+        logger.warning(f"Authorization failed for payslip emails: {auth_error}")
+        return {
+            "success": False,
+            "error": "Authorization failed - user does not have access to this company",
+        }
+
+    def report_progress(processed: int, total: int) -> None:
+        self.update_state(
+            state="PROGRESS",
+            meta={"payroll_run_id": payroll_run_id, "processed": processed, "total": total},
+        )
+
+    async def _run() -> Dict[str, Any]:
+        # Import here to avoid circular imports
+        from app.core.config import settings
+        from app.db.session import task_session_maker
+        from app.services.email.bulk_sender import BulkEmailSender, email_payroll_payslips
+        from app.services.pdf.bulk_renderer import load_company_data
+
+        async with BulkEmailSender(
+            get_email_config(),
+            connections=connections or SMTP_POOL_SIZE,
+            rate_per_second=rate_per_second or SMTP_RATE_PER_SECOND,
+        ) as sender, task_session_maker() as session_maker:
+            async with session_maker() as session:
+                company_data = await load_company_data(session, UUID(company_id))
+                return await email_payroll_payslips(
+                    session,
+                    UUID(payroll_run_id),
+                    UUID(company_id),
+                    company_data,
+                    sender,
+                    workers=settings.PDF_RENDER_WORKERS if workers is None else workers,
+                    progress=report_progress,
+                )
+
+    try:
+        result = asyncio.run(_run())
+        logger.info(
+            f"Payslip emails for payroll run {payroll_run_id}: {result['sent']} sent, "
+            f"{result['failed']} failed, {len(result['no_email'])} without email"
+        )
+        return {"success": result["failed"] == 0, **result}
+    except Exception as e:
+        logger.error(f"Payslip emails for payroll run {payroll_run_id} failed: {e}")
+        return {"success": False, "error": str(e)}
@@ -1,8 +1,9 @@
 """
 Maintenance Tasks - Scheduled cleanup and maintenance via Celery
 """
+import asyncio
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 from celery import shared_task
 from celery.utils.log import get_task_logger
 
@@ -92,6 +93,10 @@ def cleanup_old_audit_logs(self) -> Dict[str, Any]:
     """
     Clean up old audit logs based on retention policy.
 
+    Security audit logs are kept for 2 years. The user audit trail
+    (audit_logs) is kept for 7 years and pruned by dropping its expired
+    monthly partitions.
+
     Returns:
         Dict with cleanup results
     """
@@ -100,6 +105,8 @@ def cleanup_old_audit_logs(self) -> Dict[str, Any]:
     results = {
         "success": True,
         "logs_deleted": 0,
+        "audit_partitions_dropped": [],
+        "audit_rows_deleted": 0,
         "errors": [],
     }
 
@@ -108,6 +115,8 @@ def cleanup_old_audit_logs(self) -> Dict[str, Any]:
         from sqlalchemy import delete
         from datetime import timedelta
         from app.models.security import SecurityAuditLog
+        from app.services.audit_db_service import AuditDBService
+        from app.services.audit_writer import drop_expired_partitions
 
         with SessionLocal() as session:
             # Delete audit logs older than 2 years (default retention)
@@ -119,9 +128,19 @@ def cleanup_old_audit_logs(self) -> Dict[str, Any]:
             )
             results["logs_deleted"] = delete_result.rowcount
 
+            pruned = drop_expired_partitions(
+                session.connection(),
+                datetime.utcnow() - timedelta(days=AuditDBService.RETENTION_DAYS)
+            )
+            results["audit_partitions_dropped"] = pruned["partitions_dropped"]
+            results["audit_rows_deleted"] = pruned["rows_deleted"]
+
             session.commit()
 
-        logger.info(f"Audit logs cleanup completed: {results['logs_deleted']} deleted")
+        logger.info(
+            f"Audit logs cleanup completed: {results['logs_deleted']} deleted, "
+            f"{len(results['audit_partitions_dropped'])} audit partitions dropped"
+        )
         return results
 
     except Exception as e:
@@ -176,3 +195,68 @@ def cleanup_old_login_history(self) -> Dict[str, Any]:
         results["success"] = False
         results["errors"].append(str(e))
         return results
+
+
+@shared_task(
+    bind=True,
+    max_retries=5,
+    default_retry_delay=60,
+    time_limit=6 * 3600,  # 6 hours; progress is checkpointed per page
+)
+def rotate_encryption_keys(
+    self,
+    columns: Optional[List[str]] = None,
+    batch_size: int = 1000,
+    max_workers: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Re-encrypt encrypted columns to the current key version.
+
+    Every EncryptedStringType column is rotated unless ``columns`` lists
+    "table.column" names. Each column resumes from its key_rotation_jobs
+    cursor, so a retried task continues where it stopped.
+
+    Returns:
+        Dict with per-column rotation progress
+    """
+    logger.info("Starting encryption key rotation")
+
+    def report_progress(progress: Dict[str, Any]) -> None:
+        self.update_state(state="PROGRESS", meta=progress)
+
+    async def _run() -> List[Dict[str, Any]]:
+        from app.core.encryption import EncryptedStringType, get_key_rotation_manager
+        from app.db.session import task_session_maker
+        from app.models.base import Base
+        # Register every model that has encrypted columns
+        import app.models  # noqa: F401
+        import app.models.security  # noqa: F401
+        import app.models.superadmin  # noqa: F401
+
+        manager = get_key_rotation_manager()
+        results = []
+        async with task_session_maker() as session_maker:
+            for mapper in Base.registry.mappers:
+                for prop in mapper.column_attrs:
+                    column = prop.columns[0]
+                    name = f"{column.table.name}.{column.name}"
+                    if not isinstance(column.type, EncryptedStringType):
+                        continue
+                    if columns and name not in columns:
+                        continue
+                    async with session_maker() as session:
+                        results.append(await manager.rotate_column(
+                            session, mapper.class_, prop.key,
+                            batch_size=batch_size,
+                            max_workers=max_workers,
+                            progress_callback=report_progress,
+                        ))
+                    logger.info(f"Rotated {name}: {results[-1]['rows_rotated']} rows")
+        return results
+
+    try:
+        return {"success": True, "columns": asyncio.run(_run())}
+    except Exception as e:
+        # Committed pages are kept; the retry resumes from each cursor
+        logger.error(f"Key rotation failed, retrying: {e}")
+        raise self.retry(exc=e)
@@ -0,0 +1,213 @@
+"""
+Payroll Tasks - Chunked payroll runs via Celery
+
+Large payroll runs are processed off the request path. The run is
+checkpointed per chunk, so a retried task resumes from the last committed
+chunk instead of recalculating the whole company.
+"""
+import asyncio
+import os
+from typing import Dict, Any, List, Optional
+from uuid import UUID
+from celery import shared_task
+from celery.utils.log import get_task_logger
+
+from app.tasks.task_auth import TaskAuthorizationError, require_user_company_access
+
+logger = get_task_logger(__name__)
+
+
+@shared_task(
+    bind=True,
+    max_retries=3,
+    default_retry_delay=60,
+    time_limit=3600,  # 1 hour
+)
+def run_payroll_task(
+    self,
+    company_id: str,
+    user_id: str,
+    year: int,
+    month: int,
+    working_days: int = 26,
+    tax_regime_default: str = "new",
+    employee_ids: Optional[List[str]] = None,
+    chunk_size: int = 500,
+    workers: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Run a chunked payroll for a company.
+
+    SECURITY: Validates user has access to the company before processing.
+
+    Args:
+        company_id: Company UUID
+        user_id: Requesting user UUID
+        year: Payroll year
+        month: Payroll month (1-12)
+        working_days: Working days in the month
+        tax_regime_default: Default tax regime (new/old)
+        employee_ids: Optional list of employee UUIDs to process
+        chunk_size: Employees per chunk
+        workers: Calculation processes (default PAYROLL_WORKERS)
+
+    Returns:
+        Payroll run summary
+    """
+    logger.info(f"Running payroll {month:02d}/{year} for company {company_id}")
+
+    try:
+        require_user_company_access(user_id, company_id, ["admin", "hr"])
+    except TaskAuthorizationError as auth_error:
+        logger.warning(f"Authorization failed for payroll task: {auth_error}")
+        return {
+            "success": False,
+            "error": "Authorization failed - user does not have access to this company",
+        }
+
+    def report_progress(chunks_done: int, employees_done: int) -> None:
+        self.update_state(
+            state="PROGRESS",
+            meta={"chunks_done": chunks_done, "employees_done": employees_done},
+        )
+
+    async def _run() -> Dict[str, Any]:
+        # Import here to avoid circular imports
+        from app.core.config import settings
+        from app.db.session import task_session_maker
+        from app.services.payroll.payroll_db_service import PayrollDBService
+
+        async with task_session_maker() as session_maker:
+            async with session_maker() as session:
+                service = PayrollDBService(session, UUID(company_id))
+                return await service.run_payroll_chunked(
+                    year=year,
+                    month=month,
+                    user_id=UUID(user_id),
+                    working_days=working_days,
+                    tax_regime_default=tax_regime_default,
+                    employee_ids=[UUID(e) for e in employee_ids] if employee_ids else None,
+                    chunk_size=chunk_size,
+                    max_workers=settings.PAYROLL_WORKERS if workers is None else workers,
+                    progress_callback=report_progress,
+                )
+
+    try:
+        result = asyncio.run(_run())
+        logger.info(
+            f"Payroll {result['run_id']} completed: "
+            f"{result['summary']['total_employees']} employees"
+        )
+        return {"success": True, **result}
+    except Exception as e:
+        from app.services.payroll.payroll_db_service import (
+            PayrollDBService, PayrollDBServiceError, PayrollRunInProgressError
+        )
+
+        if isinstance(e, PayrollRunInProgressError) and self.request.retries:
+            # Failed runs release their lease; if our last attempt could not
+            # (e.g. the database was down), wait until the lease expires
+            logger.warning(f"Payroll run still leased, retrying after the lease timeout: {e}")
+            raise self.retry(exc=e, countdown=PayrollDBService.RUN_LEASE_TIMEOUT.total_seconds())
+
+        if isinstance(e, PayrollDBServiceError):
+            logger.warning(f"Payroll run rejected: {e}")
+            return {"success": False, "error": str(e)}
+
+        # Committed chunks are kept; the retry resumes from the checkpoint
+        logger.error(f"Payroll run failed, retrying: {e}")
+        raise self.retry(exc=e)
+
+
+@shared_task(
+    bind=True,
+    max_retries=2,
+    default_retry_delay=120,
+    time_limit=7200,  # 2 hours
+)
+def render_payslips_task(
+    self,
+    company_id: str,
+    user_id: str,
+    payroll_run_id: str,
+    output: str = "zip",
+    workers: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Render every payslip of a payroll run to PDF.
+
+    SECURITY: Validates user has access to the company before processing.
+
+    Args:
+        company_id: Company UUID
+        user_id: Requesting user UUID
+        payroll_run_id: Payroll run UUID
+        output: "zip" for one archive, "files" for one file per employee
+        workers: Rendering processes (default PDF_RENDER_WORKERS; 1 renders in the task process)
+
+    Returns:
+        Render summary with the archive or storage directory path
+    """
+    logger.info(f"Rendering payslips of payroll run {payroll_run_id} for company {company_id}")
+
+    try:
+        require_user_company_access(user_id, company_id, ["admin", "hr"])
+    except TaskAuthorizationError as auth_error:
+        logger.warning(f"Authorization failed for payslip rendering: {auth_error}")
+        return {
+            "success": False,
+            "error": "Authorization failed - user does not have access to this company",
+        }
+
+    def report_progress(rendered: int, total: int) -> None:
+        self.update_state(
+            state="PROGRESS",
+            meta={"payroll_run_id": payroll_run_id, "rendered": rendered, "total": total},
+        )
+
+    async def _run() -> Dict[str, Any]:
+        # Import here to avoid circular imports
+        from app.core.config import settings
+        from app.db.session import task_session_maker
+        from app.services.pdf.bulk_renderer import (
+            DirectorySink, ZipSink, load_company_data, render_payroll_payslips
+        )
+
+        directory = os.path.join(settings.FILE_STORAGE_PATH, "payslips", company_id)
+        os.makedirs(directory, exist_ok=True)
+        if output == "files":
+            path = os.path.join(directory, payroll_run_id)
+            sink = DirectorySink(path)
+        else:
+            path = os.path.join(directory, f"payslips_{payroll_run_id}.zip")
+            sink = ZipSink(path)
+
+        try:
+            async with task_session_maker() as session_maker:
+                async with session_maker() as session:
+                    company_data = await load_company_data(session, UUID(company_id))
+                    result = await render_payroll_payslips(
+                        session,
+                        UUID(payroll_run_id),
+                        UUID(company_id),
+                        company_data,
+                        sink,
+                        workers=settings.PDF_RENDER_WORKERS if workers is None else workers,
+                        progress=report_progress,
+                    )
+        finally:
+            sink.close()
+        return {**result, "output": output, "path": path}
+
+    try:
+        result = asyncio.run(_run())
+        logger.info(f"Rendered {result['rendered']} payslips of payroll run {payroll_run_id}")
+        return {"success": True, **result}
+    except Exception as e:
+        from app.services.pdf.pdf_service import PDFRendererUnavailable
+
+        if isinstance(e, PDFRendererUnavailable):
+            logger.error(f"Payslip rendering failed: {e}")
+            return {"success": False, "error": str(e)}
+        logger.error(f"Payslip rendering failed, retrying: {e}")
+        raise self.retry(exc=e)
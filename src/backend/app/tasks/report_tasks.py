@@ -7,7 +7,11 @@ The validation happens at task execution time (not just when queued) to ensure:
 2. User permissions haven't been revoked
 3. Defense in depth against queue tampering
 """
+import asyncio
+import os
 from typing import Dict, Any, Optional
+from uuid import UUID
+
 from celery import shared_task
 from celery.utils.log import get_task_logger
 
@@ -40,7 +44,7 @@ def generate_report_task(
         parameters: Report parameters
         user_id: Requesting user UUID
         organization_id: Organization/Company UUID
-        output_format: Output format (pdf, xlsx, csv)
+        output_format: Output format (xlsx or csv, streamed from the database)
 
     Returns:
         Dict with report file path and metadata
@@ -66,16 +70,25 @@ def generate_report_task(
                 "report_type": report_type,
             }
 
-        # Import here to avoid circular imports
-        from app.services.report_service import ReportService
-
-        service = ReportService()
-        result = service.generate_report(
-            report_type=report_type,
-            parameters=parameters,
-            organization_id=organization_id,
-            output_format=output_format,
-        )
+        async def _run() -> Dict[str, Any]:
+            # Import here to avoid circular imports
+            from app.core.config import settings
+            from app.db.session import task_session_maker
+            from app.services.report_service import ReportService
+
+            # Rows are streamed from the database into the file as they are read
+            async with task_session_maker() as session_maker:
+                async with session_maker() as session:
+                    return await ReportService.export_report_to_file(
+                        session,
+                        UUID(organization_id),
+                        report_type=report_type,
+                        parameters=parameters,
+                        output_format=output_format,
+                        directory=os.path.join(settings.FILE_STORAGE_PATH, "reports", organization_id),
+                    )
+
+        result = asyncio.run(_run())
 
         logger.info(f"Report generated successfully: {result.get('file_path')}")
         return {
@@ -0,0 +1,49 @@
+"""
+Webhook Tasks - Outbound webhook delivery via Celery
+"""
+import asyncio
+from typing import Dict, Any
+from celery import shared_task
+from celery.utils.log import get_task_logger
+
+logger = get_task_logger(__name__)
+
+# A run drains the queue until idle, or stops after this long so beat can start the next
+DISPATCH_MAX_SECONDS = 25
+
+
+@shared_task(
+    bind=True,
+    time_limit=120,
+    soft_time_limit=90,
+)
+def dispatch_webhooks_task(self, max_seconds: float = DISPATCH_MAX_SECONDS) -> Dict[str, Any]:
+    """
+    Send due webhook deliveries.
+
+    Runs every 30 seconds via Celery Beat. Deliveries are claimed with
+    SKIP LOCKED, so overlapping runs and several workers split the queue.
+
+    Returns:
+        Dict with dispatch counts
+    """
+    from app.db.session import task_session_maker
+    from app.services.integration_platform.webhook_dispatcher import WebhookDispatcher
+
+    async def _run() -> Dict[str, Any]:
+        async with task_session_maker() as session_maker:
+            async with WebhookDispatcher(session_factory=session_maker) as dispatcher:
+                return await dispatcher.run(max_seconds=max_seconds)
+
+    try:
+        stats = asyncio.run(_run())
+        if stats["claimed"]:
+            logger.info(
+                f"Webhook dispatch: {stats['delivered']} delivered, {stats['retried']} to retry, "
+                f"{stats['failed']} failed, {stats['deferred']} deferred, {stats['released']} released"
+            )
+        return {"success": True, **stats}
+
+    except Exception as e:
+        logger.error(f"Webhook dispatch failed: {str(e)}")
+        return {"success": False, "error": str(e)}
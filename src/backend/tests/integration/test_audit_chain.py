@@ -0,0 +1,103 @@
+"""
+Audit chain verification tests
+Run against the test database: paged verification, altered and deleted entries
+"""
+import uuid
+from datetime import timedelta
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import and_, delete, update
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.core.datetime_utils import utc_now
+from app.models.user import AuditLog
+from app.services.audit_db_service import AuditDBService
+from app.services.audit_writer import AuditLogWriter, audit_entry
+
+
+@pytest_asyncio.fixture
+async def writer(db_session):
+    # The writer commits in sessions of its own
+    return AuditLogWriter(session_factory=async_sessionmaker(db_session.bind, expire_on_commit=False))
+
+
+@pytest.fixture
+def small_pages(monkeypatch):
+    # Ten entries span four pages
+    monkeypatch.setattr(AuditDBService, "VERIFY_PAGE_SIZE", 3)
+
+
+async def _write(writer, company_ids, count):
+    """count entries per company, interleaved, one second apart."""
+    start = utc_now().replace(microsecond=0) - timedelta(minutes=5)
+    entries = [
+        audit_entry(
+            "update", "employee", company_id=company_id, entity_id=uuid.uuid4(),
+            new_values={"salary": 100 + i}, created_at=start + timedelta(seconds=i)
+        )
+        for i in range(count)
+        for company_id in company_ids
+    ]
+    for entry in entries:
+        await writer.submit(entry)
+    await writer.flush()
+    return entries
+
+
+async def _tamper(db_session, company_id, seq, statement):
+    await db_session.execute(statement.where(and_(AuditLog.company_id == company_id, AuditLog.seq == seq)))
+    await db_session.commit()
+
+
+class TestVerifyIntegrity:
+    """Tests for AuditDBService.verify_integrity."""
+
+    @pytest.mark.asyncio
+    async def test_intact_chain_is_verified_across_pages(self, db_session, writer, small_pages):
+        company_id, other_id = uuid.uuid4(), uuid.uuid4()
+        await _write(writer, [company_id, other_id], 10)
+
+        result = await AuditDBService(db_session, company_id).verify_integrity()
+
+        assert result["is_valid"] and result["reason"] is None
+        assert (result["first_seq"], result["last_seq"], result["checked"]) == (1, 10, 10)
+
+    @pytest.mark.asyncio
+    async def test_altered_entry_in_a_later_page(self, db_session, writer, small_pages):
+        company_id = uuid.uuid4()
+        entries = await _write(writer, [company_id], 10)
+        await _tamper(db_session, company_id, 7, update(AuditLog).values(description="edited"))
+
+        result = await AuditDBService(db_session, company_id).verify_integrity()
+
+        assert not result["is_valid"]
+        assert (result["first_invalid_seq"], result["checked"]) == (7, 6)
+        assert result["first_invalid_id"] == str(entries[6]["id"])
+        assert result["reason"] == "content does not match checksum"
+
+    @pytest.mark.asyncio
+    async def test_deleted_entry_on_a_page_boundary(self, db_session, writer, small_pages):
+        company_id = uuid.uuid4()
+        await _write(writer, [company_id], 10)
+        await _tamper(db_session, company_id, 4, delete(AuditLog))
+
+        result = await AuditDBService(db_session, company_id).verify_integrity()
+
+        assert not result["is_valid"]
+        assert (result["first_invalid_seq"], result["checked"]) == (5, 3)
+        assert result["reason"] == "expected seq 4"
+
+    @pytest.mark.asyncio
+    async def test_period_is_linked_to_the_entry_before_it(self, db_session, writer, small_pages):
+        company_id = uuid.uuid4()
+        entries = await _write(writer, [company_id], 10)
+        service = AuditDBService(db_session, company_id)
+
+        result = await service.verify_integrity(start_date=entries[3]["created_at"])
+        assert result["is_valid"] and (result["first_seq"], result["checked"]) == (4, 7)
+
+        await _tamper(db_session, company_id, 3, update(AuditLog).values(checksum="0" * 64))
+        result = await service.verify_integrity(start_date=entries[3]["created_at"])
+        assert not result["is_valid"] and result["first_invalid_seq"] == 4
+        assert result["reason"] == "broken link to the previous entry"
@@ -0,0 +1,134 @@
+"""
+GSTR-1 generation tests
+Run against the test database: result cache and HSN summary rollup
+"""
+import uuid
+import pytest
+import pytest_asyncio
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy import update
+
+from app.models.company import CompanyProfile
+from app.models.customer import Party, PartyType
+from app.models.invoice import Invoice, InvoiceItem, InvoiceType, InvoiceStatus
+from app.services.gst_service import GSTService, gst_uqc, invalidate_gstr1_cache
+
+
+GSTIN = "29AABCU9603R1ZM"
+PERIOD = "012025"
+
+
+@pytest_asyncio.fixture
+async def invoice(db_session):
+    company = CompanyProfile(id=uuid.uuid4(), name="Ganakys Technologies")
+    customer = Party(
+        id=uuid.uuid4(), company_id=company.id, code="CUST-001",
+        name="Customer Pvt Ltd", party_type=PartyType.CUSTOMER
+    )
+    invoice = Invoice(
+        id=uuid.uuid4(),
+        company_id=company.id,
+        customer_id=customer.id,
+        invoice_number="INV/2024-25/0001",
+        invoice_type=InvoiceType.TAX_INVOICE,
+        invoice_date=date(2025, 1, 10),
+        due_date=date(2025, 2, 10),
+        billing_gstin="27AAPFU0939F1ZV",
+        place_of_supply="27",
+        status=InvoiceStatus.APPROVED,
+        taxable_amount=Decimal("600"),
+        igst_amount=Decimal("108"),
+        grand_total=Decimal("708"),
+    )
+    db_session.add(company)
+    await db_session.flush()
+    db_session.add(customer)
+    await db_session.flush()
+    db_session.add(invoice)
+    await db_session.flush()
+
+    for line, (uom, quantity, amount) in enumerate([
+        ("Kg", "2", "100"), ("KGS", "3", "200"), ("kilogram", "5", "300"),
+    ], start=1):
+        db_session.add(InvoiceItem(
+            invoice_id=invoice.id, line_number=line, description="Steel rods",
+            hsn_sac_code="72142090", uom=uom, quantity=Decimal(quantity),
+            unit_price=Decimal(amount), taxable_amount=Decimal(amount),
+            igst_rate=Decimal("18"), igst_amount=Decimal(amount) * Decimal("0.18"),
+            total_amount=Decimal(amount) * Decimal("1.18"),
+        ))
+    await db_session.flush()
+
+    invalidate_gstr1_cache(company.id)
+    return invoice
+
+
+class TestGSTR1Cache:
+    """Tests for the per-period GSTR-1 result cache."""
+
+    @pytest.mark.asyncio
+    async def test_cache_hit_returns_private_copy(self, db_session, invoice):
+        service = GSTService(db_session)
+        first = await service.generate_gstr1(invoice.company_id, GSTIN, PERIOD)
+        first["summary"]["b2b"]["count"] = -1
+        del first["summary"]["hsn"]
+
+        second = await service.generate_gstr1(invoice.company_id, GSTIN, PERIOD)
+
+        assert second["return_id"] == first["return_id"]
+        assert second["summary"]["b2b"]["count"] == 1
+        assert second["summary"]["hsn"] == {"count": 1}
+
+    @pytest.mark.asyncio
+    async def test_item_edit_changes_fingerprint(self, db_session, invoice):
+        service = GSTService(db_session)
+        start, end = service._period_bounds(PERIOD)
+        before = await service._gstr1_fingerprint(invoice.company_id, start, end)
+
+        # Another process edits a line item without touching the invoice
+        await db_session.execute(
+            update(InvoiceItem)
+            .where(InvoiceItem.invoice_id == invoice.id, InvoiceItem.line_number == 1)
+            .values(taxable_amount=Decimal("150"), updated_at=datetime.utcnow() + timedelta(seconds=1))
+        )
+
+        assert await service._gstr1_fingerprint(invoice.company_id, start, end) != before
+
+    @pytest.mark.asyncio
+    async def test_item_delete_changes_fingerprint(self, db_session, invoice):
+        service = GSTService(db_session)
+        start, end = service._period_bounds(PERIOD)
+        before = await service._gstr1_fingerprint(invoice.company_id, start, end)
+
+        await db_session.execute(
+            InvoiceItem.__table__.delete().where(InvoiceItem.line_number == 1)
+        )
+
+        assert await service._gstr1_fingerprint(invoice.company_id, start, end) != before
+
+
+class TestHSNSummary:
+    """Tests for the HSN/SAC rollup."""
+
+    @pytest.mark.asyncio
+    async def test_units_are_mapped_and_merged(self, db_session, invoice):
+        service = GSTService(db_session)
+        start, end = service._period_bounds(PERIOD)
+
+        rows = await service._hsn_summary_rows(invoice.company_id, start, end)
+
+        assert len(rows) == 1
+        assert rows[0]["hsn_code"] == "72142090"
+        assert rows[0]["uqc"] == "KGS"
+        assert rows[0]["quantity"] == Decimal("10")
+        assert rows[0]["taxable_value"] == Decimal("600")
+        assert rows[0]["igst"] == Decimal("108")
+
+    def test_uqc_mapping(self):
+        assert gst_uqc(None) == "NOS"
+        assert gst_uqc("pcs") == "PCS"
+        assert gst_uqc("Litre") == "LTR"
+        assert gst_uqc("Sq. Ft") == "SQF"
+        assert gst_uqc("man-hours of consulting") == "OTH"
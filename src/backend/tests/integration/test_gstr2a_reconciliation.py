@@ -0,0 +1,180 @@
+"""
+GSTR-2A import and reconciliation tests
+Run against the test database: upsert on re-import and the SQL match query
+"""
+import io
+import json
+import uuid
+import pytest
+import pytest_asyncio
+from datetime import date
+from decimal import Decimal
+
+from sqlalchemy import select
+
+from app.models.bill import Bill, BillType, BillStatus
+from app.models.company import CompanyProfile
+from app.models.customer import Party, PartyType
+from app.models.gst import GSTR2A, GSTR2AAction
+from app.services.gst_service import GSTService
+
+
+PERIOD = "012025"
+SUPPLIER_GSTIN = "27AAPFU0939F1ZV"
+
+
+def _download(*invoices):
+    """GSTR-2A JSON with one supplier and (number, taxable value) invoices."""
+    return io.BytesIO(json.dumps({
+        "b2b": [{
+            "ctin": SUPPLIER_GSTIN.lower(),
+            "trdnm": "Supplier Pvt Ltd",
+            "inv": [
+                {
+                    "inum": number, "idt": "15-01-2025", "val": float(value) * 1.18,
+                    "pos": "29", "rchrg": "N", "inv_typ": "R",
+                    "itms": [{"num": 1, "itm_det": {"txval": value, "iamt": value * 0.18}}],
+                }
+                for number, value in invoices
+            ],
+        }],
+    }).encode())
+
+
+@pytest_asyncio.fixture
+async def company(db_session):
+    company = CompanyProfile(id=uuid.uuid4(), name="Ganakys Technologies")
+    db_session.add(company)
+    await db_session.flush()
+    return company
+
+
+async def _portal_rows(db_session, company_id):
+    result = await db_session.execute(
+        select(GSTR2A).where(GSTR2A.company_id == company_id).order_by(GSTR2A.invoice_number)
+    )
+    return list(result.scalars().all())
+
+
+class TestGSTR2AImport:
+    """Tests for GSTService.import_gstr2a."""
+
+    @pytest.mark.asyncio
+    async def test_reimport_keeps_user_actions(self, db_session, company):
+        # Read ids up front: after expire_all an attribute access would lazy-load,
+        # which an AsyncSession cannot do
+        company_id = company.id
+        service = GSTService(db_session)
+        assert await service.import_gstr2a(company_id, PERIOD, _download(("INV-1", 1000), ("INV-2", 2000))) == 2
+
+        rows = await _portal_rows(db_session, company_id)
+        rows[0].action = GSTR2AAction.ACCEPTED
+        await db_session.flush()
+
+        # The supplier amended INV-1 and dropped INV-2
+        await service.import_gstr2a(company_id, PERIOD, _download(("INV-1", 1100)))
+        db_session.expire_all()
+
+        rows = await _portal_rows(db_session, company_id)
+        assert [row.invoice_number for row in rows] == ["INV-1"]
+        assert rows[0].taxable_value == Decimal("1100.00")
+        assert rows[0].action == GSTR2AAction.ACCEPTED
+
+    @pytest.mark.asyncio
+    async def test_dropped_invoice_with_action_is_kept(self, db_session, company):
+        company_id = company.id
+        service = GSTService(db_session)
+        await service.import_gstr2a(company_id, PERIOD, _download(("INV-1", 1000), ("INV-2", 2000)))
+
+        rows = await _portal_rows(db_session, company_id)
+        rows[1].action = GSTR2AAction.REJECTED
+        await db_session.flush()
+
+        await service.import_gstr2a(company_id, PERIOD, _download(("INV-1", 1000)))
+        db_session.expire_all()
+
+        rows = await _portal_rows(db_session, company_id)
+        assert [row.invoice_number for row in rows] == ["INV-1", "INV-2"]
+
+    @pytest.mark.asyncio
+    async def test_duplicate_invoice_in_download_is_upserted_once(self, db_session, company):
+        company_id = company.id
+        service = GSTService(db_session)
+        await service.import_gstr2a(company_id, PERIOD, _download(("INV-1", 1000), ("INV-1", 1200)))
+
+        rows = await _portal_rows(db_session, company_id)
+        assert len(rows) == 1
+        assert rows[0].taxable_value == Decimal("1200.00")
+
+
+class TestGSTR2AReconciliation:
+    """Tests for the streamed books vs GSTR-2A match."""
+
+    @pytest_asyncio.fixture
+    async def vendor(self, db_session, company):
+        vendor = Party(
+            id=uuid.uuid4(), company_id=company.id, code="VEND-001",
+            name="Supplier Pvt Ltd", party_type=PartyType.VENDOR
+        )
+        db_session.add(vendor)
+        await db_session.flush()
+        return vendor
+
+    def _bill(self, company_id, vendor_id, number, taxable):
+        return Bill(
+            company_id=company_id,
+            vendor_id=vendor_id,
+            bill_number=f"B-{number}",
+            bill_type=BillType.PURCHASE_INVOICE,
+            status=BillStatus.APPROVED,
+            vendor_invoice_number=number,
+            vendor_invoice_date=date(2025, 1, 15),
+            vendor_gstin=SUPPLIER_GSTIN,
+            bill_date=date(2025, 1, 16),
+            due_date=date(2025, 2, 15),
+            taxable_amount=Decimal(taxable),
+            igst_amount=Decimal(taxable) * Decimal("0.18"),
+        )
+
+    @pytest.mark.asyncio
+    async def test_match_query_classifies_invoices(self, db_session, company, vendor):
+        company_id, vendor_id = company.id, vendor.id
+        db_session.add_all([
+            self._bill(company_id, vendor_id, "inv/0001", "1000"),   # matched after normalisation
+            self._bill(company_id, vendor_id, "INV-2", "2500"),      # value mismatch
+            self._bill(company_id, vendor_id, "INV-3", "3000"),      # only in books
+        ])
+        await db_session.flush()
+
+        service = GSTService(db_session)
+        report = await service.reconcile_gstr2a(
+            company_id=company_id,
+            gstin="29AABCU9603R1ZM",
+            period=PERIOD,
+            gstr2a_file=_download(("INV0001", 1000), ("INV-2", 2000), ("INV-4", 4000)),
+        )
+
+        assert report.summary.matched_count == 1
+        assert report.summary.value_mismatch_count == 1
+        assert report.summary.only_in_books_count == 1
+        assert report.summary.only_in_gstr2a_count == 1
+        assert report.only_in_books[0].invoice_number == "INV-3"
+        assert report.only_in_gstr2a[0].invoice_number == "INV-4"
+
+    @pytest.mark.asyncio
+    async def test_items_are_paged_but_summary_is_complete(self, db_session, company, vendor):
+        company_id = company.id
+        service = GSTService(db_session)
+        invoices = [(f"INV-{i:03d}", 100 + i) for i in range(12)]
+        await service.import_gstr2a(company_id, PERIOD, _download(*invoices))
+
+        first = await service.reconcile_gstr2a(
+            company_id, "29AABCU9603R1ZM", PERIOD, items_offset=0, items_limit=5
+        )
+        last = await service.reconcile_gstr2a(
+            company_id, "29AABCU9603R1ZM", PERIOD, items_offset=10, items_limit=5
+        )
+
+        assert first.summary.only_in_gstr2a_count == 12
+        assert [item.invoice_number for item in first.only_in_gstr2a] == [n for n, _ in invoices[:5]]
+        assert [item.invoice_number for item in last.only_in_gstr2a] == [n for n, _ in invoices[10:]]
@@ -0,0 +1,151 @@
+"""
+Offline action processing tests
+Run against the test database: bulk apply, resent actions and per-action failures
+"""
+import uuid
+from datetime import date, datetime, timezone
+from decimal import Decimal
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import func, select
+
+from app.models.company import CompanyProfile
+from app.models.employee import Employee
+from app.models.expense import ExpenseAdvance, ExpenseCategory, ExpenseClaim, ExpenseType
+from app.models.mobile import DevicePlatform, MobileAttendancePunch, MobileDevice, OfflineAction
+from app.models.user import User
+from app.schemas.mobile import OfflineActionCreate, OfflineActionType, SyncEntityType
+from app.services.mobile.offline_processor import OfflineActionProcessor
+
+
+@pytest_asyncio.fixture
+async def owner(db_session):
+    """Company, user with an employee record, registered device and expense category."""
+    company = CompanyProfile(id=uuid.uuid4(), name="Ganakys Technologies")
+    user = User(id=uuid.uuid4(), email="asha@ganakys.test", password_hash="x", company_id=company.id)
+    db_session.add_all([company, user])
+    await db_session.flush()
+
+    employees = [
+        Employee(
+            id=uuid.uuid4(), company_id=company.id, employee_code=code, first_name=name, last_name="Rao",
+            date_of_joining=date(2024, 4, 1), user_id=user.id if code == "EMP001" else None,
+        )
+        for code, name in (("EMP001", "Asha"), ("EMP002", "Ravi"))
+    ]
+    device = MobileDevice(
+        id=uuid.uuid4(), company_id=company.id, user_id=user.id, device_id="pixel-8", platform=DevicePlatform.ANDROID
+    )
+    category = ExpenseCategory(
+        id=uuid.uuid4(), company_id=company.id, code="TAXI", name="Taxi", expense_type=ExpenseType.TRANSPORT
+    )
+    db_session.add_all([*employees, device, category])
+    await db_session.flush()
+
+    advances = [
+        ExpenseAdvance(
+            id=uuid.uuid4(), company_id=company.id, employee_id=employee.id, advance_number=f"ADV-{employee.employee_code}",
+            requested_amount=Decimal("5000"), purpose="Site visit",
+        )
+        for employee in employees
+    ]
+    db_session.add_all(advances)
+    await db_session.commit()
+    return {
+        "company_id": company.id, "user_id": user.id, "device_id": device.id,
+        "category_id": category.id, "own_advance": advances[0].id, "other_advance": advances[1].id,
+    }
+
+
+def _processor(db_session, owner):
+    return OfflineActionProcessor(db_session, owner["company_id"], owner["user_id"], owner["device_id"])
+
+
+def _action(owner, client_id, entity_type, payload):
+    return OfflineActionCreate(
+        device_id=owner["device_id"], client_action_id=client_id, entity_type=entity_type,
+        action_type=OfflineActionType.CREATE, payload=payload,
+        client_timestamp=datetime(2026, 10, 1, 9, 30, tzinfo=timezone.utc),
+    )
+
+
+def _punch(owner, client_id):
+    return _action(owner, client_id, SyncEntityType.ATTENDANCE, {"punch_type": "in", "latitude": "12.97"})
+
+
+def _expense(owner, client_id, category_id=None, advance_id=None):
+    return _action(owner, client_id, SyncEntityType.EXPENSE, {
+        "title": "Site visit", "expense_period_from": "2026-09-30", "expense_period_to": "2026-09-30",
+        "advance_id": str(advance_id) if advance_id else None,
+        "items": [{
+            "category_id": str(category_id or owner["category_id"]), "expense_date": "2026-09-30",
+            "description": "Taxi", "amount": 100, "total_amount": 100, "base_amount": 100,
+        }],
+    })
+
+
+async def _count(db_session, model):
+    return (await db_session.execute(select(func.count()).select_from(model))).scalar_one()
+
+
+class TestOfflineActionProcessor:
+    """Tests for OfflineActionProcessor."""
+
+    @pytest.mark.asyncio
+    async def test_groups_are_applied_and_recorded(self, db_session, owner):
+        actions = [_punch(owner, f"p{i}") for i in range(3)] + [_expense(owner, "e1")]
+
+        results = await _processor(db_session, owner).process(actions)
+
+        assert [r["status"] for r in results] == ["success"] * 4
+        assert await _count(db_session, MobileAttendancePunch) == 3
+        assert await _count(db_session, ExpenseClaim) == 1
+        recorded = (await db_session.execute(select(OfflineAction.status))).scalars().all()
+        assert recorded == ["success"] * 4
+
+    @pytest.mark.asyncio
+    async def test_resent_action_is_not_applied_again(self, db_session, owner):
+        first = await _processor(db_session, owner).process([_punch(owner, "p1")])
+
+        again = await _processor(db_session, owner).process([_punch(owner, "p1"), _punch(owner, "p2")])
+
+        assert again[0]["server_entity_id"] == first[0]["server_entity_id"]
+        assert again[1]["status"] == "success"
+        assert await _count(db_session, MobileAttendancePunch) == 2
+
+    @pytest.mark.asyncio
+    async def test_bad_references_fail_only_their_actions(self, db_session, owner):
+        actions = [
+            _expense(owner, "ok"),
+            _expense(owner, "no-category", category_id=uuid.uuid4()),
+            _expense(owner, "foreign-advance", advance_id=owner["other_advance"]),
+            _expense(owner, "own-advance", advance_id=owner["own_advance"]),
+        ]
+
+        results = await _processor(db_session, owner).process(actions)
+
+        assert [r["status"] for r in results] == ["success", "failed", "failed", "success"]
+        assert results[1]["error_message"] == "Expense category not found"
+        assert results[2]["error_message"] == "Expense advance not found"
+        assert await _count(db_session, ExpenseClaim) == 2
+
+    @pytest.mark.asyncio
+    async def test_rejected_statement_is_retried_per_action(self, db_session, owner, monkeypatch):
+        # A reference the checks do not catch: the insert itself fails
+        async def unchecked(self, parsed):
+            return parsed
+
+        monkeypatch.setattr(OfflineActionProcessor, "_check_expense_references", unchecked)
+        actions = [_expense(owner, "ok"), _expense(owner, "bad", category_id=uuid.uuid4()), _punch(owner, "p1")]
+
+        results = await _processor(db_session, owner).process(actions)
+
+        assert [r["status"] for r in results] == ["success", "failed", "success"]
+        assert results[1]["error_message"] == "Rejected by the database: IntegrityError"
+        assert results[1]["server_entity_id"] is None
+        assert await _count(db_session, ExpenseClaim) == 1
+        stored = dict((await db_session.execute(
+            select(OfflineAction.client_action_id, OfflineAction.status)
+        )).all())
+        assert stored == {"ok": "success", "bad": "failed", "p1": "success"}
@@ -0,0 +1,82 @@
+"""
+Document sequence tests
+Run against the test database: counter allocation, period rollover, batches
+"""
+import uuid
+import pytest
+import pytest_asyncio
+
+from sqlalchemy import select
+
+from app.models.company import CompanyProfile, DocumentSequence
+from app.services.sequence_service import SequenceService
+
+
+TEMPLATE = "{prefix}-{period}-{value:04d}"
+
+
+@pytest_asyncio.fixture
+async def company_id(db_session):
+    # Allocation runs in its own transaction, so the company must be committed
+    company = CompanyProfile(id=uuid.uuid4(), name="Ganakys Technologies")
+    db_session.add(company)
+    await db_session.commit()
+    return company.id
+
+
+class TestSequenceService:
+    """Tests for SequenceService."""
+
+    @pytest.mark.asyncio
+    async def test_values_are_consecutive(self, db_session, company_id):
+        values = [await SequenceService.next_value(db_session, company_id, "LD", "202501") for _ in range(3)]
+
+        assert values == [1, 2, 3]
+
+    @pytest.mark.asyncio
+    async def test_new_period_starts_again(self, db_session, company_id):
+        await SequenceService.allocate(db_session, company_id, "LD", "202501", count=5)
+
+        assert await SequenceService.next_numbers(db_session, company_id, "LD", TEMPLATE, "202502") == ["LD-202502-0001"]
+        assert await SequenceService.next_numbers(db_session, company_id, "LD", TEMPLATE, "202501") == ["LD-202501-0006"]
+
+    @pytest.mark.asyncio
+    async def test_next_numbers_reserves_a_block(self, db_session, company_id):
+        first = await SequenceService.next_numbers(db_session, company_id, "OP", TEMPLATE, "202501", count=3)
+        second = await SequenceService.next_numbers(db_session, company_id, "OP", TEMPLATE, "202501", count=2)
+
+        assert first == ["OP-202501-0001", "OP-202501-0002", "OP-202501-0003"]
+        assert second == ["OP-202501-0004", "OP-202501-0005"]
+
+    @pytest.mark.asyncio
+    async def test_sequences_are_per_company(self, db_session, company_id):
+        other = CompanyProfile(id=uuid.uuid4(), name="Other Company")
+        db_session.add(other)
+        await db_session.commit()
+
+        await SequenceService.allocate(db_session, company_id, "CUST", count=10)
+
+        assert await SequenceService.next_value(db_session, other.id, "CUST") == 1
+
+    @pytest.mark.asyncio
+    async def test_caller_rollback_does_not_reuse_numbers(self, db_session, company_id):
+        assert await SequenceService.next_value(db_session, company_id, "ANM", "2025") == 1
+        await db_session.rollback()
+
+        assert await SequenceService.next_value(db_session, company_id, "ANM", "2025") == 2
+
+    @pytest.mark.asyncio
+    async def test_gapless_allocation_rolls_back_with_caller(self, db_session, company_id):
+        await SequenceService.next_value(db_session, company_id, "ANM", "2025", gapless=True)
+        await db_session.rollback()
+
+        assert await SequenceService.next_value(db_session, company_id, "ANM", "2025", gapless=True) == 1
+        row = (await db_session.execute(
+            select(DocumentSequence).where(DocumentSequence.company_id == company_id)
+        )).scalar_one()
+        assert row.last_value == 1
+
+    @pytest.mark.asyncio
+    async def test_count_must_be_positive(self, db_session, company_id):
+        with pytest.raises(ValueError):
+            await SequenceService.allocate(db_session, company_id, "LD", count=0)
@@ -0,0 +1,136 @@
+"""
+Webhook dispatch tests
+Run against the test database: claim caps, concurrent claims and lease release
+"""
+import asyncio
+import uuid
+from datetime import timedelta
+
+import httpx
+import pytest
+import pytest_asyncio
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.models.company import CompanyProfile
+from app.models.integration import WebhookDelivery, WebhookSubscription
+from app.models.user import User
+from app.services.integration_platform.webhook_dispatcher import (
+    PENDING, SUCCESS, WebhookDispatcher, _now
+)
+
+
+@pytest_asyncio.fixture
+async def session_factory(db_session):
+    # The dispatcher commits in sessions of its own
+    return async_sessionmaker(db_session.bind, expire_on_commit=False)
+
+
+@pytest_asyncio.fixture
+async def subscriptions(db_session):
+    company = CompanyProfile(id=uuid.uuid4(), name="Ganakys Technologies")
+    user = User(id=uuid.uuid4(), email="admin@ganakys.test", password_hash="x", company_id=company.id)
+    db_session.add_all([company, user])
+    await db_session.flush()
+
+    result = []
+    for name in ("erp", "crm"):
+        subscription = WebhookSubscription(
+            id=uuid.uuid4(), company_id=company.id, name=name,
+            url=f"https://{name}.receiver.test/hook", events=["invoice.created"], created_by=user.id,
+        )
+        db_session.add(subscription)
+        result.append(subscription)
+    await db_session.commit()
+    return result
+
+
+async def _queue(db_session, subscription, count):
+    db_session.add_all([
+        WebhookDelivery(
+            subscription_id=subscription.id, event="invoice.created", event_id=str(uuid.uuid4()),
+            request_url=subscription.url, request_headers={}, request_body="{}",
+            status=PENDING, attempt_number=1,
+        )
+        for _ in range(count)
+    ])
+    await db_session.commit()
+
+
+def _dispatcher(session_factory, handler=None, **kwargs):
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler or (lambda request: httpx.Response(200))))
+    return WebhookDispatcher(session_factory=session_factory, client=client, **kwargs)
+
+
+class TestWebhookClaim:
+    """Tests for WebhookDispatcher.claim."""
+
+    @pytest.mark.asyncio
+    async def test_claim_caps_each_subscription(self, db_session, session_factory, subscriptions):
+        erp, crm = subscriptions
+        await _queue(db_session, erp, 20)
+        await _queue(db_session, crm, 3)
+        dispatcher = _dispatcher(session_factory, subscription_backlog=5)
+
+        claimed = await dispatcher.claim(100)
+
+        counts = {erp.id: 0, crm.id: 0}
+        for delivery in claimed:
+            counts[delivery.subscription_id] += 1
+        assert counts == {erp.id: 5, crm.id: 3}
+
+        # Three of erp's deliveries still in flight: only two more fit its backlog
+        dispatcher._state(erp.id).in_flight = 3
+        assert [d.subscription_id for d in await dispatcher.claim(100)] == [erp.id, erp.id]
+
+    @pytest.mark.asyncio
+    async def test_concurrent_claims_do_not_overlap(self, db_session, session_factory, subscriptions):
+        erp, crm = subscriptions
+        await _queue(db_session, erp, 30)
+        await _queue(db_session, crm, 30)
+        first, second = _dispatcher(session_factory), _dispatcher(session_factory)
+
+        a, b = await asyncio.gather(first.claim(40), second.claim(40))
+
+        ids_a, ids_b = {d.id for d in a}, {d.id for d in b}
+        assert not ids_a & ids_b
+        assert len(ids_a) + len(ids_b) <= 60
+
+    @pytest.mark.asyncio
+    async def test_expired_lease_is_reclaimed_as_new_attempt(self, db_session, session_factory, subscriptions):
+        erp, _ = subscriptions
+        await _queue(db_session, erp, 1)
+        dispatcher = _dispatcher(session_factory)
+        assert len(await dispatcher.claim(10)) == 1
+        assert await dispatcher.claim(10) == []
+
+        # The worker holding the lease died
+        await db_session.execute(
+            update(WebhookDelivery).values(next_attempt_at=_now() - timedelta(seconds=1))
+        )
+        await db_session.commit()
+
+        reclaimed = await _dispatcher(session_factory).claim(10)
+        assert [d.attempt_number for d in reclaimed] == [2]
+
+
+class TestWebhookRun:
+    """Tests for WebhookDispatcher.run."""
+
+    @pytest.mark.asyncio
+    async def test_deadline_releases_unsent_leases(self, db_session, session_factory, subscriptions):
+        erp, _ = subscriptions
+        await _queue(db_session, erp, 5)
+
+        async def slow(request):
+            await asyncio.sleep(0.3)
+            return httpx.Response(200)
+
+        async with _dispatcher(session_factory, slow, subscription_concurrency=1) as dispatcher:
+            stats = await dispatcher.run(max_seconds=0.1)
+
+        assert (stats["claimed"], stats["delivered"], stats["released"]) == (5, 1, 4)
+        rows = (await db_session.execute(select(WebhookDelivery))).scalars().all()
+        assert sorted(row.status for row in rows) == [PENDING] * 4 + [SUCCESS]
+        released = [row for row in rows if row.status == PENDING]
+        assert all(row.attempt_number == 1 and row.next_attempt_at <= _now() for row in released)
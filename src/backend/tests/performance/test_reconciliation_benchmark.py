@@ -0,0 +1,57 @@
+"""
+Bank reconciliation benchmark
+Auto-reconcile must scale near-linearly with statement size.
+"""
+import random
+import time
+import uuid
+import pytest
+from datetime import date, timedelta
+
+from app.services.banking_service import BankingService
+
+
+def _generate(rows: int, seed: int = 42):
+    """Book entries plus a bank statement where most lines have a counterpart."""
+    rng = random.Random(seed)
+    start = date(2025, 1, 1)
+    books, banks = [], []
+
+    for i in range(rows):
+        amount = f"{rng.randint(100, 500000)}.{rng.randint(0, 99):02d}"
+        day = rng.randint(0, 89)
+        reference = f"UTR{i:08d}" if i % 2 == 0 else ""
+        books.append({
+            "id": uuid.uuid4(), "amount": amount,
+            "date": start + timedelta(days=day), "reference": reference,
+        })
+        if i % 10 != 0:
+            banks.append({
+                "id": uuid.uuid4(), "amount": amount,
+                "date": start + timedelta(days=day + rng.randint(0, 1)),
+                "reference": reference,
+            })
+    rng.shuffle(banks)
+    return books, banks
+
+
+class TestReconciliationBenchmark:
+    """Reconciliation throughput at 10k and 100k rows."""
+
+    def _run(self, rows: int) -> float:
+        books, banks = _generate(rows)
+        start = time.perf_counter()
+        matches = BankingService.auto_reconcile(books, banks)
+        elapsed = time.perf_counter() - start
+
+        assert len(matches) >= len(banks) * 0.95
+        return elapsed
+
+    def test_reconcile_10k_rows(self):
+        elapsed = self._run(10_000)
+        assert elapsed < 5.0, f"10k-row reconciliation took {elapsed:.2f}s"
+
+    @pytest.mark.slow
+    def test_reconcile_100k_rows(self):
+        elapsed = self._run(100_000)
+        assert elapsed < 60.0, f"100k-row reconciliation took {elapsed:.2f}s"
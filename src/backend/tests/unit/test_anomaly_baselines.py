@@ -0,0 +1,193 @@
+"""
+Anomaly baseline statistics tests
+Vectorised per-group statistics must match NumPy/statistics results, and
+incremental (Welford + t-digest) updates must agree with a full rebuild.
+"""
+import statistics
+from datetime import date, timedelta
+from types import SimpleNamespace
+from uuid import uuid4
+
+import numpy as np
+import pytest
+
+from app.services.anomaly_detection.baseline_service import BaselineService, _BaselinePlan
+from app.services.anomaly_detection.baseline_stats import (
+    aggregate_series, build_digest, digest_quantiles, grouped_statistics,
+    merge_digest, merge_moments, period_buckets, std_from_moments
+)
+from app.services.anomaly_detection.data_sources import Observations
+
+
+def _observations(entity_count: int, days: int, seed: int = 7) -> Observations:
+    rng = np.random.default_rng(seed)
+    size = entity_count * days
+    start = np.datetime64("2025-01-01")
+    return Observations(
+        entity_ids=[uuid4() for _ in range(entity_count)],
+        codes=np.repeat(np.arange(entity_count), days),
+        days=np.tile(start + np.arange(days), entity_count),
+        metrics={"amount": rng.lognormal(8, 0.5, size)},
+    )
+
+
+def _rule(**overrides):
+    values = dict(
+        id=uuid4(), code="EXP_SPIKE", data_source="expenses", entity_type="employee",
+        aggregation_period=None, aggregation_function=None,
+    )
+    values.update(overrides)
+    return SimpleNamespace(**values)
+
+
+class TestGroupedStatistics:
+    """Tests for grouped_statistics."""
+
+    def test_matches_numpy_per_group(self):
+        rng = np.random.default_rng(1)
+        codes = rng.integers(0, 5, 2000)
+        values = rng.normal(100, 15, 2000)
+
+        stats = grouped_statistics(codes, values, 6)
+
+        for group in range(5):
+            group_values = values[codes == group]
+            assert stats["count"][group] == group_values.size
+            assert stats["mean"][group] == pytest.approx(group_values.mean())
+            assert stats["std"][group] == pytest.approx(group_values.std(ddof=1))
+            for pct in (25, 50, 75, 95, 99):
+                assert stats[f"p{pct}"][group] == pytest.approx(np.percentile(group_values, pct))
+        assert stats["count"][5] == 0
+        assert np.isnan(stats["mean"][5])
+
+    def test_calculate_statistics_keeps_contract(self):
+        values = [3.0, 1.0, 4.0, 1.0, 5.0, 9.0, 2.0, 6.0]
+        stats = BaselineService().calculate_statistics(values)
+
+        assert stats["data_points"] == 8
+        assert stats["mean_value"] == pytest.approx(statistics.mean(values))
+        assert stats["median_value"] == pytest.approx(statistics.median(values))
+        assert stats["std_deviation"] == pytest.approx(statistics.stdev(values))
+        assert BaselineService().calculate_statistics([1.0]) == {}
+
+
+class TestIncrementalState:
+    """Tests for Welford merging and the t-digest sketch."""
+
+    def test_merge_moments_matches_full(self):
+        rng = np.random.default_rng(2)
+        a, b = rng.normal(10, 3, 500), rng.normal(12, 4, 300)
+        full = np.concatenate((a, b))
+
+        n, mean, m2 = merge_moments(
+            [a.size], [a.mean()], [((a - a.mean()) ** 2).sum()],
+            [b.size], [b.mean()], [((b - b.mean()) ** 2).sum()],
+        )
+
+        assert n[0] == full.size
+        assert mean[0] == pytest.approx(full.mean())
+        assert std_from_moments(n, m2)[0] == pytest.approx(full.std(ddof=1))
+
+    def test_merge_moments_from_empty_state(self):
+        n, mean, m2 = merge_moments([0], [np.nan], [np.nan], [4], [2.5], [5.0])
+        assert (n[0], mean[0], m2[0]) == (4, 2.5, 5.0)
+
+    def test_digest_quantiles_are_close(self):
+        rng = np.random.default_rng(3)
+        values = rng.lognormal(8, 0.6, 50000)
+        means, weights = build_digest(values[:30000])
+        means, weights = merge_digest(means, weights, values[30000:])
+
+        assert means.size <= 100
+        estimates = digest_quantiles(means, weights, (50, 95, 99), values.min(), values.max())
+        for estimate, pct in zip(estimates, (50, 95, 99)):
+            assert estimate == pytest.approx(np.percentile(values, pct), rel=0.02)
+
+
+class TestAggregation:
+    """Tests for period bucketing and aggregation."""
+
+    def test_weekly_buckets_start_on_monday(self):
+        days = np.array(["2025-01-05", "2025-01-06", "2025-01-12"], dtype="datetime64[D]")
+        buckets = period_buckets(days, "weekly")
+        # Sunday belongs to the previous week, Monday starts a new one
+        assert buckets[0] + 1 == buckets[1] == buckets[2]
+
+    def test_aggregate_series(self):
+        codes = np.array([0, 0, 1, 0, 1])
+        buckets = np.array([5, 5, 5, 6, 5])
+        values = np.array([1.0, 2.0, 10.0, 4.0, 20.0])
+
+        out_codes, out_buckets, totals = aggregate_series(codes, buckets, values, "sum")
+        assert list(zip(out_codes, out_buckets, totals)) == [(0, 5, 3.0), (0, 6, 4.0), (1, 5, 30.0)]
+
+        _, _, counts = aggregate_series(codes, buckets, values, "count")
+        assert list(counts) == [2.0, 1.0, 2.0]
+
+
+class TestRuleBaselines:
+    """Tests for BaselineService._compute_rule_baselines."""
+
+    def _plan(self, rule, start, end, baselines=None):
+        return _BaselinePlan(
+            rule=rule, metric="amount", period=rule.aggregation_period,
+            incremental=bool(baselines), fetch_start=start, fetch_end=end,
+            baselines=baselines or {},
+        )
+
+    def test_full_build_creates_entity_and_overall_baselines(self):
+        observations = _observations(entity_count=20, days=60)
+        rule = _rule()
+
+        inserts, updates = BaselineService._compute_rule_baselines(
+            self._plan(rule, date(2025, 1, 1), date(2025, 3, 1)), observations, uuid4()
+        )
+
+        assert updates == []
+        assert len(inserts) == 21
+        overall = next(row for row in inserts if row["entity_id"] is None)
+        assert overall["data_points"] == 1200
+        assert overall["mean_value"] == pytest.approx(observations.metrics["amount"].mean())
+
+    def test_incremental_update_matches_full_rebuild(self):
+        observations = _observations(entity_count=5, days=60)
+        rule = _rule()
+        company_id = uuid4()
+        split = date(2025, 1, 1) + timedelta(days=39)
+
+        first, _ = BaselineService._compute_rule_baselines(
+            self._plan(rule, date(2025, 1, 1), split), observations, company_id
+        )
+        existing = {
+            row["entity_id"]: SimpleNamespace(id=uuid4(), **row) for row in first
+        }
+        _, updates = BaselineService._compute_rule_baselines(
+            self._plan(rule, split + timedelta(days=1), date(2025, 3, 1), existing),
+            observations, company_id
+        )
+        full, _ = BaselineService._compute_rule_baselines(
+            self._plan(rule, date(2025, 1, 1), date(2025, 3, 1)), observations, company_id
+        )
+
+        by_id = {baseline.id: key for key, baseline in existing.items()}
+        full_by_entity = {row["entity_id"]: row for row in full}
+        assert len(updates) == len(full)
+        for row in updates:
+            expected = full_by_entity[by_id[row["id"]]]
+            assert row["data_points"] == expected["data_points"]
+            assert row["mean_value"] == pytest.approx(expected["mean_value"])
+            assert row["std_deviation"] == pytest.approx(expected["std_deviation"])
+            assert row["max_value"] == expected["max_value"]
+            assert row["median_value"] == pytest.approx(expected["median_value"], rel=0.05)
+
+    def test_monthly_aggregation(self):
+        observations = _observations(entity_count=3, days=59)  # Jan + Feb 2025
+        rule = _rule(aggregation_period="monthly", aggregation_function="sum")
+
+        inserts, _ = BaselineService._compute_rule_baselines(
+            self._plan(rule, date(2025, 1, 1), date(2025, 2, 28)), observations, uuid4()
+        )
+
+        per_entity = [row for row in inserts if row["entity_id"] is not None]
+        assert all(row["data_points"] == 2 for row in per_entity)
+        assert all(row["period_type"] == "monthly" for row in inserts)
@@ -0,0 +1,134 @@
+"""
+Anomaly detection engine tests
+Vectorised z-score scoring must agree with detect_statistical_anomaly, and
+rule scoring must use per-entity baselines with an overall fallback.
+"""
+from datetime import date
+from types import SimpleNamespace
+from uuid import uuid4
+
+import numpy as np
+import pytest
+
+from app.models.anomaly_detection import AnomalySeverity, AnomalyStatus
+from app.services.anomaly_detection.data_sources import DATA_SOURCES, Observations
+from app.services.anomaly_detection.detection_service import (
+    DetectionService, rule_threshold, score_deviations
+)
+
+
+def _rule(**overrides):
+    values = dict(
+        id=uuid4(), code="EXP_SPIKE", name="Expense spike", category="financial",
+        data_source="expenses", entity_type="employee", severity=AnomalySeverity.high,
+        conditions=[{"field": "amount", "operator": "deviation_above", "value": 3}],
+        aggregation_period=None, aggregation_function=None, min_data_points=10,
+    )
+    values.update(overrides)
+    return SimpleNamespace(**values)
+
+
+def _baseline(entity_id=None, mean=100.0, std=10.0, data_points=50, metric="amount"):
+    return SimpleNamespace(
+        id=uuid4(), entity_id=entity_id, metric_name=metric,
+        mean_value=mean, std_deviation=std, data_points=data_points,
+    )
+
+
+class TestScoring:
+    """Tests for rule_threshold and score_deviations."""
+
+    def test_rule_threshold(self):
+        assert rule_threshold([{"operator": "deviation_above", "value": 2.5}]) == (2.5, "above")
+        assert rule_threshold([{"operator": "deviation_below", "value": "2"}]) == (2.0, "below")
+        assert rule_threshold([
+            {"operator": "deviation_above", "value": 3},
+            {"operator": "deviation_below", "value": 2},
+        ]) == (2.0, "outside")
+        assert rule_threshold([{"operator": "greater_than", "value": 5}]) == (3.0, "outside")
+
+    @pytest.mark.asyncio
+    async def test_matches_single_value_detection(self):
+        rng = np.random.default_rng(5)
+        values = rng.normal(100, 30, 200)
+        baseline = _baseline()
+
+        mask, z = score_deviations(values, np.full(200, 100.0), np.full(200, 10.0), 3.0)
+
+        service = DetectionService()
+        for value, flagged, score in zip(values, mask, z):
+            result = await service.detect_statistical_anomaly(float(value), baseline, 3.0)
+            assert result["is_anomaly"] == bool(flagged)
+            if flagged:
+                assert result["z_score"] == pytest.approx(abs(score))
+
+    def test_direction_and_unusable_baselines(self):
+        values = np.array([150.0, 50.0, 150.0, 150.0])
+        expected = np.array([100.0, 100.0, np.nan, 100.0])
+        std = np.array([10.0, 10.0, 10.0, 0.0])
+
+        above, _ = score_deviations(values, expected, std, 3.0, "above")
+        below, _ = score_deviations(values, expected, std, 3.0, "below")
+
+        assert list(above) == [True, False, False, False]
+        assert list(below) == [False, True, False, False]
+
+
+class TestScoreRule:
+    """Tests for DetectionService._score_rule."""
+
+    def _observations(self, entity_ids, values, day="2025-03-10"):
+        codes = np.arange(len(values)) % len(entity_ids)
+        return Observations(
+            entity_ids=entity_ids,
+            codes=codes,
+            days=np.full(len(values), np.datetime64(day)),
+            metrics={"amount": np.asarray(values, dtype=np.float64)},
+        )
+
+    def _score(self, rule, observations, baselines, seen=None):
+        return DetectionService._score_rule(
+            rule, "amount", DATA_SOURCES["expenses"], observations, baselines,
+            date(2025, 3, 1), date(2025, 3, 31), uuid4(), "job", set() if seen is None else seen
+        )
+
+    def test_entity_baseline_with_overall_fallback(self):
+        rich, sparse = uuid4(), uuid4()
+        baselines = {
+            rich: _baseline(rich, mean=1000.0, std=50.0),
+            sparse: _baseline(sparse, mean=10.0, std=1.0, data_points=3),
+            None: _baseline(None, mean=100.0, std=10.0),
+        }
+        # rich: 1100 is 2 sd on its own baseline; sparse: 150 is 5 sd on the overall one
+        rows = self._score(_rule(), self._observations([rich, sparse], [1100.0, 150.0]), baselines)
+
+        assert len(rows) == 1
+        row = rows[0]
+        assert row["entity_id"] == sparse
+        assert row["baseline_id"] == baselines[None].id
+        assert row["expected_value"] == 100.0
+        assert row["anomaly_score"] == pytest.approx(5.0)
+        assert row["status"] == AnomalyStatus.detected
+        assert row["anomaly_date"] == date(2025, 3, 10)
+
+    def test_already_detected_observations_are_skipped(self):
+        entity = uuid4()
+        baselines = {None: _baseline()}
+        observations = self._observations([entity], [200.0])
+        rule = _rule()
+        seen = set()
+
+        assert len(self._score(rule, observations, baselines, seen)) == 1
+        assert self._score(rule, observations, baselines, seen) == []
+
+    def test_aggregated_rule_scores_period_totals(self):
+        entity = uuid4()
+        baselines = {entity: _baseline(entity, mean=1000.0, std=100.0)}
+        rule = _rule(aggregation_period="monthly", aggregation_function="sum")
+        # 30 x 50 = 1500 for March: 5 sd above the monthly baseline
+        rows = self._score(rule, self._observations([entity], [50.0] * 30), baselines)
+
+        assert len(rows) == 1
+        assert rows[0]["observed_value"] == pytest.approx(1500.0)
+        assert rows[0]["anomaly_date"] == date(2025, 3, 1)
+        assert rows[0]["anomaly_period_end"].date() == date(2025, 3, 31)
@@ -0,0 +1,159 @@
+"""
+Audit writer tests
+Queued audit entries must be written in batches, chained per company,
+and any altered or deleted entry must break verification.
+"""
+import asyncio
+from datetime import date, datetime, timedelta, timezone
+from types import SimpleNamespace
+from uuid import uuid4
+
+from sqlalchemy.sql import Select
+
+from app.services.audit_writer import (
+    SYSTEM_CHAIN_ID, AuditLogWriter, audit_checksum, audit_entry, chain_entries,
+    next_month, partition_name, verify_chain
+)
+
+
+def _entries(count, company_id=None, start=datetime(2026, 3, 31, 23, 59, 57, tzinfo=timezone.utc)):
+    return [
+        audit_entry(
+            "update", "employee", user_id=uuid4(), company_id=company_id, entity_id=uuid4(),
+            old_values={"salary": 100}, new_values={"salary": 100 + i}, ip_address="10.0.0.1",
+            created_at=start + timedelta(seconds=i)
+        )
+        for i in range(count)
+    ]
+
+
+class FakeConnection:
+    """Records statements; SELECTs return the stored chain heads."""
+
+    def __init__(self, heads=None):
+        self.heads = heads or {}
+        self.inserted = []
+        self.partition_months = []
+
+    async def execute(self, statement, parameters=None):
+        if parameters is not None:
+            self.inserted.extend(parameters)
+        elif isinstance(statement, Select):
+            return [
+                SimpleNamespace(chain_id=chain_id, seq=seq, checksum=checksum)
+                for chain_id, (seq, checksum) in self.heads.items()
+            ]
+
+    async def run_sync(self, fn, *args):
+        self.partition_months.extend(args[0])
+
+
+class FakeSession:
+    def __init__(self, connection):
+        self._connection = connection
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    def begin(self):
+        return self
+
+    async def connection(self):
+        return self._connection
+
+
+class TestHashChain:
+    """Tests for checksum chaining and verification."""
+
+    def test_chain_verifies_in_one_pass(self):
+        entries = _entries(5)
+        seq, head = chain_entries(entries, 0, None)
+
+        assert seq == 5
+        assert [e["seq"] for e in entries] == [1, 2, 3, 4, 5]
+        assert entries[0]["prev_checksum"] is None
+        assert entries[1]["prev_checksum"] == entries[0]["checksum"] == audit_checksum(None, entries[0])
+        assert verify_chain(entries) == {
+            "is_valid": True, "checked": 5, "first_invalid_seq": None, "first_invalid_id": None, "reason": None
+        }
+
+    def test_chain_continues_from_head(self):
+        first, second = _entries(3), _entries(2)
+        seq, head = chain_entries(first, 0, None)
+        chain_entries(second, seq, head)
+
+        assert verify_chain(second, prev_checksum=head, prev_seq=seq)["is_valid"]
+        assert verify_chain(first + second)["checked"] == 5
+
+    def test_detects_altered_and_deleted_entries(self):
+        entries = _entries(4)
+        chain_entries(entries, 0, None)
+
+        altered = [dict(e) for e in entries]
+        altered[2]["new_values"] = {"salary": 999}
+        result = verify_chain(altered)
+        assert not result["is_valid"]
+        assert result["first_invalid_seq"] == 3
+        assert result["reason"] == "content does not match checksum"
+
+        result = verify_chain(entries[:1] + entries[2:])
+        assert not result["is_valid"]
+        assert result["first_invalid_seq"] == 3
+
+    def test_entry_values_are_normalised(self):
+        entry = audit_entry("login", ip_address="testclient", user_agent="x" * 600, company_id="not-a-uuid")
+
+        assert entry["ip_address"] is None
+        assert len(entry["user_agent"]) == 500
+        assert entry["company_id"] is None
+
+
+class TestPartitions:
+    """Tests for the monthly partition helpers."""
+
+    def test_month_boundaries(self):
+        assert next_month(date(2026, 12, 1)) == date(2027, 1, 1)
+        assert next_month(date(2026, 3, 1)) == date(2026, 4, 1)
+        assert partition_name(date(2026, 3, 1)) == "audit_logs_2026_03"
+
+
+class TestAuditLogWriter:
+    """Tests for AuditLogWriter."""
+
+    async def test_write_batch_chains_per_company(self):
+        company = uuid4()
+        entries = _entries(3, company) + _entries(2)
+        connection = FakeConnection({company: (7, "abc"), SYSTEM_CHAIN_ID: (0, None)})
+
+        await AuditLogWriter.write_batch(connection, entries)
+
+        company_rows = [e for e in connection.inserted if e["company_id"] == company]
+        system_rows = [e for e in connection.inserted if e["company_id"] is None]
+        assert [e["seq"] for e in company_rows] == [8, 9, 10]
+        assert company_rows[0]["prev_checksum"] == "abc"
+        assert verify_chain(company_rows, prev_checksum="abc", prev_seq=7)["is_valid"]
+        assert [e["seq"] for e in system_rows] == [1, 2]
+
+    async def test_flushes_in_batches_and_drains_on_stop(self):
+        connection = FakeConnection({SYSTEM_CHAIN_ID: (0, None)})
+        writer = AuditLogWriter(batch_size=3, flush_interval_ms=10, session_factory=lambda: FakeSession(connection))
+        batches = []
+
+        async def write_batch(conn, batch):
+            batches.append(len(batch))
+
+        writer.write_batch = write_batch
+        await writer.start()
+        for entry in _entries(7):
+            await writer.submit(entry)
+        await asyncio.sleep(0.1)
+        for entry in _entries(2):
+            await writer.submit(entry)
+        await writer.stop()
+
+        assert sum(batches) == writer.written == 9
+        assert max(batches) <= 3
+        assert set(connection.partition_months) == {date(2026, 3, 1), date(2026, 4, 1)}
@@ -0,0 +1,86 @@
+"""
+Bank auto-reconciliation tests
+Indexed ReconciliationEngine used by BankingService.auto_reconcile
+"""
+import uuid
+from datetime import date, timedelta
+from decimal import Decimal
+
+from app.services.banking_service import BankingService
+
+
+def _entry(amount, day, reference=""):
+    return {
+        "id": uuid.uuid4(),
+        "amount": amount,
+        "date": date(2025, 1, 1) + timedelta(days=day),
+        "reference": reference,
+    }
+
+
+class TestAutoReconcile:
+    """Tests for BankingService.auto_reconcile."""
+
+    def test_reference_match_is_exact(self):
+        book = _entry("1500.00", 0, "utr123")
+        bank = _entry(Decimal("1500.00"), 5, " UTR123 ")
+
+        matches = BankingService.auto_reconcile([book], [bank])
+
+        assert len(matches) == 1
+        assert matches[0].match_type == "exact"
+        assert matches[0].match_score == 1.0
+        assert matches[0].bank_entry_id == bank["id"]
+
+    def test_reference_match_respects_tolerance(self):
+        book = _entry("1500.00", 0, "UTR123")
+        bank = _entry("1600.00", 0, "UTR123")
+
+        assert BankingService.auto_reconcile([book], [bank]) == []
+
+    def test_amount_date_match_within_window(self):
+        book = _entry("999.99", 0)
+        near = _entry("1000.00", 1)
+        far = _entry("999.99", 10)
+
+        matches = BankingService.auto_reconcile([book], [near, far])
+
+        assert len(matches) == 1
+        assert matches[0].match_type == "amount_date"
+        assert matches[0].bank_entry_id == near["id"]
+
+    def test_assignment_is_optimal_not_greedy(self):
+        # Greedy would give bank_b (same day) to book_1 and leave book_2
+        # unmatched; optimal assignment matches both.
+        book_1 = _entry("500.00", 0)
+        book_2 = _entry("500.00", 1)
+        bank_a = _entry("500.00", -1)
+        bank_b = _entry("500.00", 0)
+
+        matches = BankingService.auto_reconcile([book_1, book_2], [bank_a, bank_b])
+        pairs = {m.book_entry_id: m.bank_entry_id for m in matches}
+
+        assert pairs == {book_1["id"]: bank_a["id"], book_2["id"]: bank_b["id"]}
+
+    def test_each_bank_entry_matched_once(self):
+        books = [_entry("250.00", i % 3) for i in range(20)]
+        banks = [_entry("250.00", i % 3) for i in range(12)]
+
+        matches = BankingService.auto_reconcile(books, banks)
+
+        assert len(matches) == 12
+        assert len({m.bank_entry_id for m in matches}) == 12
+        assert len({m.book_entry_id for m in matches}) == 12
+
+    def test_identical_amounts_are_paired_by_date(self):
+        # A payroll batch of identical salary debits must be matched without
+        # scoring every book/bank pair against each other.
+        books = [_entry("45000.00", i % 5) for i in range(3000)]
+        banks = [_entry("45000.00", (i % 5) + (1 if i % 7 == 0 else 0)) for i in range(3000)]
+
+        matches = BankingService.auto_reconcile(books, banks)
+
+        assert len({m.bank_entry_id for m in matches}) == len(matches)
+        assert len({m.book_entry_id for m in matches}) == len(matches)
+        assert len(matches) == 3000
+        assert all(abs((m.book_date - m.bank_date).days) <= 1 for m in matches)
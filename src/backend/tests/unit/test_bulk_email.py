@@ -0,0 +1,192 @@
+"""
+Bulk email tests
+Messages must be delivered over a few persistent SMTP sessions (RSET
+between messages), transient failures retried and permanent ones reported.
+Runs against a minimal in-process stand-in SMTP server.
+"""
+import asyncio
+
+from app.services.email import bulk_sender
+from app.services.email.bulk_sender import (
+    PAYSLIP_EMAIL_HTML, PAYSLIP_EMAIL_SUBJECT, BulkEmailSender, compile_email_template, email_payroll_payslips
+)
+from app.services.pdf import bulk_renderer, pdf_service
+from app.services.email.email_service import EmailConfig, EmailMessage
+
+
+class StandInSMTPServer:
+    """
+    Just enough SMTP for smtplib: EHLO, MAIL, RCPT, DATA, RSET, NOOP, QUIT.
+    RCPT replies can be scripted per address, e.g. {"a@x.test": [451, 250]}.
+    """
+
+    def __init__(self, rcpt_replies=None):
+        self.rcpt_replies = rcpt_replies or {}
+        self.sessions = 0
+        self.resets = 0
+        self.messages = []
+        self._server = None
+
+    async def __aenter__(self):
+        self._server = await asyncio.start_server(self._session, "127.0.0.1", 0)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _session(self, reader, writer):
+        self.sessions += 1
+
+        async def reply(line):
+            writer.write(f"{line}\r\n".encode())
+            await writer.drain()
+
+        await reply("220 stand-in ESMTP")
+        envelope = []
+        try:
+            while True:
+                line = (await reader.readline()).decode().strip()
+                verb = line[:4].upper()
+                if not line or verb == "QUIT":
+                    await reply("221 bye")
+                    return
+                if verb == "EHLO":
+                    await reply("250-stand-in\r\n250 8BITMIME")
+                elif verb == "RCPT":
+                    address = line.split(":", 1)[1].strip(" <>")
+                    replies = self.rcpt_replies.get(address)
+                    code = replies.pop(0) if replies else 250
+                    await reply(f"{code} {'ok' if code == 250 else 'no'}")
+                    if code == 250:
+                        envelope.append(address)
+                elif verb == "DATA":
+                    await reply("354 go ahead")
+                    data = []
+                    while (chunk := await reader.readline()) != b".\r\n":
+                        data.append(chunk.decode())
+                    self.messages.append((list(envelope), "".join(data)))
+                    await reply("250 queued")
+                elif verb == "RSET":
+                    self.resets += 1
+                    envelope.clear()
+                    await reply("250 reset")
+                else:
+                    await reply("250 ok")
+        finally:
+            writer.close()
+
+
+def _config(port):
+    return EmailConfig(smtp_host="127.0.0.1", smtp_port=port, use_tls=False, from_email="hr@example.test")
+
+
+def _messages(count, address="employee{}@example.test"):
+    return [
+        EmailMessage(to=[address.format(i)], subject=f"Message {i}", body_html=f"<p>{i}</p>")
+        for i in range(count)
+    ]
+
+
+class TestBulkEmailSender:
+    """Tests for BulkEmailSender."""
+
+    async def test_reuses_connections_with_rset_between_messages(self):
+        async with StandInSMTPServer() as server:
+            async with BulkEmailSender(_config(server.port), connections=3, rate_per_second=None) as sender:
+                result = await sender.send_many(_messages(25))
+
+        assert result["sent"] == 25
+        assert result["failed"] == 0
+        assert server.sessions == 3
+        assert server.resets == 25 - 3
+        assert len(server.messages) == 25
+
+    async def test_recycles_connections_after_message_limit(self):
+        async with StandInSMTPServer() as server:
+            async with BulkEmailSender(
+                _config(server.port), connections=1, rate_per_second=None, messages_per_connection=4
+            ) as sender:
+                result = await sender.send_many(_messages(10))
+
+        assert result["sent"] == 10
+        assert server.sessions == sender.connects == 3
+
+    async def test_retries_transient_and_reports_permanent_failures(self):
+        replies = {"busy@example.test": [451, 451], "gone@example.test": [550]}
+        messages = [
+            EmailMessage(to=["busy@example.test"], subject="Busy", body_html="<p>1</p>"),
+            EmailMessage(to=["gone@example.test"], subject="Gone", body_html="<p>2</p>"),
+        ]
+        async with StandInSMTPServer(replies) as server:
+            async with BulkEmailSender(_config(server.port), connections=1, rate_per_second=None, retry_delay=0) as sender:
+                result = await sender.send_many(messages)
+
+        assert result["sent"] == 1
+        assert result["retries"] == 2
+        assert result["failed"] == 1
+        assert result["failures"][0]["to"] == ["gone@example.test"]
+        assert result["failures"][0]["code"] == 550
+        assert [envelope for envelope, _ in server.messages] == [["busy@example.test"]]
+
+    async def test_gives_up_after_max_attempts(self):
+        replies = {"busy@example.test": [451, 451, 451]}
+        async with StandInSMTPServer(replies) as server:
+            async with BulkEmailSender(
+                _config(server.port), connections=1, rate_per_second=None, max_attempts=3, retry_delay=0
+            ) as sender:
+                result = await sender.send_many(_messages(1, "busy@example.test"))
+
+        assert (result["sent"], result["failed"], result["retries"]) == (0, 1, 2)
+        assert result["failures"][0]["code"] == 451
+        assert server.messages == []
+
+
+class TestEmailPayrollPayslips:
+    """Tests for email_payroll_payslips."""
+
+    async def test_renders_and_sends_each_page(self, monkeypatch):
+        def job(code, email):
+            context = {"employee": {"id": code, "name": code, "email": email}, "period": {"month": 3, "year": 2026}}
+            return (f"{code}/payslip_2026_03.pdf", "payslip", context)
+
+        pages = [[job("E1", "e1@example.test"), job("E2", None)], [job("E3", "e3@example.test")]]
+
+        async def iter_jobs(*args):
+            for page in pages:
+                yield page
+
+        async def count(*args):
+            return 3
+
+        monkeypatch.setattr(bulk_sender, "iter_payslip_jobs", iter_jobs)
+        monkeypatch.setattr(bulk_sender, "count_payslips", count)
+        monkeypatch.setattr(pdf_service, "WEASYPRINT_AVAILABLE", True)
+        monkeypatch.setattr(bulk_renderer, "html_to_pdf", lambda html: b"%PDF-" + html.encode()[:20])
+        progress = []
+
+        async with StandInSMTPServer() as server:
+            async with BulkEmailSender(_config(server.port), connections=2, rate_per_second=None) as sender:
+                result = await email_payroll_payslips(
+                    None, "run", "company", {}, sender, workers=1, progress=lambda *p: progress.append(p)
+                )
+
+        assert (result["total"], result["sent"], result["failed"]) == (3, 2, 0)
+        assert result["no_email"] == ["E2"]
+        assert progress == [(2, 3), (3, 3)]
+        assert sorted(envelope[0] for envelope, _ in server.messages) == ["e1@example.test", "e3@example.test"]
+        assert all("Payslip for March 2026" in data and "payslip_2026_03.pdf" in data for _, data in server.messages)
+
+
+class TestEmailTemplate:
+    """Tests for compiled email templates."""
+
+    def test_renders_escaped_html_and_plain_subject(self):
+        template = compile_email_template(PAYSLIP_EMAIL_SUBJECT, PAYSLIP_EMAIL_HTML)
+        context = {"employee": {"name": "A & B <script>"}, "period": {"year": 2026}, "month_name": "March"}
+
+        message = template.message(["a@example.test"], context)
+
+        assert message.subject == "Payslip for March 2026"
+        assert "A &amp; B &lt;script&gt;" in message.body_html
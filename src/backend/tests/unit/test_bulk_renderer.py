@@ -0,0 +1,98 @@
+"""
+Bulk PDF rendering tests
+Templates are compiled once and escaped, and bulk renders write every
+document to the sink whether rendered in-process or in a process pool.
+"""
+import io
+import zipfile
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.pdf import bulk_renderer, pdf_service
+from app.services.pdf.bulk_renderer import (
+    BulkRenderer, DirectorySink, ZipSink, payslip_context, payslip_document_path
+)
+from app.services.pdf.pdf_service import PDFRendererUnavailable, PDFService
+from app.services.pdf.templates import get_template
+
+
+@pytest.fixture
+def pdf_renderer(monkeypatch):
+    """Stand-in for WeasyPrint, so bulk renders do not depend on Pango."""
+    monkeypatch.setattr(pdf_service, "WEASYPRINT_AVAILABLE", True)
+    monkeypatch.setattr(bulk_renderer, "html_to_pdf", lambda html: b"%PDF-" + html.encode()[:20])
+
+
+def _payslip(code="EMP001", first="Asha", last="Rao"):
+    return SimpleNamespace(
+        employee_code=code, first_name=first, last_name=last, pan="ABCDE1234F", uan=None,
+        work_email=None, personal_email=f"{code.lower()}@example.test",
+        month=3, year=2026, working_days=26, days_worked=25,
+        basic=Decimal("25000"), hra=Decimal("10000"), special_allowance=Decimal("5000"),
+        earnings_breakdown={"conveyance": Decimal("1600")},
+        pf_employee=Decimal("1800"), esi_employee=Decimal("0"), professional_tax=Decimal("200"),
+        tds=Decimal("1200"), gross_salary=Decimal("41600"), total_deductions=Decimal("3200"),
+        net_salary=Decimal("38400")
+    )
+
+
+def _jobs(count):
+    return [
+        (payslip_document_path(f"EMP{i:05d}", 2026, 3), "payslip",
+         payslip_context(_payslip(f"EMP{i:05d}"), {"name": "Acme"}, "2026-03-31 10:00"))
+        for i in range(count)
+    ]
+
+
+class TestBulkRenderer:
+    """Tests for templates and bulk rendering."""
+
+    def test_payslip_html_from_template(self):
+        html = PDFService._generate_payslip_html(
+            payslip_context(_payslip(first="<b>Asha</b>"), {"name": "Acme & Co"}, "now"), {"name": "Acme & Co"}
+        )
+
+        assert "Acme &amp; Co" in html
+        assert "&lt;b&gt;Asha&lt;/b&gt; Rao" in html
+        assert "Rs.38,400.00" in html and "Rs.1,600.00" in html
+        assert get_template("payslip") is get_template("payslip")
+
+    def test_invoice_items_and_missing_fields(self):
+        html = PDFService._generate_invoice_html(
+            {"invoice_number": "INV-1", "items": [{"description": "Widget", "rate": 10, "amount": 20}]}, {}
+        )
+
+        assert "INV-1" in html and "Widget" in html
+        assert "Rs.0.00" in html
+
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_render_into_zip(self, workers, pdf_renderer):
+        target = io.BytesIO()
+        sink = ZipSink(target)
+        progress = []
+
+        with BulkRenderer(workers=workers, chunk_size=4) as renderer:
+            assert renderer.render(_jobs(300), sink, progress=progress.append) == 300
+        sink.close()
+
+        names = zipfile.ZipFile(target).namelist()
+        assert len(names) == 300 and names[0] == "EMP00000/payslip_2026_03.pdf"
+        assert progress[-1] == 300
+
+    def test_directory_sink_stays_inside_storage(self, tmp_path):
+        sink = DirectorySink(str(tmp_path))
+
+        sink.write(payslip_document_path("../../etc", 2026, 3), b"pdf")
+
+        assert sink.paths == [str(tmp_path / "______etc" / "payslip_2026_03.pdf")]
+        with pytest.raises(ValueError):
+            sink.write("../outside.pdf", b"pdf")
+
+    def test_bulk_render_requires_weasyprint(self, monkeypatch):
+        monkeypatch.setattr(pdf_service, "WEASYPRINT_AVAILABLE", False)
+
+        with pytest.raises(PDFRendererUnavailable):
+            with BulkRenderer(workers=1):
+                pass
@@ -0,0 +1,102 @@
+"""
+Depreciation engine tests
+Vectorised integer-paise depreciation must match the per-asset Decimal
+calculations and never depreciate below salvage value.
+"""
+import random
+from datetime import date
+from decimal import Decimal
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+
+from app.models.fixed_assets import AssetStatus, DepreciationMethod
+from app.services.fixed_assets.depreciation_engine import (
+    AssetBatch, from_paise, month_end, month_index
+)
+from app.services.fixed_assets.depreciation_service import DepreciationService
+
+D = Decimal
+
+
+def _asset(method, cost, salvage, book, years, months=0, start=date(2024, 4, 1)):
+    return SimpleNamespace(
+        id=uuid4(), asset_code="FA-1", name="Asset", status=AssetStatus.ACTIVE,
+        depreciation_method=method, depreciation_start_date=start,
+        useful_life_years=years, useful_life_months=months,
+        total_cost=D(cost), salvage_value=D(salvage), book_value=D(book),
+        accumulated_depreciation=D(cost) - D(book)
+    )
+
+
+class TestAssetBatch:
+    """Tests for AssetBatch."""
+
+    @pytest.mark.parametrize("method", [
+        DepreciationMethod.STRAIGHT_LINE,
+        DepreciationMethod.WRITTEN_DOWN,
+        DepreciationMethod.DOUBLE_DECLINING,
+        DepreciationMethod.UNITS_OF_PRODUCTION,
+    ])
+    async def test_matches_per_asset_calculation(self, method):
+        rng = random.Random(7)
+        assets = []
+        for _ in range(300):
+            cost = D(rng.randint(1000, 10_000_000)) / 100
+            salvage = (cost * D(rng.randint(0, 10)) / 100).quantize(D("0.01"))
+            book = (cost * D(rng.randint(1, 100)) / 100).quantize(D("0.01"))
+            assets.append(_asset(method, cost, salvage, book, rng.randint(1, 20), rng.randint(0, 11)))
+
+        amounts = AssetBatch(assets).monthly(AssetBatch(assets).book, month_index(date(2026, 5, 1)))
+
+        for asset, amount in zip(assets, amounts):
+            expected = await DepreciationService.calculate_depreciation(asset)
+            expected = max(min(expected, asset.book_value - asset.salvage_value), D("0"))
+            assert from_paise(amount) == expected
+
+    def test_sum_of_years_digits_by_year(self):
+        asset = _asset(DepreciationMethod.SUM_OF_YEARS, "15000", "0", "15000", 5)
+        batch = AssetBatch([asset])
+        start = month_index(asset.depreciation_start_date)
+
+        for year in (1, 2, 5):
+            expected = DepreciationService.calculate_sum_of_years(D("15000"), D("0"), 5, year)
+            assert from_paise(batch.monthly(batch.book, start + 12 * (year - 1))[0]) == expected
+        assert batch.monthly(batch.book, start + 60)[0] == 0
+
+    def test_projection_stops_at_salvage_and_start_date(self):
+        assets = [
+            _asset(DepreciationMethod.STRAIGHT_LINE, "1200", "100", "130", 1),
+            _asset(DepreciationMethod.STRAIGHT_LINE, "1200", "0", "1200", 1, start=date(2026, 6, 15)),
+        ]
+        batch = AssetBatch(assets)
+        months = list(range(month_index(date(2026, 4, 1)), month_index(date(2026, 7, 1)) + 1))
+
+        schedule, _ = batch.project(months)
+
+        assert [from_paise(v) for v in schedule[:, 0]] == [D("30.00"), D("0.00"), D("0.00"), D("0.00")]
+        assert [from_paise(v) for v in schedule[:, 1]] == [D("0.00"), D("0.00"), D("100.00"), D("100.00")]
+
+    def test_carries_forward_from_latest_entry(self):
+        # Book value is still 1200: the March and April entries are not posted yet
+        asset = _asset(DepreciationMethod.STRAIGHT_LINE, "1200", "0", "1200", 1)
+        batch = AssetBatch([asset])
+        march = SimpleNamespace(
+            asset_id=asset.id, closing_value=D("1100"), accumulated_depreciation=D("100")
+        )
+        april = SimpleNamespace(asset_id=asset.id, depreciation_date=date(2026, 4, 30), closing_value=D("1000"))
+        batch.carry_forward({asset.id: march}, [april])
+        months = list(range(month_index(date(2026, 4, 1)), month_index(date(2026, 6, 1)) + 1))
+
+        schedule, closing = batch.project(months)
+
+        # April is already recorded; May and June continue from its closing value
+        assert [from_paise(v) for v in schedule[:, 0]] == [D("0.00"), D("100.00"), D("100.00")]
+        assert [from_paise(v) for v in closing[:, 0]] == [D("1000.00"), D("900.00"), D("800.00")]
+        assert from_paise(batch.book[0]) == D("1100.00")
+        assert from_paise(batch.accumulated[0]) == D("100.00")
+
+    def test_month_helpers(self):
+        assert month_end(month_index(date(2028, 2, 10))) == date(2028, 2, 29)
+        assert month_index(date(2026, 1, 1)) - month_index(date(2025, 12, 31)) == 1
@@ -0,0 +1,168 @@
+"""
+Field encryption tests
+v2 envelopes use one cached data key per key version, and legacy v0/v1
+ciphertexts (per-value PBKDF2 keys) still decrypt transparently.
+"""
+import base64
+import secrets
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+
+from app.core.encryption import (
+    EncryptionService, FieldLevelEncryption, KeyRotationManager,
+    _init_rotation_worker, _rotate_values_in_worker, rotate_values
+)
+
+try:
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+except ImportError:  # pragma: no cover
+    AESGCM = None
+
+pytestmark = pytest.mark.skipif(AESGCM is None, reason="cryptography not installed")
+
+MASTER_KEY = "test-master-key-0123456789abcdef"
+
+
+def _legacy_ciphertext(service: EncryptionService, plaintext: str, version: int = 1) -> str:
+    """Ciphertext in the old per-value PBKDF2 format (version 0 = unversioned)."""
+    salt = secrets.token_bytes(service.SALT_LENGTH)
+    nonce = secrets.token_bytes(service.NONCE_LENGTH)
+    key = service._derive_key(service.master_key, salt)
+    ciphertext = AESGCM(key).encrypt(nonce, plaintext.encode(), None)
+    header = bytes([version]) if version else b""
+    return base64.b64encode(header + salt + nonce + ciphertext).decode()
+
+
+class TestEnvelopeFormat:
+    """Tests for the v2 envelope."""
+
+    def test_round_trip_and_random_nonce(self):
+        service = EncryptionService(MASTER_KEY)
+        first, second = service.encrypt("ABCDE1234F"), service.encrypt("ABCDE1234F")
+
+        assert first.startswith("v2:")
+        assert first != second
+        assert service.decrypt(first) == service.decrypt(second) == "ABCDE1234F"
+        assert service.get_data_key_version(first) == service.current_version
+        assert not service.needs_re_encryption(first)
+
+    def test_data_key_derived_once(self, monkeypatch):
+        service = EncryptionService(MASTER_KEY)
+        calls = []
+        original = service._cipher.__func__
+
+        def counting_cipher(self, version, key=None):
+            calls.append((version, key or self._key_for(version)) in self._ciphers)
+            return original(self, version, key)
+
+        monkeypatch.setattr(EncryptionService, "_cipher", counting_cipher)
+        for value in ("a", "b", "c"):
+            service.decrypt(service.encrypt(value))
+
+        assert calls.count(False) == 1
+
+    def test_tampered_header_is_rejected(self):
+        service = EncryptionService(MASTER_KEY)
+        raw = bytearray(base64.b64decode(service.encrypt("secret")[3:]))
+        raw[0] = 2  # Claim another key version
+
+        with pytest.raises(ValueError):
+            service.decrypt("v2:" + base64.b64encode(bytes(raw)).decode())
+
+
+class TestLegacyFormats:
+    """Tests for v0/v1 compatibility."""
+
+    @pytest.mark.parametrize("version", [0, 1])
+    def test_legacy_values_decrypt(self, version):
+        service = EncryptionService(MASTER_KEY)
+        ciphertext = _legacy_ciphertext(service, "123412341234", version)
+
+        assert service.decrypt(ciphertext) == "123412341234"
+        assert service.get_data_key_version(ciphertext) == version
+        assert service.needs_re_encryption(ciphertext)
+        assert service.re_encrypt(ciphertext).startswith("v2:")
+
+
+class TestDecryptMany:
+    """Tests for bulk decryption."""
+
+    def test_mixed_formats_in_order(self):
+        service = EncryptionService(MASTER_KEY)
+        values = [service.encrypt("one"), None, _legacy_ciphertext(service, "two"), service.encrypt("three")]
+
+        assert service.decrypt_many(values) == ["one", None, "two", "three"]
+
+    def test_ignore_errors_keeps_plaintext(self):
+        service = EncryptionService(MASTER_KEY)
+
+        with pytest.raises(ValueError):
+            service.decrypt_many(["not-encrypted"])
+        assert service.decrypt_many(["not-encrypted", service.encrypt("x")], ignore_errors=True) == ["not-encrypted", "x"]
+
+    def test_decrypt_rows(self):
+        service = EncryptionService(MASTER_KEY)
+        fields = FieldLevelEncryption(service)
+        rows = [{"pan": service.encrypt("P1"), "name": "A"}, {"pan": None, "name": "B"}]
+
+        assert fields.decrypt_rows(rows, ["pan"]) == [{"pan": "P1", "name": "A"}, {"pan": None, "name": "B"}]
+
+
+class TestKeyRotation:
+    """Tests for the key rotation batch functions and progress."""
+
+    def _rotated_service(self) -> EncryptionService:
+        service = EncryptionService("rotated-master-key-0123456789abcdef")
+        service.current_version = 2
+        service._key_registry = {1: MASTER_KEY, 2: service.master_key}
+        return service
+
+    def test_rotate_values(self):
+        old = EncryptionService(MASTER_KEY)
+        new = self._rotated_service()
+        current = new.encrypt("kept")
+        rows = [
+            (uuid4(), old.encrypt("v1-key")),
+            (uuid4(), _legacy_ciphertext(old, "legacy")),
+            (uuid4(), current),
+            (uuid4(), "garbage"),
+        ]
+
+        updates, skipped, failed = rotate_values(new, rows)
+
+        assert (skipped, failed) == (1, 1)
+        assert [row_id for row_id, _, _ in updates] == [rows[0][0], rows[1][0]]
+        assert [new.decrypt(value) for _, _, value in updates] == ["v1-key", "legacy"]
+        assert all(new.get_data_key_version(value) == 2 for _, _, value in updates)
+
+    def test_worker_process_uses_parent_keys(self):
+        old = EncryptionService(MASTER_KEY)
+        new = self._rotated_service()
+        rows = [(uuid4(), old.encrypt("pan"))]
+
+        with ProcessPoolExecutor(
+            max_workers=1,
+            initializer=_init_rotation_worker,
+            initargs=(new.master_key, new.current_version, new._key_registry)
+        ) as pool:
+            updates, _, _ = pool.submit(_rotate_values_in_worker, rows).result()
+
+        assert new.decrypt(updates[0][2]) == "pan"
+
+    def test_progress_reports_rate_and_eta(self):
+        manager = KeyRotationManager(EncryptionService(MASTER_KEY))
+        now = datetime(2026, 1, 1)
+        job = SimpleNamespace(
+            table_name="employees", column_name="pan", target_version=1, status="running",
+            rows_total=10000, rows_processed=2000, rows_rotated=1900, rows_skipped=100,
+            rows_failed=0, started_at=now, updated_at=now + timedelta(seconds=10),
+        )
+
+        progress = manager.get_rotation_status(jobs=[job])["jobs"][0]
+
+        assert progress["rows_per_second"] == 200.0
+        assert progress["eta_seconds"] == 40
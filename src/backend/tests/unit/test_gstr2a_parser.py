@@ -0,0 +1,107 @@
+"""
+GSTR-2A/2B parser tests
+Streaming extraction of supplier invoices from portal JSON downloads
+"""
+import io
+import json
+import pytest
+from datetime import date
+from decimal import Decimal
+
+from app.services.gstr2a_parser import (
+    GSTR2AParseError, iter_gstr2a_invoices, iter_json_array, normalize_invoice_number
+)
+
+
+GSTR2A_SAMPLE = {
+    "gstin": "29AABCU9603R1ZM",
+    "fp": "012025",
+    "b2b": [
+        {
+            "ctin": "27aapfu0939f1zv",
+            "cfs": "Y",
+            "inv": [
+                {
+                    "inum": "INV/0042", "idt": "15-01-2025", "val": 11800,
+                    "pos": "29", "rchrg": "N", "inv_typ": "R",
+                    "itms": [
+                        {"num": 1, "itm_det": {"txval": 10000, "rt": 18, "iamt": 1800, "csamt": 0}},
+                    ],
+                },
+            ],
+        },
+    ],
+}
+
+GSTR2B_SAMPLE = {
+    "data": {
+        "gstin": "29AABCU9603R1ZM",
+        "rtnprd": "012025",
+        "docdata": {
+            "b2b": [
+                {
+                    "ctin": "29AAACR5055K1Z5",
+                    "trdnm": "Ravi Traders",
+                    "inv": [
+                        {
+                            "inum": "RT-7", "dt": "03-01-2025", "val": 5900, "pos": "29",
+                            "rev": "N", "typ": "R", "txval": 5000, "cgst": 450,
+                            "sgst": 450, "igst": 0, "cess": 0,
+                        },
+                        {
+                            "inum": "RT-8", "dt": "04-01-2025", "val": 1180, "pos": "29",
+                            "rev": "Y", "typ": "R", "txval": 1000, "cgst": 90,
+                            "sgst": 90, "igst": 0, "cess": 0,
+                        },
+                    ],
+                },
+            ],
+        },
+    },
+}
+
+
+class TestGSTR2AParser:
+    """Tests for GSTR-2A/2B streaming parser."""
+
+    def test_normalize_invoice_number(self):
+        assert normalize_invoice_number("inv/0042-24") == "INV004224"
+        assert normalize_invoice_number(" 000123 ") == "123"
+        assert normalize_invoice_number(None) == ""
+
+    def test_parses_gstr2a_layout(self):
+        fp = io.BytesIO(json.dumps(GSTR2A_SAMPLE).encode())
+        invoices = list(iter_gstr2a_invoices(fp))
+
+        assert len(invoices) == 1
+        inv = invoices[0]
+        assert inv["supplier_gstin"] == "27AAPFU0939F1ZV"
+        assert inv["invoice_date"] == date(2025, 1, 15)
+        assert inv["taxable_value"] == Decimal("10000")
+        assert inv["igst"] == Decimal("1800")
+
+    def test_parses_gstr2b_layout(self):
+        fp = io.StringIO(json.dumps(GSTR2B_SAMPLE))
+        invoices = list(iter_gstr2a_invoices(fp))
+
+        assert [inv["invoice_number"] for inv in invoices] == ["RT-7", "RT-8"]
+        assert invoices[0]["supplier_name"] == "Ravi Traders"
+        assert invoices[1]["is_reverse_charge"] is True
+        assert invoices[0]["cgst"] == Decimal("450")
+
+    def test_streams_with_tiny_read_chunks(self):
+        payload = {"meta": {"note": "b2b"}, "b2b": [{"n": i, "s": "é" * 3} for i in range(50)]}
+        fp = io.BytesIO(json.dumps(payload, ensure_ascii=False).encode("utf-8"))
+
+        items = list(iter_json_array(fp, "b2b", chunk_size=7))
+
+        assert [item["n"] for item in items] == list(range(50))
+        assert items[0]["s"] == "ééé"
+
+    def test_missing_array_yields_nothing(self):
+        assert list(iter_json_array(io.StringIO('{"cdnr": []}'), "b2b")) == []
+
+    def test_truncated_file_raises(self):
+        fp = io.StringIO('{"b2b": [{"ctin": "X", "inv": [')
+        with pytest.raises(GSTR2AParseError):
+            list(iter_json_array(fp, "b2b"))
@@ -0,0 +1,113 @@
+"""
+Holiday calendar tests
+Prefix-sum working-day arithmetic must give the same leave calculations as
+walking the date range day by day.
+"""
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+from uuid import uuid4
+
+from app.models.leave import DayType, Holiday
+from app.services.holiday_calendar import (
+    WEEKEND_DAYS, HolidayCalendar, YearCalendar, invalidate_holiday_calendar, _calendar_cache
+)
+from app.services.leave_service import LeaveService
+
+
+def _calendar(holiday_dates):
+    by_year = {2024: [], 2025: [], 2026: []}
+    for day in holiday_dates:
+        by_year[day.year].append(Holiday(company_id=uuid4(), name="Holiday", holiday_date=day))
+    return HolidayCalendar({year: YearCalendar(year, holidays, 0.0) for year, holidays in by_year.items()})
+
+
+def _walk(from_date, to_date, holiday_dates, from_day_type, to_day_type, sandwich):
+    """Day-by-day reference calculation."""
+    working = Decimal("0")
+    weekend = holidays = 0
+    day = from_date
+    while day <= to_date:
+        if day.weekday() in WEEKEND_DAYS:
+            weekend += 1
+        elif day in holiday_dates:
+            holidays += 1
+        elif day == from_date:
+            working += Decimal("1") if from_day_type == DayType.FULL else Decimal("0.5")
+        elif day == to_date:
+            working += Decimal("1") if to_day_type == DayType.FULL else Decimal("0.5")
+        else:
+            working += Decimal("1")
+        day += timedelta(days=1)
+
+    sandwich_days = Decimal("0")
+    if sandwich and (to_date - from_date).days > 0 and working >= 2:
+        in_block, start = False, None
+        day = from_date
+        while day <= to_date:
+            if not (day.weekday() in WEEKEND_DAYS or day in holiday_dates):
+                if start is not None and in_block:
+                    sandwich_days += Decimal((day - start).days)
+                start = None
+                in_block = True
+            elif in_block and start is None:
+                start = day
+            day += timedelta(days=1)
+    return working, weekend, holidays, sandwich_days
+
+
+class TestHolidayCalendar:
+    """Tests for HolidayCalendar and LeaveService.calculate_leave_days_from_calendar."""
+
+    def test_matches_day_by_day_walk(self):
+        rng = random.Random(11)
+        holiday_dates = {date(2024, 1, 1) + timedelta(days=rng.randrange(1096)) for _ in range(60)}
+        calendar = _calendar(holiday_dates)
+        day_types = [DayType.FULL, DayType.FIRST_HALF, DayType.SECOND_HALF]
+
+        for _ in range(500):
+            from_date = date(2024, 1, 1) + timedelta(days=rng.randrange(1050))
+            to_date = from_date + timedelta(days=rng.randrange(45))
+            from_type, to_type = rng.choice(day_types), rng.choice(day_types)
+
+            result = LeaveService.calculate_leave_days_from_calendar(
+                calendar, from_date, to_date, from_type, to_type, apply_sandwich_rule=True
+            )
+            working, weekend, holidays, sandwich = _walk(
+                from_date, to_date, holiday_dates, from_type, to_type, True
+            )
+
+            assert result.working_days == working
+            assert result.weekend_days == weekend
+            assert result.holiday_days == holidays
+            assert result.sandwich_days == sandwich
+            assert result.total_days == working + sandwich
+            assert [h.holiday_date for h in result.holidays] == sorted(
+                d for d in holiday_dates if from_date <= d <= to_date
+            )
+
+    def test_friday_to_monday_sandwich(self):
+        calendar = _calendar([])
+        result = LeaveService.calculate_leave_days_from_calendar(
+            calendar, date(2025, 1, 3), date(2025, 1, 6), apply_sandwich_rule=True
+        )
+        assert result.working_days == Decimal("2")
+        assert result.sandwich_days == Decimal("2")
+        assert result.total_days == Decimal("4")
+
+    def test_working_day_bounds_across_years(self):
+        calendar = _calendar([date(2025, 1, 1)])
+        # 2024-12-28 is a Saturday; 2025-01-01 is a holiday
+        assert calendar.first_working_day(date(2024, 12, 28), date(2025, 1, 5)) == date(2024, 12, 30)
+        assert calendar.last_working_day(date(2024, 12, 28), date(2025, 1, 5)) == date(2025, 1, 3)
+        assert calendar.first_working_day(date(2025, 1, 4), date(2025, 1, 5)) is None
+
+    def test_invalidate(self):
+        company_id = uuid4()
+        _calendar_cache[(str(company_id), 2025)] = YearCalendar(2025, [], 0.0)
+        _calendar_cache[(str(company_id), 2026)] = YearCalendar(2026, [], 0.0)
+
+        invalidate_holiday_calendar(company_id, 2025)
+        assert (str(company_id), 2025) not in _calendar_cache
+        invalidate_holiday_calendar(company_id)
+        assert (str(company_id), 2026) not in _calendar_cache
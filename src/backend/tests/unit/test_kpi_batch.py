@@ -0,0 +1,129 @@
+"""
+Batched KPI read tests
+Latest values and trends for many KPIs must come from one query each,
+be served from the per-company cache and hydrate every dashboard widget.
+"""
+from datetime import date, datetime
+from types import SimpleNamespace
+from uuid import uuid4
+
+from sqlalchemy.dialects import postgresql
+
+from app.models.analytics import WidgetType
+from app.services.analytics.dashboard_service import DashboardService
+from app.services.analytics.kpi_service import (
+    KPIService, _invalidate_on_value_change, _kpi_cache, _kpi_companies,
+    invalidate_kpi_cache, kpi_value_dict
+)
+
+
+def _value(kpi_id, month, value, target=None):
+    return kpi_value_dict(SimpleNamespace(
+        kpi_id=kpi_id, period=f"2026-{month:02d}", period_start=date(2026, month, 1),
+        period_end=date(2026, month, 28), value=value, target_value=target, previous_value=None,
+        change_percent=None, achievement_percent=None, status="normal",
+        calculated_at=datetime(2026, month, 28)
+    ))
+
+
+class _Result:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def scalars(self):
+        return SimpleNamespace(all=lambda: self.rows)
+
+
+class _Session:
+    """Records statements and answers each with the next queued rows."""
+
+    def __init__(self, *results):
+        self.results = list(results)
+        self.statements = []
+
+    async def execute(self, statement):
+        self.statements.append(str(statement.compile(dialect=postgresql.dialect())))
+        return _Result(self.results.pop(0))
+
+
+class TestKPIBatch:
+    """Tests for the batched KPI reads."""
+
+    def setup_method(self):
+        invalidate_kpi_cache()
+        _kpi_companies.clear()
+
+    async def test_latest_values_use_distinct_on_and_cache(self):
+        company, kpi = uuid4(), uuid4()
+        row = SimpleNamespace(**{**_value(kpi, 3, 10), "value": 10, "target_value": 8,
+                                 "previous_value": None})
+        db = _Session([row])
+
+        latest = await KPIService.get_latest_kpi_values(db, company, [kpi])
+        again = await KPIService.get_latest_kpi_values(db, company, [kpi])
+
+        assert latest == again
+        assert latest[kpi]["actual"] == 10.0 and latest[kpi]["variance"] == 2.0
+        assert len(db.statements) == 1
+        assert "DISTINCT ON (kpi_values.kpi_id)" in db.statements[0]
+
+    async def test_trends_use_one_window_query(self):
+        company, kpi = uuid4(), uuid4()
+        db = _Session([])
+
+        trends = await KPIService.get_kpi_trends(db, company, [kpi, kpi], periods=6)
+
+        assert trends == {kpi: []}
+        assert "row_number() OVER (PARTITION BY kpi_values.kpi_id" in db.statements[0]
+
+    def test_value_change_invalidates_company(self):
+        company, other, kpi = uuid4(), uuid4(), uuid4()
+        _kpi_cache[(str(company), "latest", None)] = (0.0, {})
+        _kpi_cache[(str(other), "latest", None)] = (0.0, {})
+        _kpi_companies[kpi] = str(company)
+
+        _invalidate_on_value_change(None, None, SimpleNamespace(kpi_id=kpi))
+        assert list(_kpi_cache) == [(str(other), "latest", None)]
+
+        _invalidate_on_value_change(None, None, SimpleNamespace(kpi_id=uuid4()))
+        assert not _kpi_cache
+
+    async def test_hydrate_dashboard_batches_and_caches(self):
+        company, revenue, margin = uuid4(), uuid4(), uuid4()
+        history = [_value(revenue, month, month * 100) for month in range(1, 7)]
+        widgets = [
+            SimpleNamespace(id=uuid4(), title="Revenue", widget_type=WidgetType.KPI_CARD,
+                            kpi_id=revenue, chart_config=None),
+            SimpleNamespace(id=uuid4(), title="Revenue trend", widget_type=WidgetType.LINE_CHART,
+                            kpi_id=revenue, chart_config={"periods": 3}),
+            SimpleNamespace(id=uuid4(), title="Margin", widget_type=WidgetType.SPARKLINE,
+                            kpi_id=margin, chart_config=None),
+            SimpleNamespace(id=uuid4(), title="Notes", widget_type=WidgetType.TABLE,
+                            kpi_id=None, chart_config=None),
+        ]
+        latest = [SimpleNamespace(**{**history[-1], "value": 600, "target_value": None,
+                                     "previous_value": None})]
+        trend = [
+            SimpleNamespace(**{**v, "value": v["actual"], "target_value": None, "previous_value": None})
+            for v in history
+        ]
+        db = _Session(widgets, latest, trend)
+        dashboard = SimpleNamespace(id=uuid4(), company_id=company)
+
+        data = await DashboardService.hydrate_dashboard(db, dashboard)
+
+        assert len(db.statements) == 3
+        cards = {item["title"]: item for item in data["widgets"]}
+        assert cards["Revenue"]["latest"]["actual"] == 600.0
+        assert cards["Revenue"]["trend"] is None
+        assert [v["period"] for v in cards["Revenue trend"]["trend"]] == ["2026-04", "2026-05", "2026-06"]
+        assert cards["Margin"]["latest"] is None and cards["Margin"]["trend"] == []
+        assert cards["Notes"]["latest"] is None and cards["Notes"]["trend"] is None
+
+        # Served from the cache the second time: only the widget query runs
+        db = _Session(widgets)
+        assert (await DashboardService.hydrate_dashboard(db, dashboard))["widgets"] == data["widgets"]
+        assert len(db.statements) == 1
@@ -0,0 +1,126 @@
+"""
+Ledger and financial statement tests
+Period snapshots must add up like the journal lines they replace, and the
+statements built from account balances must balance.
+"""
+from datetime import date
+from decimal import Decimal
+from uuid import uuid4
+
+from app.models.accounting import AccountSubType, AccountType
+from app.services.accounting.ledger_service import (
+    AccountBalance, _balance_rows, financial_year_start, merge_movements, split_balance
+)
+from app.services.report_service import ReportService
+
+D = Decimal
+
+
+def _account(code, account_type, sub_type=None, opening="0", debit="0", credit="0", **kwargs):
+    return AccountBalance(
+        account_id=uuid4(), code=code, name=f"Account {code}", account_type=account_type,
+        account_sub_type=sub_type, opening=D(opening), period_debit=D(debit), period_credit=D(credit),
+        **kwargs
+    )
+
+
+def _ledger():
+    """
+    Opening: bank 1000 = capital 1000.
+    Year: sales 500 to receivables, 300 collected; cogs 200 and depreciation
+    50; machine bought for 400 with a 250 loan; tax 40 still payable.
+    """
+    return [
+        _account("1112", AccountType.ASSET, AccountSubType.BANK, "1000", "550", "600"),
+        _account("1121", AccountType.ASSET, AccountSubType.RECEIVABLE, "0", "500", "300"),
+        _account("1210", AccountType.ASSET, AccountSubType.FIXED_ASSET, "0", "400", "0"),
+        _account("1290", AccountType.ASSET, AccountSubType.FIXED_ASSET, "0", "0", "50", balance_type="credit"),
+        _account("2124", AccountType.LIABILITY, AccountSubType.TAX_PAYABLE, "0", "0", "40"),
+        _account("2210", AccountType.LIABILITY, AccountSubType.LONG_TERM_LIABILITY, "0", "0", "250"),
+        _account("3100", AccountType.EQUITY, AccountSubType.CAPITAL, "-1000"),
+        _account("4100", AccountType.INCOME, AccountSubType.OPERATING_INCOME, "0", "0", "500"),
+        _account("5100", AccountType.EXPENSE, AccountSubType.COST_OF_GOODS, "0", "200", "0"),
+        _account("5300", AccountType.EXPENSE, AccountSubType.OPERATING_EXPENSE, "0", "50", "0"),
+        _account("5900", AccountType.EXPENSE, AccountSubType.TAX_EXPENSE, "0", "40", "0"),
+        _account("6000", AccountType.EXPENSE),
+    ]
+
+
+class TestLedgerHelpers:
+    """Tests for the snapshot arithmetic."""
+
+    def test_balance_rows_group_by_account_and_period(self):
+        posted, unposted = uuid4(), uuid4()
+        company, cash, sales, period = uuid4(), uuid4(), uuid4(), uuid4()
+        end = date(2026, 4, 30)
+        rows = [
+            (posted, company, cash, period, end, D("100"), D("0")),
+            (posted, company, sales, period, end, D("0"), D("100")),
+            (unposted, company, cash, period, end, D("30"), None),
+        ]
+
+        deltas = {row["account_id"]: row for row in _balance_rows(rows, {posted: 1, unposted: -1})}
+
+        assert deltas[cash]["debit_total"] == D("70")
+        assert deltas[cash]["period_end"] == end
+        assert deltas[sales]["credit_total"] == D("100")
+
+    def test_merge_snapshots_and_running_period(self):
+        account = uuid4()
+        snapshots = [(account, D("100"), D("40"))]
+        running = [(account, D("5"), None), (uuid4(), D("1"), D("1"))]
+
+        movements = merge_movements(snapshots, running)
+
+        assert movements[account] == (D("105"), D("40"))
+        assert len(movements) == 2
+
+    def test_split_balance_and_financial_year(self):
+        assert split_balance(D("10")) == (D("10"), D("0"))
+        assert split_balance(D("-10")) == (D("0"), D("10"))
+        assert financial_year_start(date(2026, 3, 31)) == date(2025, 4, 1)
+        assert financial_year_start(date(2026, 4, 1)) == date(2026, 4, 1)
+
+
+class TestFinancialStatements:
+    """Tests for the statements built from account balances."""
+
+    def test_trial_balance_balances_and_skips_zero_accounts(self):
+        rows, totals = ReportService._trial_balance_rows(_ledger())
+
+        assert len(rows) == 11
+        assert totals["opening_debit"] == totals["opening_credit"] == D("1000")
+        assert totals["period_debit"] == totals["period_credit"] == D("1740")
+        assert totals["closing_debit"] == totals["closing_credit"]
+        assert len(ReportService._trial_balance_rows(_ledger(), include_zero_balances=True)[0]) == 12
+
+    def test_profit_and_loss(self):
+        sections, summary = ReportService._profit_loss_sections(_ledger())
+
+        assert [s["name"] for s in sections] == [
+            "Revenue", "Cost of Goods Sold", "Operating Expenses", "Other Income", "Tax Expense"
+        ]
+        assert summary == {
+            "gross_profit": D("300"),
+            "operating_profit": D("250"),
+            "profit_before_tax": D("250"),
+            "tax_expense": D("40"),
+            "net_profit": D("210"),
+        }
+
+    def test_balance_sheet_balances(self):
+        sheet = ReportService._balance_sheet_sections(_ledger())
+
+        assert sheet["assets"]["current_assets"]["total"] == D("1150")
+        assert sheet["assets"]["non_current_assets"]["total"] == D("350")
+        assert sheet["equity"]["items"][-1] == {"particulars": "Current Year Profit", "amount": D("210")}
+        assert sheet["total_liabilities_equity"] == D("1500")
+        assert sheet["is_balanced"]
+
+    def test_cash_flow_adds_up_to_change_in_cash(self):
+        sections, summary = ReportService._cash_flow_sections(_ledger())
+
+        assert sections["operating_activities"]["total"] == D("100")
+        assert sections["investing_activities"]["total"] == D("-400")
+        assert sections["financing_activities"]["total"] == D("250")
+        assert summary["net_increase_in_cash"] == summary["closing_cash"] - summary["opening_cash"] == D("-50")
@@ -0,0 +1,170 @@
+"""
+Mobile delta sync tests
+Pages must stop at the requested limit, and the cursor must resume right
+after the last item sent. Deletes (soft and hard) are sent as delete items.
+"""
+from datetime import datetime, timedelta, timezone
+from uuid import UUID, uuid4
+
+import pytest
+
+from app.core.config import settings
+from app.schemas.mobile import MobileSyncRequest, SyncEntityType
+from app.services.mobile.sync_service import OLDEST_WRITER_QUERY, MobileSyncService, SyncCursor
+
+START = datetime(2026, 9, 1, 8, 0)
+
+
+class Row(dict):
+    """Result row stand-in: attribute access and _asdict()."""
+
+    __getattr__ = dict.__getitem__
+
+    def _asdict(self):
+        return dict(self)
+
+
+def task_row(entity_id, changed_at, title, description):
+    return Row(_id=entity_id, _changed_at=changed_at, title=title, description=description)
+
+
+def employee_row(entity_id, changed_at, deleted_at, first_name):
+    return Row(_id=entity_id, _changed_at=changed_at, _deleted_at=deleted_at, first_name=first_name)
+
+
+def tombstone_row(entity_id, deleted_at, tombstone_id):
+    return Row(entity_id=entity_id, deleted_at=deleted_at, id=tombstone_id)
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def __aiter__(self):
+        async def rows():
+            for row in self.rows:
+                yield row
+        return rows()
+
+    async def close(self):
+        pass
+
+
+class FakeDB:
+    """
+    Streams queued row lists in query order; the employee lookup returns
+    employee_id and the oldest-writer lookup oldest_writer.
+    """
+
+    def __init__(self, *pages):
+        self.pages = list(pages)
+        self.queries = []
+        self.employee_id = uuid4()
+        self.oldest_writer = None
+
+    async def stream(self, query):
+        self.queries.append(query)
+        return FakeResult(self.pages.pop(0))
+
+    async def execute(self, query, parameters=None):
+        value = self.oldest_writer if query is OLDEST_WRITER_QUERY else self.employee_id
+
+        class Result:
+            def scalar_one_or_none(self):
+                return value
+        return Result()
+
+
+def _tasks(count):
+    return [task_row(uuid4(), START + timedelta(minutes=i), f"Task {i}", None) for i in range(count)]
+
+
+def _request(entity_types, **kwargs):
+    return MobileSyncRequest(device_id=uuid4(), entity_types=entity_types, **kwargs)
+
+
+class TestSyncCursor:
+    """Tests for SyncCursor encoding."""
+
+    def test_round_trip(self):
+        cursor = SyncCursor(since=datetime(2026, 8, 1, tzinfo=timezone.utc))
+        entity_id = uuid4()
+        cursor.advance(SyncEntityType.LEAVE, "changes", datetime(2026, 9, 2, tzinfo=timezone.utc), entity_id)
+
+        decoded = SyncCursor.decode(cursor.encode())
+
+        assert decoded.since == cursor.since
+        assert decoded.mark(SyncEntityType.LEAVE, "changes") == (datetime(2026, 9, 2, tzinfo=timezone.utc), entity_id)
+        assert decoded.mark(SyncEntityType.TASK, "changes") == (cursor.since, UUID(int=0))
+
+    def test_rejects_garbage(self):
+        with pytest.raises(ValueError):
+            SyncCursor.decode("not-a-cursor")
+
+
+class TestSyncData:
+    """Tests for MobileSyncService.sync_data."""
+
+    async def test_stops_at_limit_and_resumes_after_last_item(self):
+        rows = _tasks(5)
+        db = FakeDB(rows)
+
+        response = await MobileSyncService.sync_data(db, uuid4(), uuid4(), _request([SyncEntityType.TASK], limit=3))
+
+        assert [item.entity_id for item in response.items] == [row["_id"] for row in rows[:3]]
+        assert response.has_more
+        assert db.queries[0]._limit == 4  # one extra row tells whether more follow
+        cursor = SyncCursor.decode(response.next_cursor)
+        assert cursor.mark(SyncEntityType.TASK, "changes") == (rows[2]["_changed_at"].replace(tzinfo=timezone.utc), rows[2]["_id"])
+
+    async def test_drained_entity_resumes_from_cut_off(self):
+        db = FakeDB(_tasks(2), _tasks(1))
+
+        response = await MobileSyncService.sync_data(
+            db, uuid4(), uuid4(), _request([SyncEntityType.TASK, SyncEntityType.TIMESHEET], limit=10)
+        )
+
+        assert len(response.items) == 3
+        assert not response.has_more
+        cursor = SyncCursor.decode(response.next_cursor)
+        task_mark, timesheet_mark = (cursor.mark(t, "changes") for t in (SyncEntityType.TASK, SyncEntityType.TIMESHEET))
+        assert task_mark == timesheet_mark
+        assert task_mark[0] > START.replace(tzinfo=timezone.utc)
+
+    async def test_cut_off_waits_for_open_writers(self, monkeypatch):
+        monkeypatch.setattr(settings, "MOBILE_SYNC_SAFETY_LAG_SECONDS", 2.0)
+        db = FakeDB(_tasks(1))
+        db.oldest_writer = datetime(2026, 10, 1, 9, 0, tzinfo=timezone.utc)
+
+        response = await MobileSyncService.sync_data(db, uuid4(), uuid4(), _request([SyncEntityType.TASK]))
+
+        cursor = SyncCursor.decode(response.next_cursor)
+        assert cursor.mark(SyncEntityType.TASK, "changes") == (
+            datetime(2026, 10, 1, 8, 59, 58, tzinfo=timezone.utc), UUID(int=0)
+        )
+
+    async def test_sends_soft_and_hard_deletes(self):
+        kept, removed, purged = uuid4(), uuid4(), uuid4()
+        employees = [
+            employee_row(kept, START, None, "Asha"),
+            employee_row(removed, START, START, "Ravi"),
+        ]
+        tombstones = [tombstone_row(purged, START.replace(tzinfo=timezone.utc), uuid4())]
+        db = FakeDB(employees, tombstones)
+
+        response = await MobileSyncService.sync_data(
+            db, uuid4(), uuid4(), _request([SyncEntityType.EMPLOYEE], include_deleted=True)
+        )
+
+        assert [(item.entity_id, item.action) for item in response.items] == [
+            (kept, "upsert"), (removed, "delete"), (purged, "delete")
+        ]
+        assert response.items[0].data == {"first_name": "Asha"}
+
+    async def test_skips_own_records_without_employee(self):
+        db = FakeDB()
+        db.employee_id = None
+
+        response = await MobileSyncService.sync_data(db, uuid4(), uuid4(), _request([SyncEntityType.LEAVE]))
+
+        assert response.items == [] and db.queries == []
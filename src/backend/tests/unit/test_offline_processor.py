@@ -0,0 +1,193 @@
+"""
+Offline action processor tests
+Actions must be applied per entity type in a few bulk statements, and an
+action seen before (same client_action_id) must not be applied again.
+Reference checks and savepoint fallback run against the database in
+tests/integration/test_offline_sync.py.
+"""
+from contextlib import nullcontext
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.sql import Select
+
+from app.models.leave import LeaveStatus
+from app.schemas.mobile import OfflineActionCreate, OfflineActionType, SyncEntityType
+from app.services.mobile.offline_processor import OfflineActionProcessor
+
+DEVICE = uuid4()
+
+
+def _values(row):
+    # Multi-row VALUES are keyed by column
+    return {getattr(column, "key", column): value for column, value in row.items()}
+
+
+class ScalarResult:
+    def __init__(self, values):
+        self.values = list(values)
+
+    def scalars(self):
+        return iter(self.values)
+
+    def scalar_one_or_none(self):
+        return self.values[0] if self.values else None
+
+
+class FakeSession:
+    """Records statements; offline_actions claims skip client ids in `recorded`."""
+
+    def __init__(self, recorded=None, rows=None, fail_on=None):
+        self.recorded = recorded or {}
+        self.rows = rows or []
+        self.fail_on = fail_on
+        self.statements = []
+        self.commits = 0
+        self.rollbacks = 0
+
+    async def execute(self, statement, parameters=None):
+        if isinstance(statement, Select):
+            entity = statement.column_descriptions[0]["entity"].__tablename__
+            if entity == "employees":
+                return ScalarResult([uuid4()])
+            if entity == "offline_actions":
+                return ScalarResult(self.recorded.values())
+            return ScalarResult(self.rows)
+
+        table = statement.table.name
+        self.statements.append((table, parameters))
+        if table == self.fail_on:
+            raise OperationalError("INSERT", {}, Exception("connection lost"))
+        if table == "offline_actions" and parameters is None:
+            claimed = [_values(row)["client_action_id"] for row in statement._multi_values[0]]
+            return ScalarResult(client_id for client_id in claimed if client_id not in self.recorded)
+        return ScalarResult([])
+
+    def begin_nested(self):
+        return nullcontext()
+
+    async def commit(self):
+        self.commits += 1
+
+    async def rollback(self):
+        self.rollbacks += 1
+
+
+def _action(client_id, entity_type, payload, action_type=OfflineActionType.CREATE, entity_id=None):
+    return OfflineActionCreate(
+        device_id=DEVICE, client_action_id=client_id, entity_type=entity_type, action_type=action_type,
+        entity_id=entity_id, payload=payload, client_timestamp=datetime(2026, 10, 1, 9, 30, tzinfo=timezone.utc),
+    )
+
+
+def _punch(client_id):
+    return _action(client_id, SyncEntityType.ATTENDANCE, {"punch_type": "in", "latitude": "12.97"})
+
+
+def _expense(client_id, amounts=(100, 50)):
+    items = [
+        {
+            "category_id": str(uuid4()), "expense_date": "2026-09-30", "description": "Taxi",
+            "amount": amount, "total_amount": amount, "base_amount": amount,
+        }
+        for amount in amounts
+    ]
+    return _action(client_id, SyncEntityType.EXPENSE, {
+        "title": "Site visit", "expense_period_from": "2026-09-30", "expense_period_to": "2026-09-30", "items": items,
+    })
+
+
+def _processor(db):
+    return OfflineActionProcessor(db, uuid4(), uuid4(), DEVICE)
+
+
+@pytest.fixture(autouse=True)
+def unchecked_references(monkeypatch):
+    # The fake session has no expense categories to look up
+    async def unchecked(self, parsed):
+        return parsed
+
+    monkeypatch.setattr(OfflineActionProcessor, "_check_expense_references", unchecked)
+
+
+def _writes(db, table):
+    return [parameters for name, parameters in db.statements if name == table]
+
+
+class TestOfflineActionProcessor:
+    """Tests for OfflineActionProcessor."""
+
+    async def test_applies_each_entity_group_in_bulk(self):
+        db = FakeSession()
+        actions = [_punch(f"p{i}") for i in range(300)] + [_expense("e1"), _expense("e2", (10,))]
+
+        results = await _processor(db).process(actions)
+
+        assert [r["status"] for r in results] == ["success"] * 302
+        assert all(r["server_entity_id"] for r in results)
+        # Per group: claim, bulk insert(s), result update
+        assert [table for table, _ in db.statements] == [
+            "offline_actions", "mobile_attendance_punches", "offline_actions",
+            "offline_actions", "expense_claims", "expense_items", "offline_actions",
+        ]
+        assert db.commits == 2
+        assert len(_writes(db, "offline_actions")[1]) == 300
+
+    async def test_resent_actions_return_stored_result(self):
+        stored = SimpleNamespace(
+            id=uuid4(), device_id=DEVICE, client_action_id="p1", entity_type=SyncEntityType.ATTENDANCE,
+            entity_id=None, action_type=OfflineActionType.CREATE, payload={}, client_timestamp=datetime(2026, 10, 1),
+            status="success", server_entity_id=uuid4(), error_message=None, processed_at=datetime(2026, 10, 1),
+            created_at=datetime(2026, 10, 1),
+        )
+        db = FakeSession(recorded={"p1": stored})
+
+        results = await _processor(db).process([_punch("p1"), _punch("p2"), _punch("p2")])
+
+        assert results[0]["server_entity_id"] == stored.server_entity_id
+        assert results[1] == results[2]
+        assert [r["status"] for r in results] == ["success"] * 3
+        assert len(_writes(db, "offline_actions")[1]) == 1
+
+    async def test_invalid_and_unsupported_actions_fail_alone(self):
+        db = FakeSession()
+        actions = [
+            _punch("ok"),
+            _action("bad", SyncEntityType.ATTENDANCE, {"latitude": "12.97"}),
+            _action("edit", SyncEntityType.ATTENDANCE, {}, OfflineActionType.UPDATE, uuid4()),
+        ]
+
+        ok, bad, edit = await _processor(db).process(actions)
+
+        assert ok["status"] == "success"
+        assert bad["status"] == "failed" and "punch_type" in bad["error_message"]
+        assert edit["status"] == "failed" and "not supported" in edit["error_message"]
+
+    async def test_only_draft_leave_can_be_withdrawn(self):
+        draft, approved = uuid4(), uuid4()
+        db = FakeSession(rows=[
+            SimpleNamespace(id=draft, status=LeaveStatus.DRAFT),
+            SimpleNamespace(id=approved, status=LeaveStatus.APPROVED),
+        ])
+        actions = [
+            _action(f"d{i}", SyncEntityType.LEAVE, {}, OfflineActionType.DELETE, entity_id)
+            for i, entity_id in enumerate((draft, approved, uuid4()))
+        ]
+
+        results = await _processor(db).process(actions)
+
+        assert [r["status"] for r in results] == ["success", "failed", "failed"]
+        assert results[2]["error_message"] == "Record not found"
+        assert [table for table, _ in db.statements].count("leave_requests") == 1
+
+    async def test_database_error_rolls_back_group_only(self):
+        db = FakeSession(fail_on="expense_claims")
+
+        results = await _processor(db).process([_expense("e1"), _punch("p1")])
+
+        assert results[0]["status"] == "failed" and "retry later" in results[0]["error_message"]
+        assert results[1]["status"] == "success"
+        assert db.rollbacks == 1 and db.commits == 1
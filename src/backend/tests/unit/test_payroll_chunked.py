@@ -0,0 +1,91 @@
+"""
+Chunked payroll run tests
+The chunked engine must produce the same PayrollRunResult as the serial path.
+"""
+from decimal import Decimal
+
+from app.services.payroll.payroll_service import (
+    PayrollService, calculate_payroll_chunk, iter_employee_chunks
+)
+
+
+def _employees(count: int):
+    return [
+        {
+            "id": f"EMP{i:05d}",
+            "name": f"Employee {i}",
+            "basic": 12000 + (i * 137) % 40000,
+            "hra": 4000 + (i * 53) % 15000,
+            "special_allowance": (i * 71) % 20000,
+            "days_worked": 26 - (i % 3),
+            "tax_regime": "old" if i % 4 == 0 else "new",
+        }
+        for i in range(count)
+    ]
+
+
+def _comparable(result):
+    return (
+        result.status,
+        result.total_employees,
+        result.total_gross,
+        result.total_deductions,
+        result.total_net,
+        result.total_employer_contributions,
+        [(p.employee_id, p.gross_earnings, p.net_salary) for p in result.payslips],
+        result.errors,
+    )
+
+
+class TestChunkedPayroll:
+    """Tests for PayrollService.run_payroll_chunked."""
+
+    def test_iter_employee_chunks(self):
+        chunks = list(iter_employee_chunks(iter(range(7)), 3))
+        assert chunks == [[0, 1, 2], [3, 4, 5], [6]]
+
+    def test_in_process_matches_serial(self):
+        employees = _employees(53)
+        serial = PayrollService.run_payroll("C1", 2025, 6, employees)
+        chunked = PayrollService.run_payroll_chunked(
+            "C1", 2025, 6, iter(employees), chunk_size=10, max_workers=0
+        )
+        assert _comparable(chunked) == _comparable(serial)
+
+    def test_process_pool_matches_serial(self):
+        employees = _employees(40)
+        serial = PayrollService.run_payroll("C1", 2025, 6, employees)
+        chunked = PayrollService.run_payroll_chunked(
+            "C1", 2025, 6, employees, chunk_size=7, max_workers=2
+        )
+        assert _comparable(chunked) == _comparable(serial)
+
+    def test_resume_skips_checkpointed_chunks(self):
+        employees = _employees(30)
+        restored = {
+            0: calculate_payroll_chunk(0, employees[:10], 2025, 6),
+        }
+        processed = []
+
+        result = PayrollService.run_payroll_chunked(
+            "C1", 2025, 6, employees, chunk_size=10, max_workers=0,
+            completed_chunks=restored,
+            on_chunk_complete=lambda chunk: processed.append(chunk.chunk_index),
+        )
+
+        assert processed == [1, 2]
+        serial = PayrollService.run_payroll("C1", 2025, 6, employees)
+        assert _comparable(result) == _comparable(serial)
+
+    def test_errors_are_collected_per_employee(self):
+        employees = _employees(5)
+        employees[2]["basic"] = "not-a-number"
+
+        result = PayrollService.run_payroll_chunked(
+            "C1", 2025, 6, employees, chunk_size=2, max_workers=0
+        )
+
+        assert result.status == "completed_with_errors"
+        assert result.total_employees == 4
+        assert result.errors[0]["employee_id"] == "EMP00002"
+        assert result.total_gross > Decimal("0")
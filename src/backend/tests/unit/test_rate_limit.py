@@ -0,0 +1,102 @@
+"""
+Rate limiting middleware tests
+The in-memory fallback must stay bounded and behave as a sliding window,
+and rules must apply per IP, per route and per tenant.
+"""
+from datetime import datetime, timedelta, timezone
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from jose import jwt
+
+from app.core.security import LocalRateLimiter, RateLimitMiddleware, RateLimitRule
+
+SECRET = "rate-limit-test-secret-0123456789abcdef"
+
+
+def _token(company_id: str) -> str:
+    expires = datetime.now(timezone.utc) + timedelta(minutes=5)
+    return jwt.encode({"sub": "u1", "company_id": company_id, "exp": expires}, SECRET, algorithm="HS256")
+
+
+def _client(rules):
+    app = FastAPI()
+
+    @app.get("/items")
+    async def items():
+        return {"ok": True}
+
+    @app.post("/auth/login")
+    async def login():
+        return {"ok": True}
+
+    @app.get("/health")
+    async def health():
+        return {"ok": True}
+
+    app.add_middleware(RateLimitMiddleware, rules=rules, jwt_secret=SECRET)
+    return TestClient(app)
+
+
+class TestLocalRateLimiter:
+    """Tests for LocalRateLimiter."""
+
+    def test_sliding_window(self):
+        limiter = LocalRateLimiter()
+        checks = [("k", 3, 10)]
+
+        assert [limiter.check(checks, now=t)[0] for t in (0, 1, 2, 3)] == [True, True, True, False]
+        allowed, _, retry_after = limiter.check(checks, now=5)
+        assert not allowed and retry_after == 5
+        # The first request leaves the window at t=10
+        assert limiter.check(checks, now=10.5) == (True, 0, 0.0)
+
+    def test_denied_request_is_not_recorded_on_other_keys(self):
+        limiter = LocalRateLimiter()
+        limiter.check([("tight", 1, 60)], now=0)
+
+        assert not limiter.check([("loose", 10, 60), ("tight", 1, 60)], now=1)[0]
+        assert limiter.check([("loose", 10, 60)], now=2) == (True, 9, 0.0)
+
+    def test_keys_are_evicted_lru(self):
+        limiter = LocalRateLimiter(max_keys=100)
+        for i in range(1000):
+            limiter.check([(f"ip-{i}", 5, 60)], now=i)
+        assert len(limiter) == 100
+
+
+class TestRateLimitMiddleware:
+    """Tests for RateLimitMiddleware without Redis."""
+
+    def test_ip_limit_returns_429(self):
+        client = _client([RateLimitRule("ip", 2, 60)])
+
+        responses = [client.get("/items") for _ in range(3)]
+
+        assert [r.status_code for r in responses] == [200, 200, 429]
+        assert responses[0].headers["X-RateLimit-Remaining"] == "1"
+        assert int(responses[2].headers["Retry-After"]) > 0
+        assert client.get("/health").status_code == 200
+
+    def test_route_rule_only_applies_to_its_route(self):
+        client = _client([
+            RateLimitRule("ip", 100, 60),
+            RateLimitRule("login", 1, 60, path_prefix="/auth/login", methods=frozenset({"POST"})),
+        ])
+
+        assert client.post("/auth/login").status_code == 200
+        assert client.post("/auth/login").status_code == 429
+        assert client.get("/items").status_code == 200
+
+    def test_tenant_limit(self):
+        client = _client([RateLimitRule("tenant", 1, 60, by="tenant")])
+        tenant_a = {"Authorization": f"Bearer {_token('company-a')}"}
+        tenant_b = {"Authorization": f"Bearer {_token('company-b')}"}
+
+        assert client.get("/items", headers=tenant_a).status_code == 200
+        assert client.get("/items", headers=tenant_a).status_code == 429
+        assert client.get("/items", headers=tenant_b).status_code == 200
+        # Anonymous and forged tokens are not counted against a tenant
+        forged = jwt.encode({"company_id": "company-b"}, "wrong-secret-0123456789abcdef", algorithm="HS256")
+        assert client.get("/items", headers={"Authorization": f"Bearer {forged}"}).status_code == 200
+        assert client.get("/items").status_code == 200
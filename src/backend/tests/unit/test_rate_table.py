@@ -0,0 +1,78 @@
+"""
+Exchange rate table tests
+Cached lookups must pick the latest rate in effect on a date and derive
+inverse and cross rates through a common base currency.
+"""
+from datetime import date
+from decimal import Decimal
+from uuid import uuid4
+
+from app.models.currency import ExchangeRateType
+from app.services.currency.rate_table import (
+    RateTable, _rate_tables, invalidate_rate_tables
+)
+
+D = Decimal
+INR, USD, EUR, GBP = uuid4(), uuid4(), uuid4(), uuid4()
+
+
+def _table(rows=None, base=INR):
+    rows = rows if rows is not None else [
+        (USD, INR, date(2026, 1, 1), D("83"), False),
+        (USD, INR, date(2026, 3, 1), D("84"), False),
+        (EUR, INR, date(2026, 1, 1), D("90"), False),
+    ]
+    return RateTable(rows, base, 0.0)
+
+
+class TestRateTable:
+    """Tests for RateTable."""
+
+    def test_latest_rate_in_effect(self):
+        table = _table()
+
+        assert table.rate(USD, INR, date(2025, 12, 31)) is None
+        assert table.rate(USD, INR, date(2026, 1, 1)) == D("83")
+        assert table.rate(USD, INR, date(2026, 2, 28)) == D("83")
+        assert table.rate(USD, INR, date(2026, 3, 1)) == D("84")
+        assert table.rate(INR, INR, date(2020, 1, 1)) == D("1")
+
+    def test_inverse_and_cross_rates(self):
+        table = _table()
+
+        assert table.rate(INR, USD, date(2026, 3, 5)) == D("1") / D("84")
+        assert table.rate(EUR, USD, date(2026, 3, 5)) == D("90") / D("84")
+        assert table.rate(GBP, USD, date(2026, 3, 5)) is None
+
+    def test_company_rates_replace_shared_rates(self):
+        table = _table([
+            (USD, INR, date(2026, 1, 1), D("83"), False),
+            (USD, INR, date(2026, 1, 1), D("82.5"), True),
+        ])
+
+        assert table.rate(USD, INR, date(2026, 1, 2)) == D("82.5")
+
+    def test_convert_many(self):
+        table = _table()
+        items = [
+            (D("100"), USD, date(2026, 2, 1)),
+            (D("100"), USD, date(2026, 3, 1)),
+            (D("10.005"), EUR, date(2026, 3, 1)),
+            (D("5"), GBP, date(2026, 3, 1)),
+        ]
+
+        assert table.convert_many(items) == [D("8300.00"), D("8400.00"), D("900.45"), None]
+        assert table.convert_many(items[:1], to_currency_id=EUR) == [D("92.22")]
+
+    def test_functional_currency_defaults_to_most_quoted_base(self):
+        assert _table(base=None).base_currency_id == INR
+
+    def test_invalidate(self):
+        company = uuid4()
+        _rate_tables[(str(company), ExchangeRateType.SPOT)] = _table()
+        _rate_tables[("other", ExchangeRateType.SPOT)] = _table()
+
+        invalidate_rate_tables(company)
+        assert list(_rate_tables) == [("other", ExchangeRateType.SPOT)]
+        invalidate_rate_tables()
+        assert not _rate_tables
@@ -0,0 +1,168 @@
+"""
+Request inspection middleware tests
+The combined matcher must flag what the individual rule sets flagged, and
+the pure-ASGI middleware must inspect and replay request bodies without
+rejecting ordinary passwords, tokens and free text.
+"""
+import re
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.core.security import (
+    SQL_INJECTION_PATTERNS, XSS_PATTERNS, InspectionMetrics,
+    RequestInspectionMiddleware, SecurityHeadersMiddleware,
+    detect_body_injection, detect_injection
+)
+
+
+SAMPLES = [
+    "name=John Smith",
+    "q=invoice 2024-25 & status=paid",
+    "' OR '1'='1",
+    "1; DROP TABLE users",
+    "UNION ALL SELECT password FROM users",
+    "pg_sleep(5)",
+    "<script>alert(1)</script>",
+    "<img src=x onerror=alert(1)>",
+    "javascript:alert(1)",
+    "<svg/onload=alert(1)>",
+    "eval (atob('x'))",
+    "description -- comment",
+]
+
+
+BENIGN_BODIES = [
+    {"email": "asha@example.com", "password": "Tr0ub4dor--3"},
+    {"refresh_token": "eyJhbGciOiJIUzI1NiJ9.eyJzdWIiOiIxIn0--0x9FaB.sig"},
+    {"description": "Monitor 1920x1080"},
+    {"notes": "Please execute the agreement by Friday"},
+    {"address_line1": "Flat 3/*B, MG Road"},
+    {"remarks": "Paid 1=1 split; see ref 0x1F -- approved"},
+    {"body_html": "<html><head><style>p { color: #333 }</style></head><body><p>Hi</p></body></html>"},
+]
+
+
+def _app(metrics=None, inspect_body=True, exempt_paths=()):
+    app = FastAPI()
+
+    @app.post("/echo")
+    async def echo(request: Request):
+        return {"size": len(await request.body())}
+
+    @app.post("/auth/login")
+    async def login(request: Request):
+        return {"size": len(await request.body())}
+
+    @app.get("/items")
+    async def items():
+        return {"ok": True}
+
+    app.add_middleware(
+        RequestInspectionMiddleware,
+        metrics=metrics, inspect_body=inspect_body, exempt_paths=exempt_paths
+    )
+    app.add_middleware(SecurityHeadersMiddleware)
+    return TestClient(app)
+
+
+class TestDetectInjection:
+    """Tests for the combined inspection pattern."""
+
+    @pytest.mark.parametrize("value", SAMPLES)
+    def test_matches_individual_rule_sets(self, value):
+        sqli = any(re.search(p, value, re.IGNORECASE) for p in SQL_INJECTION_PATTERNS)
+        xss = any(re.search(p, value, re.IGNORECASE | re.DOTALL) for p in XSS_PATTERNS)
+
+        assert (detect_injection(value) is not None) == (sqli or xss)
+        if sqli and not xss:
+            assert detect_injection(value) == "sqli"
+        if xss and not sqli:
+            assert detect_injection(value) == "xss"
+
+
+class TestRequestInspectionMiddleware:
+    """Tests for RequestInspectionMiddleware."""
+
+    def test_clean_request_passes_with_headers(self):
+        response = _app().get("/items", params={"q": "travel expenses"})
+        assert response.status_code == 200
+        assert response.headers["X-Frame-Options"] == "DENY"
+        assert response.headers["Server-Timing"].startswith("inspect;dur=")
+
+    def test_query_string_is_blocked(self):
+        response = _app().get("/items", params={"q": "<script>alert(1)</script>"})
+        assert response.status_code == 400
+        assert response.json() == {"detail": "Invalid request parameters"}
+
+    def test_json_body_is_inspected_and_replayed(self):
+        client = _app()
+        assert client.post("/echo", json={"name": "Asha"}).json() == {"size": 16}
+
+        response = client.post("/echo", json={"name": "<img src=x onerror=alert(1)>"})
+        assert response.status_code == 400
+        assert response.json() == {"detail": "Invalid request body"}
+
+        # JSON escapes do not hide patterns
+        escaped = client.post(
+            "/echo", content=b'{"note": "\\u003cscript>"}',
+            headers={"content-type": "application/json"}
+        )
+        assert escaped.status_code == 400
+
+    def test_body_inspection_is_off_by_default(self):
+        response = _app(inspect_body=False).post("/echo", json={"note": "<script>alert(1)</script>"})
+        assert response.status_code == 200
+
+    @pytest.mark.parametrize("body", BENIGN_BODIES)
+    def test_benign_json_bodies_pass(self, body):
+        assert _app().post("/echo", json=body).status_code == 200
+
+    @pytest.mark.parametrize("body", BENIGN_BODIES)
+    def test_benign_form_bodies_pass(self, body):
+        assert _app().post("/echo", data=body).status_code == 200
+
+    def test_credential_fields_are_not_inspected(self):
+        response = _app().post("/echo", json={"new_password": "<script>x</script>--"})
+        assert response.status_code == 200
+
+    def test_exempt_paths_skip_body_inspection(self):
+        client = _app(exempt_paths=("/auth/",))
+        assert client.post("/auth/login", json={"username": "<script>"}).status_code == 200
+        assert client.post("/echo", json={"username": "<script>"}).status_code == 400
+
+    def test_uploads_are_not_inspected(self):
+        response = _app().post(
+            "/echo", files={"file": ("a.txt", b"<script>alert(1)</script>", "text/plain")}
+        )
+        assert response.status_code == 200
+
+    def test_metrics(self):
+        metrics = InspectionMetrics()
+        client = _app(metrics)
+        client.get("/items")
+        client.get("/items", params={"q": "1=1"})
+
+        snapshot = metrics.snapshot()
+        assert snapshot["requests"] == 2
+        assert snapshot["blocked"] == 1
+        assert snapshot["p99_ms"] >= snapshot["p50_ms"] >= 0
+
+
+class TestDetectBodyInjection:
+    """Tests for the narrow body rule set."""
+
+    @pytest.mark.parametrize("value", [
+        "Tr0ub4dor--3", "Monitor 1920x1080", "Please execute the agreement",
+        "Flat 3/*B", "<style>body { margin: 0 }</style>", "O'Reilly OR 'x'",
+    ])
+    def test_benign_values(self, value):
+        assert detect_body_injection(value) is None
+
+    @pytest.mark.parametrize("value", [
+        "<script>alert(1)</script>", "<img src=x onerror=alert(1)>", "<svg/onload=alert(1)>",
+        '<a href="javascript:alert(1)">x</a>', "javascript:alert(1)", "<iframe src=//evil>",
+    ])
+    def test_script_injection(self, value):
+        assert detect_body_injection(value) == "xss"
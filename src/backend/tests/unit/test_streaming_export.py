@@ -0,0 +1,118 @@
+"""
+Streaming export tests
+CSV and XLSX exports must be written incrementally from any row source
+and hold only one chunk of output in memory.
+"""
+import csv
+import io
+import threading
+import tracemalloc
+from datetime import date
+from decimal import Decimal
+from uuid import uuid4
+
+from openpyxl import load_workbook
+from sqlalchemy.dialects import postgresql
+
+from app.schemas.reports import ColumnConfig, OutputFormatEnum
+from app.services.excel.streaming_export import iter_csv, iter_export, write_xlsx
+from app.services.report_service import ReportService
+
+COLUMNS = [
+    ColumnConfig(key="code", label="Code"),
+    ColumnConfig(key="joined", label="Joined", data_type="date"),
+    ColumnConfig(key="net", label="Net", data_type="currency"),
+    ColumnConfig(key="hidden", label="Hidden", visible=False),
+]
+
+
+async def _rows(count):
+    for i in range(count):
+        yield {"code": f"E{i:07d}", "joined": date(2026, 1, 1), "net": Decimal("1234.50"), "hidden": "x"}
+
+
+async def _collect(chunks):
+    return b"".join([chunk async for chunk in chunks])
+
+
+class TestStreamingExport:
+    """Tests for the streaming CSV/XLSX writers."""
+
+    async def test_csv_is_chunked(self):
+        chunks = [chunk async for chunk in iter_csv(_rows(5000), COLUMNS, chunk_bytes=4096)]
+
+        assert len(chunks) > 10 and all(len(c) < 4096 + 100 for c in chunks)
+        reader = list(csv.reader(io.StringIO(b"".join(chunks).decode("utf-8-sig"))))
+        assert reader[0] == ["Code", "Joined", "Net"]
+        assert reader[1] == ["E0000000", "2026-01-01", "1234.50"]
+        assert len(reader) == 5001
+
+    async def test_csv_from_plain_rows(self):
+        rows = [{"code": None, "joined": None, "net": 1, "id": uuid4()}]
+        columns = [{"key": "code", "label": "Code"}, {"key": "net", "label": "Net"}]
+
+        content = await _collect(iter_export(rows, columns, OutputFormatEnum.csv))
+
+        assert content.decode("utf-8-sig").splitlines() == ["Code,Net", ",1"]
+
+    async def test_xlsx_round_trip_and_sheet_rollover(self):
+        output = io.BytesIO()
+
+        count = await write_xlsx(
+            _rows(25), COLUMNS, output, sheet_title="Payroll Register", max_rows=10, page_rows=7
+        )
+
+        workbook = load_workbook(output, read_only=True)
+        assert count == 25
+        assert workbook.sheetnames == ["Payroll Register", "Payroll Register (2)", "Payroll Register (3)"]
+        rows = list(workbook["Payroll Register"].iter_rows(values_only=True))
+        assert rows[0] == ("Code", "Joined", "Net")
+        assert rows[1][0] == "E0000000" and rows[1][2] == 1234.5
+        assert len(rows) == 10
+
+    async def test_xlsx_is_built_off_the_event_loop(self):
+        class Target(io.BytesIO):
+            threads = set()
+
+            def write(self, data):
+                self.threads.add(threading.get_ident())
+                return super().write(data)
+
+        target = Target()
+
+        await write_xlsx(_rows(10), COLUMNS, target)
+
+        assert Target.threads and threading.get_ident() not in Target.threads
+        assert load_workbook(target, read_only=True).sheetnames == ["Report"]
+
+    async def test_xlsx_export_via_report_service(self):
+        content = await ReportService.export_to_excel(
+            {"report_name": "Register", "data": [{"code": "E1", "net": Decimal("10")}]}, COLUMNS
+        )
+
+        assert content[:2] == b"PK"
+        assert load_workbook(io.BytesIO(content)).sheetnames == ["Register"]
+
+    async def test_csv_memory_is_flat(self):
+        async def peak(count):
+            tracemalloc.start()
+            async for _ in iter_csv(_rows(count), COLUMNS):
+                pass
+            peak_bytes = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            return peak_bytes
+
+        small, large = await peak(2_000), await peak(50_000)
+
+        assert large < small * 2
+
+    def test_payroll_register_query(self):
+        query = ReportService.payroll_register_query(
+            uuid4(), {"year": 2026, "month": 3, "department_ids": [uuid4()]}
+        )
+        sql = str(query.compile(dialect=postgresql.dialect()))
+
+        keys = [column.key for column in ReportService._get_payroll_register_columns()]
+        assert list(query.selected_columns.keys()) == keys
+        assert "LEFT OUTER JOIN departments" in sql and "ORDER BY employees.employee_code" in sql
+        assert "payroll_runs.status = " in sql
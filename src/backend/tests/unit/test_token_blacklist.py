@@ -0,0 +1,206 @@
+"""
+Token blacklist tests
+Valid tokens are answered from the local bloom filter, revocations from
+other processes arrive through refreshes, and filter false positives are
+confirmed against Redis.
+"""
+import time
+
+from app.core.token_blacklist import (
+    BLACKLIST_PREFIX, BloomFilter, TokenBlacklist, token_digest
+)
+
+
+class FakeRedis:
+    """Just enough of redis.asyncio for the blacklist, keeping data in dicts."""
+
+    def __init__(self):
+        self.values = {}
+        self.expiry = {}
+        self.zsets = {}
+        self.calls = 0
+        self.down = False
+
+    def _call(self):
+        if self.down:
+            raise ConnectionError("redis down")
+        self.calls += 1
+
+    async def setex(self, key, ttl, value):
+        self._call()
+        self.values[key] = value
+        self.expiry[key] = time.time() + ttl
+
+    async def set(self, key, value, ex=None, nx=False):
+        self._call()
+        if nx and key in self.values:
+            return None
+        self.values[key] = value
+        if ex is not None:
+            self.expiry[key] = time.time() + ex
+        return True
+
+    async def ttl(self, key):
+        self._call()
+        if key not in self.values:
+            return -2
+        return int(self.expiry[key] - time.time()) if key in self.expiry else -1
+
+    async def delete(self, key):
+        self._call()
+        self.values.pop(key, None)
+        self.expiry.pop(key, None)
+
+    async def zadd(self, key, mapping):
+        self._call()
+        self.zsets.setdefault(key, {}).update(mapping)
+
+    async def zrangebyscore(self, key, low, high):
+        self._call()
+        low = float(low)
+        high = float("inf") if high == "+inf" else float(high)
+        return [m for m, score in self.zsets.get(key, {}).items() if low <= score <= high]
+
+    async def zremrangebyscore(self, key, low, high):
+        self._call()
+        zset = self.zsets.get(key, {})
+        for member in [m for m, score in zset.items() if score <= float(high)]:
+            del zset[member]
+
+    async def scan_iter(self, match, count=None):
+        prefix = match.rstrip("*")
+        for key in [k for k in self.values if k.startswith(prefix)]:
+            yield key
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.commands.append((name, args, kwargs))
+
+    async def execute(self):
+        return [await getattr(self.client, name)(*args, **kwargs) for name, args, kwargs in self.commands]
+
+
+def _blacklist(client, **kwargs):
+    return TokenBlacklist("redis://unused", client=client, **kwargs)
+
+
+class TestBloomFilter:
+    """Tests for BloomFilter."""
+
+    def test_no_false_negatives_and_low_false_positive_rate(self):
+        bloom = BloomFilter(1000, 0.01)
+        members = [token_digest(f"member-{i}") for i in range(1000)]
+        for digest in members:
+            bloom.add(digest)
+
+        assert all(digest in bloom for digest in members)
+        false_positives = sum(token_digest(f"other-{i}") in bloom for i in range(10000))
+        assert false_positives < 300
+
+
+class TestTokenBlacklist:
+    """Tests for TokenBlacklist."""
+
+    async def test_valid_tokens_need_no_redis_call(self):
+        client = FakeRedis()
+        blacklist = _blacklist(client)
+        await blacklist.is_revoked("warm-up")
+        calls = client.calls
+
+        for i in range(50):
+            assert not await blacklist.is_revoked(f"valid-{i}")
+
+        assert client.calls == calls
+        assert blacklist.metrics_snapshot()["local_hits"] == 51
+
+    async def test_revocation_reaches_other_process_on_refresh(self):
+        client = FakeRedis()
+        api_a, api_b = _blacklist(client), _blacklist(client)
+        await api_b.is_revoked("warm-up")
+
+        assert await api_a.revoke("stolen", 900)
+        assert await api_a.is_revoked("stolen")
+
+        await api_b.refresh()
+        assert await api_b.is_revoked("stolen")
+        # Confirmed once, then answered locally
+        calls = client.calls
+        assert await api_b.is_revoked("stolen")
+        assert client.calls == calls
+
+    async def test_false_positive_is_confirmed_once(self):
+        client = FakeRedis()
+        blacklist = _blacklist(client)
+        await blacklist.refresh()
+        blacklist._filter.add(token_digest("unlucky"))
+
+        assert not await blacklist.is_revoked("unlucky")
+        calls = client.calls
+        assert not await blacklist.is_revoked("unlucky")
+        assert client.calls == calls
+        assert blacklist.metrics["false_positives"] == 1
+
+    async def test_rebuild_evicts_expired_tokens(self):
+        client = FakeRedis()
+        blacklist = _blacklist(client)
+        await blacklist.revoke("short-lived", 900)
+        digest = token_digest("short-lived")
+        client.zsets["token_blacklist:index"][digest] = time.time() - 1
+        blacklist._revoked[digest] = time.time() - 1
+
+        await blacklist.refresh(full=True)
+
+        assert digest not in client.zsets["token_blacklist:index"]
+        assert digest not in blacklist._revoked
+
+    async def test_legacy_keys_are_imported(self):
+        client = FakeRedis()
+        await client.setex("blacklist:old-token", 600, "1")
+
+        assert await _blacklist(client).is_revoked("old-token")
+        assert f"{BLACKLIST_PREFIX}{token_digest('old-token')}" in client.values
+        assert "blacklist:old-token" not in client.values
+
+    async def test_redis_down(self):
+        client = FakeRedis()
+        blacklist = _blacklist(client)
+        await blacklist.refresh()
+        client.down = True
+
+        assert not await blacklist.revoke("local-only", 900)
+        assert await blacklist.is_revoked("local-only")
+        assert not await blacklist.is_revoked("someone-else")
+
+    async def test_consumed_token_is_refused_by_other_process_at_once(self):
+        client = FakeRedis()
+        api_a, api_b = _blacklist(client), _blacklist(client)
+        await api_b.is_revoked("warm-up")
+
+        assert await api_a.consume("refresh", 900)
+
+        # api_b has not refreshed its filter, but consume asks Redis
+        assert not await api_b.consume("refresh", 900)
+        assert not await api_a.consume("refresh", 900)
+        assert await api_b.consume("other-refresh", 900)
+
+    async def test_consume_with_redis_down(self):
+        client = FakeRedis()
+        blacklist = _blacklist(client)
+        client.down = True
+
+        assert await blacklist.consume("refresh", 900)
+        assert not await blacklist.consume("refresh", 900)
@@ -0,0 +1,199 @@
+"""
+Webhook dispatcher tests
+Deliveries must be signed, classified into success/retry/failure, capped
+per subscription, and held back while a subscription's breaker is open.
+"""
+import asyncio
+import hashlib
+import hmac
+from types import SimpleNamespace
+from uuid import uuid4
+
+import httpx
+
+from app.models.integration import AuthType, WebhookStatus
+from app.services.integration_platform import webhook_dispatcher
+from app.services.integration_platform.webhook_dispatcher import (
+    FAILED, RETRY, SUCCESS, CircuitBreaker, ClaimedDelivery, WebhookDispatcher, signed_headers
+)
+
+
+def _subscription(**overrides):
+    values = dict(
+        id=uuid4(), method="POST", secret="s3cret", auth_type=AuthType.NONE, auth_config=None,
+        status=WebhookStatus.ACTIVE, deleted_at=None,
+    )
+    values.update(overrides)
+    return SimpleNamespace(**values)
+
+
+def _delivery(subscription, attempt_number=1, url="https://receiver.test/hook"):
+    return ClaimedDelivery(
+        id=uuid4(), subscription_id=subscription.id, request_url=url,
+        request_headers={"Content-Type": "application/json"}, request_body='{"event":"invoice.created"}',
+        attempt_number=attempt_number,
+    )
+
+
+def _dispatcher(handler, **kwargs):
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return WebhookDispatcher(client=client, **kwargs)
+
+
+class TestCircuitBreaker:
+    """Tests for CircuitBreaker."""
+
+    def test_opens_after_threshold_and_half_opens(self, monkeypatch):
+        clock = [100.0]
+        monkeypatch.setattr(webhook_dispatcher.time, "monotonic", lambda: clock[0])
+        breaker = CircuitBreaker(failure_threshold=2, open_seconds=30)
+
+        breaker.record_failure()
+        assert breaker.allow()
+        breaker.record_failure()
+        assert breaker.is_open and not breaker.allow()
+
+        clock[0] += 30
+        assert breaker.allow()
+        assert not breaker.allow()  # one trial at a time
+        breaker.record_failure()
+        assert breaker.is_open and not breaker.allow()
+
+        clock[0] += 30
+        assert breaker.allow()
+        breaker.record_success()
+        assert not breaker.is_open and breaker.allow()
+
+
+class TestSigning:
+    """Tests for request signing."""
+
+    def test_signature_covers_timestamp_and_body(self):
+        subscription = _subscription(auth_type=AuthType.BEARER, auth_config={"token": "abc"})
+        delivery = _delivery(subscription)
+
+        headers = signed_headers(delivery, subscription)
+
+        signed = f"{headers['X-Webhook-Timestamp']}.{delivery.request_body}".encode()
+        expected = hmac.new(b"s3cret", signed, hashlib.sha256).hexdigest()
+        assert headers["X-Webhook-Signature"] == f"sha256={expected}"
+        assert headers["Authorization"] == "Bearer abc"
+        assert headers["Content-Type"] == "application/json"
+
+
+class TestWebhookDispatcher:
+    """Tests for WebhookDispatcher sending and outcomes."""
+
+    async def test_classifies_responses(self):
+        statuses = {"/ok": 204, "/busy": 503, "/bad": 400}
+        dispatcher = _dispatcher(lambda request: httpx.Response(statuses[request.url.path]))
+        subscription = _subscription()
+        deliveries = [
+            _delivery(subscription, url="https://receiver.test/ok"),
+            _delivery(subscription, url="https://receiver.test/busy"),
+            _delivery(subscription, attempt_number=5, url="https://receiver.test/busy"),
+            _delivery(subscription, url="https://receiver.test/bad"),
+        ]
+
+        for delivery in deliveries:
+            dispatcher._state(subscription.id).in_flight += 1
+            await dispatcher._send(delivery, subscription)
+
+        outcomes = {o.values["id"]: o.values for o in dispatcher._outcomes}
+        ok, busy, exhausted, bad = (outcomes[d.id] for d in deliveries)
+        assert (ok["status"], ok["response_status"], ok["next_attempt_at"]) == (SUCCESS, 204, None)
+        assert (busy["status"], busy["attempt_number"]) == (RETRY, 2)
+        assert busy["next_attempt_at"] is not None
+        assert exhausted["status"] == FAILED
+        assert (bad["status"], bad["error_message"]) == (FAILED, "HTTP 400")
+        assert dispatcher.stats == {
+            "claimed": 0, "delivered": 1, "retried": 1, "failed": 2, "deferred": 0, "released": 0
+        }
+        # Every row in a bulk update needs the same keys
+        assert len({tuple(sorted(values)) for values in outcomes.values()}) == 1
+
+    async def test_caps_concurrency_per_subscription(self):
+        slow, fast = _subscription(), _subscription()
+        active = {slow.id: 0, fast.id: 0}
+        peak = {slow.id: 0, fast.id: 0}
+        owners = {}
+
+        async def handler(request):
+            owner = owners[request.url.path]
+            active[owner] += 1
+            peak[owner] = max(peak[owner], active[owner])
+            await asyncio.sleep(0.05 if owner == slow.id else 0)
+            active[owner] -= 1
+            return httpx.Response(200)
+
+        dispatcher = _dispatcher(handler, subscription_concurrency=2)
+        jobs = []
+        for subscription in (slow, fast):
+            for i in range(6):
+                delivery = _delivery(subscription, url=f"https://receiver.test/{subscription.id}/{i}")
+                owners[f"/{subscription.id}/{i}"] = subscription.id
+                dispatcher._state(subscription.id).in_flight += 1
+                jobs.append(dispatcher._send(delivery, subscription))
+
+        await asyncio.gather(*jobs)
+
+        assert peak[slow.id] == 2 and peak[fast.id] <= 2
+        assert dispatcher.stats["delivered"] == 12
+        assert all(state.in_flight == 0 for state in dispatcher._subscriptions.values())
+
+    async def test_open_breaker_defers_without_sending(self):
+        requests = []
+        dispatcher = _dispatcher(lambda request: requests.append(request) or httpx.Response(500))
+        subscription = _subscription()
+        dispatcher._state(subscription.id).breaker = CircuitBreaker(failure_threshold=1, open_seconds=60)
+
+        for _ in range(3):
+            dispatcher._state(subscription.id).in_flight += 1
+            await dispatcher._send(_delivery(subscription), subscription)
+
+        assert len(requests) == 1
+        assert dispatcher.stats["retried"] == 1 and dispatcher.stats["deferred"] == 2
+        deferred = dispatcher._outcomes[-1].values
+        assert (deferred["status"], deferred["attempt_number"]) == (RETRY, 1)
+
+    async def test_inactive_subscription_fails_delivery(self):
+        dispatcher = _dispatcher(lambda request: httpx.Response(200))
+        subscription = _subscription(status=WebhookStatus.INACTIVE)
+        dispatcher._state(subscription.id).in_flight += 1
+
+        await dispatcher._send(_delivery(subscription), subscription)
+
+        assert dispatcher._outcomes[0].values["status"] == FAILED
+
+    async def test_closing_releases_queued_deliveries(self):
+        gate = asyncio.Event()
+        requests = []
+
+        async def handler(request):
+            requests.append(request)
+            await gate.wait()
+            return httpx.Response(200)
+
+        dispatcher = _dispatcher(handler, subscription_concurrency=1)
+        subscription = _subscription()
+        deliveries = [_delivery(subscription) for _ in range(3)]
+        jobs = []
+        for delivery in deliveries:
+            dispatcher._state(subscription.id).in_flight += 1
+            jobs.append(asyncio.create_task(dispatcher._send(delivery, subscription)))
+        await asyncio.sleep(0.01)
+
+        # The deadline passes while the first request is under way
+        dispatcher._closing = True
+        gate.set()
+        await asyncio.gather(*jobs)
+
+        assert len(requests) == 1
+        assert dispatcher.stats["delivered"] == 1 and dispatcher.stats["released"] == 2
+        assert dispatcher._released == [deliveries[1].id, deliveries[2].id]
+
+    def test_lease_outlasts_batch_and_task(self):
+        from app.tasks.webhook_tasks import DISPATCH_MAX_SECONDS, dispatch_webhooks_task
+
+        assert webhook_dispatcher.WEBHOOK_LEASE_SECONDS > webhook_dispatcher.WEBHOOK_BATCH_SECONDS + DISPATCH_MAX_SECONDS
+        assert webhook_dispatcher.WEBHOOK_LEASE_SECONDS > dispatch_webhooks_task.time_limit
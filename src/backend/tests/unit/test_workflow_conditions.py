@@ -0,0 +1,84 @@
+"""
+Workflow condition compiler tests
+Compiled expressions must keep the evaluator's semantics, add precedence and
+parentheses, and be cached per transition version.
+"""
+from datetime import datetime
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+
+from app.services.workflow_engine.conditions import (
+    ConditionCache, ConditionSyntaxError, compile_condition, tokenize
+)
+from app.services.workflow_engine.instance_service import ConditionEvaluator
+
+
+class TestCompileCondition:
+    """Tests for compile_condition."""
+
+    @pytest.mark.parametrize("expression, variables, expected", [
+        ("amount > 100", {"amount": 150}, True),
+        ("amount > 100", {"amount": 50}, False),
+        ("status == 'approved'", {"status": "approved"}, True),
+        ('status != "approved"', {"status": "approved"}, False),
+        ("status in ['approved', 'pending']", {"status": "pending"}, True),
+        ("status not in ['approved', 'pending']", {"status": "rejected"}, True),
+        ("tags contains 'urgent'", {"tags": ["urgent", "tax"]}, True),
+        ("amount >= 1000 AND department == 'finance'", {"amount": 1000, "department": "finance"}, True),
+        ("approved", {"approved": True}, True),
+        ("!approved", {"approved": True}, False),
+        ("not approved", {}, True),
+        ("employee.grade == 'M1'", {"employee": {"grade": "M1"}}, True),
+        ("employee.grade == 'M1'", {"employee": "M1"}, False),
+        ("level in [1, 2]", {"level": 2}, True),
+        ("amount > 100", {"amount": None}, False),
+        ("", {}, True),
+    ])
+    def test_semantics(self, expression, variables, expected):
+        assert compile_condition(expression)(variables) is expected
+        assert ConditionEvaluator.evaluate(expression, variables) is expected
+
+    def test_precedence_and_parentheses(self):
+        # and binds tighter than or
+        condition = compile_condition("urgent or amount > 1000 and department == 'finance'")
+        assert condition({"urgent": True, "amount": 0, "department": "hr"})
+        assert not condition({"urgent": False, "amount": 5000, "department": "hr"})
+
+        grouped = compile_condition("(urgent or amount > 1000) and department == 'finance'")
+        assert not grouped({"urgent": True, "amount": 0, "department": "hr"})
+        assert grouped({"urgent": False, "amount": 5000, "department": "finance"})
+
+    def test_invalid_expressions_are_false(self):
+        with pytest.raises(ConditionSyntaxError):
+            tokenize("amount > 100 ; drop")
+        assert compile_condition("amount > ")({"amount": 1}) is False
+        assert compile_condition("(amount > 1")({"amount": 5}) is False
+
+
+class TestConditionCache:
+    """Tests for ConditionCache."""
+
+    def _transition(self, expression, updated_at=datetime(2025, 1, 1)):
+        return SimpleNamespace(id=uuid4(), condition_expression=expression, updated_at=updated_at)
+
+    def test_recompiles_when_transition_changes(self):
+        cache = ConditionCache()
+        transition = self._transition("amount > 100")
+
+        first = cache.get(transition)
+        assert cache.get(transition) is first
+        assert first({"amount": 150})
+
+        transition.condition_expression = "amount > 200"
+        transition.updated_at = datetime(2025, 1, 2)
+        assert not cache.get(transition)({"amount": 150})
+
+    def test_evicts_least_recently_used(self):
+        cache = ConditionCache(max_size=2)
+        transitions = [self._transition(f"amount > {i}") for i in range(3)]
+        for transition in transitions:
+            cache.get(transition)
+        assert len(cache._entries) == 2
+        assert (transitions[0].id, transitions[0].updated_at) not in cache._entries